@@ -113,6 +113,25 @@ class BaseBenchmarkUtil(object):
                  "cannot be used in conjunction with --mpi_num_processes, which uses mpirun.",
             dest="numa_cores_per_instance", default=None)
 
+        self._common_arg_parser.add_argument(
+            "--numa-instances", type=check_positive_number,
+            help="When used with --numa-cores-per-instance, run this number of instances, each "
+                 "one with as many cores as possible (an instance placement for latency), "
+                 "instead of as many instances of NUMA_CORES_PER_INSTANCE cores as fit.",
+            dest="numa_instances", default=None)
+
+        self._common_arg_parser.add_argument(
+            "--instance-timeout", type=check_positive_number,
+            help="The number of seconds after which the instances of a --numa-cores-per-instance "
+                 "run are stopped, if they are still running.",
+            dest="instance_timeout", default=None)
+
+        self._common_arg_parser.add_argument(
+            "--stop-on-instance-failure",
+            help="When running multiple instances using --numa-cores-per-instance, stop all of "
+                 "the remaining instances as soon as one instance exits with an error.",
+            dest="stop_on_instance_failure", action="store_true")
+
         self._common_arg_parser.add_argument(
             "-d", "--data-location",
             help="Specify the location of the data. If this parameter is not "
@@ -348,6 +367,10 @@ class BaseBenchmarkUtil(object):
                                          "number of system cores ({}).".format(args.numa_cores_per_instance,
                                                                                system_num_cores))
 
+        if getattr(args, "numa_instances", None) and \
+                (not args.numa_cores_per_instance or args.numa_cores_per_instance == "socket"):
+            raise ValueError("--numa-instances can only be used with a number of --numa-cores-per-instance.")
+
         # If socket id is specified and we have a cpuset, make sure that there are some cores in the specified socket.
         # If cores are limited, then print out a note about that.
         if args.socket_id != -1 and self._platform_util.cpuset_cpus:
@@ -23,7 +23,10 @@ import json
 import os
 import re
 import sys
-import time
+
+from common.platform_util import CPUTopology
+from common.utils.instance_supervisor import InstanceSupervisor
+from common.utils.placement import LATENCY, THROUGHPUT, PlacementPlanner
 
 
 def set_env_var(env_var, value, overwrite_existing=False):
@@ -103,6 +106,8 @@ class BaseModelInitializer(object):
         If the replace_unique_output_dir arg is set, multi-instance runs will
         swap out that path for a path with the instance number in the folder name
         so that each instance uses a unique output folder.
+
+        For multi-instance runs, the list of InstanceResult objects is returned.
         """
         if self.args.verbose:
             print("Received these standard args: {}".format(self.args))
@@ -120,7 +125,7 @@ class BaseModelInitializer(object):
                       "the list of cpu nodes could not be retrieved. Please ensure "
                       "that your system has numa nodes and numactl is installed.")
             else:
-                self.run_numactl_multi_instance(
+                return self.run_numactl_multi_instance(
                     cmd, replace_unique_output_dir=replace_unique_output_dir)
         else:
             if self.args.verbose:
@@ -145,9 +150,21 @@ class BaseModelInitializer(object):
         instances, where each instance uses the a specified number of cores. The
         number of cores used per instance is specified by args.numa_cores_per_instance.
 
+        When the platform util has the sysfs topology, the cores are assigned using the
+        PlacementPlanner, so that an instance never spans last level cache domains or NUMA
+        nodes, and leftover cores are spread over the instances instead of being skipped.
+        Each instance's memory is bound to its node with --membind. If args.numa_instances
+        is set, that number of instances is planned instead, each with as many cores as possible.
+
         The command for each instance uses numactl and the --physcpubind arg with
-        the appropriate core list. Each instance writes output to it's own log file,
-        and a combined log file is created after everything has executed.
+        the appropriate core list. The instances are started and supervised by an
+        InstanceSupervisor, which streams the output of each instance to it's own
+        log file and to stdout. A combined log file is created after every instance
+        has exited. If args.stop_on_instance_failure is set, the remaining instances
+        are stopped when one instance fails, and if args.instance_timeout is set,
+        instances that are still running after that many seconds are stopped.
+
+        Returns the list of InstanceResult objects with the exit code of each instance.
 
         If the replace_unique_output_dir arg is set, multi-instance runs will
         swap out that path for a path with the instance number in the folder name
@@ -164,6 +181,10 @@ class BaseModelInitializer(object):
         # Remove leading/trailing whitespace
         cmd = cmd.strip()
 
+        # numactl prefix of each instance from the placement planner, which binds the memory
+        # to the instance's node
+        instance_numactl_prefixes = None
+
         if self.args.numa_cores_per_instance != "socket":
             # Get the cores list and group them according to the number of cores per instance
             cores_per_instance = int(self.args.numa_cores_per_instance)
@@ -184,7 +205,21 @@ class BaseModelInitializer(object):
                     combined_core_list += socket_cores
                 cpu_cores_list = combined_core_list
 
-            instance_cores_list = self.group_cores(cpu_cores_list, cores_per_instance)
+            topology = getattr(self.platform_util, "topology", None)
+            if isinstance(topology, CPUTopology):
+                # Plan the instances so that they don't span cache domains, and spread the
+                # leftover cores over the instances instead of skipping them. With
+                # --numa-instances, plan that number of instances for latency instead.
+                planner = PlacementPlanner(topology, allowed_cpus=[int(x) for x in cpu_cores_list])
+                num_instances = getattr(self.args, "numa_instances", None)
+                if isinstance(num_instances, int) and num_instances > 0:
+                    placements = planner.plan(objective=LATENCY, num_instances=num_instances)
+                else:
+                    placements = planner.plan(objective=THROUGHPUT, cores_per_instance=cores_per_instance)
+                instance_cores_list = [[str(x) for x in placement.cores] for placement in placements]
+                instance_numactl_prefixes = [placement.numactl_prefix() for placement in placements]
+            else:
+                instance_cores_list = self.group_cores(cpu_cores_list, cores_per_instance)
         else:
             instance_cores_list = []
             cores_per_instance = "socket"
@@ -208,10 +243,14 @@ class BaseModelInitializer(object):
         log_filename_format += "{}.log"
         instance_logfiles = []
 
-        # Loop through each instance and add that instance's command to a string
-        multi_instance_command = ""
+        supervisor = InstanceSupervisor(
+            stop_on_failure=getattr(self.args, "stop_on_instance_failure", False) is True,
+            timeout=self._get_instance_timeout())
+
+        # Loop through each instance and register that instance's command with the supervisor
         for instance_num, core_list in enumerate(instance_cores_list):
-            if cores_per_instance != "socket" and len(core_list) < int(cores_per_instance):
+            if cores_per_instance != "socket" and len(core_list) < int(cores_per_instance) and \
+                    instance_numactl_prefixes is None:
                 print("NOTE: Skipping remainder of {} cores for instance {}"
                       .format(len(core_list), instance_num))
                 continue
@@ -219,14 +258,17 @@ class BaseModelInitializer(object):
             if len(core_list) == 0:
                 continue
 
+            if instance_numactl_prefixes is not None:
+                numactl_prefix = instance_numactl_prefixes[instance_num]
+            else:
+                numactl_prefix = "numactl --localalloc --physcpubind={}".format(",".join(core_list))
+
             if "OMP_NUM_THREADS" in os.environ:
-                prefix = ("{0}OMP_NUM_THREADS={1} "
-                          "numactl --localalloc --physcpubind={2}").format(
-                              ld_preload_prefix, os.environ["OMP_NUM_THREADS"], ",".join(core_list))
+                prefix = "{0}OMP_NUM_THREADS={1} {2}".format(
+                    ld_preload_prefix, os.environ["OMP_NUM_THREADS"], numactl_prefix)
             else:
-                prefix = ("{0}OMP_NUM_THREADS={1} "
-                          "numactl --localalloc --physcpubind={2}").format(
-                              ld_preload_prefix, len(core_list), ",".join(core_list))
+                prefix = "{0}OMP_NUM_THREADS={1} {2}".format(
+                    ld_preload_prefix, len(core_list), numactl_prefix)
             instance_logfile = log_filename_format.format("instance" + str(instance_num))
 
             unique_command = cmd
@@ -237,8 +279,7 @@ class BaseModelInitializer(object):
                 unique_command = unique_command.replace(replace_unique_output_dir, unique_dir)
 
             instance_command = "{} {}".format(prefix, unique_command)
-            multi_instance_command += "{} >> {} 2>&1 & \\\n".format(
-                instance_command, instance_logfile)
+            supervisor.add_instance("instance{}".format(instance_num), instance_command, instance_logfile)
             instance_logfiles.append(instance_logfile)
 
             # write the command to the instance's log file
@@ -246,26 +287,15 @@ class BaseModelInitializer(object):
                 log.write(instance_command)
                 log.write("\n\n")
 
-        multi_instance_command += "wait"
-
-        # Run the multi-instance command
-        print("\nMulti-instance run:\n" + multi_instance_command)
+        # Run the instances and wait for all of them to exit
+        print("\nMulti-instance run:\n" + "\n".join(
+            "{} >> {} 2>&1".format(instance.command, instance.log_file) for instance in supervisor.instances))
         sys.stdout.flush()
-        os.system(multi_instance_command)
-
-        # Wait to ensure that log files have been written
-        max_retries = 20
-        retry_counter = 0
-        while retry_counter < max_retries:
-            if all([os.path.exists(log) for log in instance_logfiles]):
-                break
-            retry_counter += 1
-            if retry_counter >= max_retries:
-                print("Warning: Log files for all instances were not found after "
-                      "rechecking and waiting for {} seconds. The combined log file "
-                      "may not have output from all instances.".format(retry_counter))
-                break
-            time.sleep(1)
+        results = supervisor.run()
+
+        print("\nInstance exit codes:")
+        for result in results:
+            print("{}: {}{}".format(result.name, result.returncode, " (stopped)" if result.stopped else ""))
 
         # Generate the combined log file
         all_instance_log = log_filename_format.format("all_instances")
@@ -289,6 +319,18 @@ class BaseModelInitializer(object):
             print("\nA combined log file was saved to the output directory:\n"
                   "{}\n".format(os.path.basename(all_instance_log)))
 
+        return results
+
+    def _get_instance_timeout(self):
+        """
+        Returns the number of seconds after which multi-instance runs are stopped,
+        or None if no --instance-timeout was specified.
+        """
+        timeout = getattr(self.args, "instance_timeout", None)
+        if isinstance(timeout, (int, float)) and timeout > 0:
+            return timeout
+        return None
+
     def get_command_prefix(self, socket_id, numactl=True):
         """
         Returns the command prefix with:
@@ -22,6 +22,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import json
 import os  # noqa: F401
 import re
 import platform as system_platform
@@ -36,6 +37,284 @@ LOGICAL_CPUS_STR_ = "CPU(s):"
 NUMA_NODE_CPU_RANGE_STR_ = "NUMA node{} CPU(s):"
 ONLINE_CPUS_LIST = "On-line CPU(s) list:"
 
+SYSFS_ROOT_ = "/sys"
+BOOT_ID_FILE_ = "/proc/sys/kernel/random/boot_id"
+CGROUP_CPUSET_FILES_ = ["fs/cgroup/cpuset/cpuset.cpus",     # cgroup v1
+                        "fs/cgroup/cpuset.cpus.effective"]  # cgroup v2
+TOPOLOGY_CACHE_DIR_ENV_ = "CPU_TOPOLOGY_CACHE_DIR"
+TOPOLOGY_CACHE_FILE_ = "cpu_topology.json"
+
+
+def get_list_from_string_ranges(str_ranges):
+    """
+    Converts a string of numbered ranges (comma separated numbers or ranges), like the
+    sysfs cpu lists, to an ordered integer list without duplicates.
+    For example an input of "3-6,10,0-5" returns [0, 1, 2, 3, 4, 5, 6, 10]
+    """
+    result_list = []
+
+    for section in str_ranges.strip().split(","):
+        if "-" in section:
+            # Section is a range, so get the start and end values
+            start, end = section.split("-")
+            result_list += range(int(start), int(end) + 1)
+        elif len(section):
+            # This section is either empty or just a single number and not a range
+            result_list.append(int(section))
+
+    return sorted(set(result_list))
+
+
+def _read_sysfs_file(path, default=None):
+    """Returns the stripped contents of a sysfs file, or the default if it can't be read."""
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return default
+
+
+def read_cgroup_cpuset(sysfs_root=SYSFS_ROOT_):
+    """
+    Returns the cpu list string from the cgroup (v1 or v2) cpuset, or an empty string if
+    there is no cpuset. The cpuset is how docker limits the cores of a container.
+    """
+    for cpuset_file in CGROUP_CPUSET_FILES_:
+        cpuset = _read_sysfs_file(os.path.join(sysfs_root, cpuset_file))
+        if cpuset:
+            return cpuset
+    return ""
+
+
+class CPUTopology(object):
+    """
+    CPU topology of a Linux system, read from /sys/devices/system/cpu and
+    /sys/devices/system/node.
+
+    Only online cpus are part of the topology. Every cpu has a core id (unique
+    across the system, numbered like lscpu does), a socket (package) id, a NUMA
+    node id (-1 if the system has no NUMA nodes), a list of SMT siblings, and the
+    id of the last level cache domain that it belongs to (the lowest cpu id
+    sharing that cache). Nodes are read from sysfs instead of assuming an even
+    split of the cores, so uneven nodes, sub-NUMA clustering and offline cores
+    are handled.
+    """
+
+    def __init__(self, cpus, offline_cpus=None, cpuset=None):
+        """
+        :param cpus: dict of cpu id to a dict with the core_id, socket_id, node_id,
+                     siblings and llc_id of the cpu
+        :param offline_cpus: list of cpu ids that are present, but offline
+        :param cpuset: list of cpu ids in the cgroup cpuset, or None if there is no cpuset
+        """
+        self.cpus = {int(cpu_id): info for cpu_id, info in cpus.items()}
+        self.offline_cpus = sorted(offline_cpus or [])
+        self.cpuset = cpuset
+
+    @classmethod
+    def from_sysfs(cls, sysfs_root=SYSFS_ROOT_):
+        """Reads the topology from sysfs. Raises an IOError if the cpu topology isn't available."""
+        cpu_dir = os.path.join(sysfs_root, "devices", "system", "cpu")
+        node_dir = os.path.join(sysfs_root, "devices", "system", "node")
+
+        online = _read_sysfs_file(os.path.join(cpu_dir, "online"))
+        if not online:
+            raise IOError("Unable to read the online cpus from {}".format(cpu_dir))
+        online_cpus = get_list_from_string_ranges(online)
+        online_set = set(online_cpus)
+        offline_cpus = get_list_from_string_ranges(_read_sysfs_file(os.path.join(cpu_dir, "offline"), ""))
+
+        # Map each cpu to its node using the node cpu lists
+        cpu_to_node = {}
+        if os.path.isdir(node_dir):
+            for entry in os.listdir(node_dir):
+                match = re.match(r"^node(\d+)$", entry)
+                if not match:
+                    continue
+                node_cpus = _read_sysfs_file(os.path.join(node_dir, entry, "cpulist"), "")
+                for cpu_id in get_list_from_string_ranges(node_cpus):
+                    cpu_to_node[cpu_id] = int(match.group(1))
+
+        cpus = {}
+        core_ids = {}
+        for cpu_id in online_cpus:
+            topology_dir = os.path.join(cpu_dir, "cpu{}".format(cpu_id), "topology")
+            socket_id = int(_read_sysfs_file(os.path.join(topology_dir, "physical_package_id"), "0"))
+            package_core_id = int(_read_sysfs_file(os.path.join(topology_dir, "core_id"), str(cpu_id)))
+            siblings = _read_sysfs_file(os.path.join(topology_dir, "thread_siblings_list"), str(cpu_id))
+
+            # core_id is only unique within a package, so number the cores the way lscpu does
+            core_key = (socket_id, package_core_id)
+            if core_key not in core_ids:
+                core_ids[core_key] = len(core_ids)
+
+            cpus[cpu_id] = {
+                "core_id": core_ids[core_key],
+                "socket_id": socket_id,
+                "node_id": cpu_to_node.get(cpu_id, -1),
+                "siblings": [x for x in get_list_from_string_ranges(siblings) if x in online_set],
+                "llc_id": cls._get_llc_id(os.path.join(cpu_dir, "cpu{}".format(cpu_id), "cache"), cpu_id),
+            }
+
+        return cls(cpus, offline_cpus)
+
+    @staticmethod
+    def _get_llc_id(cache_dir, cpu_id):
+        """Returns the lowest cpu id sharing the highest level data or unified cache with the cpu."""
+        llc_level = -1
+        llc_id = cpu_id
+        if not os.path.isdir(cache_dir):
+            return llc_id
+
+        for entry in os.listdir(cache_dir):
+            if not entry.startswith("index"):
+                continue
+            index_dir = os.path.join(cache_dir, entry)
+            if _read_sysfs_file(os.path.join(index_dir, "type")) == "Instruction":
+                continue
+            level = int(_read_sysfs_file(os.path.join(index_dir, "level"), "-1"))
+            shared_cpus = get_list_from_string_ranges(
+                _read_sysfs_file(os.path.join(index_dir, "shared_cpu_list"), ""))
+            if level > llc_level and shared_cpus:
+                llc_level = level
+                llc_id = shared_cpus[0]
+        return llc_id
+
+    @classmethod
+    def load(cls, sysfs_root=SYSFS_ROOT_, cache_dir=None, boot_id_file=BOOT_ID_FILE_):
+        """
+        Returns the topology of the system, using a cache file so that sysfs only has to be
+        walked once per boot. The cache is keyed by the boot id and the list of online cpus,
+        so it is refreshed after a reboot or when cpus are taken offline. The cgroup cpuset
+        is not cached, since it can be different for every container.
+
+        The cache directory defaults to the CPU_TOPOLOGY_CACHE_DIR environment variable or
+        ~/.cache/model_zoo. Errors reading or writing the cache file are ignored.
+        """
+        cpuset = read_cgroup_cpuset(sysfs_root)
+        cache_key = "{}:{}:{}".format(
+            _read_sysfs_file(boot_id_file, ""), os.path.abspath(sysfs_root),
+            _read_sysfs_file(os.path.join(sysfs_root, "devices", "system", "cpu", "online"), ""))
+
+        if cache_dir is None:
+            cache_dir = os.environ.get(TOPOLOGY_CACHE_DIR_ENV_,
+                                       os.path.join(os.path.expanduser("~"), ".cache", "model_zoo"))
+        cache_file = os.path.join(cache_dir, TOPOLOGY_CACHE_FILE_)
+
+        topology = None
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached.get("cache_key") == cache_key:
+                topology = cls.from_dict(cached["topology"])
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        if topology is None:
+            topology = cls.from_sysfs(sysfs_root)
+            try:
+                if not os.path.isdir(cache_dir):
+                    os.makedirs(cache_dir)
+                # Write to a temp file first, so that concurrent launches never read a partial file
+                tmp_file = "{}.{}".format(cache_file, os.getpid())
+                with open(tmp_file, "w") as f:
+                    json.dump({"cache_key": cache_key, "topology": topology.to_dict()}, f)
+                os.replace(tmp_file, cache_file)
+            except (IOError, OSError):
+                pass
+
+        topology.cpuset = get_list_from_string_ranges(cpuset) if cpuset else None
+        return topology
+
+    def to_dict(self):
+        return {"cpus": {str(cpu_id): info for cpu_id, info in self.cpus.items()},
+                "offline_cpus": self.offline_cpus}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["cpus"], data.get("offline_cpus"))
+
+    @property
+    def online_cpus(self):
+        return sorted(self.cpus.keys())
+
+    @property
+    def sockets(self):
+        """Sorted list of the socket ids with online cpus"""
+        return sorted(set(info["socket_id"] for info in self.cpus.values()))
+
+    @property
+    def nodes(self):
+        """Sorted list of the NUMA node ids with online cpus (empty if there are no NUMA nodes)"""
+        return sorted(set(info["node_id"] for info in self.cpus.values() if info["node_id"] != -1))
+
+    @property
+    def num_logical_cpus(self):
+        return len(self.cpus) + len(self.offline_cpus)
+
+    @property
+    def threads_per_core(self):
+        return max([len(info["siblings"]) for info in self.cpus.values()] or [0])
+
+    @property
+    def cores_per_socket(self):
+        """The largest number of physical cores on one socket"""
+        return max([len(self.physical_cores(socket_id=socket_id)) for socket_id in self.sockets] or [0])
+
+    def physical_cores(self, node_id=None, socket_id=None, allowed_cpus=None):
+        """
+        Returns one cpu id per physical core (the lowest of its SMT siblings), optionally
+        limited to one node or socket. If allowed_cpus is set, only those cpus are used, so
+        a core is skipped if none of its threads are allowed.
+        """
+        allowed = set(allowed_cpus) if allowed_cpus is not None else None
+        cores = {}
+        for cpu_id in self.online_cpus:
+            info = self.cpus[cpu_id]
+            if node_id is not None and info["node_id"] != node_id:
+                continue
+            if socket_id is not None and info["socket_id"] != socket_id:
+                continue
+            if allowed is not None and cpu_id not in allowed:
+                continue
+            cores.setdefault(info["core_id"], cpu_id)
+        return sorted(cores.values())
+
+    def llc_domains(self, allowed_cpus=None):
+        """Returns a dict of last level cache domain id to the physical cores in that domain."""
+        domains = {}
+        for cpu_id in self.physical_cores(allowed_cpus=allowed_cpus):
+            domains.setdefault(self.cpus[cpu_id]["llc_id"], []).append(cpu_id)
+        return domains
+
+    def membind_info(self):
+        """
+        Returns the cpu, core, socket and node for every online cpu, in the same format
+        as the parsed output of 'lscpu --parse=CPU,Core,Socket,Node'.
+        """
+        return [[str(cpu_id), str(self.cpus[cpu_id]["core_id"]), str(self.cpus[cpu_id]["socket_id"]),
+                 str(self.cpus[cpu_id]["node_id"]) if self.cpus[cpu_id]["node_id"] != -1 else ""]
+                for cpu_id in self.online_cpus]
+
+
+# CPUTopology loaded by get_cpu_topology, so that it's only loaded once per process
+_cpu_topology = None
+
+
+def get_cpu_topology(verbose=False):
+    """
+    Returns the cached sysfs CPUTopology, or None if it's not available (for example,
+    when not running on Linux), in which case lscpu is used.
+    """
+    global _cpu_topology
+    if _cpu_topology is None:
+        try:
+            _cpu_topology = CPUTopology.load()
+        except (IOError, OSError, ValueError) as e:
+            if verbose:
+                print("Unable to read the cpu topology from sysfs: {}".format(e))
+    return _cpu_topology
+
 
 class CPUInfo():
     """CPU information class."""
@@ -43,18 +322,26 @@ class CPUInfo():
     def __init__(self):
         """Initialize CPU information class."""
         self._binding_data = CPUInfo._sort_membind_info(self._get_core_membind_info())
+        # sysfs topology, or None if lscpu was used to get the binding information
+        self.topology = get_cpu_topology()
 
     @staticmethod
     def _get_core_membind_info():
         """
         Return sorted information about cores and memory binding.
+        The information is read from the sysfs topology, and lscpu is only used
+        if sysfs is not available.
         E.g.
-        CPU ID, Socket ID, Node ID, HT CPU ID,
+        CPU ID, Core ID, Socket ID, Node ID,
         0  ,     0    ,    0   ,     0
-        1  ,     0    ,    0   ,     1
+        1  ,     1    ,    0   ,     0
         :return: list with cpu, sockets, ht core and memory binding information
         :rtype: List[List[str, Any]]
         """
+        topology = get_cpu_topology()
+        if topology is not None:
+            return topology.membind_info()
+
         args = ["lscpu", "--parse=CPU,Core,Socket,Node"]
         process_lscpu = subprocess.check_output(args, universal_newlines=True).split("\n")
 
@@ -72,55 +359,44 @@ class CPUInfo():
     @staticmethod
     def _sort_membind_info(membind_bind_info):
         """
-        Sore membind info data.
+        Sort membind info data into one list of cores per NUMA node (or per socket, on
+        a machine with no NUMA nodes). The first cpu of each core is used as the core's
+        cpu_id and the next one as its ht_cpu_id, so nodes don't need to have the same
+        number of cores and cpu ids don't need to match the core ids.
         :param membind_bind_info: raw membind info data
         :type membind_bind_info: List[List[str]]
         :return: sorted membind info
         :rtype: List[List[Dict[str, int]]]
         """
-        membind_cpu_list = []
-        nodes_count = int(max(element[2] for element in membind_bind_info)) + 1
-        # Sort list by Node id
-        for node_number in range(nodes_count):
-            node_core_list = []
-            core_info = {}
-            for entry in membind_bind_info:
-                cpu_id = int(entry[0])
-                core_id = int(entry[1])
-                node_id = int(entry[2])
-                # On a machine where there is no NUMA nodes, entry[3] could be empty, so set socket_id = -1
-                if entry[3] != "":
-                    socket_id = int(entry[3])
-                else:
-                    socket_id = -1
-
-                # Skip nodes other than current node number
-                if node_number != node_id:
-                    continue
+        core_info_per_group = {}
+        for entry in sorted(membind_bind_info, key=lambda x: int(x[0])):
+            cpu_id = int(entry[0])
+            core_id = int(entry[1])
+            node_id = int(entry[2])
+            # On a machine where there is no NUMA nodes, entry[3] could be empty, so set socket_id = -1
+            if entry[3] != "":
+                socket_id = int(entry[3])
+            else:
+                socket_id = -1
+
+            # Group by the NUMA node if there is one, so that instances never span nodes
+            group_id = socket_id if socket_id != -1 else node_id
+            core_info = core_info_per_group.setdefault(group_id, {})
 
+            if core_id not in core_info:
                 # Add core info
-                if cpu_id == core_id:
-                    core_info.update({
-                        core_id: {
-                            "cpu_id": cpu_id,
-                            "node_id": node_id,
-                            "socket_id": socket_id,
-                        },
-                    })
-                else:
-                    # Add information about Hyper Threading
-                    core_info[core_id]["ht_cpu_id"] = cpu_id
-
-            # Change dict of dicts to list of dicts
-            for iterator in range(len(core_info)):
-                curr_core_id = len(core_info) * node_number + iterator
-                single_core_info = core_info.get(curr_core_id)
-                if single_core_info:
-                    node_core_list.append(single_core_info)
-
-            membind_cpu_list.append(node_core_list)
-
-        return membind_cpu_list
+                core_info[core_id] = {
+                    "cpu_id": cpu_id,
+                    "node_id": node_id,
+                    "socket_id": socket_id,
+                }
+            elif "ht_cpu_id" not in core_info[core_id]:
+                # Add information about Hyper Threading
+                core_info[core_id]["ht_cpu_id"] = cpu_id
+
+        # Change dict of dicts to list of dicts, ordered by cpu id
+        return [sorted(core_info_per_group[group_id].values(), key=lambda x: x["cpu_id"])
+                for group_id in sorted(core_info_per_group.keys())]
 
     @property
     def sockets(self):
@@ -195,11 +471,15 @@ class PlatformUtil:
         self.num_logical_cpus = 0
         self.num_numa_nodes = 0
 
-        # Core list generated by numactl -H in the case where --numa-cores-per-instance is
-        # being used. It then gets pruned based on the cpuset_cpus, in case docker is
+        # Core list with the physical cores of each numa node, from the sysfs topology (or
+        # from numactl -H in the case where --numa-cores-per-instance is being used and sysfs
+        # is not available). It then gets pruned based on the cpuset_cpus, in case docker is
         # limiting the cores that the container has access to
         self.cpu_core_list = []
 
+        # CPUTopology read from sysfs, or None if lscpu was used to get the platform info
+        self.topology = None
+
         # Dictionary generated from the cpuset.cpus file (in linux_init) for the case where
         # docker is limiting the number of cores that the container has access to
         self.cpuset_cpus = None
@@ -221,39 +501,75 @@ class PlatformUtil:
         ordered.
         For example an input of "3-6,10,0-5" should return [0, 1, 2, 3, 4, 5, 6, 10]
         """
-        result_list = []
-
-        for section in str_ranges.split(","):
-            if "-" in section:
-                # Section is a range, so get the start and end values
-                start, end = section.split("-")
-                section_list = range(int(start), int(end) + 1)
-                result_list += section_list
-            elif len(section):
-                # This section is either empty or just a single number and not a range
-                result_list.append(int(section))
-
-        # Remove duplicates
-        result_list = list(set(result_list))
-
-        return result_list
+        return get_list_from_string_ranges(str_ranges)
 
     def _get_cpuset(self):
         """
-        Try to get the cpuset.cpus info, since lscpu does not know if docker has limited
-        the cpuset accessible to the container
+        Try to get the cpuset.cpus info (cgroup v1 or v2), since lscpu does not know if
+        docker has limited the cpuset accessible to the container
         """
-        cpuset = ""
-        cpuset_cpus_file = "/sys/fs/cgroup/cpuset/cpuset.cpus"
-        if os.path.exists(cpuset_cpus_file):
-            with open(cpuset_cpus_file, "r") as f:
-                cpuset = f.read()
-
-            if hasattr(self.args, "verbose") and self.args.verbose:
-                print("cpuset.cpus: {}".format(cpuset))
+        cpuset = read_cgroup_cpuset()
+        if cpuset and hasattr(self.args, "verbose") and self.args.verbose:
+            print("cpuset.cpus: {}".format(cpuset))
         return cpuset
 
     def linux_init(self):
+        verbose = hasattr(self.args, "verbose") and self.args.verbose
+        topology = get_cpu_topology(verbose=verbose)
+        if topology is not None:
+            self._topology_init(topology)
+        else:
+            self._lscpu_init()
+
+    def _topology_init(self, topology):
+        """
+        Sets the platform info from the sysfs topology. The cpu_core_list has one cpu per
+        physical core for each NUMA node, using the actual cores of each node, so nodes
+        with different numbers of cores (e.g. with sub-NUMA clustering or offline cores)
+        get the right core lists.
+        """
+        self.topology = topology
+        self.num_numa_nodes = len(topology.nodes)
+        self.num_cpu_sockets = len(topology.sockets)
+        self.num_cores_per_socket = topology.cores_per_socket
+        self.num_threads_per_core = topology.threads_per_core
+        self.num_logical_cpus = topology.num_logical_cpus
+
+        # The cgroup cpuset limits the cores when running in a container
+        allowed_cpus = None
+        cpuset = self._get_cpuset()
+        if cpuset:
+            num_cores_arg = -1
+            if hasattr(self.args, "num_cores"):
+                num_cores_arg = self.args.num_cores
+            # Only use the cpuset if it is limiting the cpus, or if the num_cores arg is being
+            # specified, since the cpuset_cpus will be used to create the numactl args in
+            # base_model_init.py
+            cpuset_list = self._get_list_from_string_ranges(cpuset)
+            if cpuset_list != topology.online_cpus or num_cores_arg != -1:
+                allowed_cpus = cpuset_list
+
+        self.cpu_core_list = [[str(x) for x in topology.physical_cores(node_id=node, allowed_cpus=allowed_cpus)]
+                              for node in topology.nodes]
+
+        if allowed_cpus is not None:
+            # Split the cpuset up by node, keeping one cpu per physical core, and remove nodes
+            # where there are no cores enabled in the cpuset
+            self.cpuset_cpus = {}
+            for node, core_list in enumerate(self.cpu_core_list):
+                if core_list:
+                    self.cpuset_cpus[node] = [int(x) for x in core_list]
+
+            # Update the number of sockets based on the cpuset
+            cpuset_sockets = set(topology.cpus[cpu]["socket_id"] for cpu in allowed_cpus if cpu in topology.cpus)
+            if len(cpuset_sockets) > 0:
+                self.num_cpu_sockets = len(cpuset_sockets)
+
+        if hasattr(self.args, "verbose") and self.args.verbose:
+            print("Core list: {}".format(self.cpu_core_list), flush=True)
+
+    def _lscpu_init(self):
+        """Sets the platform info by parsing the output of lscpu, when sysfs is not available."""
         lscpu_cmd = "lscpu"
         try:
             lscpu_output = subprocess.check_output([lscpu_cmd],
@@ -51,6 +51,9 @@ echo "    MPI_NUM_PROCESSES: ${MPI_NUM_PROCESSES}"
 echo "    MPI_NUM_PEOCESSES_PER_SOCKET: ${MPI_NUM_PROCESSES_PER_SOCKET}"
 echo "    MPI_HOSTNAMES: ${MPI_HOSTNAMES}"
 echo "    NUMA_CORES_PER_INSTANCE: ${NUMA_CORES_PER_INSTANCE}"
+echo "    NUMA_INSTANCES: ${NUMA_INSTANCES}"
+echo "    INSTANCE_TIMEOUT: ${INSTANCE_TIMEOUT}"
+echo "    STOP_ON_INSTANCE_FAILURE: ${STOP_ON_INSTANCE_FAILURE}"
 echo "    PYTHON_EXE: ${PYTHON_EXE}"
 echo "    PYTHONPATH: ${PYTHONPATH}"
 echo "    DRY_RUN: ${DRY_RUN}"
@@ -333,6 +336,18 @@ fi
 numa_cores_per_instance_arg=""
 if [[ -n ${NUMA_CORES_PER_INSTANCE} && ${NUMA_CORES_PER_INSTANCE} != "None" ]]; then
   numa_cores_per_instance_arg="--numa-cores-per-instance=${NUMA_CORES_PER_INSTANCE}"
+
+  if [[ -n ${NUMA_INSTANCES} && ${NUMA_INSTANCES} != "None" ]]; then
+    numa_cores_per_instance_arg="${numa_cores_per_instance_arg} --numa-instances=${NUMA_INSTANCES}"
+  fi
+
+  if [[ -n ${INSTANCE_TIMEOUT} && ${INSTANCE_TIMEOUT} != "None" ]]; then
+    numa_cores_per_instance_arg="${numa_cores_per_instance_arg} --instance-timeout=${INSTANCE_TIMEOUT}"
+  fi
+
+  if [[ ${STOP_ON_INSTANCE_FAILURE} == "True" ]]; then
+    numa_cores_per_instance_arg="${numa_cores_per_instance_arg} --stop-on-instance-failure"
+  fi
 fi
 
 RUN_SCRIPT_PATH="common/${FRAMEWORK}/run_tf_benchmark.py"
@@ -0,0 +1,194 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+
+"""Supervisor for the processes of a multi-instance run."""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+class InstanceResult(object):
+    """Outcome of a single supervised instance."""
+
+    def __init__(self, name, command, log_file):
+        self.name = name
+        self.command = command
+        self.log_file = log_file
+        self.returncode = None
+        self.duration = None
+        self.stopped = False
+
+    @property
+    def succeeded(self):
+        return self.returncode == 0
+
+    def __repr__(self):
+        return "InstanceResult(name={!r}, returncode={!r}, duration={!r}, stopped={!r})".format(
+            self.name, self.returncode, self.duration, self.stopped)
+
+
+class InstanceSupervisor(object):
+    """
+    Starts one process per instance, streams the output of each process into
+    that instance's log file (and optionally to stdout, prefixed with the
+    instance name), and waits for all of them to exit.
+
+    If stop_on_failure is set, the remaining instances are stopped as soon as
+    one instance exits with a non-zero code. If timeout is set, all instances
+    that are still running after that many seconds are stopped.
+    """
+
+    def __init__(self, stop_on_failure=False, timeout=None, stream_output=True,
+                 poll_interval=0.1, kill_grace_period=10):
+        self.stop_on_failure = stop_on_failure
+        self.timeout = timeout
+        self.stream_output = stream_output
+        self.poll_interval = poll_interval
+        self.kill_grace_period = kill_grace_period
+        self._instances = []
+        self._stdout_lock = threading.Lock()
+
+    @property
+    def instances(self):
+        return self._instances
+
+    def add_instance(self, name, command, log_file):
+        """
+        Registers a shell command to run as an instance. Output is appended to
+        log_file, so a header can be written to the file before calling run().
+        """
+        result = InstanceResult(name, command, log_file)
+        self._instances.append(result)
+        return result
+
+    def run(self):
+        """
+        Runs all of the registered instances and blocks until every instance
+        has exited. Returns the list of InstanceResult objects.
+        """
+        processes = []
+        readers = []
+        start_time = time.time()
+
+        try:
+            for instance in self._instances:
+                process = self._start(instance)
+                reader = threading.Thread(target=self._stream, args=(instance, process))
+                reader.daemon = True
+                reader.start()
+                processes.append((instance, process, time.time()))
+                readers.append(reader)
+
+            self._wait(processes, start_time)
+        except KeyboardInterrupt:
+            self._stop_all(processes)
+            raise
+        finally:
+            for reader in readers:
+                reader.join()
+
+        return self._instances
+
+    def _start(self, instance):
+        """Starts the instance command in its own process group."""
+        popen_kwargs = {}
+        if hasattr(os, "setsid"):
+            popen_kwargs["start_new_session"] = True
+
+        return subprocess.Popen(instance.command, shell=True, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, **popen_kwargs)
+
+    def _stream(self, instance, process):
+        """Copies the process output into the instance log file and stdout."""
+        prefix = "[{}] ".format(instance.name)
+        with open(instance.log_file, "ab") as log:
+            for line in iter(process.stdout.readline, b""):
+                log.write(line)
+                log.flush()
+                if self.stream_output:
+                    text = line.decode("utf-8", errors="replace")
+                    with self._stdout_lock:
+                        sys.stdout.write(prefix + text)
+                        sys.stdout.flush()
+        process.stdout.close()
+
+    def _wait(self, processes, start_time):
+        """Polls the instances until they have all exited."""
+        running = list(processes)
+        while running:
+            still_running = []
+            for instance, process, instance_start in running:
+                returncode = process.poll()
+                if returncode is None:
+                    still_running.append((instance, process, instance_start))
+                    continue
+
+                instance.returncode = returncode
+                instance.duration = time.time() - instance_start
+                print("Instance {} exited with code {} after {:.1f} seconds".format(
+                    instance.name, returncode, instance.duration))
+
+                if returncode != 0 and self.stop_on_failure:
+                    print("Stopping the remaining instances, because instance {} failed".format(instance.name))
+                    self._stop_all([p for p in running if p[1] is not process])
+
+            running = [p for p in still_running if p[1].returncode is None]
+
+            if running and self.timeout and time.time() - start_time > self.timeout:
+                print("Stopping the remaining instances, because the timeout of {} seconds "
+                      "was reached".format(self.timeout))
+                self._stop_all(running)
+                running = []
+
+            if running:
+                time.sleep(self.poll_interval)
+
+    def _stop_all(self, processes):
+        """Sends SIGTERM to each process group, and SIGKILL after the grace period."""
+        alive = [(instance, process, start) for instance, process, start in processes
+                 if process.poll() is None]
+        for instance, process, _ in alive:
+            instance.stopped = True
+            self._signal(process, signal.SIGTERM)
+
+        deadline = time.time() + self.kill_grace_period
+        for instance, process, start in alive:
+            try:
+                process.wait(timeout=max(0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                self._signal(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+                process.wait()
+            instance.returncode = process.returncode
+            instance.duration = time.time() - start
+
+    @staticmethod
+    def _signal(process, sig):
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(os.getpgid(process.pid), sig)
+            else:
+                process.terminate()
+        except OSError:
+            # The process already exited
+            pass
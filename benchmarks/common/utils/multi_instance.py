@@ -20,6 +20,7 @@
 """Multi instance utils module."""
 
 from common.platform_util import CPUInfo
+from common.utils.placement import PlacementPlanner, format_cpu_list
 
 
 def buckets(array, bucket_size):
@@ -230,6 +231,9 @@ class InferencePrefix:
         if cores_per_instance == 0:
             raise Exception("1 instance on sockets > 1 not implemented.")
 
+        if self._cpu_information.topology is not None:
+            return self._plan_cores(cores_per_instance)
+
         bucketed_cores = {}
         for node_id in range(self.sockets):
             socket_cores = membind_info[node_id][:self.cores_per_socket]
@@ -238,6 +242,41 @@ class InferencePrefix:
 
         return bucketed_cores
 
+    def _plan_cores(self, cores_per_instance):
+        """
+        Return cores in instance buckets using the placement planner, so that instances
+        don't span cache domains and leftover cores are spread over the instances.
+        Like the buckets of the binding information, only the first cores_per_socket cores
+        and instances_per_socket instances of each node are used.
+        :param cores_per_instance: minimum number of cores per instance
+        :return: instance buckets
+        :rtype: Dict[str, List[List[Dict[str, Any]]]]
+        """
+        topology = self._cpu_information.topology
+        node_ids = topology.nodes[:self.sockets]
+        allowed_cpus = []
+        for node_id in node_ids:
+            allowed_cpus += topology.physical_cores(node_id=node_id)[:self.cores_per_socket]
+        planner = PlacementPlanner(topology, allowed_cpus=allowed_cpus, node_ids=node_ids)
+
+        bucketed_cores = {}
+        for placement in planner.plan(cores_per_instance=cores_per_instance):
+            instance_buckets = bucketed_cores.setdefault(str(placement.node_id), [])
+            if len(instance_buckets) >= self.instances_per_socket:
+                continue
+            instance_config = []
+            for cpu_id in placement.cores:
+                core_info = {"cpu_id": cpu_id,
+                             "node_id": placement.node_id,
+                             "socket_id": topology.cpus[cpu_id]["socket_id"]}
+                siblings = [x for x in topology.cpus[cpu_id]["siblings"] if x != cpu_id]
+                if siblings:
+                    core_info["ht_cpu_id"] = siblings[0]
+                instance_config.append(core_info)
+            instance_buckets.append(instance_config)
+
+        return bucketed_cores
+
     def generate_multi_instance_ranges(self, use_ht=False):
         """
         Create config for multi-instance execution.
@@ -246,25 +285,28 @@ class InferencePrefix:
         """
         instance_binding = []
         split_cores = self.split_cores()
+        # The binding information has the NUMA node of a core under "socket_id", while the
+        # cores planned with the sysfs topology have it under "node_id"
+        memory_node_key = "node_id" if self._cpu_information.topology is not None else "socket_id"
         for instance_buckets in split_cores.values():
             for instance_config in instance_buckets:
                 if len(instance_config) == 1:
                     cores = instance_config[0].get("cpu_id")
                     ht_cores = instance_config[0].get("ht_cpu_id", None)
                 else:
-                    cores = "{first}-{last}".format(first=instance_config[0].get("cpu_id"),
-                                                    last=instance_config[-1].get("cpu_id"))
+                    # The cores of an instance aren't always consecutive (e.g. with a cpuset),
+                    # so only use ranges for consecutive cpu ids
+                    cores = format_cpu_list([core.get("cpu_id") for core in instance_config])
 
-                    first_ht = instance_config[0].get("ht_cpu_id", None)
-                    last_ht = instance_config[-1].get("ht_cpu_id", None)
-                    if first_ht is None or last_ht is None:
+                    ht_cpu_ids = [core.get("ht_cpu_id", None) for core in instance_config]
+                    if None in ht_cpu_ids:
                         ht_cores = None
                     else:
-                        ht_cores = "{first}-{last}".format(first=first_ht, last=last_ht)
+                        ht_cores = format_cpu_list(ht_cpu_ids)
 
                 cores_range = self.get_cores_range(cores, ht_cores, use_ht)
                 instance_binding.append({"cores_range": cores_range,
-                                         "socket_id": instance_config[0].get("socket_id")})
+                                         "socket_id": instance_config[0].get(memory_node_key)})
 
         return instance_binding
 
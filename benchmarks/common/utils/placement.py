@@ -0,0 +1,220 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+
+"""Instance placement planner for multi-instance runs."""
+
+THROUGHPUT = "throughput"
+LATENCY = "latency"
+
+
+def format_cpu_list(cpus):
+    """
+    Formats a list of cpu ids the way numactl and taskset expect them, using ranges
+    for consecutive ids. For example [0, 1, 2, 3, 8, 10, 11] returns "0-3,8,10-11".
+    :param cpus: list of cpu ids
+    :type cpus: List[int]
+    :return: cpu list string
+    :rtype: str
+    """
+    sections = []
+    for cpu in sorted(set(int(x) for x in cpus)):
+        if sections and cpu == sections[-1][1] + 1:
+            sections[-1][1] = cpu
+        else:
+            sections.append([cpu, cpu])
+
+    return ",".join(str(first) if first == last else "{}-{}".format(first, last)
+                    for first, last in sections)
+
+
+class InstancePlacement(object):
+    """Cores and memory node assigned to one instance."""
+
+    def __init__(self, cores, node_id, llc_id, ht_cores=None):
+        """
+        :param cores: physical core cpu ids used by the instance
+        :param node_id: NUMA node that the instance should allocate memory from
+        :param llc_id: id of the last level cache domain of the cores
+        :param ht_cores: SMT sibling cpu ids of the cores
+        """
+        self.cores = cores
+        self.node_id = node_id
+        self.llc_id = llc_id
+        self.ht_cores = ht_cores or []
+
+    def cpu_list(self, use_ht=False):
+        """Returns the cpu list string of the instance, with the SMT siblings if use_ht is set."""
+        return format_cpu_list(self.cores + (self.ht_cores if use_ht else []))
+
+    def numactl_prefix(self, use_ht=False, localalloc=False):
+        """
+        Returns the numactl prefix that binds the instance to its cores and its memory node.
+        If localalloc is set, memory is allocated on the local node instead of being bound.
+        """
+        if localalloc or self.node_id < 0:
+            memory_arg = "--localalloc"
+        else:
+            memory_arg = "--membind={}".format(self.node_id)
+        return "numactl {} --physcpubind={}".format(memory_arg, self.cpu_list(use_ht))
+
+    def taskset_prefix(self, use_ht=False):
+        """Returns the taskset prefix that binds the instance to its cores."""
+        return "taskset -c {}".format(self.cpu_list(use_ht))
+
+    def __repr__(self):
+        return "InstancePlacement(cores={!r}, node_id={!r}, llc_id={!r})".format(
+            self.cores, self.node_id, self.llc_id)
+
+
+class PlacementPlanner(object):
+    """
+    Plans which cores and memory node each instance of a multi-instance run uses.
+
+    Cores are grouped into domains that share a NUMA node and a last level cache,
+    and an instance never spans two domains. When the cores of a domain can't be
+    split evenly, the leftover cores are spread over the instances of that domain,
+    instead of being dropped. A domain with fewer cores than an instance is merged
+    into a neighbouring domain of the same node.
+
+    Two objectives are supported:
+     - THROUGHPUT: instances of (at least) cores_per_instance cores, as many as fit
+     - LATENCY: exactly num_instances instances, each one as large as possible, for
+       runs with a fixed number of instances and a latency budget
+    """
+
+    def __init__(self, topology, allowed_cpus=None, node_ids=None):
+        """
+        :param topology: CPUTopology of the system
+        :param allowed_cpus: cpus that can be used (e.g. the cpuset), or None to use every online cpu
+        :param node_ids: NUMA nodes that can be used, or None to use every node
+        """
+        self._topology = topology
+        self._allowed_cpus = allowed_cpus
+        self._node_ids = node_ids
+
+    def domains(self, merge_llc=False):
+        """
+        Returns a list of (node id, llc id, cores) tuples, with one cpu id per physical core.
+        If merge_llc is set, each node is a single domain.
+        """
+        domains = {}
+        for cpu in self._topology.physical_cores(allowed_cpus=self._allowed_cpus):
+            info = self._topology.cpus[cpu]
+            if self._node_ids is not None and info["node_id"] not in self._node_ids:
+                continue
+            llc_id = -1 if merge_llc else info["llc_id"]
+            domains.setdefault((info["node_id"], llc_id), []).append(cpu)
+
+        return sorted([(node_id, llc_id, cores) for (node_id, llc_id), cores in domains.items()],
+                      key=lambda x: (x[0], x[2][0]))
+
+    def plan(self, objective=THROUGHPUT, cores_per_instance=None, num_instances=None):
+        """
+        Returns the list of InstancePlacement objects for the objective.
+        :param objective: THROUGHPUT or LATENCY
+        :param cores_per_instance: minimum cores per instance, required for THROUGHPUT
+        :param num_instances: number of instances, required for LATENCY
+        :rtype: List[InstancePlacement]
+        """
+        if objective == THROUGHPUT:
+            if not cores_per_instance or int(cores_per_instance) <= 0:
+                raise ValueError("The number of cores per instance is required to plan for throughput.")
+            instances_per_domain = self._plan_throughput(int(cores_per_instance))
+        elif objective == LATENCY:
+            if not num_instances or int(num_instances) <= 0:
+                raise ValueError("The number of instances is required to plan for latency.")
+            instances_per_domain = self._plan_latency(int(num_instances))
+        else:
+            raise ValueError("Unknown placement objective: {}".format(objective))
+
+        placements = []
+        for (node_id, llc_id, cores), count in instances_per_domain:
+            for instance_cores in self._split(cores, count):
+                placements.append(InstancePlacement(
+                    instance_cores, node_id, llc_id, self._get_ht_cores(instance_cores)))
+        return placements
+
+    def _plan_throughput(self, cores_per_instance):
+        """Returns (domain, number of instances) pairs with as many instances as fit in each domain."""
+        domains = self.domains()
+        if domains and cores_per_instance > max(len(cores) for _, _, cores in domains):
+            # Instances are larger than a cache domain, so only keep them within a node
+            domains = self.domains(merge_llc=True)
+        if not domains:
+            raise ValueError("There are no cores available to place instances on.")
+
+        # Domains with fewer cores than an instance are merged into a neighbouring domain of the
+        # same node, and the cores of a node with fewer cores than an instance are left unused
+        merged_domains = []
+        for node_id, llc_id, cores in domains:
+            if merged_domains and merged_domains[-1][0] == node_id and \
+                    min(len(cores), len(merged_domains[-1][2])) < cores_per_instance:
+                _, prev_llc_id, prev_cores = merged_domains[-1]
+                merged_domains[-1] = (node_id, prev_llc_id if len(prev_cores) >= len(cores) else llc_id,
+                                      prev_cores + cores)
+            else:
+                merged_domains.append((node_id, llc_id, cores))
+
+        instances_per_domain = [(domain, len(domain[2]) // cores_per_instance) for domain in merged_domains
+                                if len(domain[2]) >= cores_per_instance]
+        if not instances_per_domain:
+            raise ValueError("No node has {} cores available to place an instance on.".format(cores_per_instance))
+        return instances_per_domain
+
+    def _plan_latency(self, num_instances):
+        """
+        Returns (domain, number of instances) pairs, assigning each instance to the domain
+        where it gets the most cores, which maximizes the size of the smallest instance.
+        """
+        domains = self.domains()
+        if len(domains) > num_instances:
+            # Fewer instances than cache domains, so allow instances to use a whole node
+            domains = self.domains(merge_llc=True)
+
+        total_cores = sum(len(cores) for _, _, cores in domains)
+        if num_instances > total_cores:
+            raise ValueError("Unable to place {} instances on {} cores.".format(num_instances, total_cores))
+
+        counts = [0] * len(domains)
+        for _ in range(num_instances):
+            best = max(range(len(domains)), key=lambda i: (len(domains[i][2]) / float(counts[i] + 1), -i))
+            counts[best] += 1
+        return [(domain, count) for domain, count in zip(domains, counts) if count > 0]
+
+    @staticmethod
+    def _split(cores, count):
+        """Splits the cores into count consecutive groups, whose sizes differ by at most one."""
+        size, remainder = divmod(len(cores), count)
+        groups = []
+        start = 0
+        for i in range(count):
+            end = start + size + (1 if i < remainder else 0)
+            groups.append(cores[start:end])
+            start = end
+        return groups
+
+    def _get_ht_cores(self, cores):
+        """Returns the SMT siblings of the cores, limited to the allowed cpus."""
+        allowed = set(self._allowed_cpus) if self._allowed_cpus is not None else None
+        ht_cores = []
+        for cpu in cores:
+            ht_cores += [x for x in self._topology.cpus[cpu]["siblings"]
+                         if x != cpu and (allowed is None or x in allowed)]
+        return ht_cores
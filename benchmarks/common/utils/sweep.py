@@ -0,0 +1,337 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+
+"""Batch size, cores per instance and precision sweeps for the launch script."""
+
+from __future__ import print_function
+
+import glob
+import importlib.util
+import json
+import os
+import re
+
+SUCCESS = "success"
+FAILED = "failed"
+
+# Patterns for the "Throughput: ... images/sec" and "Latency: ... ms" lines that the
+# model scripts print. These follow the format of the model pattern modules in
+# models/common/pytorch/consts/patterns.
+DEFAULT_PERF_PATTERN = {
+    "type": "total",
+    "pattern": r"Throughput:\s*(\d+(?:\.\d+)?)",
+    "unit": "fps",
+}
+
+DEFAULT_LATENCY_PATTERN = {
+    "type": "mean",
+    "pattern": r"Latency:\s*(\d+(?:\.\d+)?)\s*ms",
+    "unit": "ms",
+}
+
+
+def load_patterns(pattern_file=None):
+    """
+    Returns the (performance, latency) pattern dictionaries from a model pattern module.
+    The latency pattern is None if the module doesn't have a LATENCY dictionary, in which
+    case the latency is calculated from the throughput and the batch size.
+    :param pattern_file: path to the pattern module, or None to use the default patterns
+    """
+    if not pattern_file:
+        return DEFAULT_PERF_PATTERN, DEFAULT_LATENCY_PATTERN
+
+    name = os.path.splitext(os.path.basename(pattern_file))[0]
+    spec = importlib.util.spec_from_file_location(name, os.path.abspath(pattern_file))
+    patterns = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(patterns)
+    return patterns.PERF, getattr(patterns, "LATENCY", None)
+
+
+def _parse_values(log_file, pattern_dict):
+    """Returns the list of values that match the pattern in the log file."""
+    values = []
+    with open(log_file, "r", errors="replace") as f:
+        for line in f:
+            match = re.search(pattern_dict["pattern"], line)
+            if match:
+                values.append(float(match.group(1)))
+    return values
+
+
+def _get_value(values, pattern_dict):
+    """Returns the last value for a 'total' pattern or the mean for a 'mean' pattern."""
+    if not values:
+        return None
+    if pattern_dict.get("type") == "mean":
+        number_of_partials = pattern_dict.get("number_of_partials", len(values))
+        return sum(values[-number_of_partials:]) / len(values[-number_of_partials:])
+    return values[-1]
+
+
+def parse_point_logs(log_files, perf_pattern, latency_pattern=None, batch_size=None):
+    """
+    Parses the throughput and latency of one sweep point. The throughput is the sum of the
+    throughput of each instance's log file, and the latency is the mean latency in ms.
+    Returns (None, None) if the throughput was not found in one of the log files.
+    """
+    throughputs = []
+    latencies = []
+    for log_file in log_files:
+        throughput = _get_value(_parse_values(log_file, perf_pattern), perf_pattern)
+        if throughput is None:
+            return None, None
+
+        if perf_pattern.get("inverse") and throughput:
+            throughput = 1 / throughput
+        if perf_pattern.get("multiply") and throughput:
+            throughput = throughput * perf_pattern["multiply"]
+        if perf_pattern.get("use_batch_size") and batch_size and batch_size > 0:
+            throughput = throughput * batch_size
+        throughputs.append(throughput)
+
+        latency = None
+        if latency_pattern:
+            latency = _get_value(_parse_values(log_file, latency_pattern), latency_pattern)
+        if latency is None and throughput and batch_size and batch_size > 0:
+            latency = 1000.0 * batch_size / throughput
+        if latency is not None:
+            latencies.append(latency)
+
+    if not throughputs:
+        return None, None
+    latency = sum(latencies) / len(latencies) if latencies else None
+    return sum(throughputs), latency
+
+
+def find_point_logs(output_dir):
+    """
+    Returns the log files of a sweep point. Multi-instance runs have a log file for each
+    instance, and other runs have the log file that is written by start.sh.
+    """
+    instance_logs = [log for log in glob.glob(os.path.join(output_dir, "*_instance*.log"))
+                     if re.search(r"_instance\d+\.log$", log)]
+    if instance_logs:
+        return sorted(instance_logs)
+    return sorted(glob.glob(os.path.join(output_dir, "benchmark_*.log")))[-1:]
+
+
+class SweepPoint(object):
+    """One combination of precision, cores per instance and batch size."""
+
+    def __init__(self, precision, cores_per_instance, batch_size):
+        self.precision = precision
+        self.cores_per_instance = cores_per_instance
+        self.batch_size = batch_size
+
+    @property
+    def key(self):
+        """Returns the name of the point, which is used in the results file and for the output dir."""
+        cores = "{}cores".format(self.cores_per_instance) if self.cores_per_instance else "allcores"
+        return "{}_{}_bs{}".format(self.precision, cores, self.batch_size)
+
+    def __repr__(self):
+        return "SweepPoint({!r}, {!r}, {!r})".format(self.precision, self.cores_per_instance, self.batch_size)
+
+
+class SweepResults(object):
+    """
+    Results file of a sweep, with one JSON object per line. Results are appended as soon
+    as a point finishes, so that an interrupted sweep can be resumed. When a point is run
+    more than once, the last result is used.
+    """
+
+    def __init__(self, results_file):
+        self.results_file = results_file
+        self._results = {}
+        if os.path.isfile(results_file):
+            with open(results_file, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        # Ignore a partially written line from an interrupted sweep
+                        continue
+                    self._results[result["key"]] = result
+
+    def get(self, point):
+        """Returns the result of the point, or None if it hasn't been run."""
+        return self._results.get(point.key)
+
+    def add(self, point, status, throughput=None, latency=None, output_dir=None):
+        """Saves the result of the point to the results file."""
+        result = {
+            "key": point.key,
+            "precision": point.precision,
+            "cores_per_instance": point.cores_per_instance,
+            "batch_size": point.batch_size,
+            "status": status,
+            "throughput": throughput,
+            "latency": latency,
+            "output_dir": output_dir
+        }
+        results_dir = os.path.dirname(self.results_file)
+        if results_dir and not os.path.isdir(results_dir):
+            os.makedirs(results_dir)
+        with open(self.results_file, "a") as f:
+            f.write(json.dumps(result, sort_keys=True) + "\n")
+        self._results[point.key] = result
+        return result
+
+    @property
+    def results(self):
+        return list(self._results.values())
+
+
+def get_pareto_front(results):
+    """
+    Returns the successful results that are not dominated by another result, which means
+    that no other result has both a higher or equal throughput and a lower or equal latency.
+    The results are sorted by latency.
+    """
+    candidates = [r for r in results if r.get("status") == SUCCESS and r.get("throughput") is not None]
+    front = []
+    for result in sorted(candidates, key=lambda r: (r["latency"] if r["latency"] is not None else float("inf"),
+                                                    -r["throughput"])):
+        if not front or result["throughput"] > front[-1]["throughput"]:
+            front.append(result)
+    return front
+
+
+def format_pareto_table(results):
+    """Returns the Pareto table of throughput against latency as a string."""
+    header = ["Precision", "Cores/instance", "Batch size", "Throughput", "Latency (ms)"]
+    rows = [[str(r["precision"]), str(r["cores_per_instance"] or "all"), str(r["batch_size"]),
+             "{:.4f}".format(r["throughput"]),
+             "{:.4f}".format(r["latency"]) if r["latency"] is not None else "N/A"]
+            for r in get_pareto_front(results)]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    lines = ["  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+             for row in [header] + rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines) + "\n"
+
+
+class SweepRunner(object):
+    """
+    Runs each point of a sweep over precisions, cores per instance and batch sizes.
+
+    For each precision and number of cores per instance, the batch sizes are run from
+    smallest to largest, and the remaining batch sizes are skipped once the throughput
+    plateaus, which is when the throughput didn't improve by more than the plateau
+    threshold over the best throughput for `patience` points in a row.
+
+    Points that already succeeded in the results file are not run again, so a sweep
+    can be resumed after a failure or an interruption.
+    """
+
+    def __init__(self, run_point, results_file, batch_sizes, cores_per_instance, precisions,
+                 pattern_file=None, plateau_threshold=0.02, patience=1):
+        """
+        :param run_point: function that runs a SweepPoint, which gets the point and the output
+                          directory and returns the exit code
+        :param results_file: path to the results file, which is created or resumed
+        :param batch_sizes: list of batch sizes
+        :param cores_per_instance: list of cores per instance, where None runs without instances
+        :param precisions: list of precisions
+        :param pattern_file: model pattern module used to parse the throughput and latency
+        :param plateau_threshold: minimum relative throughput improvement, or 0 to run every point
+        :param patience: number of points without improvement before the batch sizes are stopped
+        """
+        self._run_point = run_point
+        self._results = SweepResults(results_file)
+        self._batch_sizes = sorted(batch_sizes)
+        self._cores_per_instance = cores_per_instance
+        self._precisions = precisions
+        self._perf_pattern, self._latency_pattern = load_patterns(pattern_file)
+        self._plateau_threshold = plateau_threshold
+        self._patience = patience
+
+    @property
+    def results_file(self):
+        return self._results.results_file
+
+    @property
+    def pareto_file(self):
+        return os.path.splitext(self.results_file)[0] + "_pareto.txt"
+
+    def get_point_output_dir(self, point):
+        return os.path.join(os.path.dirname(os.path.abspath(self.results_file)), point.key)
+
+    def run(self):
+        """Runs the sweep, writes the Pareto table and returns the list of results."""
+        for precision in self._precisions:
+            for cores_per_instance in self._cores_per_instance:
+                self._run_batch_sizes(precision, cores_per_instance)
+
+        table = format_pareto_table(self._results.results)
+        with open(self.pareto_file, "w") as f:
+            f.write(table)
+        print("\nSweep results were saved to: {}".format(self.results_file))
+        print("Pareto table of throughput against latency ({}):\n{}".format(self.pareto_file, table))
+        return self._results.results
+
+    def _run_batch_sizes(self, precision, cores_per_instance):
+        best_throughput = None
+        points_without_improvement = 0
+        for batch_size in self._batch_sizes:
+            point = SweepPoint(precision, cores_per_instance, batch_size)
+            result = self._results.get(point)
+            if result and result["status"] == SUCCESS:
+                print("Skipping {}, which is already in the results file".format(point.key))
+            else:
+                result = self._run(point)
+
+            throughput = result["throughput"]
+            if result["status"] != SUCCESS or throughput is None:
+                continue
+
+            if best_throughput is not None and self._plateau_threshold > 0 and \
+                    throughput <= best_throughput * (1 + self._plateau_threshold):
+                points_without_improvement += 1
+            else:
+                points_without_improvement = 0
+            best_throughput = max(throughput, best_throughput or 0)
+
+            if self._plateau_threshold > 0 and points_without_improvement >= self._patience:
+                remaining = [b for b in self._batch_sizes if b > batch_size]
+                if remaining:
+                    print("Throughput plateaued at {} for {}, skipping batch sizes: {}".format(
+                        best_throughput, point.key, ",".join(str(b) for b in remaining)))
+                break
+
+    def _run(self, point):
+        output_dir = self.get_point_output_dir(point)
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+
+        print("\nRunning sweep point {}".format(point.key))
+        returncode = self._run_point(point, output_dir)
+
+        throughput, latency = parse_point_logs(
+            find_point_logs(output_dir), self._perf_pattern, self._latency_pattern, point.batch_size)
+        status = SUCCESS if returncode == 0 and throughput is not None else FAILED
+        if status == FAILED:
+            print("Sweep point {} failed (exit code: {})".format(point.key, returncode))
+        else:
+            print("Sweep point {}: throughput {}, latency {} ms".format(point.key, throughput, latency))
+        return self._results.add(point, status, throughput, latency, output_dir)
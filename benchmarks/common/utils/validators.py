@@ -138,3 +138,32 @@ def check_num_cores_per_instance(value):
         except ArgumentTypeError:
             raise ArgumentTypeError(error_message)
     return value
+
+
+def check_sweep_values(value):
+    """
+    Parses a comma separated list of positive integers and ranges that are used for
+    a sweep, and returns the sorted list of unique values. A range like 1-64 doubles
+    the value from the start until the end (1,2,4,...,64), and a range with a step
+    like 4-16:4 increases the value by the step (4,8,12,16).
+    """
+    if value is None:
+        return value
+
+    error_message = "Invalid sweep values ({}). The value must be a comma separated list of " \
+                    "positive integers or ranges like 1-64 or 4-16:4".format(value)
+    values = set()
+    for item in str(value).split(","):
+        match = re.match(r"^\s*(\d+)(?:-(\d+)(?::(\d+))?)?\s*$", item)
+        if not match:
+            raise ArgumentTypeError(error_message)
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        step = int(match.group(3)) if match.group(3) else None
+        if start <= 0 or end < start or step == 0:
+            raise ArgumentTypeError(error_message)
+
+        while start <= end:
+            values.add(start)
+            start = start + step if step else start * 2
+    return sorted(values)
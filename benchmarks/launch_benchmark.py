@@ -22,6 +22,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import copy
 import glob
 import os
 import signal
@@ -31,7 +32,9 @@ import platform as system_platform
 from argparse import ArgumentParser
 from common import base_benchmark_util
 from common import platform_util
-from common.utils.validators import check_no_spaces, check_volume_mount, check_shm_size
+from common.utils.sweep import SweepRunner
+from common.utils.validators import (check_no_spaces, check_positive_number, check_shm_size,
+                                     check_sweep_values, check_valid_filename, check_volume_mount)
 from common.base_model_init import BaseModelInitializer
 
 
@@ -50,6 +53,15 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
     def main(self):
         benchmark_scripts = os.path.dirname(os.path.realpath(__file__))
         os_type = system_platform.system()
+        if self.args.sweep:
+            self.run_sweep(benchmark_scripts, os_type)
+        else:
+            self.run_model(benchmark_scripts, os_type)
+
+    def run_model(self, benchmark_scripts, os_type):
+        """
+        Runs the model with the current args, and returns the exit code of the run.
+        """
         use_case = self.get_model_use_case(benchmark_scripts, os_type)
         intelai_models = self.get_model_dir(benchmark_scripts, use_case, os_type)
         intelai_models_common = self.get_model_dir(benchmark_scripts, "common", os_type)
@@ -63,14 +75,52 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
 
         if self.args.docker_image:
             if self.args.framework == 'tensorflow_serving':
-                self.run_bare_metal(benchmark_scripts, intelai_models,
-                                    intelai_models_common, env_var_dict, os_type)
+                return self.run_bare_metal(benchmark_scripts, intelai_models,
+                                           intelai_models_common, env_var_dict, os_type)
             elif self.args.framework == 'tensorflow':
-                self.run_docker_container(benchmark_scripts, intelai_models,
-                                          intelai_models_common, env_var_dict)
+                return self.run_docker_container(benchmark_scripts, intelai_models,
+                                                 intelai_models_common, env_var_dict)
         else:
-            self.run_bare_metal(benchmark_scripts, intelai_models,
-                                intelai_models_common, env_var_dict, os_type)
+            return self.run_bare_metal(benchmark_scripts, intelai_models,
+                                       intelai_models_common, env_var_dict, os_type)
+
+    def run_sweep(self, benchmark_scripts, os_type):
+        """
+        Runs the model for each combination of the sweep batch sizes, cores per instance and
+        precisions, using a separate output directory for each point. The throughput and latency
+        of each point is saved to the sweep results file, and a Pareto table of throughput
+        against latency is written next to it. Running the same sweep again resumes it.
+        """
+        base_args = self.args
+        output_dir = base_args.output_dir
+        if output_dir == "/models/benchmarks/common/tensorflow/logs":
+            output_dir = os.path.join(benchmark_scripts, "common", base_args.framework, "logs")
+        results_file = base_args.sweep_results or os.path.join(
+            output_dir, "sweep_{}_{}".format(base_args.model_name, base_args.mode), "results.jsonl")
+
+        def run_point(point, point_output_dir):
+            self.args = copy.copy(base_args)
+            self.args.precision = point.precision
+            self.args.batch_size = point.batch_size
+            self.args.numa_cores_per_instance = \
+                str(point.cores_per_instance) if point.cores_per_instance else None
+            self.args.output_dir = point_output_dir
+            if self._default_disable_tcmalloc:
+                self.args.disable_tcmalloc = str(point.precision != "int8")
+            return self.run_model(benchmark_scripts, os_type)
+
+        runner = SweepRunner(run_point, results_file,
+                             batch_sizes=base_args.sweep_batch_sizes or [base_args.batch_size],
+                             cores_per_instance=base_args.sweep_cores_per_instance or
+                             [base_args.numa_cores_per_instance],
+                             precisions=base_args.sweep_precisions or [base_args.precision],
+                             pattern_file=base_args.sweep_patterns,
+                             plateau_threshold=base_args.sweep_plateau_threshold,
+                             patience=base_args.sweep_patience)
+        try:
+            return runner.run()
+        finally:
+            self.args = base_args
 
     def parse_args(self):
         # Additional args that are only used with the launch script
@@ -114,6 +164,57 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             help="Shows the call to the model without actually running it",
             dest="dry_run", action="store_true", default=None)
 
+        arg_parser.add_argument(
+            "--sweep",
+            help="Runs the model for each combination of the --sweep-batch-sizes, "
+                 "--sweep-cores-per-instance and --sweep-precisions values, and writes the "
+                 "throughput and latency of each run to the --sweep-results file",
+            dest="sweep", action="store_true")
+
+        arg_parser.add_argument(
+            "--sweep-batch-sizes",
+            help="Batch sizes for the sweep, as a comma separated list of numbers and ranges. "
+                 "A range like 1-64 doubles the batch size (1,2,4,...,64) and a range like "
+                 "16-64:16 uses a step (16,32,48,64). Defaults to the --batch-size.",
+            dest="sweep_batch_sizes", default=None, type=check_sweep_values)
+
+        arg_parser.add_argument(
+            "--sweep-cores-per-instance",
+            help="Numbers of cores per instance for the sweep, in the same format as "
+                 "--sweep-batch-sizes. Defaults to the --numa-cores-per-instance.",
+            dest="sweep_cores_per_instance", default=None, type=check_sweep_values)
+
+        arg_parser.add_argument(
+            "--sweep-precisions",
+            help="Comma separated list of precisions for the sweep. Defaults to the --precision.",
+            dest="sweep_precisions", default=None)
+
+        arg_parser.add_argument(
+            "--sweep-results",
+            help="Path to the sweep results file. If the file already exists, the sweep is "
+                 "resumed and the points that succeeded are not run again. Defaults to "
+                 "sweep_<model>_<mode>/results.jsonl in the output directory.",
+            dest="sweep_results", default=None)
+
+        arg_parser.add_argument(
+            "--sweep-patterns",
+            help="Path to a model pattern module with PERF (and optionally LATENCY) patterns, "
+                 "which are used to parse the throughput and latency from the logs. By default, "
+                 "the 'Throughput:' and 'Latency: ... ms' lines are parsed.",
+            dest="sweep_patterns", default=None, type=check_valid_filename)
+
+        arg_parser.add_argument(
+            "--sweep-plateau-threshold",
+            help="Stop increasing the batch size when the throughput improves by less than "
+                 "this fraction (default: 0.02). Use 0 to run every batch size.",
+            dest="sweep_plateau_threshold", default=0.02, type=float)
+
+        arg_parser.add_argument(
+            "--sweep-patience",
+            help="Number of batch sizes without a throughput improvement before the sweep "
+                 "stops increasing the batch size (default: 1)",
+            dest="sweep_patience", default=1, type=check_positive_number)
+
         return arg_parser.parse_known_args()
 
     def validate_args(self):
@@ -130,6 +231,7 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             self.args.benchmark_only = True
 
         # default disable_tcmalloc=False for int8 and disable_tcmalloc=True for other precisions
+        self._default_disable_tcmalloc = not self.args.disable_tcmalloc
         if not self.args.disable_tcmalloc:
             self.args.disable_tcmalloc = str(self.args.precision != "int8")
 
@@ -137,6 +239,22 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             raise ValueError("Volume mounts can only be used when running in a docker container "
                              "(a --docker-image must be specified when using --volume).")
 
+        sweep_args = [self.args.sweep_batch_sizes, self.args.sweep_cores_per_instance, self.args.sweep_precisions]
+        if self.args.sweep:
+            if not any(sweep_args):
+                raise ValueError("A sweep requires at least one of --sweep-batch-sizes, "
+                                 "--sweep-cores-per-instance or --sweep-precisions.")
+            if self.args.sweep_precisions:
+                self.args.sweep_precisions = [p.strip() for p in self.args.sweep_precisions.split(",")]
+                invalid_precisions = [p for p in self.args.sweep_precisions
+                                      if p not in ["fp32", "int8", "bfloat16", "fp16"]]
+                if invalid_precisions:
+                    raise ValueError("Invalid sweep precisions: {}".format(", ".join(invalid_precisions)))
+            if self.args.sweep_plateau_threshold < 0:
+                raise ValueError("The --sweep-plateau-threshold can't be negative.")
+        elif any(sweep_args) or self.args.sweep_results:
+            raise ValueError("The --sweep-* args can only be used with --sweep.")
+
         if self.args.mode == "inference" and self.args.checkpoint:
             print("Warning: The --checkpoint argument is being deprecated in favor of using frozen graphs.")
 
@@ -229,6 +347,7 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             "DRY_RUN": str(args.dry_run) if args.dry_run is not None else "",
             "EXTERNAL_MODELS_SOURCE_DIRECTORY": args.model_source_dir,
             "FRAMEWORK": args.framework,
+            "INSTANCE_TIMEOUT": args.instance_timeout,
             "INTELAI_MODELS": intelai_models,
             "INTELAI_MODELS_COMMON": intelai_models_common,
             "MODE": args.mode,
@@ -237,6 +356,7 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             "MPI_NUM_PROCESSES": args.mpi,
             "MPI_NUM_PROCESSES_PER_SOCKET": args.num_mpi,
             "NUMA_CORES_PER_INSTANCE": args.numa_cores_per_instance,
+            "NUMA_INSTANCES": args.numa_instances,
             "NOINSTALL": str(args.noinstall) if args.noinstall is not None else "True" if not args.docker_image else "False",  # noqa: E501
             "NUM_CORES": args.num_cores,
             "NUM_INTER_THREADS": args.num_inter_threads,
@@ -246,6 +366,7 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             "PRECISION": args.precision,
             "PYTHON_EXE": python_exe,
             "SOCKET_ID": args.socket_id,
+            "STOP_ON_INSTANCE_FAILURE": args.stop_on_instance_failure,
             "TCMALLOC_LARGE_ALLOC_REPORT_THRESHOLD": args.tcmalloc_large_alloc_report_threshold,
             "TF_SERVING_VERSION": args.tf_serving_version,
             "USE_CASE": str(use_case),
@@ -362,9 +483,9 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
         # Run the start script
         start_script = os.path.join(workspace, "start.sh")
         if "Windows" == os_type:
-            self._launch_command([os.environ["MSYS64_BASH"], start_script])
+            return self._launch_command([os.environ["MSYS64_BASH"], start_script])
         else:
-            self._launch_command(["bash", start_script])
+            return self._launch_command(["bash", start_script])
 
     def run_docker_container(self, benchmark_scripts, intelai_models,
                              intelai_models_common, env_var_dict):
@@ -483,10 +604,13 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
         if args.verbose:
             print("Docker run command:\n{}".format(docker_run_cmd))
 
-        self._launch_command(docker_run_cmd)
+        return self._launch_command(docker_run_cmd)
 
     def _launch_command(self, run_cmd):
-        """runs command that runs the start script in a container or on bare metal and exits on ctrl c"""
+        """
+        runs command that runs the start script in a container or on bare metal and exits on ctrl c,
+        and returns the exit code of the command
+        """
         os_type = system_platform.system()
         if "Windows" == os_type:
             p = subprocess.Popen(run_cmd, start_new_session=True)
@@ -497,6 +621,7 @@ class LaunchBenchmark(base_benchmark_util.BaseBenchmarkUtil):
             p.communicate()
         except KeyboardInterrupt:
             os.killpg(os.getpgid(p.pid), signal.SIGKILL)
+        return p.returncode
 
 
 if __name__ == "__main__":
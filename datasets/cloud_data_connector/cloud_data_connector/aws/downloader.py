@@ -16,6 +16,8 @@
 # limitations under the License.
 #
 from cloud_data_connector.int.int_downloader import IntDownloader
+from cloud_data_connector.int.transfer import MULTIPART_CHUNKSIZE, MULTIPART_THRESHOLD, RemoteObject
+from boto3.s3.transfer import TransferConfig
 import botocore.exceptions
 import botocore.client
 import logging
@@ -24,6 +26,51 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
+# Parts of one object transferred at the same time. Objects are also
+# transferred concurrently by the TransferEngine.
+MAX_PART_CONCURRENCY = 4
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=MULTIPART_THRESHOLD,
+                                 multipart_chunksize=MULTIPART_CHUNKSIZE,
+                                 max_concurrency=MAX_PART_CONCURRENCY)
+
+
+def raise_connection_error(error: Exception):
+    """Log a botocore error and raise it with the connector error message."""
+    logging.error(error)
+    if isinstance(error, botocore.exceptions.ClientError):
+        code = error.response['Error']['Code']
+        message = error.response['Error']['Message']
+        raise Exception(f"Connection object error. Code: {code}. Message: {message}")
+    raise Exception(error.fmt)
+
+
+def paginate_objects(s3_client: botocore.client.BaseClient, container_obj: str, prefix: str = "",
+                     page_size: int = None):
+    """
+    Yield the list_objects_v2 entries of a bucket, following every page.
+
+    Args:
+        s3_client (botocore.client.BaseClient): An AWS S3 BaseClient.
+        container_obj (str): The bucket name to list.
+        prefix (str): Only list the keys that start with the prefix.
+        page_size (int): Number of keys requested per page, 1000 by default.
+    """
+    pagination_config = {'PageSize': page_size} if page_size else {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    try:
+        for page in paginator.paginate(Bucket=container_obj, Prefix=prefix,
+                                       PaginationConfig=pagination_config):
+            for file in page.get('Contents', []):
+                yield file
+    except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as error:
+        raise_connection_error(error)
+
+
+def list_remote_objects(s3_client: botocore.client.BaseClient, container_obj: str, prefix: str = "") -> list:
+    """List the objects under a prefix as RemoteObjects."""
+    return [RemoteObject(file['Key'], file['Size'], file.get('ETag'))
+            for file in paginate_objects(s3_client, container_obj, prefix)]
+
 class Downloader(IntDownloader):
     """
     This is a class for download operations for AWS S3 buckets.
@@ -55,12 +102,39 @@ class Downloader(IntDownloader):
             s3_client = self.connector
             s3_client.download_file(container_obj, data_file, destiny)
 
-    def list_blobs(self, container_obj:str) -> list:
+    def download_object(self, container_obj: str, remote_object: RemoteObject, destiny: str):
+        """
+        The function to download one listed object, using multipart transfers
+        for large objects.
+
+        Args:
+            container_obj (str): The name of the bucket to download from.
+            remote_object (RemoteObject): The object to download.
+            destiny (str): The path to the file to download to.
+        """
+        self.connector.download_file(container_obj, remote_object.name, destiny, Config=TRANSFER_CONFIG)
+
+    def list_objects(self, container_obj: str, prefix: str = "") -> list:
         """
-        The function to get a list of the objects in a bucket.
+        The function to get the objects under a prefix, with their size and ETag.
 
         Args:
             container_obj (str): The bucket name to list.
+            prefix (str): Only list the keys that start with the prefix.
+
+        Returns:
+            list: A list of RemoteObject.
+        """
+        return list_remote_objects(self.connector, container_obj, prefix)
+
+    def list_blobs(self, container_obj:str, prefix:str = "") -> list:
+        """
+        The function to get a list of the objects in a bucket. Every page of
+        the listing is read, so buckets with more than 1000 keys are complete.
+
+        Args:
+            container_obj (str): The bucket name to list.
+            prefix (str): Only list the keys that start with the prefix.
 
         Raises:
             Exception: Client Error message.
@@ -69,19 +143,5 @@ class Downloader(IntDownloader):
         Returns:
             list: A list of object names contained in the bucket.
         """
-        container_list = []
-        s3_client = self.connector
-        try:
-            response = s3_client.list_objects_v2(Bucket=container_obj)
-            for file in response['Contents']:
-                container_list.append(file['Key'])
-            return container_list
-        except botocore.exceptions.ClientError as error:
-            code = error.response['Error']['Code']
-            message = error.response['Error']['Message']
-            logging.error(error)
-            raise Exception(f"Connection object error. Code: {code}. Message: {message}")
-        except botocore.exceptions.BotoCoreError as error:
-            logging.error(error)
-            raise Exception(error.fmt)
-        
+        return [file['Key'] for file in paginate_objects(self.connector, container_obj, prefix)]
+
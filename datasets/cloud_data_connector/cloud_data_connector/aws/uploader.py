@@ -17,6 +17,7 @@
 #
 import os
 from cloud_data_connector.int.int_uploader import IntUploader
+from cloud_data_connector.aws.downloader import TRANSFER_CONFIG, list_remote_objects
 from botocore.exceptions import ClientError
 import logging
 import botocore
@@ -62,3 +63,28 @@ class Uploader(IntUploader):
             message = error.response['Error']['Message']
             logging.error(error)
             raise Exception(f"Connection object error. Code: {code}. Message: {message}")
+
+    def upload_object(self, container_obj: str, data_file: str, object_name: str):
+        """
+        The function to upload one file of a directory sync, using multipart
+        transfers for large files.
+
+        Args:
+            container_obj (str): The name of the bucket to upload to.
+            data_file (str): The path to the file to upload.
+            object_name (str): The name of the file to upload to.
+        """
+        self.connector.upload_file(data_file, container_obj, object_name, Config=TRANSFER_CONFIG)
+
+    def list_objects(self, container_obj: str, prefix: str = "") -> list:
+        """
+        The function to get the objects under a prefix, with their size and ETag.
+
+        Args:
+            container_obj (str): The bucket name to list.
+            prefix (str): Only list the keys that start with the prefix.
+
+        Returns:
+            list: A list of RemoteObject.
+        """
+        return list_remote_objects(self.connector, container_obj, prefix)
@@ -16,6 +16,7 @@
 # limitations under the License.
 #
 from cloud_data_connector.int.int_downloader import IntDownloader
+from cloud_data_connector.int.transfer import RemoteObject
 # Azure
 from azure.storage.blob import BlobServiceClient, ContainerClient
 from azureml.core.model import Model
@@ -23,6 +24,23 @@ from azureml.core.dataset import Dataset
 from azure.ai.ml import MLClient
 from azure.storage.blob import BlobClient, ContainerClient
 CONNECTOR_TYPE_ERROR = "Connector for blobs should be a BlobServiceClient"
+# Ranges of one blob transferred at the same time
+MAX_BLOB_CONCURRENCY = 4
+
+
+def list_remote_objects(blob_service_client: BlobServiceClient, container_obj: str, prefix: str = "") -> list:
+    """
+    List the blobs under a prefix as RemoteObjects, following every page. The
+    ETag is the Content-MD5 of the blob, or None when the blob doesn't have one.
+    """
+    if not isinstance(blob_service_client, BlobServiceClient):
+        raise ValueError(CONNECTOR_TYPE_ERROR)
+    container_client = blob_service_client.get_container_client(container_obj)
+    objects = []
+    for blob in container_client.list_blobs(name_starts_with=prefix or None):
+        content_md5 = blob.content_settings.content_md5
+        objects.append(RemoteObject(blob.name, blob.size, bytes(content_md5).hex() if content_md5 else None))
+    return objects
 
 
 class Downloader(IntDownloader):
@@ -60,6 +78,20 @@ class Downloader(IntDownloader):
                 version = "latest"
             donwload_obj.get_by_name(name=data_file, version=version)
 
+    def download_object(self, container_obj: str, remote_object: RemoteObject, destiny: str):
+        """Download one listed blob, streaming its ranges concurrently to the file."""
+        if not isinstance(self.connector, BlobServiceClient):
+            raise ValueError(CONNECTOR_TYPE_ERROR)
+        container_client = self.connector.get_container_client(container_obj)
+        with open(destiny, mode="wb") as downloaded_blob:
+            container_client.download_blob(
+                remote_object.name, max_concurrency=MAX_BLOB_CONCURRENCY
+            ).readinto(downloaded_blob)
+
+    def list_objects(self, container_obj: str, prefix: str = "") -> list:
+        """List the blobs under a prefix as RemoteObjects."""
+        return list_remote_objects(self.connector, container_obj, prefix)
+
     def list_blobs(self, container_obj: object = None)-> iter: # str | ContainerClient | BlobServiceClient = None):
         if isinstance(container_obj, (ContainerClient,str)):
             blob_service_client = self.connector
@@ -18,7 +18,7 @@
 import os
 from pathlib import Path
 # azure
-from azure.storage.blob import BlobServiceClient, ContainerClient
+from azure.storage.blob import BlobServiceClient, ContainerClient, ContentSettings
 from azureml.core.environment import DockerBuildContext, Environment
 from azureml.core.workspace import Workspace
 from azure.ai.ml import MLClient
@@ -26,6 +26,8 @@ from azure.ai.ml import MLClient
 from azure.core.exceptions import ResourceExistsError
 # Interface
 from cloud_data_connector.int.int_uploader import IntUploader
+from cloud_data_connector.int.transfer import compute_etag
+from cloud_data_connector.azure.downloader import MAX_BLOB_CONCURRENCY, list_remote_objects
 
 
 DOCKER_FILE_NOT_EXISTS = "Docker file not exists "
@@ -75,6 +77,28 @@ class Uploader(IntUploader):
         else:
             raise ValueError(BAD_CONNECTOR_INSTANCE + f"{type(self.connector)}")
 
+    def upload_object(self, container_obj: str, data_file: str, object_name: str):
+        """
+        Upload one file of a directory sync, in concurrent blocks. The MD5 of the
+        file is stored as the blob Content-MD5, which later syncs compare against.
+        """
+        if not isinstance(self.connector, BlobServiceClient):
+            raise ValueError(BAD_CONNECTOR_INSTANCE + f"{type(self.connector)}")
+        container_client = self.connector.get_container_client(container_obj)
+        content_md5 = bytearray.fromhex(compute_etag(data_file, parts=0))
+        with open(data_file, 'rb') as data:
+            container_client.upload_blob(
+                name=object_name,
+                data=data,
+                overwrite=True,
+                max_concurrency=MAX_BLOB_CONCURRENCY,
+                content_settings=ContentSettings(content_md5=content_md5)
+            )
+
+    def list_objects(self, container_obj: str, prefix: str = "") -> list:
+        """List the blobs under a prefix as RemoteObjects."""
+        return list_remote_objects(self.connector, container_obj, prefix)
+
     def uploadml(
         self, docker_build_file_context_path: str, workspace_name: str, path: str
     ) -> DockerBuildContext:
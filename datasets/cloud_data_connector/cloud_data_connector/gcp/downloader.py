@@ -15,7 +15,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import base64
 from cloud_data_connector.int.int_downloader import IntDownloader
+from cloud_data_connector.int.transfer import RemoteObject
 from google.api_core.exceptions import NotFound
 from google.cloud.storage.client import Client
 from abc import ABCMeta
@@ -49,6 +51,17 @@ class Downloader(IntDownloader, metaclass=ABCMeta):
             return False
 
 
+    def download_object(self, container_obj:str, remote_object:RemoteObject, destination:str):
+        """Downloads one listed blob, checking its MD5 hash."""
+        blob = self.connector.bucket(container_obj).blob(remote_object.name)
+        blob.download_to_filename(destination)
+
+
+    def list_objects(self, container_obj:str, prefix:str = "") -> list:
+        """Lists the blobs under a prefix as RemoteObjects, following every page."""
+        return list_remote_objects(self.connector, container_obj, prefix)
+
+
     def list_blobs(self, container_obj:object):
         """Lists all blobs."""
 
@@ -85,3 +98,18 @@ class Downloader(IntDownloader, metaclass=ABCMeta):
             return []
         
         return buckets
+
+
+def list_remote_objects(storage_client: Client, container_obj: str, prefix: str = "") -> list:
+    """
+    Lists the blobs under a prefix as RemoteObjects. The ETag is the MD5 hash
+    of the blob, or None for composite blobs, which only have a CRC32C.
+    """
+    if not isinstance(container_obj, str):
+        raise TypeError("container_obj must be str.")
+
+    objects = []
+    for blob in storage_client.list_blobs(container_obj, prefix=prefix or None):
+        md5 = base64.b64decode(blob.md5_hash).hex() if blob.md5_hash else None
+        objects.append(RemoteObject(blob.name, blob.size, md5))
+    return objects
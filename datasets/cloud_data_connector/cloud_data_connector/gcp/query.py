@@ -18,7 +18,64 @@
 from google.api_core.exceptions import NotFound
 from time import sleep
 from google.cloud import bigquery
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import json
+
+# BigQuery recommends 500 rows per streaming insert request and rejects
+# requests larger than 10 MB, so batches are bounded by both.
+DEFAULT_BATCH_ROWS = 500
+DEFAULT_BATCH_BYTES = 8 * 1024 * 1024
+# Insert requests sent at the same time by the streaming writer
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_PAGE_SIZE = 10000
+MAX_PAUSE = 60
+
+
+def chunk_rows(rows:Iterable[Tuple], max_rows:int=DEFAULT_BATCH_ROWS, max_bytes:int=DEFAULT_BATCH_BYTES) -> Iterator[Tuple[int, List[Tuple]]]:
+    """
+    Split rows into batches of at most max_rows rows and about max_bytes of
+    JSON, without reading more than one batch ahead. Yields (index of the
+    first row, batch) pairs. A single row larger than max_bytes is its own batch.
+    """
+    if max_rows < 1 or max_bytes < 1:
+        raise ValueError("max_rows and max_bytes must be positive")
+
+    batch = []
+    batch_bytes = 0
+    start = 0
+    for index, row in enumerate(rows):
+        row_bytes = len(json.dumps(row, default=str))
+        if batch and (len(batch) >= max_rows or batch_bytes + row_bytes > max_bytes):
+            yield start, batch
+            batch = []
+            batch_bytes = 0
+            start = index
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield start, batch
+
+
+def _row_pages(rows, page_size:int) -> Iterator[list]:
+    """
+    Yield the pages of a RowIterator, or chunks of page_size rows for plain iterators.
+    Empty pages (e.g. of an empty result) are skipped.
+    """
+    if hasattr(rows, "pages"):
+        for page in rows.pages:
+            page = list(page)
+            if page:
+                yield page
+        return
+    rows = iter(rows)
+    while True:
+        page = list(islice(rows, page_size))
+        if not page:
+            return
+        yield page
 
 class Query():
 
@@ -179,36 +236,135 @@ class Query():
 
         if exists:
             try:
-                dataset_ref = self.client.dataset(dataset_name)                                                                                                                            
-                table_ref = dataset_ref.table(table_name)   
-                table = self.client.get_table(table_ref)
-
-                tries = 0
-                while True: #Prevents insert_rows from failing when table was recently created
-                    try:
-                        errors = self.client.insert_rows(table, rows_to_insert)
-                    except NotFound as e:
-                        errors = e
-                        if tries < max_tries:
-                            tries += 1
-                            print("Insert rows attempt #{}".format(tries))
-                            sleep(pause)
-                            continue
-                    break
-
-                if errors == []:
-                    print("Rows inserted correctly to table {}.".format(table_ref.table_id))
-                else:
-                    print(errors)
-
+                errors = self._insert_batches(table, chunk_rows(rows_to_insert), DEFAULT_MAX_IN_FLIGHT, max_tries, pause)
+            except NotFound as e:
+                errors = e
             except ValueError as e:
                 print(e)
+                return
+
+            if errors == []:
+                print("Rows inserted correctly to table {}.".format(table_ref.table_id))
+            else:
+                print(errors)
         else:
             print('Table {} reference not found.'.format(table_ref.table_id))
 
 
+    def stream_rows_to_bq(self, dataset_name:str, table_name:str, rows:Iterable[Tuple],
+                          max_batch_rows:int=DEFAULT_BATCH_ROWS, max_batch_bytes:int=DEFAULT_BATCH_BYTES,
+                          max_in_flight:int=DEFAULT_MAX_IN_FLIGHT, max_tries=15, pause=3) -> List[dict]:
+        """
+        Insert rows from any iterable, e.g. a generator, in size-bounded batches.
+        Up to max_in_flight insert requests run while the next batches are read,
+        so only those batches are held in memory.
+
+        Returns the insert errors, with each "index" relative to the first row
+        of the iterable, or None if the table doesn't exist.
+        """
+        if not isinstance(dataset_name, str):
+            raise TypeError("dataset_name must be str")
+
+        if not isinstance(table_name, str):
+            raise TypeError("table_name must be str")
+
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be positive")
+
+        dataset_ref = self.get_datasetref(dataset_name)
+        table_ref = self.get_tableref(dataset_ref, table_name)
+        exists, table = self.table_exist(table_ref)
+
+        if not exists:
+            print('Table {} reference not found.'.format(table_ref.table_id))
+            return None
+
+        batches = chunk_rows(rows, max_batch_rows, max_batch_bytes)
+        errors = self._insert_batches(table, batches, max_in_flight, max_tries, pause)
+        if errors == []:
+            print("Rows inserted correctly to table {}.".format(table_ref.table_id))
+        return errors
+
+
+    def _insert_batches(self, table:bigquery.Table, batches:Iterator[Tuple[int, List[Tuple]]],
+                        max_in_flight:int, max_tries:int, pause:float) -> List[dict]:
+
+        errors = []
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            try:
+                for start, batch in batches:
+                    if len(in_flight) >= max_in_flight:
+                        errors.extend(in_flight.popleft().result())
+                    in_flight.append(executor.submit(self._insert_batch, table, start, batch, max_tries, pause))
+                while in_flight:
+                    errors.extend(in_flight.popleft().result())
+            finally:
+                for future in in_flight:
+                    future.cancel()
+        return errors
+
+
+    def _insert_batch(self, table:bigquery.Table, start:int, batch:List[Tuple], max_tries:int, pause:float) -> List[dict]:
+
+        tries = 0
+        while True: #Prevents insert_rows from failing when table was recently created
+            try:
+                errors = self.client.insert_rows(table, batch)
+                break
+            except NotFound:
+                if tries >= max_tries:
+                    raise
+                tries += 1
+                print("Insert rows attempt #{}".format(tries))
+                sleep(min(pause * 2 ** (tries - 1), MAX_PAUSE))
+
+        for error in errors:
+            if "index" in error:
+                error["index"] += start
+        return errors
+
+
     def sql_query(self, sql_query:str) -> bigquery.QueryJob:
         
         query_job = self.client.query(sql_query)
         
         return query_job
+
+
+    def query_pages(self, sql_query:str, page_size:int=DEFAULT_PAGE_SIZE) -> Iterator[List[bigquery.Row]]:
+        """Run a query and yield its result rows one page at a time."""
+
+        rows = self.client.query(sql_query).result(page_size=page_size)
+        yield from _row_pages(rows, page_size)
+
+
+    def query_arrow_batches(self, sql_query:str, page_size:int=DEFAULT_PAGE_SIZE, bqstorage_client=None) -> Iterator:
+        """
+        Run a query and yield its result as pyarrow.RecordBatch objects, one per
+        page, instead of loading the whole result. Pass a BigQueryReadClient as
+        bqstorage_client to download large results with the Storage Read API.
+        """
+        import pyarrow
+
+        rows = self.client.query(sql_query).result(page_size=page_size)
+        if hasattr(rows, "to_arrow_iterable"):
+            yield from rows.to_arrow_iterable(bqstorage_client=bqstorage_client)
+            return
+        for page in _row_pages(rows, page_size):
+            yield pyarrow.RecordBatch.from_pylist([dict(row) for row in page])
+
+
+    def query_dataframes(self, sql_query:str, page_size:int=DEFAULT_PAGE_SIZE, bqstorage_client=None) -> Iterator:
+        """
+        Run a query and yield its result as pandas.DataFrame chunks, one per page,
+        instead of loading the whole result. See query_arrow_batches for bqstorage_client.
+        """
+        import pandas
+
+        rows = self.client.query(sql_query).result(page_size=page_size)
+        if hasattr(rows, "to_dataframe_iterable"):
+            yield from rows.to_dataframe_iterable(bqstorage_client=bqstorage_client)
+            return
+        for page in _row_pages(rows, page_size):
+            yield pandas.DataFrame.from_records([row.values() for row in page], columns=list(page[0].keys()))
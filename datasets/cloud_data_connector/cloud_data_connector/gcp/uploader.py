@@ -17,10 +17,17 @@
 #
 import os
 from google.cloud.exceptions import GoogleCloudError
-class Uploader():
+from cloud_data_connector.gcp.downloader import list_remote_objects
+from cloud_data_connector.int.int_uploader import IntUploader
+from cloud_data_connector.int.transfer import MULTIPART_CHUNKSIZE, MULTIPART_THRESHOLD
+
+class Uploader(IntUploader):
 
     def __init__(self, connector: object):
-        self.connector = connector
+        super().__init__(connector)
+
+    def upload(self, container_obj:object, data_file:object, object_name:object) -> object:
+        return self.upload_to_bucket(container_obj, data_file, object_name)
 
     def upload_to_bucket(self, container_obj:object, data_file:object, destination:object) -> object:
         if not isinstance(container_obj, str):
@@ -42,3 +49,13 @@ class Uploader():
         except GoogleCloudError as e:
             print(e)
             raise GoogleCloudError('Failed to copy local file {0} to cloud storage file {1}.'.format(data_file, destination))
+
+    def upload_object(self, container_obj:str, data_file:str, object_name:str):
+        """Uploads one file of a directory sync, in resumable chunks for large files."""
+        chunk_size = MULTIPART_CHUNKSIZE if os.path.getsize(data_file) >= MULTIPART_THRESHOLD else None
+        blob = self.connector.bucket(container_obj).blob(object_name, chunk_size=chunk_size)
+        blob.upload_from_filename(data_file)
+
+    def list_objects(self, container_obj:str, prefix:str = "") -> list:
+        """Lists the blobs under a prefix as RemoteObjects, following every page."""
+        return list_remote_objects(self.connector, container_obj, prefix)
@@ -16,6 +16,7 @@
 # limitations under the License.
 #
 from abc import ABCMeta, abstractmethod 
+from cloud_data_connector.int.transfer import TransferEngine, TransferResult
 
 
 class IntDownloader(metaclass=ABCMeta):
@@ -26,3 +27,31 @@ class IntDownloader(metaclass=ABCMeta):
     @abstractmethod 
     def download(self, container_obj: object, data_file: object, destiny: object) -> object:
         pass
+
+    @abstractmethod
+    def list_objects(self, container_obj: object, prefix: str = "") -> list:
+        """
+        List the objects under a prefix, following every page of the listing.
+        Returns a list of cloud_data_connector.int.transfer.RemoteObject.
+        """
+        pass
+
+    @abstractmethod
+    def download_object(self, container_obj: object, remote_object: object, destiny: str):
+        """Download one RemoteObject to a local path."""
+        pass
+
+    def download_prefix(self, container_obj: object, prefix: str, destiny: str,
+                        engine: TransferEngine = None) -> TransferResult:
+        """
+        Download every object under a prefix into the destiny directory, with
+        bounded concurrency and retries. Objects whose size and ETag match the
+        local file are skipped, so a sync can be resumed or repeated cheaply.
+        """
+        engine = engine or TransferEngine()
+        objects = self.list_objects(container_obj, prefix)
+        return engine.download_prefix(
+            objects,
+            lambda remote_object, path: self.download_object(container_obj, remote_object, path),
+            destiny,
+            prefix)
@@ -16,6 +16,7 @@
 # limitations under the License.
 #
 from abc import ABCMeta, abstractmethod 
+from cloud_data_connector.int.transfer import TransferEngine, TransferResult
 
 
 class IntUploader(metaclass=ABCMeta):
@@ -28,3 +29,31 @@ class IntUploader(metaclass=ABCMeta):
     @abstractmethod 
     def upload(self, container_obj: object, data_file: object, object_name: object):
         pass
+
+    @abstractmethod
+    def list_objects(self, container_obj: object, prefix: str = "") -> list:
+        """
+        List the objects under a prefix, following every page of the listing.
+        Returns a list of cloud_data_connector.int.transfer.RemoteObject.
+        """
+        pass
+
+    @abstractmethod
+    def upload_object(self, container_obj: object, data_file: str, object_name: str):
+        """Upload one local file to an object name."""
+        pass
+
+    def upload_directory(self, container_obj: object, source_dir: str, prefix: str = "",
+                         engine: TransferEngine = None) -> TransferResult:
+        """
+        Upload every file of the source directory under a prefix, with bounded
+        concurrency and retries. Files whose size and ETag match the remote
+        object are skipped.
+        """
+        engine = engine or TransferEngine()
+        existing = self.list_objects(container_obj, prefix)
+        return engine.upload_directory(
+            source_dir,
+            existing,
+            lambda data_file, object_name: self.upload_object(container_obj, data_file, object_name),
+            prefix)
@@ -0,0 +1,372 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Transfer engine shared by the AWS, GCP and Azure downloaders and uploaders.
+
+The engine syncs a bucket prefix to a local directory, or a local directory
+to a bucket prefix. Objects are transferred by a bounded thread pool, each
+transfer is retried with exponential backoff, and objects whose size and
+ETag already match are skipped. The provider classes only supply listing
+and single object transfers.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30
+# Matches the boto3 TransferConfig defaults, so local ETags of S3 multipart
+# uploads can be computed without knowing how the object was uploaded.
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+MANIFEST_NAME = ".transfer_manifest.json"
+PARTIAL_SUFFIX = ".part"
+
+
+class RemoteObject:
+    """
+    An object in a bucket or container.
+
+    Attributes:
+        name (str): The object name (key).
+        size (int): The object size in bytes.
+        etag (str): The MD5 hex digest of the object, or an S3 multipart
+            ETag ("<md5>-<parts>"), or None when the provider has no MD5.
+    """
+
+    def __init__(self, name: str, size: int, etag: Optional[str] = None):
+        self.name = name
+        self.size = size
+        self.etag = normalize_etag(etag)
+
+    def __repr__(self):
+        return "RemoteObject({!r}, {!r}, {!r})".format(self.name, self.size, self.etag)
+
+
+class TransferResult:
+    """
+    The outcome of a sync.
+
+    Attributes:
+        transferred (list): Names of the objects that were transferred.
+        skipped (list): Names of the objects that already matched.
+        failed (dict): Names of the objects that failed, with their error.
+    """
+
+    def __init__(self):
+        self.transferred: List[str] = []
+        self.skipped: List[str] = []
+        self.failed: Dict[str, Exception] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def __repr__(self):
+        return "TransferResult(transferred={}, skipped={}, failed={})".format(
+            len(self.transferred), len(self.skipped), len(self.failed))
+
+
+def normalize_etag(etag: Optional[str]) -> Optional[str]:
+    """Strip the quotes that S3 and Azure put around ETags."""
+    if etag is None:
+        return None
+    etag = etag.strip().strip('"').lower()
+    return etag or None
+
+
+def compute_etag(path: str, part_size: int = MULTIPART_CHUNKSIZE,
+                 multipart_threshold: int = MULTIPART_THRESHOLD, parts: int = None) -> str:
+    """
+    Compute the ETag of a local file: the MD5 hex digest for files under the
+    multipart threshold, and the S3 multipart ETag ("<md5 of part md5s>-<parts>")
+    for larger files.
+
+    Args:
+        path (str): The local file.
+        part_size (int): The multipart chunk size.
+        multipart_threshold (int): Files at least this large are multipart.
+        parts (int): Compute a multipart ETag with this number of parts, e.g.
+            the part count of a remote ETag, instead of using the threshold.
+    """
+    size = os.path.getsize(path)
+    if parts is None:
+        parts = -(-size // part_size) if size >= multipart_threshold else 0
+    elif parts > 0 and part_size * (parts - 1) >= size:
+        # The remote part count can't be reached with this part size.
+        part_size = -(-size // parts)
+    if not parts:
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_SIZE), b""):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    digests = []
+    with open(path, "rb") as f:
+        while True:
+            md5 = hashlib.md5()
+            remaining = part_size
+            while remaining > 0:
+                chunk = f.read(min(READ_SIZE, remaining))
+                if not chunk:
+                    break
+                md5.update(chunk)
+                remaining -= len(chunk)
+            if remaining == part_size:
+                break
+            digests.append(md5.digest())
+    return "{}-{}".format(hashlib.md5(b"".join(digests)).hexdigest(), len(digests))
+
+
+def local_etag_matches(path: str, etag: Optional[str], part_size: int = MULTIPART_CHUNKSIZE) -> bool:
+    """Check whether a local file has the given (normalized) ETag."""
+    if not etag:
+        return False
+    if "-" in etag:
+        parts = etag.rsplit("-", 1)[1]
+        if not parts.isdigit():
+            return False
+        candidates = [part_size]
+        # Other tools pick part sizes in whole MiB, which can be derived from the part count.
+        size = os.path.getsize(path)
+        mib = 1024 * 1024
+        candidates.append(-(-size // int(parts) // mib) * mib)
+        return any(compute_etag(path, candidate, parts=int(parts)) == etag
+                   for candidate in sorted(set(c for c in candidates if c > 0)))
+    return compute_etag(path, parts=0) == etag
+
+
+class _Manifest:
+    """
+    Sizes, ETags and modification times of files written by previous syncs,
+    so unchanged files are skipped without hashing them again.
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except ValueError:
+                logger.warning("Ignoring corrupted manifest %s", self.path)
+
+    def matches(self, name: str, path: str, etag: Optional[str]) -> bool:
+        entry = self._entries.get(name)
+        if not entry or not etag or entry.get("etag") != etag:
+            return False
+        stat = os.stat(path)
+        return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+    def add(self, name: str, path: str, etag: Optional[str]):
+        if not etag:
+            return
+        stat = os.stat(path)
+        with self._lock:
+            self._entries[name] = {"size": stat.st_size, "etag": etag, "mtime_ns": stat.st_mtime_ns}
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + PARTIAL_SUFFIX
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+
+
+class TransferEngine:
+    """
+    Runs object transfers with bounded concurrency and retries.
+
+    Attributes:
+        max_workers (int): Number of objects transferred at the same time.
+        retries (int): Number of retries of a failed transfer.
+        backoff (float): Delay before the first retry, doubled on each retry.
+        part_size (int): Multipart chunk size used for ETag comparisons.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, part_size: int = MULTIPART_CHUNKSIZE):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.part_size = part_size
+
+    def retry(self, function: Callable, *args, **kwargs):
+        """Call the function, retrying with exponential backoff when it raises."""
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                if attempt >= self.retries:
+                    raise
+                delay = min(self.backoff * 2 ** attempt, MAX_BACKOFF)
+                logger.warning("Transfer failed (%s), retrying in %.1fs", error, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def run(self, tasks: Dict[str, Callable], result: TransferResult) -> TransferResult:
+        """Run the tasks (name to callable) on the thread pool and record the outcome."""
+        if not tasks:
+            return result
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+            futures = {executor.submit(self.retry, task): name for name, task in tasks.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                    result.transferred.append(name)
+                except Exception as error:
+                    logger.error("Failed to transfer %s: %s", name, error)
+                    result.failed[name] = error
+        return result
+
+    def download_prefix(self, objects: Iterable[RemoteObject], download_object: Callable[[RemoteObject, str], None],
+                        destination_dir: str, prefix: str = "") -> TransferResult:
+        """
+        Download objects into a directory, keeping their path relative to the prefix.
+        Files are written next to their destination and renamed once complete,
+        so an interrupted sync never leaves a truncated file behind.
+
+        Args:
+            objects (iterable): The RemoteObjects to download.
+            download_object (callable): Downloads one RemoteObject to a local path.
+            destination_dir (str): The local directory.
+            prefix (str): Prefix removed from the object names.
+        """
+        os.makedirs(destination_dir, exist_ok=True)
+        manifest = _Manifest(destination_dir)
+        result = TransferResult()
+        tasks = {}
+        for obj in objects:
+            if obj.name.endswith("/"):
+                # Folder placeholder objects
+                continue
+            try:
+                path = local_path(destination_dir, obj.name, prefix)
+            except ValueError as error:
+                logger.error("Failed to transfer %s: %s", obj.name, error)
+                result.failed[obj.name] = error
+                continue
+            if os.path.isfile(path) and os.path.getsize(path) == obj.size and obj.etag:
+                if manifest.matches(obj.name, path, obj.etag):
+                    result.skipped.append(obj.name)
+                    continue
+                if local_etag_matches(path, obj.etag, self.part_size):
+                    manifest.add(obj.name, path, obj.etag)
+                    result.skipped.append(obj.name)
+                    continue
+            tasks[obj.name] = self._download_task(download_object, obj, path, manifest)
+
+        try:
+            self.run(tasks, result)
+        finally:
+            manifest.save()
+        return result
+
+    @staticmethod
+    def _download_task(download_object: Callable, obj: RemoteObject, path: str, manifest: _Manifest) -> Callable:
+        def task():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = path + PARTIAL_SUFFIX
+            try:
+                download_object(obj, partial_path)
+                os.replace(partial_path, path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            manifest.add(obj.name, path, obj.etag)
+        return task
+
+    def upload_directory(self, source_dir: str, remote_objects: Iterable[RemoteObject],
+                         upload_object: Callable[[str, str], None], prefix: str = "") -> TransferResult:
+        """
+        Upload the files of a directory, naming them prefix + their relative path.
+
+        Args:
+            source_dir (str): The local directory.
+            remote_objects (iterable): The RemoteObjects already under the prefix.
+            upload_object (callable): Uploads one local path to an object name.
+            prefix (str): Prefix added to the object names.
+        """
+        if not os.path.isdir(source_dir):
+            raise FileNotFoundError("{} not found.".format(source_dir))
+
+        existing = {obj.name: obj for obj in remote_objects}
+        result = TransferResult()
+        tasks = {}
+        for path in iter_local_files(source_dir):
+            name = object_name(source_dir, path, prefix)
+            remote = existing.get(name)
+            if remote is not None and remote.size == os.path.getsize(path) and \
+                    local_etag_matches(path, remote.etag, self.part_size):
+                result.skipped.append(name)
+                continue
+            tasks[name] = (lambda path=path, name=name: upload_object(path, name))
+        return self.run(tasks, result)
+
+
+def local_path(destination_dir: str, name: str, prefix: str = "") -> str:
+    """
+    Map an object name to a path in the destination directory. The prefix is only
+    removed at a "/" boundary, and an object named like the prefix keeps its base name.
+    """
+    relative = name
+    if prefix:
+        directory = prefix.rstrip("/")
+        if name == prefix or name == directory:
+            relative = name.rsplit("/", 1)[-1]
+        elif name.startswith(directory + "/"):
+            relative = name[len(directory) + 1:]
+    parts = [part for part in relative.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError("Object name {} can't be mapped to a local path.".format(name))
+    return os.path.join(destination_dir, *parts)
+
+
+def object_name(source_dir: str, path: str, prefix: str = "") -> str:
+    """Map a local path in the source directory to an object name."""
+    relative = os.path.relpath(path, source_dir).replace(os.sep, "/")
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    return prefix + relative
+
+
+def iter_local_files(source_dir: str):
+    """Yield the files of a directory, except the sync manifest and partial downloads."""
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name == MANIFEST_NAME or file_name.endswith(PARTIAL_SUFFIX):
+                continue
+            yield os.path.join(root, file_name)
@@ -0,0 +1,131 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import pytest
+from cloud_data_connector.aws.connector import Connector
+from cloud_data_connector.aws.downloader import Downloader, paginate_objects
+from cloud_data_connector.aws.uploader import Uploader
+from cloud_data_connector.int.transfer import (
+    MULTIPART_CHUNKSIZE,
+    TransferEngine,
+    compute_etag,
+)
+
+
+@pytest.fixture(autouse=True)
+def checksum_when_required(monkeypatch):
+    """Recent botocore sends aws-chunked bodies with checksums, which older moto stores as is."""
+    monkeypatch.setenv("AWS_REQUEST_CHECKSUM_CALCULATION", "when_required")
+
+
+def write_tree(root, files):
+    for name, data in files.items():
+        path = os.path.join(root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def test_list_blobs_pagination(aws_session, s3_test, bucket_name):
+    connection_obj = Connector().connect()
+    keys = ["data/part-{:04d}.csv".format(i) for i in range(25)]
+    for key in keys:
+        connection_obj.put_object(Bucket=bucket_name, Key=key, Body=b"x")
+    connection_obj.put_object(Bucket=bucket_name, Key="other.csv", Body=b"x")
+
+    # A small page size forces several list_objects_v2 calls
+    listed = [file['Key'] for file in paginate_objects(connection_obj, bucket_name, "data/", page_size=10)]
+    assert listed == keys
+    assert len(Downloader(connection_obj).list_blobs(bucket_name)) == 26
+    assert Downloader(connection_obj).list_blobs(bucket_name, "nothing/") == []
+
+
+def test_upload_and_download_sync(aws_session, s3_test, bucket_name, tmp_path):
+    connection_obj = Connector().connect()
+    files = {"a.csv": b"a" * 10, "nested/b.csv": b"b" * 20, "nested/deep/c.csv": b"c" * 30}
+    source = str(tmp_path / "source")
+    destination = str(tmp_path / "destination")
+    write_tree(source, files)
+    engine = TransferEngine(max_workers=2, backoff=0)
+
+    result = Uploader(connection_obj).upload_directory(bucket_name, source, "features", engine)
+    assert sorted(result.transferred) == sorted("features/" + name for name in files)
+    assert result.ok
+
+    downloader = Downloader(connection_obj)
+    result = downloader.download_prefix(bucket_name, "features/", destination, engine)
+    assert len(result.transferred) == 3 and result.ok
+    for name, data in files.items():
+        with open(os.path.join(destination, *name.split("/")), "rb") as f:
+            assert f.read() == data
+
+    # Nothing changed, so a second sync skips every object
+    result = downloader.download_prefix(bucket_name, "features/", destination, engine)
+    assert result.transferred == [] and len(result.skipped) == 3
+    result = Uploader(connection_obj).upload_directory(bucket_name, source, "features", engine)
+    assert result.transferred == [] and len(result.skipped) == 3
+
+    # A local file with the same size but other content is downloaded again
+    write_tree(destination, {"a.csv": b"z" * 10})
+    result = downloader.download_prefix(bucket_name, "features/", destination, engine)
+    assert result.transferred == ["features/a.csv"]
+    with open(os.path.join(destination, "a.csv"), "rb") as f:
+        assert f.read() == files["a.csv"]
+
+
+def test_multipart_etag(aws_session, s3_test, bucket_name, tmp_path):
+    connection_obj = Connector().connect()
+    source = str(tmp_path / "source")
+    write_tree(source, {"large.bin": os.urandom(MULTIPART_CHUNKSIZE * 2 + 1024)})
+    Uploader(connection_obj).upload_directory(bucket_name, source)
+
+    etag = connection_obj.head_object(Bucket=bucket_name, Key="large.bin")["ETag"].strip('"')
+    assert etag.endswith("-3")
+    assert compute_etag(os.path.join(source, "large.bin")) == etag
+
+    # Without a manifest, the downloaded file is recognized by its multipart ETag
+    destination = str(tmp_path / "destination")
+    Downloader(connection_obj).download_prefix(bucket_name, "", destination)
+    os.remove(os.path.join(destination, ".transfer_manifest.json"))
+    result = Downloader(connection_obj).download_prefix(bucket_name, "", destination)
+    assert result.skipped == ["large.bin"]
+
+
+def test_retry(aws_session, s3_test, bucket_name, tmp_path):
+    connection_obj = Connector().connect()
+    connection_obj.put_object(Bucket=bucket_name, Key="flaky.csv", Body=b"data")
+    downloader = Downloader(connection_obj)
+    download_object = downloader.download_object
+    calls = []
+
+    def flaky_download(container_obj, remote_object, destiny):
+        calls.append(remote_object.name)
+        if len(calls) < 3:
+            raise ConnectionError("connection reset")
+        download_object(container_obj, remote_object, destiny)
+
+    downloader.download_object = flaky_download
+    destination = str(tmp_path / "destination")
+    result = downloader.download_prefix(bucket_name, "", destination, TransferEngine(retries=2, backoff=0))
+    assert result.transferred == ["flaky.csv"] and len(calls) == 3
+
+    os.remove(os.path.join(destination, "flaky.csv"))
+    calls.clear()
+    result = downloader.download_prefix(bucket_name, "", destination, TransferEngine(retries=1, backoff=0))
+    assert list(result.failed) == ["flaky.csv"]
+    assert sorted(os.listdir(destination)) == [".transfer_manifest.json"]
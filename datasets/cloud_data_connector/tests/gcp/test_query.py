@@ -18,7 +18,7 @@
 import pytest
 from google.cloud.bigquery import Client, DatasetReference, TableReference, SchemaField
 from google.api_core.exceptions import NotFound
-from cloud_data_connector.gcp.query import Query
+from cloud_data_connector.gcp.query import Query, chunk_rows
 from google.cloud.bigquery.dataset import Dataset, Table
 
 
@@ -160,3 +160,94 @@ def test_sql_query(bq_client_mock):
 
     for row, expected_row in zip(rows, expected_row_dicts):
         assert dict(row) == expected_row
+
+
+def test_chunk_rows():
+    rows = [("a" * 10,)] * 7
+    assert [(start, len(batch)) for start, batch in chunk_rows(rows, max_rows=3)] == [(0, 3), (3, 3), (6, 1)]
+    # Each row is 16 bytes of JSON, so two rows fit in 40 bytes
+    assert [(start, len(batch)) for start, batch in chunk_rows(iter(rows), max_bytes=40)] == \
+        [(0, 2), (2, 2), (4, 2), (6, 1)]
+    with pytest.raises(ValueError):
+        list(chunk_rows(rows, max_rows=0))
+
+
+def test_stream_rows_to_bq(mocker, bq_client_mock):
+    bq_client_mock.__class__ = Client
+    mocker.patch.object(bq_client_mock, "dataset", side_effect=lambda name: DatasetReference("test_unittest", name))
+    mocker.patch.object(bq_client_mock, "get_table", side_effect=Table)
+    inserted = []
+    calls = []
+
+    def insert_rows(table, batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise NotFound("") # Table was recently created
+        inserted.extend(batch)
+        return [{"index": i, "errors": ["bad row"]} for i, row in enumerate(batch) if row[0] == 13]
+
+    mocker.patch.object(bq_client_mock, "insert_rows", side_effect=insert_rows)
+    query = Query(bq_client_mock)
+    rows = ((i, "name") for i in range(25))
+    errors = query.stream_rows_to_bq("test_unittest", "test_unittest", rows,
+                                     max_batch_rows=10, max_in_flight=2, pause=0)
+
+    assert sorted(inserted) == [(i, "name") for i in range(25)]
+    assert calls == [10, 10, 10, 5]
+    assert errors == [{"index": 13, "errors": ["bad row"]}]
+
+
+def test_stream_rows_to_bq_no_table(mocker, bq_client_mock):
+    bq_client_mock.__class__ = Client
+    mocker.patch.object(bq_client_mock, "dataset", side_effect=lambda name: DatasetReference("test_unittest", name))
+    mocker.patch.object(bq_client_mock, "get_table", side_effect=NotFound(""))
+    query = Query(bq_client_mock)
+    assert query.stream_rows_to_bq("test_unittest", "test_unittest", [(1,)]) is None
+    bq_client_mock.insert_rows.assert_not_called()
+
+
+QUERY_DATA = [
+    {
+        "query": "SELECT * FROM table",
+        "table": {
+            "columns": ["id_row", "name"],
+            "rows": [[i, "name{}".format(i)] for i in range(5)],
+        },
+    },
+]
+
+
+@pytest.mark.bq_query_return_data(QUERY_DATA)
+def test_query_arrow_batches(bq_client_mock):
+    bq_client_mock.__class__ = Client
+    query = Query(bq_client_mock)
+
+    batches = list(query.query_arrow_batches("SELECT * FROM table", page_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert batches[0].schema.names == ["id_row", "name"]
+    assert sum((batch.column(0).to_pylist() for batch in batches), []) == list(range(5))
+
+
+@pytest.mark.bq_query_return_data(QUERY_DATA)
+def test_query_dataframes(bq_client_mock):
+    bq_client_mock.__class__ = Client
+    query = Query(bq_client_mock)
+
+    frames = list(query.query_dataframes("SELECT * FROM table", page_size=3))
+    assert [len(frame) for frame in frames] == [3, 2]
+    assert list(frames[1]["name"]) == ["name3", "name4"]
+
+
+class EmptyPages:
+    """Rows without the dataframe and arrow iterators, whose only page is empty."""
+    pages = [[]]
+
+
+def test_query_pages_empty_result(mocker, bq_client_mock):
+    bq_client_mock.__class__ = Client
+    mocker.patch.object(bq_client_mock, "query", return_value=mocker.Mock(**{"result.return_value": EmptyPages()}))
+    query = Query(bq_client_mock)
+
+    assert list(query.query_pages("SELECT * FROM table", page_size=2)) == []
+    assert list(query.query_arrow_batches("SELECT * FROM table", page_size=2)) == []
+    assert list(query.query_dataframes("SELECT * FROM table", page_size=2)) == []
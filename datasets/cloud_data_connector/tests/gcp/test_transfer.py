@@ -0,0 +1,72 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import pytest
+from cloud_data_connector.gcp.downloader import Downloader
+from cloud_data_connector.gcp.uploader import Uploader
+from cloud_data_connector.int.transfer import RemoteObject, TransferEngine, local_path
+
+
+def test_sync_prefix(get_fake_storage_client, tmp_path):
+    bucket_name = "test-bucket"
+    files = {"a.txt": b"MtW a", "nested/b.txt": b"MtW b"}
+    source = tmp_path / "source"
+    for name, data in files.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_bytes(data)
+    engine = TransferEngine(max_workers=2, backoff=0)
+
+    uploader = Uploader(get_fake_storage_client)
+    result = uploader.upload_directory(bucket_name, str(source), "features/", engine)
+    assert sorted(result.transferred) == ["features/a.txt", "features/nested/b.txt"]
+    result = uploader.upload_directory(bucket_name, str(source), "features/", engine)
+    assert sorted(result.skipped) == ["features/a.txt", "features/nested/b.txt"]
+
+    downloader = Downloader(get_fake_storage_client)
+    destination = str(tmp_path / "destination")
+    result = downloader.download_prefix(bucket_name, "features/", destination, engine)
+    assert result.ok and len(result.transferred) == 2
+    for name, data in files.items():
+        with open(os.path.join(destination, *name.split("/")), "rb") as f:
+            assert f.read() == data
+
+    result = downloader.download_prefix(bucket_name, "features/", destination, engine)
+    assert result.transferred == [] and len(result.skipped) == 2
+
+
+@pytest.mark.parametrize("name,prefix,expected", [
+    ("features/a.txt", "features/", "a.txt"),
+    ("features/nested/b.txt", "features", "nested/b.txt"),
+    ("features2/a.txt", "features", "features2/a.txt"),
+    ("features/a.txt", "features/a.txt", "a.txt"),
+    ("nested/b.txt", "", "nested/b.txt"),
+])
+def test_local_path(tmp_path, name, prefix, expected):
+    assert local_path(str(tmp_path), name, prefix) == os.path.join(str(tmp_path), *expected.split("/"))
+
+
+def test_download_prefix_invalid_name(tmp_path):
+    def download_object(remote_object, path):
+        with open(path, "wb") as f:
+            f.write(remote_object.name.encode())
+
+    objects = [RemoteObject("features/a.txt", 14), RemoteObject("features/../b.txt", 17)]
+    result = TransferEngine(backoff=0).download_prefix(objects, download_object, str(tmp_path), "features/")
+    assert result.transferred == ["features/a.txt"]
+    assert list(result.failed) == ["features/../b.txt"]
+    assert isinstance(result.failed["features/../b.txt"], ValueError)
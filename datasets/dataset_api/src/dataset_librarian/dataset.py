@@ -15,11 +15,12 @@
 #
 
 import os
+import sys
 from dotenv import load_dotenv, dotenv_values, set_key
 import pkg_resources
 import json
 import argparse
-from dataset_librarian.dataset_api.download import download_dataset
+from dataset_librarian.dataset_api.download import DownloadError, download_dataset
 from dataset_librarian.dataset_api.preprocess import preprocess_dataset
 
 def accept_terms_and_conditions(package_path):
@@ -70,13 +71,18 @@ def main():
     parser.add_argument('--download', action='store_true', help='download the raw dataset')
     parser.add_argument('--preprocess', action='store_true', help='preprocess the dataset')
     parser.add_argument('--split_ratio', type=float, help="split ratio of the test data", default=0.1)
+    parser.add_argument('--workers', type=int, help="number of files to download in parallel", default=4)
 
     # Parse the command-line arguments
     args = parser.parse_args()
 
     # Download the dataset if the --download flag is true
     if args.download:
-        download_dataset(args.name, args.directory)
+        try:
+            download_dataset(args.name, args.directory, args.workers)
+        except DownloadError as e:
+            # Don't preprocess an incomplete dataset
+            sys.exit("\nError: {}".format(e))
 
     # Preprocess the dataset if the --preprocess flag is true
     if args.preprocess:
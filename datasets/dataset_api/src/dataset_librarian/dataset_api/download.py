@@ -16,14 +16,202 @@
 
 #
 
+import hashlib
 import os
-import subprocess
 import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import pkg_resources
 
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 5
+DEFAULT_TIMEOUT = 60
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 30
 
-def download_dataset(dataset_name, dataset_directory):
+
+class DownloadError(Exception):
+    pass
+
+
+def get_file_name(url_entry):
+    # Use the 'file_name' key if it exists in the JSON file, otherwise the last part of the URL
+    if 'file_name' in url_entry:
+        return url_entry['file_name']
+    return url_entry['url'].split('/')[-1]
+
+
+def file_checksum(file_path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_file(file_path, size=None, checksum=None):
+    """
+    Returns True if the file matches the expected size and checksum. The checksum
+    uses the '<algorithm>:<hex digest>' format, for example 'sha256:9f86d0...'.
+    """
+    if size is not None and os.path.getsize(file_path) != int(size):
+        return False
+    if checksum:
+        algorithm, _, expected = checksum.partition(':')
+        if file_checksum(file_path, algorithm.lower()) != expected.lower():
+            return False
+    return True
+
+
+def _request(url, offset, timeout):
+    request = urllib.request.Request(url, headers={'User-Agent': 'dataset_librarian'})
+    if offset > 0:
+        request.add_header('Range', 'bytes={}-'.format(offset))
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def download_file(url, destination_file_path, size=None, checksum=None, progress=None,
+                  retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT):
+    """
+    Downloads the url to destination_file_path. The data is written to a '.part' file,
+    which is resumed with an HTTP Range request after an interruption, and renamed once
+    the download is complete and matches the expected size and checksum.
+    """
+    part_file_path = destination_file_path + '.part'
+    if os.path.exists(destination_file_path):
+        if size is None and not checksum:
+            print("\n{} already exists, skipping it.".format(destination_file_path))
+            return destination_file_path
+        if verify_file(destination_file_path, size, checksum):
+            if progress is not None:
+                progress.update(os.path.getsize(destination_file_path))
+            return destination_file_path
+        if size is not None and os.path.getsize(destination_file_path) < int(size) and \
+                not os.path.exists(part_file_path):
+            # Most likely an interrupted download, so resume it
+            os.replace(destination_file_path, part_file_path)
+        else:
+            os.remove(destination_file_path)
+
+    # Bytes of this file that were counted in the progress bar
+    reported = 0
+
+    def report(downloaded):
+        nonlocal reported
+        if progress is not None:
+            progress.update(downloaded - reported)
+        reported = downloaded
+
+    attempt = 0
+    total_added = size is not None
+    while True:
+        offset = os.path.getsize(part_file_path) if os.path.exists(part_file_path) else 0
+        report(offset)
+        if size is not None and offset == int(size):
+            # Create the file for empty downloads
+            open(part_file_path, 'ab').close()
+            break
+        try:
+            with _request(url, offset, timeout) as response:
+                if offset > 0 and response.status != 206:
+                    # The server ignored the Range header, so start from the beginning
+                    offset = 0
+                    report(0)
+                content_length = response.headers.get('Content-Length')
+                if not total_added and content_length is not None and progress is not None:
+                    progress.add_total(offset + int(content_length))
+                    total_added = True
+                with open(part_file_path, 'ab' if offset > 0 else 'wb') as f:
+                    for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                        f.write(chunk)
+                        report(reported + len(chunk))
+                if content_length is not None and reported < offset + int(content_length):
+                    # The connection was closed before the end of the response
+                    raise ConnectionError("Received {} of {} bytes".format(
+                        reported, offset + int(content_length)))
+            break
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset > 0:
+                # The requested range starts at the end of the file, so it's already complete
+                break
+            if e.code < 500 or attempt >= retries:
+                raise DownloadError("Failed to download {}: {}".format(url, e))
+        except (urllib.error.URLError, OSError) as e:
+            if attempt >= retries:
+                raise DownloadError("Failed to download {}: {}".format(url, e))
+        attempt += 1
+        time.sleep(min(RETRY_DELAY * 2 ** (attempt - 1), MAX_RETRY_DELAY))
+
+    if not verify_file(part_file_path, size, checksum):
+        os.remove(part_file_path)
+        raise DownloadError("{} does not match the expected size or checksum, "
+                            "the partial file was removed.".format(destination_file_path))
+    os.replace(part_file_path, destination_file_path)
+    return destination_file_path
+
+
+class _Progress:
+    """Thread safe aggregate progress bar of the downloads."""
+
+    def __init__(self, total, disable=False):
+        self._lock = threading.Lock()
+        self._bar = tqdm(total=total or None, unit='B', unit_scale=True, unit_divisor=1024, disable=disable)
+
+    def add_total(self, size):
+        with self._lock:
+            self._bar.total = (self._bar.total or 0) + size
+            self._bar.refresh()
+
+    def update(self, size):
+        with self._lock:
+            self._bar.update(size)
+
+    def close(self):
+        self._bar.close()
+
+
+def download_files(url_entries, dataset_directory, max_workers=DEFAULT_WORKERS, show_progress=True,
+                   retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT):
+    """
+    Downloads the url entries (dicts with 'url' and the optional 'file_name', 'size' and
+    'checksum' keys) to the dataset directory using a pool of max_workers threads.
+    Returns the list of downloaded file paths and the list of errors.
+    """
+    if not os.path.isdir(dataset_directory):
+        os.makedirs(dataset_directory)
+
+    # The total is only known up front when every entry has a size
+    sizes = [url.get('size') for url in url_entries]
+    total = sum(int(x) for x in sizes) if all(x is not None for x in sizes) else None
+    progress = _Progress(total, disable=not show_progress)
+    if total is None:
+        # Entries with a size are added now, the others once their response arrives
+        progress.add_total(sum(int(x) for x in sizes if x is not None))
+
+    file_paths = []
+    errors = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(download_file, url['url'],
+                                       os.path.join(dataset_directory, get_file_name(url)),
+                                       url.get('size'), url.get('checksum'), progress,
+                                       retries, timeout): url for url in url_entries}
+            for future in as_completed(futures):
+                try:
+                    file_paths.append(future.result())
+                except DownloadError as e:
+                    errors.append(str(e))
+    finally:
+        progress.close()
+    return file_paths, errors
+
+
+def download_dataset(dataset_name, dataset_directory, max_workers=DEFAULT_WORKERS):
     # Get the path to the file relative to the package root
     datasets = pkg_resources.resource_filename('dataset_librarian', 'datasets_urls.json')
     # Load the JSON file that contains the dataset URLs
@@ -37,23 +225,14 @@ def download_dataset(dataset_name, dataset_directory):
     # Check if the dataset destination directory is given or create one using the dataset name
     if not dataset_directory:
         dataset_directory = os.path.join(os.getcwd(), dataset_name)
-    if not os.path.isdir(dataset_directory):
-        os.makedirs(dataset_directory)
-
-    # Get the URL for the dataset
-    dataset_url = dataset_urls[dataset_name]
-    for url in dataset_url['urls']:
-        # Check if the key 'file_name' exists in the JSON file
-        if 'file_name' in url:
-            filename = url['file_name']
-        else:
-            filename = url['url'].split('/')[-1]
 
-        destination_file_path = os.path.join(dataset_directory, filename)
-        if os.path.exists(destination_file_path):
-            print("\nFile already exists in {}.".format(destination_file_path))
-            print("Please delete it and try again!.\n")
-        else:
-            # Download the file if it does not exist in the desired dataset directory
-            subprocess.run(["wget", url['url'], "-O", destination_file_path])
-            print("\n{} downloaded successfully in {}\n".format(filename, dataset_directory))
+    # Download every URL of the dataset concurrently
+    file_paths, errors = download_files(dataset_urls[dataset_name]['urls'], dataset_directory, max_workers)
+    for file_path in sorted(file_paths):
+        print("{} downloaded successfully in {}".format(os.path.basename(file_path), dataset_directory))
+    for error in errors:
+        print("\nError: {}".format(error))
+    if errors:
+        raise DownloadError("{} of {} files of {} failed to download, run the download again to resume "
+                            "the failed files".format(len(errors), len(errors) + len(file_paths), dataset_name))
+    return file_paths
@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dataset_librarian.dataset_api import download
+from dataset_librarian.dataset_api.download import download_files
+
+FILES = {"a.bin": os.urandom(300000), "b.bin": os.urandom(1000), "c.bin": b""}
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves FILES with Range support, and cuts the first response of the paths in fail_once."""
+    fail_once = set()
+    requests = []
+
+    def do_GET(self):
+        name = self.path.lstrip("/")
+        if name not in FILES:
+            self.send_error(404)
+            return
+        data = FILES[name]
+        range_header = self.headers.get("Range")
+        self.requests.append((name, range_header))
+        start = int(range_header.split("=")[1].rstrip("-")) if range_header else 0
+        if start >= len(data) and range_header:
+            self.send_error(416)
+            return
+        self.send_response(206 if range_header else 200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        if name in self.fail_once:
+            self.fail_once.discard(name)
+            self.wfile.write(data[start:start + 1000])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(download, "RETRY_DELAY", 0)
+    RangeHandler.fail_once = set()
+    RangeHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(httpd.server_port)
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get_entries(server, **kwargs):
+    return [dict({"url": "{}/{}".format(server, name), "size": len(data),
+                  "checksum": "sha256:" + hashlib.sha256(data).hexdigest()}, **kwargs)
+            for name, data in FILES.items()]
+
+
+def test_parallel_download(server, tmpdir):
+    file_paths, errors = download_files(get_entries(server), str(tmpdir), max_workers=3, show_progress=False)
+    assert errors == []
+    assert len(file_paths) == len(FILES)
+    for name, data in FILES.items():
+        assert tmpdir.join(name).read_binary() == data
+        assert not tmpdir.join(name + ".part").exists()
+
+
+def test_resume_partial_file(server, tmpdir):
+    """ Verifies that a partial file is resumed with a Range request instead of starting over """
+    tmpdir.join("a.bin.part").write_binary(FILES["a.bin"][:120000])
+    entries = [e for e in get_entries(server) if e["url"].endswith("a.bin")]
+    _, errors = download_files(entries, str(tmpdir), show_progress=False)
+    assert errors == []
+    assert tmpdir.join("a.bin").read_binary() == FILES["a.bin"]
+    assert RangeHandler.requests == [("a.bin", "bytes=120000-")]
+
+
+def test_retry_after_interruption(server, tmpdir):
+    RangeHandler.fail_once = {"a.bin"}
+    entries = [e for e in get_entries(server) if e["url"].endswith("a.bin")]
+    _, errors = download_files(entries, str(tmpdir), show_progress=False)
+    assert errors == []
+    assert tmpdir.join("a.bin").read_binary() == FILES["a.bin"]
+    assert RangeHandler.requests == [("a.bin", None), ("a.bin", "bytes=1000-")]
+
+
+def test_skip_verified_files(server, tmpdir):
+    download_files(get_entries(server), str(tmpdir), show_progress=False)
+    RangeHandler.requests = []
+    _, errors = download_files(get_entries(server), str(tmpdir), show_progress=False)
+    assert errors == []
+    assert RangeHandler.requests == []
+
+
+def test_checksum_mismatch(server, tmpdir):
+    entries = [dict(e, checksum="sha256:" + "0" * 64) for e in get_entries(server) if e["url"].endswith("b.bin")]
+    file_paths, errors = download_files(entries, str(tmpdir), show_progress=False)
+    assert file_paths == []
+    assert len(errors) == 1 and "checksum" in errors[0]
+    assert not tmpdir.join("b.bin").exists()
+    assert not tmpdir.join("b.bin.part").exists()
+
+
+def test_missing_file(server, tmpdir):
+    _, errors = download_files([{"url": server + "/missing.bin"}], str(tmpdir), show_progress=False)
+    assert len(errors) == 1 and "404" in errors[0]
@@ -41,11 +41,19 @@ ImageNet .tar files. It should be extracted and provided in the format:
 - Validation Images: validation/ILSVRC2012_val_00000001.JPEG
 - Validation Labels: synset_labels.txt
 
+The TFRecords are written to `local_scratch_dir`, which can be a local
+directory or a GCS path. Shards are written in parallel by `num_workers`
+processes, and each shard is written to a temporary file that is renamed when
+it is complete. Shards that already exist with the expected number of records
+are skipped, so an interrupted conversion can be resumed by running the
+script again.
 """
 
 import math
+import multiprocessing
 import os
 import random
+import struct
 import tarfile
 import urllib
 
@@ -64,6 +72,12 @@ flags.DEFINE_string(
     'Should have train and validation subdirectories inside it.')
 flags.DEFINE_string(
     'dataset_option', "Training", 'Option to pre-process entire dataset or just the validation dataset.')
+flags.DEFINE_integer(
+    'num_workers', os.cpu_count(), 'Number of processes that write shards.')
+flags.DEFINE_integer(
+    'training_shards', 1024, 'Number of training shards.')
+flags.DEFINE_integer(
+    'validation_shards', 128, 'Number of validation shards.')
 
 FLAGS = flags.FLAGS
 
@@ -74,9 +88,6 @@ TRAINING_FILE = 'ILSVRC2012_img_train.tar'
 VALIDATION_FILE = 'ILSVRC2012_img_val.tar'
 LABELS_FILE = 'synset_labels.txt'
 
-TRAINING_SHARDS = 1024
-VALIDATION_SHARDS = 128
-
 TRAINING_DIRECTORY = 'train'
 VALIDATION_DIRECTORY = 'validation'
 
@@ -226,6 +237,63 @@ def _is_cmyk(filename):
   return os.path.basename(filename) in blacklist
 
 
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Start of frame markers, which have the image size. 0xC4, 0xC8 and 0xCC are
+# other markers in the same range.
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - frozenset([0xC4, 0xC8, 0xCC])
+# Markers without a length field.
+_STANDALONE_MARKERS = frozenset([0x01, 0xD8] + list(range(0xD0, 0xD8)))
+_JPEG_EOI = b'\xff\xd9'
+
+
+def _jpeg_header(image_data):
+  """Reads the image size and number of components from a JPEG header.
+
+  Args:
+    image_data: string, JPEG encoded image.
+
+  Returns:
+    (height, width, components), or None if the start of frame segment is not
+    found before the image data.
+  """
+  if image_data[:2] != b'\xff\xd8':
+    return None
+  offset = 2
+  while offset + 4 <= len(image_data):
+    if image_data[offset] != 0xFF:
+      return None
+    marker = image_data[offset + 1]
+    if marker == 0xFF:
+      # fill byte
+      offset += 1
+      continue
+    if marker in _STANDALONE_MARKERS:
+      offset += 2
+      continue
+    if marker == 0xDA:
+      # start of scan, so the image data starts without a frame header
+      return None
+    length, = struct.unpack('>H', image_data[offset + 2:offset + 4])
+    if marker in _SOF_MARKERS:
+      if offset + 10 > len(image_data):
+        return None
+      height, width, components = struct.unpack(
+          '>HHB', image_data[offset + 5:offset + 10])
+      return height, width, components
+    offset += 2 + length
+  return None
+
+
+def _has_jpeg_end(image_data):
+  """Checks that a JPEG ends with the end of image marker.
+
+  A truncated JPEG (e.g. of an interrupted download) doesn't, so it's decoded
+  instead of sized from its header, and the decode error stops the conversion
+  rather than a corrupt record being written.
+  """
+  return image_data.rstrip(b'\x00\r\n\t ').endswith(_JPEG_EOI)
+
+
 class ImageCoder(object):
   """Helper class that provides TensorFlow image coding utilities."""
 
@@ -279,14 +347,24 @@ def _process_image(filename, coder):
     image_data = f.read()
 
   # Clean the dirty data.
-  if _is_png(filename):
+  header = None
+  if _is_png(filename) or image_data.startswith(_PNG_SIGNATURE):
     # 1 image is a PNG.
     logging.info('Converting PNG to JPEG for %s', filename)
     image_data = coder.png_to_jpeg(image_data)
-  elif _is_cmyk(filename):
-    # 22 JPEG images are in CMYK colorspace.
-    logging.info('Converting CMYK to RGB for %s', filename)
-    image_data = coder.cmyk_to_rgb(image_data)
+  else:
+    header = _jpeg_header(image_data)
+    if _is_cmyk(filename) or (header is not None and header[2] == 4):
+      # 22 JPEG images are in CMYK colorspace.
+      logging.info('Converting CMYK to RGB for %s', filename)
+      image_data = coder.cmyk_to_rgb(image_data)
+      header = None
+
+  # Only decode the images with an unexpected header or end. Grayscale JPEGs
+  # are kept as they are, and are decoded to RGB by the input pipelines.
+  if (header is not None and header[2] in (1, 3) and header[0] and header[1]
+      and _has_jpeg_end(image_data)):
+    return image_data, header[0], header[1]
 
   # Decode the RGB JPEG.
   image = coder.decode_jpeg(image_data)
@@ -322,8 +400,54 @@ def _process_image_files_batch(coder, output_file, filenames, synsets, labels):
   writer.close()
 
 
+# ImageCoder of the worker process, which is created by the first shard.
+_coder = None
+
+
+def _get_coder():
+  global _coder
+  if _coder is None:
+    _coder = ImageCoder()
+  return _coder
+
+
+def _is_valid_shard(output_file, num_records):
+  """Checks that a shard exists and has num_records readable records."""
+  if not tf.gfile.Exists(output_file):
+    return False
+  try:
+    count = sum(1 for _ in tf.python_io.tf_record_iterator(output_file))
+  except tf.errors.DataLossError:
+    return False
+  return count == num_records
+
+
+def _process_shard(shard):
+  """Writes one shard, unless it already exists.
+
+  The records are written to a temporary file that is renamed when it is
+  complete, so that an interrupted run doesn't leave a partial shard.
+
+  Args:
+    shard: tuple of the output file, the list of image files, the list of
+      their synsets and the map of synset to label.
+
+  Returns:
+    (output_file, True if the shard was written or False if it was skipped)
+  """
+  output_file, filenames, synsets, labels = shard
+  if _is_valid_shard(output_file, len(filenames)):
+    return output_file, False
+
+  tmp_file = '{0}.tmp-{1}'.format(output_file, os.getpid())
+  _process_image_files_batch(_get_coder(), tmp_file, filenames, synsets,
+                             labels)
+  tf.gfile.Rename(tmp_file, output_file, overwrite=True)
+  return output_file, True
+
+
 def _process_dataset(filenames, synsets, labels, output_directory, prefix,
-                     num_shards):
+                     num_shards, num_workers=1):
   """Processes and saves list of images as TFRecords.
 
   Args:
@@ -333,27 +457,51 @@ def _process_dataset(filenames, synsets, labels, output_directory, prefix,
     output_directory: path where output files should be created
     prefix: string; prefix for each file
     num_shards: number of chucks to split the filenames into
+    num_workers: number of processes that write the shards
 
   Returns:
     files: list of tf-record filepaths created from processing the dataset.
   """
   _check_or_create_dir(output_directory)
   chunksize = int(math.ceil(len(filenames) / num_shards))
-  coder = ImageCoder()
 
-  files = []
+  # remove the temporary files of an interrupted run
+  for tmp_file in tf.gfile.Glob(
+      os.path.join(output_directory, prefix + '-*.tmp-*')):
+    tf.gfile.Remove(tmp_file)
 
+  shards = []
   for shard in range(num_shards):
     chunk_files = filenames[shard * chunksize : (shard + 1) * chunksize]
     chunk_synsets = synsets[shard * chunksize : (shard + 1) * chunksize]
     single_filename = "{0}-{1:05d}-of-{2:05d}".format(prefix,shard,num_shards)
     output_file = os.path.join(
         output_directory, single_filename)
-    _process_image_files_batch(coder, output_file, chunk_files,
-                               chunk_synsets, labels)
-    logging.info('Finished writing file: %s', output_file)
-    files.append(output_file)
-  return files
+    shards.append((output_file, chunk_files, chunk_synsets, labels))
+
+  num_workers = max(1, min(num_workers or 1, num_shards))
+  if num_workers > 1:
+    # TensorFlow sessions are not fork safe, so the workers are spawned and
+    # each creates its own ImageCoder.
+    pool = multiprocessing.get_context('spawn').Pool(num_workers)
+    results = pool.imap_unordered(_process_shard, shards)
+  else:
+    pool = None
+    results = map(_process_shard, shards)
+
+  files = []
+  try:
+    for output_file, written in results:
+      if written:
+        logging.info('Finished writing file: %s', output_file)
+      else:
+        logging.info('Skipping existing file: %s', output_file)
+      files.append(output_file)
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+  return sorted(files)
 
 
 def convert_to_tf_records(raw_data_dir):
@@ -396,14 +544,14 @@ def convert_to_tf_records(raw_data_dir):
   training_records = _process_dataset(
       training_files, training_synsets, labels,
       os.path.join(FLAGS.local_scratch_dir, TRAINING_DIRECTORY),
-      TRAINING_DIRECTORY, TRAINING_SHARDS)
+      TRAINING_DIRECTORY, FLAGS.training_shards, FLAGS.num_workers)
 
   # Create validation data
   logging.info('Processing the validation data.')
   validation_records = _process_dataset(
       validation_files, validation_synsets, labels,
       os.path.join(FLAGS.local_scratch_dir, VALIDATION_DIRECTORY),
-      VALIDATION_DIRECTORY, VALIDATION_SHARDS)
+      VALIDATION_DIRECTORY, FLAGS.validation_shards, FLAGS.num_workers)
 
   return training_records, validation_records
 
@@ -430,7 +578,7 @@ def convert_val_data_to_tf_records(raw_data_dir):
   validation_records = _process_dataset(
       validation_files, validation_synsets, labels,
       os.path.join(FLAGS.local_scratch_dir, VALIDATION_DIRECTORY),
-      VALIDATION_DIRECTORY, VALIDATION_SHARDS)
+      VALIDATION_DIRECTORY, FLAGS.validation_shards, FLAGS.num_workers)
 
   return validation_records
 
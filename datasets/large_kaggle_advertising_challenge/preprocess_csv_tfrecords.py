@@ -17,150 +17,270 @@
 #
 
 #
+"""Converts the Criteo CSV dataset to TFRecords for wide_deep_large_ds.
+
+The CSV files are read in chunks of --chunk-size rows, so the memory use
+doesn't depend on the size of the dataset. The first pass computes the
+min/max normalization ranges of the numeric columns of the input CSV and the
+optional calibration CSV. The second pass normalizes and hashes the columns
+of each chunk and serializes the examples in --num-workers worker processes,
+and the examples are written in the CSV order to --num-shards output files.
+"""
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
+import argparse
+import collections
+import multiprocessing
 import os
 import sys
 import pandas
-import argparse
 import numpy as np
 import tensorflow as tf
+
+
 def version_is_less_than(a, b):
     a_parts = a.split('.')
     b_parts = b.split('.')
-    
+
     for i in range(len(a_parts)):
         if int(a_parts[i]) < int(b_parts[i]):
             print('{} < {}, version_is_less_than() returning False'.format(
               a_parts[i], b_parts[i]))
             return True
     return False
-print("TensorFlow version {}".format(tf.__version__))
 required_tf_version = '2.0.0'
 if version_is_less_than(tf.__version__ , required_tf_version):
     tf.compat.v1.enable_eager_execution()
-parser = argparse.ArgumentParser()
-parser.add_argument('--inputcsv-datafile', type=str,
-                    help='full path of data file e.g. eval.csv',
-                    dest='evaldatafile_path',
-                    required=True)
-parser.add_argument('--calibrationcsv-datafile', type=str,
-                    help='full path of data file of calibration/train dataset to get normalization ranges',
-                    dest='traindatafile_path',
-                    default='NULL',
-                    required=False)
-
-parser.add_argument('--outputfile-name', type=str,
-                    help='output tfrecord file name e.g. processed_eval.[tfrecords]',
-                    dest='outputfile_path',
-                    default="processed_data.tfrecords",
-                    required=False)
-
-args = parser.parse_args()
-
-eval_csv_file = args.evaldatafile_path
-train_csv_file = args.traindatafile_path
-output_file = args.outputfile_path
-
-if not os.path.isfile(eval_csv_file):
-    print("Please input a valid csv file")
-    sys.exit(1)
-
-filename, file_ext = os.path.splitext(output_file)
-in_filename, _ = os.path.splitext(os.path.basename(eval_csv_file))
-
-if file_ext != ".tfrecords":
-    output_file = output_file + ".tfrecords"
-
-output_file = "{}_{}".format(in_filename,output_file)
-csv = pandas.read_csv(eval_csv_file, header=None)
-if len(csv.columns)==39:
-    dataset_type = 'test'
-else:
-    dataset_type = 'eval'
-fill_na_dict  = {}
-if dataset_type=='test':
-    for i in range(0,13):
-        fill_na_dict[i]=0.0
-    for i in range(13,39):
-        fill_na_dict[i]=""
-else:
-    for i in range(1,14):
-        fill_na_dict[i]=0.0
-    for i in range(14,40):
-        fill_na_dict[i]=""
-csv=csv.fillna(value=fill_na_dict).values
+
+NUM_NUMERIC_COLUMNS = 13
+NUM_CATEGORICAL_COLUMNS = 26
+HASH_BUCKET_SIZE = 1000
 numeric_feature_names = ["numeric_1"]
 string_feature_names = ["string_1"]
-LABEL_COLUMN =["clicked"]
-CATEGORICAL_COLUMNS1 = ["C"+str(i)+"_embedding" for i in range(1, 27)]
-NUMERIC_COLUMNS1 = ["I"+str(i) for i in range(1, 14)]
-if dataset_type=='eval':
-    DATA_COLUMNS = LABEL_COLUMN + NUMERIC_COLUMNS1 + CATEGORICAL_COLUMNS1
-else:
-    DATA_COLUMNS = NUMERIC_COLUMNS1 + CATEGORICAL_COLUMNS1
-CATEGORICAL_COLUMNS2 = ["C"+str(i)+"_embedding" for i in range(1, 27)]
-NUMERIC_COLUMNS2 = ["I"+str(i) for i in range(1, 14)]
-
-CATEGORICAL_COLUMNS1.sort()
-NUMERIC_COLUMNS1.sort()
-no_of_rows = 0
-with open(eval_csv_file, 'r') as f:
-    if not os.path.isfile(train_csv_file):
-        nums=[line.strip('\n\r').split(',') for line in f.readlines()]
-    else: 
-        f1 = open(train_csv_file, 'r')
-        nums=[line.strip('\n\r').split(',') for line in f.readlines(
-        )]+[line.strip('\n\t').split(',') for line in f1.readlines()]
-    numpy_arr = np.array(nums)
-    numpy_arr[numpy_arr=='']='0'
-    min_list,max_list,range_list = [],[],[]
-    for i in range(len(DATA_COLUMNS)):
-        if DATA_COLUMNS[i] in NUMERIC_COLUMNS1:
-            col_min = numpy_arr[:,i].astype(np.float32).min()
-            col_max = numpy_arr[:,i].astype(np.float32).max()
-            min_list.append(col_min)
-            max_list.append(col_max)
-            range_list.append(col_max-col_min)
+CATEGORICAL_COLUMNS = ["C"+str(i)+"_embedding" for i in range(1, 27)]
+NUMERIC_COLUMNS = ["I"+str(i) for i in range(1, 14)]
+# the features are stored in the sorted order of the column names, e.g.
+# I1, I10, I11, I12, I13, I2, ..., so these are the CSV column offsets of
+# the sorted columns
+NUMERIC_ORDER = [NUMERIC_COLUMNS.index(c) for c in sorted(NUMERIC_COLUMNS)]
+CATEGORICAL_ORDER = [CATEGORICAL_COLUMNS.index(c)
+                     for c in sorted(CATEGORICAL_COLUMNS)]
+
+# CSV column indices of the label, numeric and categorical columns. The 'test'
+# dataset has 39 columns and no label.
+CsvLayout = collections.namedtuple('CsvLayout', ['label', 'numeric',
+                                                 'categorical'])
+
+
+def get_csv_layout(csv_file):
+    num_columns = len(pandas.read_csv(csv_file, header=None, nrows=1).columns)
+    first = 0 if num_columns == 39 else 1
+    return CsvLayout(
+        label=None if num_columns == 39 else 0,
+        numeric=list(range(first, first + NUM_NUMERIC_COLUMNS)),
+        categorical=list(range(first + NUM_NUMERIC_COLUMNS,
+                               first + NUM_NUMERIC_COLUMNS +
+                               NUM_CATEGORICAL_COLUMNS)))
+
+
+def compute_ranges(csv_files, layout, chunk_size):
+    """Computes the min and max of the numeric columns of the CSV files.
+
+    Missing values are counted as 0.
+
+    Returns:
+        min, max and range float32 arrays in the CSV column order, and the
+        number of rows of the first CSV file.
+    """
+    col_min = np.full(NUM_NUMERIC_COLUMNS, np.inf, np.float32)
+    col_max = np.full(NUM_NUMERIC_COLUMNS, -np.inf, np.float32)
+    num_rows = []
+    for csv_file in csv_files:
+        rows = 0
+        for chunk in pandas.read_csv(csv_file, header=None, chunksize=chunk_size,
+                                     usecols=layout.numeric,
+                                     dtype=np.float64):
+            values = chunk[layout.numeric].fillna(0.0).values.astype(np.float32)
+            col_min = np.minimum(col_min, values.min(axis=0))
+            col_max = np.maximum(col_max, values.max(axis=0))
+            rows += len(values)
+        num_rows.append(rows)
+    return col_min, col_max, col_max - col_min, num_rows[0]
+
+
+def read_chunks(csv_file, layout, chunk_size):
+    """Yields (numeric, categorical, labels) arrays of the CSV chunks.
+
+    Missing numeric values are 0.0 and missing categorical values are "". The
+    labels are None for a CSV file without labels.
+    """
+    # the categorical columns are read as strings, so that hex values with
+    # only digits keep their leading zeros in every chunk
+    dtype = dict((i, str) for i in layout.categorical)
+    for chunk in pandas.read_csv(csv_file, header=None, chunksize=chunk_size,
+                                 dtype=dtype):
+        numeric = chunk[layout.numeric].fillna(0.0).values.astype(np.float64)
+        categorical = chunk[layout.categorical].fillna("").values
+        labels = None
+        if layout.label is not None:
+            labels = chunk[layout.label].values.astype(np.int64)
+        yield numeric, categorical, labels
+
+
+def serialize_chunk(numeric, categorical, labels, col_min, col_range):
+    """Returns the serialized tf.train.Examples of the rows of a chunk."""
+    normalized = ((numeric - col_min.astype(np.float64)) /
+                  col_range.astype(np.float64))
+    normalized = normalized[:, NUMERIC_ORDER].astype(np.float32)
+
+    # hash all the categorical values of the chunk with a single op
+    hash_values = tf.strings.to_hash_bucket_fast(
+        categorical[:, CATEGORICAL_ORDER], HASH_BUCKET_SIZE).numpy()
+    # each categorical feature is stored as the pair [column id, hash value]
+    ids = np.empty([len(hash_values), 2 * NUM_CATEGORICAL_COLUMNS], np.int64)
+    ids[:, 0::2] = np.arange(NUM_CATEGORICAL_COLUMNS)
+    ids[:, 1::2] = hash_values
+
+    normalized = normalized.tolist()
+    ids = ids.tolist()
+    labels = labels.tolist() if labels is not None else None
+    records = []
+    for i in range(len(ids)):
+        feature = {
+            numeric_feature_names[0]: tf.train.Feature(
+                float_list=tf.train.FloatList(value=normalized[i])),
+            string_feature_names[0]: tf.train.Feature(
+                int64_list=tf.train.Int64List(value=ids[i])),
+        }
+        if labels is not None:
+            feature["label"] = tf.train.Feature(
+                int64_list=tf.train.Int64List(value=[labels[i]]))
+        example = tf.train.Example(features=tf.train.Features(feature=feature))
+        records.append(example.SerializeToString())
+    return records
+
+
+def _serialize_chunk_star(args):
+    return serialize_chunk(*args)
+
+
+def imap_bounded(pool, func, iterable, max_pending):
+    """Like pool.imap, but reads at most max_pending items ahead."""
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def get_output_files(output_file, num_shards):
+    if num_shards == 1:
+        return [output_file]
+    filename, file_ext = os.path.splitext(output_file)
+    return ["{}-{:05d}-of-{:05d}{}".format(filename, i, num_shards, file_ext)
+            for i in range(num_shards)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--inputcsv-datafile', type=str,
+                        help='full path of data file e.g. eval.csv',
+                        dest='evaldatafile_path',
+                        required=True)
+    parser.add_argument('--calibrationcsv-datafile', type=str,
+                        help='full path of data file of calibration/train dataset to get normalization ranges',
+                        dest='traindatafile_path',
+                        default='NULL',
+                        required=False)
+
+    parser.add_argument('--outputfile-name', type=str,
+                        help='output tfrecord file name e.g. processed_eval.[tfrecords]',
+                        dest='outputfile_path',
+                        default="processed_data.tfrecords",
+                        required=False)
+    parser.add_argument('--num-shards', type=int,
+                        help='number of output files. With more than one, '
+                             'the files are named <name>-NNNNN-of-NNNNN.tfrecords',
+                        dest='num_shards',
+                        default=1,
+                        required=False)
+    parser.add_argument('--num-workers', type=int,
+                        help='number of processes that serialize the examples',
+                        dest='num_workers',
+                        default=os.cpu_count(),
+                        required=False)
+    parser.add_argument('--chunk-size', type=int,
+                        help='number of CSV rows that are processed at a time',
+                        dest='chunk_size',
+                        default=100000,
+                        required=False)
+
+    args = parser.parse_args()
+    print("TensorFlow version {}".format(tf.__version__))
+
+    eval_csv_file = args.evaldatafile_path
+    train_csv_file = args.traindatafile_path
+    output_file = args.outputfile_path
+
+    if not os.path.isfile(eval_csv_file):
+        print("Please input a valid csv file")
+        sys.exit(1)
+
+    filename, file_ext = os.path.splitext(output_file)
+    in_filename, _ = os.path.splitext(os.path.basename(eval_csv_file))
+
+    if file_ext != ".tfrecords":
+        output_file = output_file + ".tfrecords"
+
+    output_file = "{}_{}".format(in_filename,output_file)
+    output_files = get_output_files(output_file, args.num_shards)
+
+    layout = get_csv_layout(eval_csv_file)
+    csv_files = [eval_csv_file]
     if os.path.isfile(train_csv_file):
-        f1.close()
-    print('min list',min_list)
-    print('max list',max_list)
-    print('range list',range_list)
+        csv_files.append(train_csv_file)
+    col_min, col_max, col_range, num_rows = compute_ranges(
+        csv_files, layout, args.chunk_size)
+    print('min list',col_min.tolist())
+    print('max list',col_max.tolist())
+    print('range list',col_range.tolist())
+
+    # the output files have consecutive rows of the CSV
+    rows_per_shard = max(1, -(-num_rows // args.num_shards))
+    chunks = ((numeric, categorical, labels, col_min, col_range)
+              for numeric, categorical, labels in
+              read_chunks(eval_csv_file, layout, args.chunk_size))
+    pool = None
+    if args.num_workers > 1:
+        pool = multiprocessing.get_context('spawn').Pool(args.num_workers)
+        records_iter = imap_bounded(pool, _serialize_chunk_star, chunks,
+                                    2 * args.num_workers)
+    else:
+        records_iter = (_serialize_chunk_star(chunk) for chunk in chunks)
 
-with tf.io.TFRecordWriter(output_file) as writer:
     print('*****Processing data******')
-    for row in csv:
-        no_of_rows = no_of_rows+1
-        if dataset_type == 'eval':
-            unnormalized_vals = np.array(row[1:14])
-        else:
-            unnormalized_vals = np.array(row[0:13])
-        normalized_vals = (unnormalized_vals-min_list)/range_list
-        if dataset_type == 'eval':
-            new_categorical_dict = dict(zip(CATEGORICAL_COLUMNS2, row[14:40]))
-        else:
-            new_categorical_dict = dict(zip(CATEGORICAL_COLUMNS2, row[13:39]))
-        new_categorical_list = []
-        for i in CATEGORICAL_COLUMNS1:
-            if pandas.isnull(new_categorical_dict[i]):
-                new_categorical_list.append("")
-            else:
-                new_categorical_list.append(new_categorical_dict[i])
-        hash_values =  tf.strings.to_hash_bucket_fast(
-            new_categorical_list, 1000).numpy()
-        new_numerical_dict = dict(zip(NUMERIC_COLUMNS2, normalized_vals))
-        example = tf.train.Example()
-        for i in NUMERIC_COLUMNS1:
-            example.features.feature[numeric_feature_names[0]].float_list.value.extend([new_numerical_dict[i]])
-        for i in range(0, 26):
-            example.features.feature[string_feature_names[0]].int64_list.value.extend([i])
-            example.features.feature[string_feature_names[0]].int64_list.value.extend([hash_values[i]])
-        if dataset_type == 'eval':
-            example.features.feature["label"].int64_list.value.append(row[0])
-        writer.write(example.SerializeToString())
-
-print('Total number of rows ', no_of_rows)
-print('Generated output file name :'+output_file)
+    no_of_rows = 0
+    writers = [tf.io.TFRecordWriter(f) for f in output_files]
+    try:
+        for records in records_iter:
+            for record in records:
+                writers[no_of_rows // rows_per_shard].write(record)
+                no_of_rows = no_of_rows + 1
+    finally:
+        for writer in writers:
+            writer.close()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    print('Total number of rows ', no_of_rows)
+    for f in output_files:
+        print('Generated output file name :'+f)
+
+
+if __name__ == "__main__":
+    main()
@@ -71,6 +71,8 @@ class OuterProductMean(nn.Module):
     self.output_w = nn.Parameter(torch.Tensor(
                               c['num_outer_channel'], c['num_outer_channel'],self.num_output_channel))
     self.output_b = nn.Parameter(torch.Tensor(self.num_output_channel,))
+    # residues of the right projection in a chunk, 0 for no chunking
+    self.chunk_size = 0
 
   def compute_chunk(self,left_act,right_act):
     left_act = torch.transpose(left_act, 2, 1)
@@ -83,7 +85,15 @@ class OuterProductMean(nn.Module):
     act = self.layer_norm_input(act)
     left_act = mask * self.left_projection(act)
     right_act = mask * self.right_projection(act)
-    act = self.compute_chunk(left_act,right_act)
+    n = right_act.size()[1]
+    if self.chunk_size > 0 and n > self.chunk_size:
+      act = torch.empty(
+        [left_act.size()[1], n, self.num_output_channel], dtype=left_act.dtype)
+      for i in range(0, n, self.chunk_size):
+        j = i + self.chunk_size
+        act[:, i:j] = self.compute_chunk(left_act,right_act[:, i:j])
+    else:
+      act = self.compute_chunk(left_act,right_act)
     epsilon = 1e-3
     norm = torch.einsum('abc,adc->bdc', mask, mask)
     act /= epsilon + norm
@@ -115,25 +125,45 @@ class TriangleMultiplication(nn.Module):
     self.center_layer_norm = nn.LayerNorm(normalized_shape=act_dim,elementwise_affine=True)
     self.output_projection = nn.Linear(act_dim,act_dim)
     self.gating_linear = nn.Linear(act_dim,act_dim)
+    assert self.c_equation in ['ikc,jkc->ijc', 'kjc,kic->ijc']
+    self.is_outgoing = self.c_equation == 'ikc,jkc->ijc'
+    # output rows in a chunk, 0 for no chunking
+    self.chunk_size = 0
 
-  def forward(self, act, mask):
-    mask = mask[..., None]
-    act = self.layer_norm_input(act)
-    input_act = act # For gate
-    left_proj_act = mask * self.left_projection(act)
-    right_proj_act = mask * self.right_projection(act)
-    left_proj_act *= torch.sigmoid(self.left_gate(act))
-    right_proj_act *= torch.sigmoid(self.right_gate(act))
+  def compute_chunk(self, left_proj_act, right_proj_act, input_act, start:int, end:int):
+    """Rows start:end of the output."""
     # "Outgoing" edges equation: 'ikc,jkc->ijc'
     # "Incoming" edges equation: 'kjc,kic->ijc'
     # Note on the Suppl. Alg. 11 & 12 notation:
     # For the "outgoing" edges, a = left_proj_act and b = right_proj_act
     # For the "incoming" edges, it's swapped:
     #   b = left_proj_act and a = right_proj_act
+    if self.is_outgoing:
+      left_proj_act = left_proj_act[start:end]
+    else:
+      right_proj_act = right_proj_act[:, start:end]
     act = torch.einsum(self.c_equation, left_proj_act, right_proj_act)
     act = self.center_layer_norm(act)
     act = self.output_projection(act)
-    act *= torch.sigmoid(self.gating_linear(input_act))
+    act *= torch.sigmoid(self.gating_linear(input_act[start:end]))
+    return act
+
+  def forward(self, act, mask):
+    mask = mask[..., None]
+    act = self.layer_norm_input(act)
+    input_act = act # For gate
+    left_proj_act = mask * self.left_projection(act)
+    right_proj_act = mask * self.right_projection(act)
+    left_proj_act *= torch.sigmoid(self.left_gate(act))
+    right_proj_act *= torch.sigmoid(self.right_gate(act))
+    n = input_act.size()[0]
+    if self.chunk_size > 0 and n > self.chunk_size:
+      act = torch.empty_like(input_act)
+      for i in range(0, n, self.chunk_size):
+        j = i + self.chunk_size
+        act[i:j] = self.compute_chunk(left_proj_act, right_proj_act, input_act, i, j)
+    else:
+      act = self.compute_chunk(left_proj_act, right_proj_act, input_act, 0, n)
     return act
 
 
@@ -159,20 +189,18 @@ class TriangleAttention(nn.Module):
     self.feat_2d_weights = nn.Parameter(torch.Tensor(pa_dim,self.c['num_head']))
     # self.c['gating'] is 1, use GatingAttention
     self.attention = GatingAttention(self.c,self.gc,pa_dim,pa_dim,pa_dim)
+    self.chunk_size = 320
 
   def _slice_attention(self,q_data,m_data,bias,nonbatched_bias=torch.Tensor()):
     """get same result with sliced input."""
     ### avoiding huge memory cost
-    ### threhold is ajustable
-    threhold = 1000
-    unit = 320 # unit is adjustable
-    if q_data.size()[0] > threhold:
-      res = torch.ones_like(q_data)
-      for i in range(q_data.size()[0] // unit):
-        q_sub_data = q_data[unit*i:unit*(i+1)]
-        m_sub_data = m_data[unit*i:unit*(i+1)]
-        bias_sub = bias[unit*i:unit*(i+1)]
-        res[unit*i:unit*(i+1)] = self.attention(q_sub_data,m_sub_data,bias_sub,nonbatched_bias)
+    ### chunk_size is set by chunking.apply_chunk_sizes, 0 for no slicing
+    n = q_data.size()[0]
+    if self.chunk_size > 0 and n > self.chunk_size:
+      res = torch.empty_like(q_data)
+      for i in range(0, n, self.chunk_size):
+        j = i + self.chunk_size
+        res[i:j] = self.attention(q_data[i:j],m_data[i:j],bias[i:j],nonbatched_bias)
       return res
     else:
       return self.attention(q_data,m_data,bias,nonbatched_bias)
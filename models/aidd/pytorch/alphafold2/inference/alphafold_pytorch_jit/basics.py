@@ -306,20 +306,18 @@ class MSAColumnAttention(nn.Module):
     # m_dim = msa_act.shape
     c = self.config
     assert c['orientation'] == 'per_column'
+    self.chunk_size = 0
   
   def _slice_attention(self,q_data,m_data,bias,nonbatched_bias=torch.Tensor()):
     """get same result with sliced input."""
     ### avoiding huge memory cost
-    ### threhold is ajustable
-    threhold = 1000
-    unit = 1280 # unit is ajustable
-    if q_data.size()[0] > threhold:
-      res = torch.ones_like(q_data)
-      for i in range(q_data.size()[0] // unit):
-        q_sub_data = q_data[unit*i:unit*(i+1)]
-        m_sub_data = m_data[unit*i:unit*(i+1)]
-        bias_sub = bias[unit*i:unit*(i+1)]
-        res[unit*i:unit*(i+1)] = self.attention(q_sub_data,m_sub_data,bias_sub,nonbatched_bias)
+    ### chunk_size is set by chunking.apply_chunk_sizes, 0 for no slicing
+    n = q_data.size()[0]
+    if self.chunk_size > 0 and n > self.chunk_size:
+      res = torch.empty_like(q_data)
+      for i in range(0, n, self.chunk_size):
+        j = i + self.chunk_size
+        res[i:j] = self.attention(q_data[i:j],m_data[i:j],bias[i:j],nonbatched_bias)
       return res
     else:
       return self.attention(q_data,m_data,bias,nonbatched_bias)
@@ -345,7 +343,7 @@ class MSAColumnAttention(nn.Module):
     # balance between contribution of msa_act and that of msa_mask
     assert bias.dim() == 4
     msa_act = self.query_norm(msa_act)
-    msa_act = self.attention(msa_act, msa_act, bias)
+    msa_act = self._slice_attention(msa_act, msa_act, bias)
     msa_act = torch.swapaxes(msa_act, -2, -3)
     return msa_act
 
@@ -369,20 +367,18 @@ class MSARowAttentionWithPairBias(nn.Module):
     self.attention = GatingAttention(self.config, self.global_config,a_dim, m_dim, a_dim)
     self.feat_2d_weights = nn.Parameter(torch.Tensor(p_dim,self.config['num_head']))
     assert self.config['orientation'] == 'per_row'
+    self.chunk_size = 320
 
 
   def _slice_attention(self,q_data,m_data,bias,nonbatched_bias):
     ### avoiding huge memory cost
-    ### threhold is ajustable
-    threhold = 1000
-    unit = 320 # unit is ajustable, 160
-    if q_data.size()[0] > threhold:
-      res = torch.ones_like(q_data)
-      for i in range(q_data.size()[0] // unit):
-        q_sub_data = q_data[unit*i:unit*(i+1)]
-        m_sub_data = m_data[unit*i:unit*(i+1)]
-        bias_sub = bias[unit*i:unit*(i+1)]
-        res[unit*i:unit*(i+1)] = self.attention(q_sub_data,m_sub_data,bias_sub,nonbatched_bias)
+    ### chunk_size is set by chunking.apply_chunk_sizes, 0 for no slicing
+    n = q_data.size()[0]
+    if self.chunk_size > 0 and n > self.chunk_size:
+      res = torch.empty_like(q_data)
+      for i in range(0, n, self.chunk_size):
+        j = i + self.chunk_size
+        res[i:j] = self.attention(q_data[i:j],m_data[i:j],bias[i:j],nonbatched_bias)
       return res
     else:
       return self.attention(q_data,m_data,bias,nonbatched_bias)
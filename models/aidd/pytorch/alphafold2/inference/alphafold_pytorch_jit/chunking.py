@@ -0,0 +1,138 @@
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Memory aware chunk sizes of the Evoformer modules.
+
+The attention, triangle multiplication and outer product mean modules compute
+their outputs in chunks of rows, and the intermediates of a chunk take memory
+in proportion to its size, e.g. the attention logits of c MSA rows take
+c * num_head * N_res^2 floats. plan_chunk_sizes() estimates the activations
+that are alive across the modules from the sequence length and the MSA
+depths, and the rest of the memory budget is the workspace of each module in
+turn, as the modules run one after another. Short proteins get a single chunk,
+and long proteins the largest chunks that fit the workspace.
+"""
+import os
+from typing import Dict
+from torch import nn
+from alphafold_pytorch_jit.basics import MSAColumnAttention, MSARowAttentionWithPairBias
+from alphafold_pytorch_jit.backbones import OuterProductMean, TriangleAttention, TriangleMultiplication
+
+FLOAT_BYTES = 4
+# copies of the pair and MSA activations that are alive in an Evoformer block,
+# i.e. the residual inputs, the layer norms, the projections and the gates
+PAIR_COPIES = 8
+MSA_COPIES = 6
+# model parameters, recycled representations, structure module and heads
+BASE_BYTES = 8 << 30
+
+
+def available_memory() -> int:
+  """Returns MemAvailable of /proc/meminfo, or the physical memory."""
+  try:
+    with open('/proc/meminfo') as h:
+      for line in h:
+        if line.startswith('MemAvailable:'):
+          return int(line.split()[1]) * 1024
+  except OSError:
+    pass
+  return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+def attention_row_bytes(num_head:int, num_queries:int, channel:int) -> int:
+  """Intermediates of the gating attention of a row of queries.
+
+  The logits and the softmax weights, and the queries, keys, values, gates and
+  outputs.
+  """
+  return FLOAT_BYTES * (2 * num_head * num_queries**2 + 5 * num_queries * channel)
+
+
+def _chunk_size(row_bytes:int, workspace:int, num_rows:int) -> int:
+  """Returns the number of rows that fit the workspace, 0 if all of them."""
+  n = workspace // max(row_bytes, 1)
+  if n >= num_rows:
+    return 0
+  return max(int(n), 1)
+
+
+def plan_chunk_sizes(
+    num_res:int,
+    num_seq:int,
+    num_extra_seq:int,
+    memory_budget:int,
+    config) -> Dict[str, int]:
+  """Chunk sizes of the Evoformer modules, 0 for no chunking.
+
+  Arguments:
+    num_res: number of residues.
+    num_seq: number of MSA rows of the Evoformer stack, with the templates.
+    num_extra_seq: number of rows of the extra MSA stack.
+    memory_budget: bytes of memory of the model inference.
+    config: embeddings_and_evoformer config.
+
+  Returns:
+    Dict of the number of rows of a chunk of each module.
+  """
+  c = config
+  evo = c['evoformer']
+  c_m, c_e, c_z = c['msa_channel'], c['extra_msa_channel'], c['pair_channel']
+  row_heads = evo['msa_row_attention_with_pair_bias']['num_head']
+  column_heads = evo['msa_column_attention']['num_head']
+  triangle_heads = evo['triangle_attention_starting_node']['num_head']
+  c_outer = evo['outer_product_mean']['num_outer_channel']
+  persistent = BASE_BYTES + FLOAT_BYTES * (
+    PAIR_COPIES * num_res**2 * c_z +
+    MSA_COPIES * num_res * (num_seq * c_m + num_extra_seq * c_e))
+  workspace = max(memory_budget - persistent, 0)
+  if workspace == 0:
+    print('### [WARNING] activations of %d residues exceed the memory budget '
+          'of %.1f GB, chunking by single rows' % (num_res, memory_budget / (1 << 30)))
+  return {
+    'extra_msa_row_attention': _chunk_size(
+      attention_row_bytes(row_heads, num_res, c_e), workspace, num_extra_seq),
+    'msa_row_attention': _chunk_size(
+      attention_row_bytes(row_heads, num_res, c_m), workspace, num_seq),
+    'msa_column_attention': _chunk_size(
+      attention_row_bytes(column_heads, num_seq, c_m), workspace, num_res),
+    'triangle_attention': _chunk_size(
+      attention_row_bytes(triangle_heads, num_res, c_z), workspace, num_res),
+    # einsum output, its layer norm, the output projection and the gate
+    'triangle_multiplication': _chunk_size(
+      FLOAT_BYTES * 5 * num_res * c_z, workspace, num_res),
+    # outer products of a residue before and after the output projection
+    'outer_product_mean': _chunk_size(
+      FLOAT_BYTES * num_res * (c_outer**2 + c_z), workspace, num_res),
+  }
+
+
+def apply_chunk_sizes(evoformer:nn.Module, chunk_sizes:Dict[str, int]):
+  """Sets the chunk sizes of the modules of an EmbeddingsAndEvoformer.
+
+  The chunk sizes are constants of the scripted module, so they're set before
+  it's compiled. The template pair stack uses the triangle chunk sizes.
+  """
+  for name, m in evoformer.named_modules():
+    if isinstance(m, MSARowAttentionWithPairBias):
+      m.chunk_size = chunk_sizes[
+        'extra_msa_row_attention' if name.startswith('extra_msa_stack')
+        else 'msa_row_attention']
+    elif isinstance(m, MSAColumnAttention):
+      m.chunk_size = chunk_sizes['msa_column_attention']
+    elif isinstance(m, TriangleAttention):
+      m.chunk_size = chunk_sizes['triangle_attention']
+    elif isinstance(m, TriangleMultiplication):
+      m.chunk_size = chunk_sizes['triangle_multiplication']
+    elif isinstance(m, OuterProductMean):
+      m.chunk_size = chunk_sizes['outer_product_mean']
@@ -334,6 +334,8 @@ CONFIG = ml_collections.ConfigDict({
         },
         'global_config': {
             'deterministic': 0,
+            # memory of the chunk planner, 0 for MemAvailable at inference
+            'memory_budget_gb': 0.,
             'subbatch_size': 4,
             'use_remat': 0,
             'zero_init': 1
@@ -30,6 +30,7 @@ from alphafold_pytorch_jit.heads import (
 from alphafold_pytorch_jit import residue_constants
 from alphafold_pytorch_jit.weight_io import filtered_pth_params
 from alphafold_pytorch_jit.utils import detached, list2tensor
+from alphafold_pytorch_jit import chunking
 import jax
 import time
 #from tqdm import tqdm
@@ -265,6 +266,7 @@ class AlphaFold(nn.Module):
     self.gc = config['global_config']
     self.timer = timer
     self.recycle_iter_idx = -1
+    self.chunk_sizes = None
     ### modules
     self.impl = AlphaFoldIteration(
       self.config, 
@@ -287,6 +289,25 @@ class AlphaFold(nn.Module):
     new_prev['prev_pair'] = ret['representations']['pair']
     return new_prev
   
+  ### plan chunk sizes of evoformer modules by input shapes & memory budget
+  def _plan_chunks(self, batch):
+    if self.chunk_sizes is not None:
+      return # chunk sizes are constants of the compiled evoformer
+    emb_config = self.config['embeddings_and_evoformer']
+    num_res = batch['aatype'].shape[1]
+    num_seq = batch['msa_feat'].shape[1]
+    if emb_config['template']['enabled'] and emb_config['template']['embed_torsion_angles']:
+      num_seq += batch['template_aatype'].shape[1]
+    num_extra_seq = batch['extra_msa'].shape[1]
+    memory_budget = int(self.gc['memory_budget_gb'] * (1 << 30))
+    if memory_budget <= 0:
+      memory_budget = chunking.available_memory()
+    self.chunk_sizes = chunking.plan_chunk_sizes(
+      num_res, num_seq, num_extra_seq, memory_budget, emb_config)
+    print('### [INFO] chunk sizes for %d residues, %d+%d sequences, %.1f GB:' % (
+      num_res, num_seq, num_extra_seq, memory_budget / (1 << 30)), self.chunk_sizes)
+    chunking.apply_chunk_sizes(self.impl.evoformer, self.chunk_sizes)
+
   ### forward func for current recycle
   def _do_call(self,
     prev,
@@ -331,6 +352,7 @@ class AlphaFold(nn.Module):
     ensemble_representations=False,
     return_representations=False
   ):
+    self._plan_chunks(batch)
     print('### [INFO] jit compilation') # [issue] PyTorch 1.11 has a bug at 2nd alphafold iter
     self.impl.compile() # use jit.script to compile alphafolditeration
     num_residues = batch['aatype'].shape[1]
@@ -356,6 +378,8 @@ class AlphaFold(nn.Module):
       for i in range(0, num_iter+1):
         print('### [INFO] start AlphaFold Iteration-%d' % (i+1))
         t0 = time.time()
+        if self.timer is not None:
+          self.timer.add_timmer('alphafold_iteration_%d' % (i+1))
         res = self._do_call(
           prev,
           i,
@@ -368,6 +392,9 @@ class AlphaFold(nn.Module):
           print('  # [INFO] update to prev done.')
         dt = time.time() - t0
         print('  # [INFO] duration = %.2fs' % dt)
+        if self.timer is not None:
+          self.timer.end_timmer('alphafold_iteration_%d' % (i+1))
+          self.timer.save()
     else: # 1 iteration if num_iter is not defined
       res = self._do_call(
         {},
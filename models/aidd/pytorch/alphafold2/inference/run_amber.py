@@ -118,11 +118,11 @@ def amber_relax(
   assert os.path.isdir(tmp_output_dir)
   ftmp_processed_featdict = os.path.join(
     tmp_output_dir, 
-    'processed_features.npz')
+    'processed_features')
   processed_feature_dict = load_feature_dict_if_exist(
     ftmp_processed_featdict)
   processed_feature_dict = jax.tree_map(
-    lambda x:np.array(x), processed_feature_dict)
+    lambda x:np.asarray(x), processed_feature_dict)
   if processed_feature_dict is None:
     raise FileNotFoundError(
       'Invalid processed features: ',
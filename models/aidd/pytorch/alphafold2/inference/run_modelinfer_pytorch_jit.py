@@ -87,6 +87,9 @@ flags.DEFINE_integer('random_seed', None, 'The random seed for the data '
                      'that even if this is set, Alphafold may still not be '
                      'deterministic, because processes like GPU inference are '
                      'nondeterministic.')
+flags.DEFINE_float('memory_budget_gb', 0., 'Memory of the model inference, '
+                   'by which the chunk sizes of the Evoformer modules are '
+                   'planned. By default, the available memory.')
 FLAGS = flags.FLAGS
 MAX_TEMPLATE_HITS = 20
 RELAX_MAX_ITERATIONS = 0
@@ -120,7 +123,7 @@ def alphafold_infer(
   assert os.path.isdir(tmp_output_dir)
   ftmp_processed_featdict = os.path.join(
     tmp_output_dir, 
-    'processed_features.npz')
+    'processed_features')
   processed_feature_dict = load_feature_dict_if_exist(
     ftmp_processed_featdict)
   if processed_feature_dict is None:
@@ -133,7 +136,7 @@ def alphafold_infer(
   
   ### prepare model runners
   processed_feature_dict = jax.tree_map(
-    lambda x:torch.tensor(x), processed_feature_dict)
+    lambda x:torch.from_numpy(x), processed_feature_dict)
   if FLAGS.preset in ('reduced_dbs', 'full_dbs'):
     num_ensemble = 1
   elif FLAGS.preset == 'casp14':
@@ -142,6 +145,7 @@ def alphafold_infer(
   for model_name in FLAGS.model_names:
     model_config = config.model_config(model_name)
     model_config['data']['eval']['num_ensemble'] = num_ensemble
+    model_config['model']['global_config']['memory_budget_gb'] = FLAGS.memory_budget_gb
     root_params = FLAGS.root_params
     model_runner = model.RunModel(
       model_config, 
@@ -13,12 +13,16 @@
 # limitations under the License.
 
 """Full AlphaFold protein structure prediction script."""
+import concurrent.futures
 import os
 import pathlib
 import time
 from typing import Dict
+import numpy as np
 from runners.timmer import Timmers
-from runners.saver import save_feature_dict, load_feature_dict_if_exist
+from runners.saver import FeatureDict, save_feature_dict, link_feature_dict
+from runners import feature_cache
+from runners import msa_scheduler
 
 from absl import app, flags, logging
 import sys
@@ -83,6 +87,32 @@ flags.DEFINE_integer('random_seed', None, 'The random seed for the data '
                      'that even if this is set, Alphafold may still not be '
                      'deterministic, because processes like GPU inference are '
                      'nondeterministic.')
+flags.DEFINE_integer('n_cpu', None, 'CPU cores shared by the MSA and '
+                     'template searches, which sizes the default core budgets '
+                     'of the tools and msa_workers. Each search keeps the '
+                     'threads that AlphaFold gives its tool, e.g. 8 of '
+                     'jackhmmer and 4 of HHblits, within the budget of the '
+                     'tool. By default, all the cores.', lower_bound=1)
+flags.DEFINE_integer('msa_workers', None, 'Number of sequences whose MSA '
+                     'and template searches run concurrently. By default, '
+                     'n_cpu / 8, the cores of a jackhmmer search.',
+                     lower_bound=1)
+flags.DEFINE_integer('jackhmmer_cpu_budget', None, 'Cores shared by the '
+                     'concurrent jackhmmer searches. By default, n_cpu.',
+                     lower_bound=1)
+flags.DEFINE_integer('hhblits_cpu_budget', None, 'Cores shared by the '
+                     'concurrent HHblits searches. By default, n_cpu.',
+                     lower_bound=1)
+flags.DEFINE_integer('hhsearch_cpu_budget', None, 'Cores shared by the '
+                     'concurrent HHsearch searches. By default, n_cpu.',
+                     lower_bound=1)
+flags.DEFINE_string('feature_cache_dir', None, 'Directory of the features '
+                    'cached by sequence and databases, which can be shared '
+                    'by runs with other output directories. By default, '
+                    '<output_dir>/feature_cache.')
+flags.DEFINE_boolean('compressed_features', False, 'Save the features as '
+                     'compressed archives, which are smaller but are read '
+                     'into memory, rather than as memory mapped .npy files.')
 FLAGS = flags.FLAGS
 
 MAX_TEMPLATE_HITS = 20
@@ -99,62 +129,95 @@ def _check_flag(flag_name: str, preset: str, should_be_set: bool):
     raise ValueError(f'{flag_name} must {verb} set for preset "{preset}"')
 
 
+def compute_features(
+    fasta_path: str,
+    msa_output_dir: str,
+    intermediates_dir: str,
+    sequence: str,
+    data_pipeline: pipeline.DataPipeline,
+    cache: feature_cache.FeatureCache,
+    key: str) -> FeatureDict:
+  """Returns the cached features of a sequence, or runs the data pipeline."""
+  ftmp_featdict = cache.features_path(key)
+  feature_dict = cache.load(ftmp_featdict)
+  if feature_dict is None:
+    # the features that a run before the feature cache saved
+    feature_dict = feature_cache.load_previous_features(
+      intermediates_dir, sequence)
+    if feature_dict is not None:
+      print('==== 1. loaded intermediates of data pipeline preprocessing.')
+      cache.save(ftmp_featdict, feature_dict)
+      return feature_dict
+    print('#### 1. start data pipeline preprocessing from de novo.')
+    os.makedirs(msa_output_dir, exist_ok=True)
+    feature_dict = data_pipeline.process(
+      input_fasta_path=fasta_path,
+      msa_output_dir=msa_output_dir)
+    cache.save(ftmp_featdict, feature_dict)
+  else:
+    print('==== 1. loaded archive of data pipeline preprocessing.')
+  return feature_dict
+
+
 def predict_structure(
     timmer: Timmers,
-    fasta_path: str,
     fasta_name: str,
+    description: str,
     output_dir_base: str,
-    data_pipeline: pipeline.DataPipeline,
+    features_future: concurrent.futures.Future,
+    key: str,
+    cache: feature_cache.FeatureCache,
     model_runners: Dict[str, model.RunModel],
+    num_ensemble: int,
     random_seed: int):
   """Predicts structure using AlphaFold for the given sequence."""
   timings = {}
   output_dir = os.path.join(output_dir_base, fasta_name)
   if not os.path.exists(output_dir):
     os.makedirs(output_dir)
-  msa_output_dir = os.path.join(output_dir, 'msas')
   tmp_output_dir = os.path.join(output_dir, 'intermediates')
-  if not os.path.exists(msa_output_dir):
-    os.makedirs(msa_output_dir)
   if not os.path.exists(tmp_output_dir):
     os.makedirs(tmp_output_dir)
 
   is_save_intermediates = True
-  # Get features.
+  # Get features, of the first FASTA file with the same sequence.
   t_0 = time.time()
   timmer.add_timmer('predict_%s_datapipeline' % fasta_name)
-  ftmp_featdict = os.path.join(tmp_output_dir, 'features.npz')
-  feature_dict = load_feature_dict_if_exist(ftmp_featdict)
-  if feature_dict is None:
-    print('#### 1. start data pipeline preprocessing from de novo.')
-    feature_dict = data_pipeline.process(
-      input_fasta_path=fasta_path,
-      msa_output_dir=msa_output_dir)
-    if is_save_intermediates:
-      save_feature_dict(ftmp_featdict, feature_dict)
-  else:
-    print('==== 1. loaded archive of data pipeline preprocessing.')
+  feature_dict = dict(features_future.result())
+  # the description of the FASTA file is the only feature that doesn't
+  # depend on the sequence
+  feature_dict['domain_name'] = np.array(
+    [description.encode('utf-8')], dtype=np.object_)
+  if is_save_intermediates:
+    save_feature_dict(os.path.join(tmp_output_dir, 'features'), feature_dict,
+                      compressed=cache.compressed)
   timings['features'] = time.time() - t_0
   timmer.end_timmer('predict_%s_datapipeline' % fasta_name)
   timmer.save()
 
-  # Run the models.
-  for model_name, model_runner in model_runners.items():
-    logging.info('Running model %s', model_name)
-    t_0 = time.time()
-    timmer.add_timmer('processfeatures_%s_by_%s' % (fasta_name, model_name))
-    ftmp_processed_featdict = os.path.join(tmp_output_dir, 'processed_features.npz')
-    processed_feature_dict = load_feature_dict_if_exist(ftmp_processed_featdict)
-    if processed_feature_dict is None:
-      print('#### 2. start feature pre-model processing from de novo.')
-      processed_feature_dict = model_runner.process_features(
-        feature_dict, 
-        random_seed=random_seed
-      )
-      if is_save_intermediates:
-        save_feature_dict(ftmp_processed_featdict, processed_feature_dict)
-    else:
-      print('==== 2. loaded archive of feature pre-model processing.')
+  # Process the features. The model inference reads a single
+  # processed_features archive, so the features are processed by the first model.
+  model_name, model_runner = next(iter(model_runners.items()))
+  logging.info('Running model %s', model_name)
+  t_0 = time.time()
+  timmer.add_timmer('processfeatures_%s_by_%s' % (fasta_name, model_name))
+  fcache_processed_featdict = cache.processed_features_path(
+    key, model_name, num_ensemble, random_seed)
+  processed_feature_dict = cache.load(fcache_processed_featdict)
+  if processed_feature_dict is None:
+    print('#### 2. start feature pre-model processing from de novo.')
+    processed_feature_dict = model_runner.process_features(
+      feature_dict, 
+      random_seed=random_seed
+    )
+    cache.save(fcache_processed_featdict, processed_feature_dict)
+  else:
+    print('==== 2. loaded archive of feature pre-model processing.')
+  if is_save_intermediates:
+    link_feature_dict(
+      fcache_processed_featdict,
+      os.path.join(tmp_output_dir, 'processed_features'))
+  timmer.end_timmer('processfeatures_%s_by_%s' % (fasta_name, model_name))
 
 
 def main(argv):
@@ -228,20 +291,74 @@ def main(argv):
   random_seed = 5582232524994481130
   logging.info('Using random seed %d for the data pipeline', random_seed)
 
-  # Predict structure for each of the sequences.
+  # Key the features of each FASTA file by its sequence and the databases.
+  fingerprint = feature_cache.database_fingerprint(
+      {
+          'jackhmmer': FLAGS.jackhmmer_binary_path,
+          'hhblits': FLAGS.hhblits_binary_path,
+          'hhsearch': FLAGS.hhsearch_binary_path,
+          'kalign': FLAGS.kalign_binary_path,
+          'uniref90': FLAGS.uniref90_database_path,
+          'mgnify': FLAGS.mgnify_database_path,
+          'bfd': FLAGS.bfd_database_path,
+          'small_bfd': FLAGS.small_bfd_database_path,
+          'uniclust30': FLAGS.uniclust30_database_path,
+          'pdb70': FLAGS.pdb70_database_path,
+          'template_mmcif_dir': FLAGS.template_mmcif_dir,
+          'obsolete_pdbs': FLAGS.obsolete_pdbs_path,
+      },
+      use_small_bfd=use_small_bfd,
+      max_template_date=FLAGS.max_template_date,
+      max_template_hits=MAX_TEMPLATE_HITS)
+  cache = feature_cache.FeatureCache(
+      FLAGS.feature_cache_dir or os.path.join(FLAGS.output_dir, 'feature_cache'),
+      compressed=FLAGS.compressed_features)
+  targets = []
   for fasta_path, fasta_name in zip(FLAGS.fasta_paths, fasta_names):
-    h_timmer.add_timmer('predict_%s' % fasta_name)
-    predict_structure(
-        timmer=h_timmer,
-        fasta_path=fasta_path,
-        fasta_name=fasta_name,
-        output_dir_base=FLAGS.output_dir,
-        data_pipeline=data_pipeline,
-        model_runners=model_runners,
-        random_seed=random_seed)
-    h_timmer.end_timmer('predict_%s' % fasta_name)
-    h_timmer.save()
+    sequence, description = feature_cache.read_fasta(fasta_path)
+    key = feature_cache.feature_key(sequence, fingerprint)
+    targets.append((fasta_path, fasta_name, sequence, description, key))
+
+  # Run the searches of the distinct sequences concurrently, each tool within
+  # its CPU core budget.
+  n_cpu = FLAGS.n_cpu or os.cpu_count()
+  msa_scheduler.limit_tool_cpus(data_pipeline, {
+      'jackhmmer': msa_scheduler.CpuBudget(FLAGS.jackhmmer_cpu_budget or n_cpu),
+      'hhblits': msa_scheduler.CpuBudget(FLAGS.hhblits_cpu_budget or n_cpu),
+      'hhsearch': msa_scheduler.CpuBudget(FLAGS.hhsearch_cpu_budget or n_cpu),
+  })
+  msa_workers = FLAGS.msa_workers or max(1, n_cpu // 8)
+  features_futures = {}
+  with concurrent.futures.ThreadPoolExecutor(msa_workers) as executor:
+    for fasta_path, fasta_name, sequence, _, key in targets:
+      if key not in features_futures:
+        features_futures[key] = executor.submit(
+            compute_features,
+            fasta_path=fasta_path,
+            msa_output_dir=os.path.join(FLAGS.output_dir, fasta_name, 'msas'),
+            intermediates_dir=os.path.join(
+                FLAGS.output_dir, fasta_name, 'intermediates'),
+            sequence=sequence,
+            data_pipeline=data_pipeline,
+            cache=cache,
+            key=key)
 
+    # Predict structure for each of the sequences.
+    for fasta_path, fasta_name, _, description, key in targets:
+      h_timmer.add_timmer('predict_%s' % fasta_name)
+      predict_structure(
+          timmer=h_timmer,
+          fasta_name=fasta_name,
+          description=description,
+          output_dir_base=FLAGS.output_dir,
+          features_future=features_futures[key],
+          key=key,
+          cache=cache,
+          model_runners=model_runners,
+          num_ensemble=num_ensemble,
+          random_seed=random_seed)
+      h_timmer.end_timmer('predict_%s' % fasta_name)
+      h_timmer.save()
 
 if __name__ == '__main__':
   logging.set_verbosity(logging.FATAL)
@@ -0,0 +1,137 @@
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Content addressed cache of the features of the data pipeline.
+
+The features of a sequence only depend on the sequence and on the databases
+and tools of the MSA and template searches, so they are cached under a key
+that hashes them rather than under the name of the FASTA file. The same
+sequence in another FASTA file, output directory or run reuses the features.
+The databases are identified by the sizes and modification times of their
+files, as hashing their contents would take as long as the searches.
+"""
+import glob
+import hashlib
+import json
+import os
+import numpy as np
+from typing import Mapping, Optional, Tuple
+from runners.saver import FeatureDict, save_feature_dict, load_feature_dict_if_exist
+
+
+def read_fasta(f:str) -> Tuple[str, str]:
+  """Returns the sequence and the description of a single sequence FASTA."""
+  sequences, descriptions = [], []
+  with open(f) as h:
+    for line in h:
+      line = line.strip()
+      if line.startswith('>'):
+        descriptions.append(line[1:])
+        sequences.append('')
+      elif line and sequences:
+        sequences[-1] += line
+  if len(sequences) != 1:
+    raise ValueError(
+      f'More than one input sequence found in {f}.' if sequences else
+      f'No input sequence found in {f}.')
+  return sequences[0], descriptions[0]
+
+
+def path_fingerprint(path:Optional[str]) -> list:
+  """Returns the names, sizes and modification times of the files of a path.
+
+  A database path can be a prefix of several files, e.g. of HH-suite
+  databases, so all the files that start with the path are included. A
+  directory, e.g. of the template mmCIF files, is identified by the number and
+  the total size of its files and the latest modification time of its files
+  and subdirectories, so that added, removed and updated files change it.
+  """
+  if not path:
+    return []
+  if os.path.isdir(path):
+    num_files, size, mtime = 0, 0, os.stat(path).st_mtime_ns
+    for root, dirs, files in os.walk(path):
+      for name in dirs:
+        mtime = max(mtime, os.stat(os.path.join(root, name)).st_mtime_ns)
+      for name in files:
+        st = os.stat(os.path.join(root, name))
+        num_files += 1
+        size += st.st_size
+        mtime = max(mtime, st.st_mtime_ns)
+    return [[os.path.basename(path), num_files, size, mtime]]
+  res = []
+  for f in sorted(glob.glob(glob.escape(path) + '*')):
+    st = os.stat(f)
+    res.append([os.path.basename(f), st.st_size, st.st_mtime_ns])
+  return res
+
+
+def database_fingerprint(paths:Mapping[str, Optional[str]], **params) -> str:
+  """Returns the hash of the database and binary paths and the params."""
+  desc = {
+    'paths': {k: path_fingerprint(v) for k, v in sorted(paths.items())},
+    'params': params}
+  return hashlib.sha1(json.dumps(desc, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_previous_features(intermediates_dir:str,
+                           sequence:str) -> Optional[FeatureDict]:
+  """Returns the features that a run saved in its output directory.
+
+  The runs before the feature cache only saved the features to
+  <output_dir>/<fasta_name>/intermediates/features.npz, and they are reused
+  when they are of the same sequence, rather than searching again.
+  """
+  feature_dict = load_feature_dict_if_exist(
+    os.path.join(intermediates_dir, 'features'))
+  if feature_dict is None or 'sequence' not in feature_dict:
+    return None
+  saved = np.asarray(feature_dict['sequence']).reshape(-1)[0]
+  if isinstance(saved, bytes):
+    saved = saved.decode('utf-8')
+  return feature_dict if saved == sequence else None
+
+
+def feature_key(sequence:str, fingerprint:str) -> str:
+  """Returns the cache key of the features of a sequence."""
+  return hashlib.sha1(
+    ('%s\n%s' % (fingerprint, sequence)).encode('utf-8')).hexdigest()
+
+
+class FeatureCache(object):
+  """Directory of the cached features and processed features archives.
+
+  The archives of a key are in <path>/<key[:2]>/<key>/. save_feature_dict()
+  writes an archive to a temporary directory and renames it, so concurrent
+  runs that share the cache never read a partially written archive.
+  """
+  def __init__(self, path:str, compressed:bool=False) -> None:
+    super().__init__()
+    self.path = path
+    self.compressed = compressed
+
+  def features_path(self, key:str) -> str:
+    return os.path.join(self.path, key[:2], key, 'features')
+
+  def processed_features_path(self, key:str, model_name:str,
+                              num_ensemble:int, random_seed:int) -> str:
+    return os.path.join(
+      self.path, key[:2], key, 'processed_features_%s_ens%d_seed%d' % (
+        model_name, num_ensemble, random_seed))
+
+  def load(self, f:str) -> Optional[FeatureDict]:
+    return load_feature_dict_if_exist(f)
+
+  def save(self, f:str, data:FeatureDict):
+    save_feature_dict(f, data, compressed=self.compressed)
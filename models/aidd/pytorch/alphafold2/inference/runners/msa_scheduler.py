@@ -0,0 +1,89 @@
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""CPU core budgets of the MSA and template search tools.
+
+The data pipelines of several sequences run concurrently in threads, and each
+search reserves the cores of its call from the budget of its tool, e.g. a
+jackhmmer search with 8 cores waits until 8 of the jackhmmer cores are free.
+"""
+import contextlib
+import threading
+from typing import Mapping
+
+# default number of cores of HHsearch, which AlphaFold doesn't set
+HHSEARCH_N_CPU = 2
+
+# tool of each search runner of alphafold.data.pipeline.DataPipeline
+RUNNER_TOOLS = {
+  'jackhmmer_uniref90_runner': 'jackhmmer',
+  'jackhmmer_mgnify_runner': 'jackhmmer',
+  'jackhmmer_small_bfd_runner': 'jackhmmer',
+  'hhblits_bfd_uniclust_runner': 'hhblits',
+  'hhsearch_pdb70_runner': 'hhsearch',
+}
+
+
+class CpuBudget(object):
+  def __init__(self, n_cpu:int) -> None:
+    super().__init__()
+    self.n_cpu = n_cpu
+    self.free = n_cpu
+    self.cond = threading.Condition()
+
+  @contextlib.contextmanager
+  def reserve(self, n:int):
+    n = min(n, self.n_cpu)
+    with self.cond:
+      while self.free < n:
+        self.cond.wait()
+      self.free -= n
+    try:
+      yield
+    finally:
+      with self.cond:
+        self.free += n
+        self.cond.notify_all()
+
+
+class BudgetedRunner(object):
+  """Search runner whose queries reserve n_cpu cores of a budget."""
+  def __init__(self, runner, budget:CpuBudget, n_cpu:int) -> None:
+    super().__init__()
+    self.runner = runner
+    self.budget = budget
+    self.n_cpu = n_cpu
+
+  def query(self, *args, **kwargs):
+    with self.budget.reserve(self.n_cpu):
+      return self.runner.query(*args, **kwargs)
+
+  def __getattr__(self, name):
+    return getattr(self.runner, name)
+
+
+def limit_tool_cpus(data_pipeline, budgets:Mapping[str, CpuBudget]):
+  """Makes the searches of a DataPipeline reserve the cores of their tools.
+
+  The cores of a call are limited to the budget of its tool.
+  """
+  for attr, tool in RUNNER_TOOLS.items():
+    runner = getattr(data_pipeline, attr, None)
+    if runner is None:
+      continue
+    budget = budgets[tool]
+    if hasattr(runner, 'n_cpu'):
+      runner.n_cpu = min(runner.n_cpu, budget.n_cpu)
+    n_cpu = getattr(runner, 'n_cpu', HHSEARCH_N_CPU)
+    setattr(data_pipeline, attr, BudgetedRunner(runner, budget, n_cpu))
@@ -12,27 +12,164 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from typing import Mapping
+"""Feature archives of the AlphaFold2 pipeline stages.
+
+An archive is a directory with one raw .npy file per feature and a
+manifest.json of their dtypes and shapes. The features are loaded as copy on
+write memory maps, so that torch.from_numpy makes tensors of them without a
+copy and only the pages that are used are read. A compressed archive has a
+single compressed features.npz instead, for cold storage, which is read into
+memory. The .npz files of the previous format are still read.
+"""
+from typing import Iterable, Mapping, Optional
+import json
 import numpy as np
 import os
+import shutil
+import tempfile
 
 FeatureDict = Mapping[str, np.ndarray]
 
-def save_feature_dict(f:str, data:FeatureDict):
-  np.savez(f, **data)
+MANIFEST = 'manifest.json'
+COMPRESSED_FEATURES = 'features.npz'
+
+
+def _replace_dir(src:str, dst:str):
+  """Renames the archive directory src to dst, and removes the previous dst.
+
+  Another writer of the same archive can move dst away or create it again
+  between the two renames. Its archive has the same features, so when a
+  complete archive is at dst, src is removed instead of failing.
+  """
+  old = None
+  try:
+    if os.path.lexists(dst):
+      old = tempfile.mkdtemp(dir=os.path.dirname(dst),
+                             prefix=os.path.basename(dst) + '.old')
+      try:
+        os.rename(dst, os.path.join(old, 'archive'))
+      except FileNotFoundError:
+        pass
+    try:
+      os.rename(src, dst)
+    except OSError:
+      if not os.path.isfile(os.path.join(dst, MANIFEST)):
+        raise
+      shutil.rmtree(src)
+  finally:
+    if old is not None:
+      shutil.rmtree(old, ignore_errors=True)
+
+
+def save_feature_dict(f:str, data:FeatureDict, compressed:bool=False):
+  """Saves the features to the archive directory f.
+
+  The archive is written to a temporary directory and renamed, so that a
+  partially written archive is never read.
+  """
+  f = os.path.abspath(f)
+  d = os.path.dirname(f)
+  os.makedirs(d, exist_ok=True)
+  tmp = tempfile.mkdtemp(dir=d, prefix=os.path.basename(f) + '.tmp')
+  try:
+    manifest = {'version': 1, 'compressed': compressed, 'features': {}}
+    for k, v in data.items():
+      if os.sep in k or k in (MANIFEST, COMPRESSED_FEATURES):
+        raise ValueError('Invalid feature name: %s' % k)
+      v = np.asarray(v)
+      manifest['features'][k] = {'dtype': v.dtype.str, 'shape': list(v.shape)}
+      if not compressed:
+        np.save(os.path.join(tmp, k + '.npy'), v)
+    if compressed:
+      np.savez_compressed(os.path.join(tmp, COMPRESSED_FEATURES), **data)
+    with open(os.path.join(tmp, MANIFEST), 'w') as h:
+      json.dump(manifest, h, indent=2)
+    _replace_dir(tmp, f)
+  except BaseException:
+    shutil.rmtree(tmp, ignore_errors=True)
+    raise
+
+
+def link_feature_dict(src:str, dst:str):
+  """Makes dst an archive with the files of src, hard linked if possible."""
+  dst = os.path.abspath(dst)
+  d = os.path.dirname(dst)
+  os.makedirs(d, exist_ok=True)
+  tmp = tempfile.mkdtemp(dir=d, prefix=os.path.basename(dst) + '.tmp')
+  try:
+    for name in os.listdir(src):
+      try:
+        os.link(os.path.join(src, name), os.path.join(tmp, name))
+      except OSError:
+        shutil.copyfile(os.path.join(src, name), os.path.join(tmp, name))
+    _replace_dir(tmp, dst)
+  except BaseException:
+    shutil.rmtree(tmp, ignore_errors=True)
+    raise
 
-def load_feature_dict(f:str) -> FeatureDict:
-  df = np.load(f, allow_pickle=True)
-  res = {}
-  for k in df.files:
-    res[k] = df[k]
-  return res
 
-def load_feature_dict_if_exist(f:str):
-  if os.path.exists(f):
-    return load_feature_dict(f)
+class FeatureArchive(Mapping):
+  """Features of an archive, which are loaded on the first access."""
+  def __init__(self, f:str, mmap_mode:Optional[str]='c') -> None:
+    super().__init__()
+    self.f = f
+    self.mmap_mode = mmap_mode
+    with open(os.path.join(f, MANIFEST)) as h:
+      self.manifest = json.load(h)
+    self.specs = self.manifest['features']
+    self.compressed = self.manifest['compressed']
+    self._npz = None
+    self._features = {}
+
+  def __getitem__(self, k:str) -> np.ndarray:
+    if k not in self.specs:
+      raise KeyError(k)
+    if k not in self._features:
+      if self.compressed:
+        if self._npz is None:
+          self._npz = np.load(os.path.join(self.f, COMPRESSED_FEATURES),
+                              allow_pickle=True)
+        v = self._npz[k]
+      elif np.dtype(self.specs[k]['dtype']).hasobject:
+        # e.g. the sequence and the domain name, which can't be memory mapped
+        v = np.load(os.path.join(self.f, k + '.npy'), allow_pickle=True)
+      else:
+        v = np.load(os.path.join(self.f, k + '.npy'), mmap_mode=self.mmap_mode)
+      self._features[k] = v
+    return self._features[k]
+
+  def __iter__(self):
+    return iter(self.specs)
+
+  def __len__(self):
+    return len(self.specs)
+
+
+def load_feature_dict(f:str, keys:Optional[Iterable[str]]=None,
+                      mmap_mode:Optional[str]='c') -> FeatureDict:
+  """Returns a dict of the features of an archive or of a .npz file.
+
+  Args:
+    f: path of the archive or of the .npz file.
+    keys: names of the features to load, all of them by default.
+    mmap_mode: mode of the memory maps of the archive, e.g. None to read the
+      features into memory. The default copy on write maps are writable, and
+      the writes aren't saved.
+  """
+  if os.path.isdir(f):
+    df = FeatureArchive(f, mmap_mode)
   else:
-    return None
+    df = np.load(f, allow_pickle=True)
+    df = {k: df[k] for k in df.files}
+  return {k: df[k] for k in (df if keys is None else keys)}
+
+
+def load_feature_dict_if_exist(f:str, **kwargs) -> Optional[FeatureDict]:
+  """Loads the archive f, or the f.npz file of the previous format."""
+  for path in (f, f + '.npz'):
+    if os.path.exists(path):
+      return load_feature_dict(path, **kwargs)
+  return None
 
 def get_mock_2darray(h, w):
   np.random.seed(1)
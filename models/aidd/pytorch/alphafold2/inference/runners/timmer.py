@@ -12,26 +12,38 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import resource
 import time
 
 
+def peak_rss() -> int:
+  """Returns the peak resident set size of the process in bytes."""
+  # ru_maxrss is in KB on Linux
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
 class Timmer(object):
   def __init__(self, name) -> None:
     super().__init__()
     self.name = name
     self.start = 0.
     self.stop = 0.
+    self.peak_rss = 0
     self.start = time.time()
   
   def end(self):
     self.stop = time.time()
+    # the peak RSS of the process so far, i.e. the peak of the timmer if it's
+    # higher than the peak RSS of the previous timmers
+    self.peak_rss = peak_rss()
 
   def result(self):
     return self.stop - self.start
 
   def __str__(self):
     #fmt = '%Y-%m-%d-%H.%M.%S'
-    return '|Timmer %s| %.3f sec' % (self.name, self.result())
+    return '|Timmer %s| %.3f sec, peak RSS %.3f GB' % (
+      self.name, self.result(), self.peak_rss / (1 << 30))
 
 
 class Timmers(object):
@@ -59,8 +71,9 @@ class Timmers(object):
   
   def save(self):
     with open(self.f, 'w') as h:
-      h.write('name\tduration(sec)\n')
-      [h.write('%s\t%.3f\n' % (t.name, t.result())) for t in self.timmers]
+      h.write('name\tduration(sec)\tpeak_rss(GB)\n')
+      [h.write('%s\t%.3f\t%.3f\n' % (t.name, t.result(), t.peak_rss / (1 << 30)))
+        for t in self.timmers]
 
 
 def ttest_timmer():
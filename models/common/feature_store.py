@@ -0,0 +1,245 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+"""Memory mapped store of the features of a dataset.
+
+The features are written once, one raw binary file per column, and are read
+back as read-only memory maps, so that later runs skip the featurization and
+only read the pages that they use. The store is shared by the TensorFlow and
+PyTorch BERT SQuAD scripts, and only depends on numpy.
+
+A column is either dense, with the same shape for every feature, or ragged,
+with a variable number of values per feature and a table of offsets: the
+values of feature i are values[offsets[i]:offsets[i + 1]].
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+
+
+def file_digest(path, block_size=1 << 20):
+    """Returns the SHA-1 hex digest of the contents of a file."""
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def store_key(files, **params):
+    """Returns the key of the features of the files with the given params."""
+    sha1 = hashlib.sha1()
+    for path in files:
+        sha1.update(file_digest(path).encode("utf-8"))
+    sha1.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return sha1.hexdigest()
+
+
+class RaggedColumn(object):
+    """Column with a variable number of values per feature."""
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+
+class FeatureStore(object):
+    """Directory of the columns of the features and index.json.
+
+    A store is written to a temporary directory next to it and renamed into
+    place, so that the instances of a multi-instance run that share the store
+    never see a partially written store, and the memory maps of a store stay
+    valid when another instance replaces it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+        self._columns = {}
+
+    @property
+    def index(self):
+        if self._index is None:
+            index_path = os.path.join(self.path, INDEX_FILE)
+            if os.path.isfile(index_path):
+                with open(index_path, "r") as f:
+                    self._index = json.load(f)
+        return self._index
+
+    def is_complete(self):
+        return self.index is not None
+
+    @property
+    def metadata(self):
+        return self.index["metadata"]
+
+    def __len__(self):
+        return self.index["num_features"] if self.index else 0
+
+    def writer(self, dense, ragged=None, metadata=None):
+        """Returns a writer that replaces the features of the store.
+
+        Args:
+            dense: dict of the dense column names to their (dtype, shape).
+            ragged: dict of the ragged column names to their dtype.
+            metadata: JSON serializable dict that is saved in the index.
+        """
+        return _FeatureStoreWriter(self, dense, ragged or {}, metadata or {})
+
+    def _load(self, name, dtype, shape):
+        if not np.prod(shape):
+            return np.zeros(shape, dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r",
+                         shape=tuple(shape))
+
+    def column(self, name):
+        """Returns the memory mapped array or RaggedColumn of a column."""
+        if name not in self._columns:
+            index = self.index
+            if not index:
+                raise ValueError("No features in %s" % self.path)
+            spec = index["columns"][name]
+            if spec["ragged"]:
+                offsets = self._load(name + ".offsets.bin", np.int64,
+                                     [index["num_features"] + 1])
+                values = self._load(name + ".bin", spec["dtype"], [int(offsets[-1])])
+                self._columns[name] = RaggedColumn(values, offsets)
+            else:
+                self._columns[name] = self._load(
+                    name + ".bin", spec["dtype"],
+                    [index["num_features"]] + spec["shape"])
+        return self._columns[name]
+
+
+class _FeatureStoreWriter(object):
+    """Appends the features of a FeatureStore to the column files.
+
+    The files are written to the temporary directory path, where the caller
+    can also save other files of the store, e.g. the examples of the features.
+    """
+
+    def __init__(self, store, dense, ragged, metadata):
+        self._store = store
+        self._dense = dict((name, (np.dtype(dtype), list(shape)))
+                           for name, (dtype, shape) in dense.items())
+        self._ragged = dict((name, np.dtype(dtype))
+                            for name, dtype in ragged.items())
+        self._metadata = metadata
+        self._num_features = 0
+        self._offsets = dict((name, [0]) for name in self._ragged)
+
+        parent, name = os.path.split(os.path.abspath(store.path))
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                if not os.path.isdir(parent):
+                    raise
+        self.path = tempfile.mkdtemp(dir=parent, prefix=name + ".tmp")
+        self._files = dict(
+            (name, open(os.path.join(self.path, name + ".bin"), "wb"))
+            for name in list(self._dense) + list(self._ragged))
+
+    def add(self, **columns):
+        """Adds a feature with the values of every column."""
+        if set(columns) != set(self._files):
+            raise ValueError("Expected the columns %s, got %s" % (
+                sorted(self._files), sorted(columns)))
+        for name, (dtype, shape) in self._dense.items():
+            values = np.asarray(columns[name], dtype)
+            if list(values.shape) != shape:
+                raise ValueError("Expected shape %s for column %s, got %s" % (
+                    shape, name, list(values.shape)))
+            self._files[name].write(values.tobytes())
+        for name, dtype in self._ragged.items():
+            values = np.asarray(columns[name], dtype).reshape(-1)
+            self._files[name].write(values.tobytes())
+            self._offsets[name].append(self._offsets[name][-1] + len(values))
+        self._num_features += 1
+
+    def close(self):
+        """Writes the offsets tables and the index, and replaces the store."""
+        for f in self._files.values():
+            f.close()
+        for name, offsets in self._offsets.items():
+            np.asarray(offsets, np.int64).tofile(
+                os.path.join(self.path, name + ".offsets.bin"))
+
+        columns = {}
+        for name, (dtype, shape) in self._dense.items():
+            columns[name] = {"dtype": dtype.name, "shape": shape, "ragged": False}
+        for name, dtype in self._ragged.items():
+            columns[name] = {"dtype": dtype.name, "shape": [], "ragged": True}
+        index = {"num_features": self._num_features, "columns": columns,
+                 "metadata": self._metadata}
+        with open(os.path.join(self.path, INDEX_FILE), "w") as f:
+            json.dump(index, f)
+        self._replace_store()
+        self._store._index = None
+        self._store._columns = {}
+
+    def abort(self):
+        """Removes the features that were written."""
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _replace_store(self):
+        """Renames the written store to the store path.
+
+        An existing store is moved aside first. Its files are unlinked, not
+        truncated, so the memory maps of other instances stay valid. When
+        another instance renames its store in between, that store is kept and
+        this one is discarded.
+        """
+        path = self._store.path
+        old = None
+        if os.path.isdir(path):
+            parent, name = os.path.split(os.path.abspath(path))
+            old = tempfile.mkdtemp(dir=parent, prefix=name + ".old")
+            try:
+                os.rename(path, os.path.join(old, name))
+            except OSError:
+                # moved aside by another instance
+                pass
+        try:
+            os.rename(self.path, path)
+        except OSError:
+            if not os.path.isfile(os.path.join(path, INDEX_FILE)):
+                raise
+            self.abort()
+        finally:
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,108 @@
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Background batch prefetching shared by the DLRM inference scripts.
+"""
+
+import threading
+import time
+from queue import Full, Queue
+
+
+class BatchPrefetcher:
+    """
+    Prefetches the batches of a loader on a background thread.
+
+    source is any iterable loader (e.g. the Criteo DataLoader or a torch DataLoader)
+    or, with indices, a dataset that is indexed by batch (e.g. CriteoBinDataset).
+    Up to depth batches are read and passed through transform (e.g. unpack_batch)
+    ahead of the consumer, so that decoding overlaps with the model. wait_time is
+    the time the consumer spent waiting for the wait_batches batches it fetched.
+    """
+
+    _END = object()
+
+    def __init__(self, source, depth=2, indices=None, transform=None):
+        self.source = source
+        self.depth = max(1, depth)
+        self.indices = indices
+        self.transform = transform
+        self.wait_time = 0.0
+        self.wait_batches = 0
+        self.num_batches = 0
+
+    def __len__(self):
+        return len(self.indices) if self.indices is not None else len(self.source)
+
+    def reset_wait_time(self):
+        """Returns the wait time since the last call and resets it."""
+        wait_time, self.wait_time = self.wait_time, 0.0
+        self.wait_batches = 0
+        return wait_time
+
+    def reset_wait_per_batch(self):
+        """Returns the mean wait per batch since the last reset and resets it."""
+        wait_batches = self.wait_batches
+        return self.reset_wait_time() / max(wait_batches, 1)
+
+    def _batches(self):
+        if self.indices is None:
+            return iter(self.source)
+        return (self.source[i] for i in self.indices)
+
+    def _put(self, queue, item, stop):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _produce(self, queue, stop):
+        try:
+            for batch in self._batches():
+                if self.transform is not None:
+                    batch = self.transform(batch)
+                if not self._put(queue, batch, stop):
+                    return
+            self._put(queue, self._END, stop)
+        except BaseException as e:
+            # e.g. also a SystemExit of the loader, which would leave the consumer waiting
+            self._put(queue, e, stop)
+
+    def __iter__(self):
+        queue = Queue(self.depth)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._produce, args=(queue, stop), daemon=True)
+        thread.start()
+        try:
+            while True:
+                start = time.time()
+                batch = queue.get()
+                self.wait_time += time.time() - start
+                if batch is self._END:
+                    return
+                self.wait_batches += 1
+                if isinstance(batch, BaseException):
+                    raise batch
+                self.num_batches += 1
+                yield batch
+        finally:
+            # also stops the thread when the consumer breaks out early
+            stop.set()
+            thread.join()
@@ -0,0 +1,215 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+"""Cache of decoded and resized images.
+
+The images are saved as uint8 shards in the .npy format, so that they can be
+memory mapped, which lets the page cache keep them in memory between runs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+INDEX_FILE = 'index.json'
+LABELS_FILE = 'labels.npy'
+SHARD_PATTERN = 'images-%05d.npy'
+
+
+class PreprocessedImageCache(object):
+  """Directory of preprocessed [height, width, 3] uint8 images and labels.
+
+  The directory has the images-NNNNN.npy shards, labels.npy and index.json.
+  A cache is written to a temporary directory next to it, which is renamed to
+  the cache path once complete, so that runs never read a partially written
+  cache, and concurrent runs don't write into the same directory.
+  """
+
+  def __init__(self, path, shard_size=1024):
+    self.path = path
+    self.shard_size = shard_size
+    self._index = None
+
+  @property
+  def index(self):
+    if self._index is None:
+      index_path = os.path.join(self.path, INDEX_FILE)
+      if os.path.isfile(index_path):
+        with open(index_path, 'r') as f:
+          self._index = json.load(f)
+    return self._index
+
+  @property
+  def num_images(self):
+    return self.index['num_images'] if self.index else 0
+
+  def is_complete(self, height, width, num_images=None):
+    """Returns True if the cache has the images with the given size.
+
+    Args:
+      height: image height.
+      width: image width.
+      num_images: minimum number of images, or None for a whole subset.
+    """
+    index = self.index
+    if not index or index['height'] != height or index['width'] != width:
+      return False
+    if num_images is None:
+      return not index['truncated']
+    return index['num_images'] >= num_images
+
+  def writer(self, height, width):
+    return _CacheWriter(self, height, width)
+
+  def batches(self, batch_size, num_images=None):
+    """Yields (images, labels) batches of the cached images.
+
+    The remainder that doesn't fill a batch is dropped.
+
+    Args:
+      batch_size: number of images in a batch.
+      num_images: number of images to read, or None to read every image.
+    """
+    index = self.index
+    if not index:
+      raise ValueError('No preprocessed images in %s' % self.path)
+    shards = [np.load(os.path.join(self.path, SHARD_PATTERN % i), mmap_mode='r')
+              for i in range(index['num_shards'])]
+    labels = np.load(os.path.join(self.path, LABELS_FILE))
+    num_images = min(num_images or index['num_images'], index['num_images'])
+
+    shard_id = 0
+    shard_start = 0
+    for start in range(0, num_images - batch_size + 1, batch_size):
+      parts = []
+      remaining = batch_size
+      while remaining:
+        shard = shards[shard_id]
+        end = min(shard_start + remaining, len(shard))
+        parts.append(shard[shard_start:end])
+        remaining -= end - shard_start
+        shard_start = end
+        if shard_start == len(shard):
+          shard_id += 1
+          shard_start = 0
+      # a batch within a shard is a view of the memory map
+      images = parts[0] if len(parts) == 1 else np.concatenate(parts)
+      yield images, labels[start:start + batch_size]
+
+
+class _CacheWriter(object):
+  """Writes the images of a PreprocessedImageCache one shard at a time."""
+
+  def __init__(self, cache, height, width):
+    self._cache = cache
+    self._height = height
+    self._width = width
+    self._shard = np.empty((cache.shard_size, height, width, 3), np.uint8)
+    self._shard_len = 0
+    self._num_shards = 0
+    self._labels = []
+
+    parent, name = os.path.split(os.path.abspath(cache.path))
+    if not os.path.isdir(parent):
+      try:
+        os.makedirs(parent)
+      except OSError:
+        if not os.path.isdir(parent):
+          raise
+    self._path = tempfile.mkdtemp(dir=parent, prefix=name + '.tmp')
+
+  def add(self, images, labels):
+    """Adds a batch of [batch_size, height, width, 3] uint8 images."""
+    if images.shape[1:] != self._shard.shape[1:]:
+      raise ValueError('Expected images with shape [batch_size, %d, %d, 3], '
+                       'got %s' % (self._height, self._width, images.shape))
+    self._labels.append(np.asarray(labels, np.int32).reshape(-1))
+    start = 0
+    while start < len(images):
+      size = min(len(images) - start, len(self._shard) - self._shard_len)
+      self._shard[self._shard_len:self._shard_len + size] = \
+          images[start:start + size]
+      self._shard_len += size
+      start += size
+      if self._shard_len == len(self._shard):
+        self._write_shard()
+
+  def _write_shard(self):
+    np.save(os.path.join(self._path, SHARD_PATTERN % self._num_shards),
+            self._shard[:self._shard_len])
+    self._num_shards += 1
+    self._shard_len = 0
+
+  def close(self, truncated=False):
+    """Writes the last shard, the labels and the index.
+
+    Args:
+      truncated: True if the images are only the first part of a subset.
+    """
+    if self._shard_len:
+      self._write_shard()
+    labels = np.concatenate(self._labels) if self._labels \
+        else np.zeros([0], np.int32)
+    np.save(os.path.join(self._path, LABELS_FILE), labels)
+
+    index = {'num_images': len(labels), 'num_shards': self._num_shards,
+             'height': self._height, 'width': self._width,
+             'truncated': truncated}
+    with open(os.path.join(self._path, INDEX_FILE), 'w') as f:
+      json.dump(index, f)
+    self._replace_cache()
+    self._cache._index = None
+
+  def abort(self):
+    """Removes the images that were written."""
+    shutil.rmtree(self._path, ignore_errors=True)
+
+  def _replace_cache(self):
+    """Renames the written cache to the cache path.
+
+    An existing cache, e.g. one of a shorter calibration run, is moved aside
+    first. When another run renames its cache in between, that cache is kept
+    and this one is discarded.
+    """
+    path = self._cache.path
+    old = None
+    if os.path.isdir(path):
+      parent, name = os.path.split(os.path.abspath(path))
+      old = tempfile.mkdtemp(dir=parent, prefix=name + '.old')
+      try:
+        os.rename(path, os.path.join(old, name))
+      except OSError:
+        # moved aside by another run
+        pass
+    try:
+      os.rename(self._path, path)
+    except OSError:
+      if not os.path.isfile(os.path.join(path, INDEX_FILE)):
+        raise
+      self.abort()
+    finally:
+      if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,240 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+"""Pipelined evaluation of the TensorFlow image classifiers.
+
+The data graph runs in its own session on a producer thread that keeps a
+bounded queue of preprocessed batches, so that preprocessing overlaps with
+inference. Accuracy is computed with NumPy on the fetched predictions instead
+of building TensorFlow ops for every batch.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import time
+
+import numpy as np
+
+try:
+  import queue
+except ImportError:  # python 2
+  import Queue as queue
+
+
+def in_top_k(predictions, targets, k):
+  """NumPy version of tf.nn.in_top_k.
+
+  A target is in the top k when fewer than k classes have a strictly higher
+  prediction, so ties at the boundary count as in the top k, and non-finite
+  predictions are never in the top k.
+
+  Args:
+    predictions: [batch_size, num_classes] predictions.
+    targets: [batch_size] class ids.
+    k: number of top elements to look at.
+
+  Returns:
+    A [batch_size] boolean array.
+  """
+  predictions = np.asarray(predictions)
+  targets = np.asarray(targets).reshape(-1).astype(np.int64)
+  target_predictions = predictions[np.arange(len(targets)), targets]
+  num_higher = np.sum(predictions > target_predictions[:, np.newaxis], axis=1)
+  finite = np.all(np.isfinite(predictions), axis=1)
+  return np.logical_and(num_higher < k, finite)
+
+
+class EvalStats(object):
+  """Data wait and compute time of each iteration, in seconds."""
+
+  def __init__(self):
+    self.data_wait_times = []
+    self.compute_times = []
+
+  def add(self, data_wait_time, compute_time):
+    self.data_wait_times.append(data_wait_time)
+    self.compute_times.append(compute_time)
+
+  def latency_percentiles(self, include_data_time=True, percents=(50, 90, 99)):
+    """Returns the latency percentiles in ms."""
+    latencies = np.array(self.compute_times)
+    if include_data_time:
+      latencies = latencies + np.array(self.data_wait_times)
+    if not len(latencies):
+      return [None] * len(percents)
+    return [np.percentile(latencies, percent) * 1000 for percent in percents]
+
+  def print_summary(self, include_data_time=True):
+    if not self.compute_times:
+      return
+    print('Data wait time: %.3f ms/iter, compute time: %.3f ms/iter' %
+          (np.mean(self.data_wait_times) * 1000, np.mean(self.compute_times) * 1000))
+    print('Latency percentiles (ms): p50 %.3f, p90 %.3f, p99 %.3f' %
+          tuple(self.latency_percentiles(include_data_time)))
+
+
+class ClassifierEvalEngine(object):
+  """Runs the inference session on batches from a data session.
+
+  Args:
+    data_sess: session of the data graph (real or dummy data).
+    data_fetches: tensor or list of tensors fetched from the data session, where
+      the first one is fed to input_tensor. Labels are expected in second place.
+    infer_sess: session of the inference graph.
+    input_tensor: input tensor of the inference graph.
+    output_tensor: output tensor (predictions) of the inference graph.
+    batch_size: batch size.
+    prefetch: number of batches the producer thread prepares ahead.
+  """
+
+  def __init__(self, data_sess, data_fetches, infer_sess, input_tensor,
+               output_tensor, batch_size, prefetch=2):
+    self.data_sess = data_sess
+    self.data_fetches = data_fetches if isinstance(data_fetches, (list, tuple)) \
+        else [data_fetches]
+    self.infer_sess = infer_sess
+    self.input_tensor = input_tensor
+    self.output_tensor = output_tensor
+    self.batch_size = batch_size
+    self.prefetch = max(1, prefetch)
+
+  def _put(self, batches, item, stop):
+    """Puts an item in the queue, unless the consumer stopped first."""
+    while not stop.is_set():
+      try:
+        batches.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def _produce(self, num_batches, batches, stop):
+    try:
+      for _ in range(num_batches):
+        data = self.data_sess.run(self.data_fetches)
+        if not self._put(batches, data, stop):
+          return
+    except Exception as e:  # pylint: disable=broad-except
+      self._put(batches, e, stop)
+
+  def batches(self, num_batches):
+    """Yields the fetched data of num_batches batches, with the time spent waiting for it."""
+    batches = queue.Queue(self.prefetch)
+    stop = threading.Event()
+    producer = threading.Thread(target=self._produce,
+                                args=(num_batches, batches, stop))
+    producer.daemon = True
+    producer.start()
+    try:
+      for _ in range(num_batches):
+        start_time = time.time()
+        data = batches.get()
+        data_wait_time = time.time() - start_time
+        if isinstance(data, Exception):
+          raise data
+        yield data, data_wait_time
+    finally:
+      stop.set()
+      producer.join()
+
+  def infer(self, data):
+    """Runs inference on the fetched data, and returns the predictions and the time."""
+    start_time = time.time()
+    predictions = self.infer_sess.run(self.output_tensor,
+                                      {self.input_tensor: data[0]})
+    return predictions, time.time() - start_time
+
+  def benchmark(self, num_batches, warmup_steps, include_data_time=False,
+                on_batch=None):
+    """Measures the throughput and latency.
+
+    Args:
+      num_batches: number of batches to run, including the warmup.
+      warmup_steps: number of batches that are not measured.
+      include_data_time: whether the time spent waiting for data counts
+        towards the iteration time.
+      on_batch: optional function that gets the predictions and fetched data.
+
+    Returns:
+      The EvalStats of the measured iterations.
+    """
+    stats = EvalStats()
+    for iteration, (data, data_wait_time) in enumerate(self.batches(num_batches), 1):
+      predictions, compute_time = self.infer(data)
+      stats.add(data_wait_time, compute_time)
+      if on_batch:
+        on_batch(predictions, data)
+      time_consume = stats.compute_times[-1]
+      if include_data_time:
+        time_consume += stats.data_wait_times[-1]
+      print('Iteration %d: %.6f sec' % (iteration, time_consume))
+
+    measured = EvalStats()
+    measured.data_wait_times = stats.data_wait_times[warmup_steps:]
+    measured.compute_times = stats.compute_times[warmup_steps:]
+    if not measured.compute_times:
+      return measured
+    time_average = np.mean(measured.compute_times)
+    if include_data_time:
+      time_average += np.mean(measured.data_wait_times)
+    print('Average time: %.6f sec' % (time_average))
+    print('Batch size = %d' % self.batch_size)
+    if (self.batch_size == 1):
+      print('Latency: %.3f ms' % (time_average * 1000))
+    print('Throughput: %.3f images/sec' % (self.batch_size / time_average))
+    measured.print_summary(include_data_time)
+    return measured
+
+  def accuracy(self, num_batches, label_offset=0, on_batch=None):
+    """Measures the top-1 and top-5 accuracy.
+
+    Args:
+      num_batches: number of batches to run.
+      label_offset: value added to the labels, e.g. -1 for models without a
+        background class.
+      on_batch: optional function that gets the predictions and fetched data.
+
+    Returns:
+      The (top-1, top-5) accuracy.
+    """
+    stats = EvalStats()
+    total_accuracy1, total_accuracy5 = (0, 0)
+    num_processed_images = 0
+    for data, data_wait_time in self.batches(num_batches):
+      predictions, compute_time = self.infer(data)
+      stats.add(data_wait_time, compute_time)
+      labels = np.asarray(data[1]).reshape(-1) + label_offset
+      if on_batch:
+        on_batch(predictions, data)
+
+      num_processed_images += len(labels)
+      total_accuracy1 += np.sum(in_top_k(predictions, labels, 1))
+      total_accuracy5 += np.sum(in_top_k(predictions, labels, 5))
+      print("Iteration time: %0.4f ms" % (stats.compute_times[-1] * 1000))
+      print("Processed %d images. (Top1 accuracy, Top5 accuracy) = (%0.4f, %0.4f)"
+            % (num_processed_images, total_accuracy1 / num_processed_images,
+               total_accuracy5 / num_processed_images))
+    stats.print_summary()
+    if not num_processed_images:
+      return 0.0, 0.0
+    return (total_accuracy1 / num_processed_images,
+            total_accuracy5 / num_processed_images)
@@ -0,0 +1,326 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+"""ImageNet data and evaluation preprocessing of the image classifiers.
+
+Preprocessing has two stages: decode_and_resize decodes the JPEG and crops and
+resizes it to the model input size, and normalize scales the pixel values for
+the model. The parameters of both stages are in MODEL_PREPROCESS_PARAMS.
+
+When a cache directory is given, the output of the first stage is saved as
+uint8 images in a PreprocessedImageCache, keyed by the model, the input size
+and a hash of the data location and the decode parameters, and later runs read
+the cached images instead of decoding the JPEGs.
+Cached images are rounded to uint8, so they can differ from the uncached
+images by up to half a pixel level.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import hashlib
+import os
+
+import tensorflow as tf
+
+from image_classification.cache import PreprocessedImageCache
+
+IMAGENET_NUM_TRAIN_IMAGES = 1281167
+IMAGENET_NUM_VAL_IMAGES = 50000
+IMAGENET_NUM_CALIB_IMAGES = 500
+
+# channel means that are subtracted by the 'vgg' normalization
+_RGB_MEANS = [123.68, 116.78, 103.94]
+
+# Evaluation preprocessing parameters:
+#   central_fraction: fraction of the decoded image that is kept by a central
+#     crop before resizing, or None.
+#   crop_fraction: the image is resized to the input size divided by this
+#     fraction, and then center cropped to the input size.
+#   resize_side: if set, the image is resized with its aspect ratio preserved
+#     so that its shortest side is resize_side, instead of using crop_fraction.
+#   half_pixel_centers: use half pixel centers for the bilinear resize.
+#   fancy_upscaling: fancy upscaling of the JPEG chroma channels. The int8
+#     calibration and accuracy scripts of inceptionv3 and resnet101 decode with
+#     fancy upscaling, and override the fp32 value of the model.
+#   normalization: 'inception' scales the pixel values to [-1, 1] and 'vgg'
+#     subtracts the channel means.
+PreprocessParams = collections.namedtuple('PreprocessParams', [
+    'central_fraction', 'crop_fraction', 'resize_side', 'half_pixel_centers',
+    'fancy_upscaling', 'normalization'])
+
+MODEL_PREPROCESS_PARAMS = {
+    'mobilenet': PreprocessParams(
+        central_fraction=0.875, crop_fraction=0.875, resize_side=None,
+        half_pixel_centers=False, fancy_upscaling=True,
+        normalization='inception'),
+    'inceptionv3': PreprocessParams(
+        central_fraction=0.875, crop_fraction=1.0, resize_side=None,
+        half_pixel_centers=True, fancy_upscaling=False,
+        normalization='inception'),
+    'resnet101': PreprocessParams(
+        central_fraction=None, crop_fraction=1.0, resize_side=256,
+        half_pixel_centers=True, fancy_upscaling=False, normalization='vgg'),
+}
+
+
+class ImagenetData(object):
+  """ImageNet TFRecords with the train-*-of-* and validation-*-of-* files."""
+
+  def __init__(self, data_dir):
+    if not data_dir:
+      raise ValueError('Data directory not specified')
+    self.data_dir = data_dir
+
+  def tf_record_pattern(self, subset):
+    return os.path.join(self.data_dir, '%s-*-of-*' % subset)
+
+  def num_examples_per_epoch(self, subset='validation'):
+    if subset == 'train':
+      return IMAGENET_NUM_TRAIN_IMAGES
+    elif subset == 'validation':
+      return IMAGENET_NUM_VAL_IMAGES
+    elif subset == 'calibration':
+      return IMAGENET_NUM_CALIB_IMAGES
+    else:
+      raise ValueError('Invalid data subset "%s"' % subset)
+
+
+def parse_example_proto(example_serialized):
+  """Parses an Example proto of an ImageNet image.
+
+  Args:
+    example_serialized: scalar Tensor tf.string containing a serialized
+      Example protocol buffer.
+
+  Returns:
+    image_buffer: Tensor tf.string containing the contents of a JPEG file.
+    label: [1] tf.int32 Tensor containing the label.
+  """
+  feature_map = {
+      'image/encoded': tf.io.FixedLenFeature([], dtype=tf.string,
+                                             default_value=''),
+      'image/class/label': tf.io.FixedLenFeature([1], dtype=tf.int64,
+                                                 default_value=-1),
+  }
+  features = tf.io.parse_single_example(serialized=example_serialized,
+                                        features=feature_map)
+  label = tf.cast(features['image/class/label'], dtype=tf.int32)
+  return features['image/encoded'], label
+
+
+def decode_and_resize(image_buffer, height, width, params):
+  """Decodes a JPEG and crops and resizes it to the model input size.
+
+  Args:
+    image_buffer: scalar string Tensor.
+    height: input height of the model.
+    width: input width of the model.
+    params: PreprocessParams of the model.
+
+  Returns:
+    [height, width, 3] float32 Tensor with values in [0, 255].
+  """
+  with tf.compat.v1.name_scope('decode_and_resize'):
+    image = tf.image.decode_jpeg(image_buffer, channels=3,
+                                 fancy_upscaling=params.fancy_upscaling,
+                                 dct_method='INTEGER_FAST')
+    if params.central_fraction:
+      image = tf.image.central_crop(image,
+                                    central_fraction=params.central_fraction)
+
+    if params.resize_side:
+      shape = tf.cast(tf.shape(input=image)[:2], tf.float32)
+      scale = params.resize_side / tf.reduce_min(input_tensor=shape)
+      resize_shape = tf.cast(tf.math.rint(shape * scale), tf.int32)
+    else:
+      resize_shape = [int(height / params.crop_fraction),
+                      int(width / params.crop_fraction)]
+    image = tf.compat.v1.image.resize_bilinear(
+        tf.expand_dims(image, 0), resize_shape, align_corners=False,
+        half_pixel_centers=params.half_pixel_centers)
+    image = tf.squeeze(image, [0])
+
+    shape = tf.shape(input=image)
+    image = tf.image.crop_to_bounding_box(image, (shape[0] - height) // 2,
+                                          (shape[1] - width) // 2,
+                                          height, width)
+    image.set_shape([height, width, 3])
+    return image
+
+
+def normalize(images, params):
+  """Scales the pixel values of decode_and_resize images for the model."""
+  images = tf.cast(images, tf.float32)
+  if params.normalization == 'inception':
+    images = tf.multiply(tf.subtract(images / 255.0, 0.5), 2.0)
+  elif params.normalization == 'vgg':
+    images = tf.subtract(images, _RGB_MEANS)
+  return images
+
+
+class ImagenetPreprocessor(object):
+  """Evaluation input pipeline of an image classifier.
+
+  Args:
+    model: key of the model in MODEL_PREPROCESS_PARAMS.
+    height: input height of the model.
+    width: input width of the model.
+    batch_size: number of images in a batch.
+    dtype: data type of the images fed to the model.
+    cache_dir: directory of the preprocessed image caches, or None to decode
+      the JPEGs in every run.
+    num_parallel_calls: number of images that are decoded in parallel.
+    fancy_upscaling: overrides the fancy_upscaling parameter of the model when
+      it's not None.
+  """
+
+  def __init__(self, model, height, width, batch_size, dtype=tf.float32,
+               cache_dir=None, num_parallel_calls=tf.data.experimental.AUTOTUNE,
+               fancy_upscaling=None):
+    if model not in MODEL_PREPROCESS_PARAMS:
+      raise ValueError('Unknown model "%s". Must be one of %s' % (
+          model, ', '.join(sorted(MODEL_PREPROCESS_PARAMS))))
+    self.model = model
+    self.params = MODEL_PREPROCESS_PARAMS[model]
+    if fancy_upscaling is not None:
+      self.params = self.params._replace(fancy_upscaling=fancy_upscaling)
+    self.height = height
+    self.width = width
+    self.batch_size = batch_size
+    self.dtype = dtype
+    self.cache_dir = cache_dir
+    self.num_parallel_calls = num_parallel_calls
+
+  def get_cache(self, dataset, subset):
+    """Returns the PreprocessedImageCache of the subset for this model.
+
+    The images of different data locations and decode parameters are cached
+    separately.
+    """
+    data_dir = dataset.data_dir
+    if '://' not in data_dir:
+      data_dir = os.path.abspath(data_dir)
+    source = repr((data_dir, tuple(self.params)))
+    cache_key = '%s_%dx%d_%s' % (
+        self.model, self.height, self.width,
+        hashlib.sha1(source.encode('utf-8')).hexdigest()[:12])
+    return PreprocessedImageCache(
+        os.path.join(self.cache_dir, cache_key, subset))
+
+  def parse_and_resize(self, value):
+    image_buffer, label = parse_example_proto(value)
+    image = decode_and_resize(image_buffer, self.height, self.width,
+                              self.params)
+    return image, label
+
+  def decoded_dataset(self, dataset, subset):
+    """Returns a dataset of the decode_and_resize images and labels."""
+    glob_pattern = dataset.tf_record_pattern(subset)
+    file_names = tf.io.gfile.glob(glob_pattern)
+    if not file_names:
+      raise ValueError('Found no files in --data_dir matching: {}'
+                       .format(glob_pattern))
+    ds = tf.data.Dataset.from_tensor_slices(sorted(file_names))
+    ds = ds.interleave(tf.data.TFRecordDataset,
+                       cycle_length=min(10, len(file_names)),
+                       num_parallel_calls=tf.data.experimental.AUTOTUNE)
+    return ds.map(self.parse_and_resize,
+                  num_parallel_calls=self.num_parallel_calls)
+
+  def build_cache(self, dataset, subset, num_images=None):
+    """Decodes the images of the subset and saves them to the cache.
+
+    Args:
+      dataset: ImagenetData.
+      subset: 'validation', 'train' or 'calibration'.
+      num_images: number of images to save, or None to save the whole subset.
+
+    Returns:
+      The PreprocessedImageCache.
+    """
+    cache = self.get_cache(dataset, subset)
+    print('Saving the preprocessed %s images to %s' % (subset, cache.path))
+    with tf.Graph().as_default():
+      ds = self.decoded_dataset(dataset, subset)
+      if num_images:
+        ds = ds.take(num_images)
+      ds = ds.map(lambda image, label: (
+          tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8), label))
+      ds = ds.batch(256).prefetch(tf.data.experimental.AUTOTUNE)
+      images, labels = tf.compat.v1.data.make_one_shot_iterator(ds).get_next()
+
+      writer = cache.writer(self.height, self.width)
+      try:
+        with tf.compat.v1.Session() as sess:
+          while True:
+            try:
+              np_images, np_labels = sess.run([images, labels])
+            except tf.errors.OutOfRangeError:
+              break
+            writer.add(np_images, np_labels)
+      except BaseException:
+        writer.abort()
+        raise
+      writer.close(truncated=bool(num_images))
+    print('Saved %d preprocessed images' % cache.num_images)
+    return cache
+
+  def _cached_dataset(self, cache, num_images):
+    return tf.data.Dataset.from_generator(
+        lambda: cache.batches(self.batch_size, num_images),
+        output_types=(tf.uint8, tf.int32),
+        output_shapes=([self.batch_size, self.height, self.width, 3],
+                       [self.batch_size]))
+
+  def minibatch(self, dataset, subset, num_images=None):
+    """Returns the images and labels Tensors of the next batch.
+
+    The images are repeated after num_images, or after the whole subset when
+    num_images is None.
+
+    Args:
+      dataset: ImagenetData.
+      subset: 'validation', 'train' or 'calibration'.
+      num_images: number of images to read, or None to read the whole subset.
+
+    Returns:
+      images: [batch_size, height, width, 3] Tensor of the model dtype.
+      labels: [batch_size] tf.int32 Tensor.
+    """
+    with tf.compat.v1.name_scope('batch_processing'):
+      if self.cache_dir:
+        cache = self.get_cache(dataset, subset)
+        if not cache.is_complete(self.height, self.width, num_images):
+          cache = self.build_cache(dataset, subset, num_images)
+        ds = self._cached_dataset(cache, num_images).repeat()
+      else:
+        ds = self.decoded_dataset(dataset, subset)
+        if num_images:
+          ds = ds.take(num_images)
+        ds = ds.repeat().batch(self.batch_size, drop_remainder=True)
+
+      ds = ds.map(lambda images, labels: (
+          tf.cast(normalize(images, self.params), self.dtype),
+          tf.reshape(labels, [self.batch_size])))
+      ds = ds.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
+      images, labels = tf.compat.v1.data.make_one_shot_iterator(ds).get_next()
+      return images, labels
@@ -18,14 +18,16 @@
 
 #
 
-import time
+import os
 from argparse import ArgumentParser
 
 import tensorflow as tf
 from tensorflow.python.tools.optimize_for_inference_lib import optimize_for_inference
 from tensorflow.python.framework import dtypes
 
-import datasets
+from image_classification.preprocessing import (
+    IMAGENET_NUM_VAL_IMAGES, ImagenetData, ImagenetPreprocessor)
+from image_classification.eval_engine import ClassifierEvalEngine
 
 INPUTS = 'input'
 OUTPUTS = 'predict'
@@ -65,6 +67,12 @@ class eval_classifier_optimized_graph:
                                  'the benchmark will use random/dummy data.',
                             dest="data_location", default=None)
 
+    arg_parser.add_argument("--cache-dir",
+                            help='Directory of the preprocessed image cache, '
+                                 'which skips the JPEG decode in later runs.',
+                            dest="cache_dir",
+                            default=os.environ.get("IMAGENET_CACHE_DIR"))
+
     arg_parser.add_argument('-r', "--accuracy-only",
                             help='For accuracy measurement only.',
                             dest='accuracy_only', action='store_true')
@@ -111,11 +119,10 @@ class eval_classifier_optimized_graph:
     with data_graph.as_default():
       if (self.args.data_location):
         print("Inference with real data.")
-        dataset = datasets.ImagenetData(self.args.data_location)
-        preprocessor = dataset.get_image_preprocessor()(
-          INCEPTION_V3_IMAGE_SIZE, INCEPTION_V3_IMAGE_SIZE, self.args.batch_size,
-          num_cores=self.args.num_cores,
-          resize_method='bilinear')
+        dataset = ImagenetData(self.args.data_location)
+        preprocessor = ImagenetPreprocessor(
+          'inceptionv3', INCEPTION_V3_IMAGE_SIZE, INCEPTION_V3_IMAGE_SIZE,
+          self.args.batch_size, cache_dir=self.args.cache_dir)
         images, labels = preprocessor.minibatch(dataset, subset='validation')
       else:
         print("Inference with dummy data.")
@@ -140,75 +147,23 @@ class eval_classifier_optimized_graph:
     data_sess  = tf.compat.v1.Session(graph=data_graph,  config=data_config)
     infer_sess = tf.compat.v1.Session(graph=infer_graph, config=infer_config)
 
-    num_processed_images = 0
-    num_remaining_images = datasets.IMAGENET_NUM_VAL_IMAGES
+    num_remaining_images = IMAGENET_NUM_VAL_IMAGES
 
     if (not self.args.accuracy_only):
-      iteration = 0
-      warm_up_iteration = self.args.warmup_steps
-      total_run = self.args.steps
-      total_time = 0
-
-      while num_remaining_images >= self.args.batch_size and iteration < total_run:
-        iteration += 1
-
-        data_load_start = time.time()
-        image_np = data_sess.run(images)
-        data_load_time = time.time() - data_load_start
-
-        num_processed_images += self.args.batch_size
-        num_remaining_images -= self.args.batch_size
-
-        start_time = time.time()
-        infer_sess.run([output_tensor], feed_dict={input_tensor: image_np})
-        time_consume = time.time() - start_time
-
-        print('Iteration %d: %.6f sec' % (iteration, time_consume))
-        if iteration > warm_up_iteration:
-          total_time += time_consume
-
-      time_average = total_time / (iteration - warm_up_iteration)
-      print('Average time: %.6f sec' % (time_average))
-
-      print('Batch size = %d' % self.args.batch_size)
-      if (self.args.batch_size == 1):
-        print('Latency: %.3f ms' % (time_average * 1000))
-
-      print('Throughput: %.3f images/sec' % (self.args.batch_size / time_average))
+      engine = ClassifierEvalEngine(data_sess, images, infer_sess,
+                                    input_tensor, output_tensor,
+                                    self.args.batch_size)
+      num_batches = min(self.args.steps,
+                        num_remaining_images // self.args.batch_size)
+      engine.benchmark(num_batches, self.args.warmup_steps)
 
     else:  # accuracy check
-      total_accuracy1, total_accuracy5 = (0.0, 0.0)
-
-      while num_remaining_images >= self.args.batch_size:
-        # Reads and preprocess data
-        np_images, np_labels = data_sess.run([images, labels])
-        num_processed_images += self.args.batch_size
-        num_remaining_images -= self.args.batch_size
-
-        start_time = time.time()
-        # Compute inference on the preprocessed data
-        predictions = infer_sess.run(output_tensor,
-                                     {input_tensor: np_images})
-        elapsed_time = time.time() - start_time
-
-        with tf.Graph().as_default() as accu_graph:
-          accuracy1 = tf.reduce_sum(
-            input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-                                   targets=tf.constant(np_labels), k=1), tf.float32))
-
-          accuracy5 = tf.reduce_sum(
-            input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-                                   targets=tf.constant(np_labels), k=5), tf.float32))
-          with tf.compat.v1.Session() as accu_sess:
-            np_accuracy1, np_accuracy5 = accu_sess.run([accuracy1, accuracy5])
-
-          total_accuracy1 += np_accuracy1
-          total_accuracy5 += np_accuracy5
-
-        print("Iteration time: %0.4f ms" % elapsed_time)
-        print("Processed %d images. (Top1 accuracy, Top5 accuracy) = (%0.4f, %0.4f)" \
-              % (num_processed_images, total_accuracy1 / num_processed_images,
-                 total_accuracy5 / num_processed_images))
+      # the data graph runs on a producer thread, and the accuracy is
+      # computed on the fetched predictions
+      engine = ClassifierEvalEngine(data_sess, [images, labels], infer_sess,
+                                    input_tensor, output_tensor,
+                                    self.args.batch_size)
+      engine.accuracy(num_remaining_images // self.args.batch_size)
 
   def validate_args(self):
     """validate the arguments"""
@@ -40,9 +40,11 @@ import argparse
 import sys
 import time
 
-import datasets
 import tensorflow as tf
 
+import preprocessing_benchmark
+from image_classification.preprocessing import ImagenetData
+
 if __name__ == "__main__":
   parser = argparse.ArgumentParser()
   parser.add_argument("--input_graph", default=None,
@@ -118,8 +120,8 @@ if __name__ == "__main__":
     if args.data_location:
       print("inference with real data")
       # get the images from dataset
-      dataset = datasets.ImagenetData(args.data_location)
-      preprocessor = dataset.get_image_preprocessor(benchmark=True)(
+      dataset = ImagenetData(args.data_location)
+      preprocessor = preprocessing_benchmark.RecordInputImagePreprocessor(
         input_height, input_width, batch_size,
         num_cores=args.num_cores,
         resize_method='bilinear')
@@ -25,10 +25,10 @@ import numpy as np
 
 from google.protobuf import text_format
 import tensorflow as tf
-import preprocessing
-import datasets
+from image_classification.preprocessing import ImagenetData, ImagenetPreprocessor
 
 NUM_TEST_IMAGES = 50000
+NUM_CALIB_IMAGES = 10000
 
 def load_graph(model_file):
   graph = tf.Graph()
@@ -53,6 +53,9 @@ if __name__ == "__main__":
                       help="graph/model to be executed")
   parser.add_argument("--data_location", default=None,
                       help="full path to the validation data")
+  parser.add_argument("--cache_dir", default=os.environ.get("IMAGENET_CACHE_DIR"),
+                      help="directory of the preprocessed image cache, which skips "
+                      "the JPEG decode in later runs")
   parser.add_argument("--input_height", default=299,
                       type=int, help="input height")
   parser.add_argument("--input_width", default=299,
@@ -91,16 +94,14 @@ if __name__ == "__main__":
   num_inter_threads = args.num_inter_threads
   num_intra_threads = args.num_intra_threads
   data_location = args.data_location
-  dataset = datasets.ImagenetData(data_location)
-  preprocessor = dataset.get_image_preprocessor()(
-      input_height, input_width, batch_size,
-      1, # device count
-      tf.float32, # data_type for input fed to the graph
-      train=False, # doing inference
-      resize_method='bilinear')
+  dataset = ImagenetData(data_location)
+  # unlike the fp32 evaluation, the int8 scripts decode with fancy upscaling
+  preprocessor = ImagenetPreprocessor(
+      'inceptionv3', input_height, input_width, batch_size,
+      cache_dir=args.cache_dir, fancy_upscaling=True)
 
   images, labels = preprocessor.minibatch(dataset, subset='train',
-                    use_datasets=True, cache_data=False)
+                                          num_images=NUM_CALIB_IMAGES)
   graph = load_graph(model_file)
   input_tensor = graph.get_tensor_by_name(input_layer + ":0")
   output_tensor = graph.get_tensor_by_name(output_layer + ":0")
@@ -115,9 +116,9 @@ if __name__ == "__main__":
                             - num_processed_images
   with tf.compat.v1.Session() as sess:
     sess_graph = tf.compat.v1.Session(graph=graph, config=config)
-    while (num_remaining_images >= batch_size) and (num_processed_images < 10000):
+    while (num_remaining_images >= batch_size) and (num_processed_images < NUM_CALIB_IMAGES):
       # Reads and preprocess data
-      np_images, np_labels = sess.run([images[0], labels[0]])
+      np_images, np_labels = sess.run([images, labels])
       num_processed_images += batch_size
       num_remaining_images -= batch_size
       # Compute inference on the preprocessed data
@@ -39,13 +39,12 @@ from __future__ import print_function
 import argparse
 import sys
 import os
-import time
 import numpy as np
 
 from google.protobuf import text_format
 import tensorflow as tf
-import preprocessing
-import datasets
+from image_classification.preprocessing import ImagenetData, ImagenetPreprocessor
+from image_classification.eval_engine import ClassifierEvalEngine
 
 from tensorflow.core.protobuf import rewriter_config_pb2
 
@@ -74,6 +73,9 @@ if __name__ == "__main__":
                       help="graph/model to be executed")
   parser.add_argument("--data_location", default=None,
                       help="full path to the validation data")
+  parser.add_argument("--cache_dir", default=os.environ.get("IMAGENET_CACHE_DIR"),
+                      help="directory of the preprocessed image cache, which skips "
+                      "the JPEG decode in later runs")
   parser.add_argument("--input_height", default=224,
                       type=int, help="input height")
   parser.add_argument("--input_width", default=224,
@@ -108,16 +110,12 @@ if __name__ == "__main__":
   num_inter_threads = args.num_inter_threads
   num_intra_threads = args.num_intra_threads
   data_location = args.data_location
-  dataset = datasets.ImagenetData(data_location)
-  preprocessor = dataset.get_image_preprocessor()(
-      input_height, input_width, batch_size,
-      1, # device count
-      tf.float32, # data_type for input fed to the graph
-      train=False, # doing inference
-      resize_method='bilinear')
+  dataset = ImagenetData(data_location)
+  preprocessor = ImagenetPreprocessor(
+      'mobilenet', input_height, input_width, batch_size,
+      cache_dir=args.cache_dir)
   with tf.compat.v1.get_default_graph().as_default():
-    images, labels = preprocessor.minibatch(dataset, subset='validation',
-                     use_datasets=True, cache_data=False)
+    images, labels = preprocessor.minibatch(dataset, subset='validation')
   graph = load_graph(model_file)
   input_tensor = graph.get_tensor_by_name(input_layer + ":0")
   output_tensor = graph.get_tensor_by_name(output_layer + ":0")
@@ -127,34 +125,11 @@ if __name__ == "__main__":
   config.intra_op_parallelism_threads = num_intra_threads
   if args.precision == 'bfloat16':
     config.graph_options.rewrite_options.auto_mixed_precision_mkl = rewriter_config_pb2.RewriterConfig.ON
-  total_accuracy1, total_accuracy5 = (0.0, 0.0)
-  num_processed_images = 0
-  num_remaining_images = dataset.num_examples_per_epoch(subset='validation') \
-                            - num_processed_images
-  with tf.compat.v1.Session(graph=tf.compat.v1.get_default_graph()) as sess:
-    sess_graph = tf.compat.v1.Session(graph=graph, config=config)
-    while num_remaining_images >= batch_size:
-      # Reads and preprocess data
-      np_images, np_labels = sess.run([images[0], labels[0]])
-      num_processed_images += batch_size
-      num_remaining_images -= batch_size
-      start_time = time.time()
-      # Compute inference on the preprocessed data
-      predictions = sess_graph.run(output_tensor,
-                             {input_tensor: np_images})
-      elapsed_time = time.time() - start_time
-      accuracy1 = tf.reduce_sum(
-          input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-              targets=tf.constant(np_labels), k=1), tf.float32))
-
-      accuracy5 = tf.reduce_sum(
-          input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-              targets=tf.constant(np_labels), k=5), tf.float32))
-      np_accuracy1, np_accuracy5 =  sess.run([accuracy1, accuracy5])
-      total_accuracy1 += np_accuracy1
-      total_accuracy5 += np_accuracy5
-      print("Iteration time: %0.4f ms" % elapsed_time)
-      print("Processed %d images. (Top1 accuracy, Top5 accuracy) = (%0.4f, %0.4f)" \
-          % (num_processed_images, total_accuracy1/num_processed_images,
-          total_accuracy5/num_processed_images))
-      
+  num_images = dataset.num_examples_per_epoch(subset='validation')
+  data_sess = tf.compat.v1.Session(graph=tf.compat.v1.get_default_graph())
+  infer_sess = tf.compat.v1.Session(graph=graph, config=config)
+  # the data graph runs on a producer thread, and the accuracy is computed
+  # on the fetched predictions
+  engine = ClassifierEvalEngine(data_sess, [images, labels], infer_sess,
+                                input_tensor, output_tensor, batch_size)
+  engine.accuracy(num_images // batch_size)
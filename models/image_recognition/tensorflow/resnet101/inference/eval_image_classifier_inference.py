@@ -18,14 +18,15 @@
 
 #
 
-import time
+import os
 from argparse import ArgumentParser
 
 import tensorflow as tf
 from tensorflow.python.tools.optimize_for_inference_lib import optimize_for_inference
 from tensorflow.python.framework import dtypes
 
-import datasets
+from image_classification.preprocessing import ImagenetData, ImagenetPreprocessor
+from image_classification.eval_engine import ClassifierEvalEngine
 
 INPUTS = 'input'
 OUTPUTS = 'resnet_v1_101/predictions/Reshape_1'
@@ -70,6 +71,12 @@ class eval_classifier_optimized_graph:
                                  'the benchmark will use random/dummy data.',
                             dest="data_location", default=None)
 
+    arg_parser.add_argument("--cache-dir",
+                            help='Directory of the preprocessed image cache, '
+                                 'which skips the JPEG decode in later runs.',
+                            dest="cache_dir",
+                            default=os.environ.get("IMAGENET_CACHE_DIR"))
+
     arg_parser.add_argument('-r', "--accuracy-only",
                             help='For accuracy measurement only.',
                             dest='accuracy_only', action='store_true')
@@ -110,11 +117,10 @@ class eval_classifier_optimized_graph:
     with data_graph.as_default():
       if (self.args.data_location):
         print("Inference with real data.")
-        dataset = datasets.ImagenetData(self.args.data_location)
-        preprocessor = dataset.get_image_preprocessor()(
-            RESNET_IMAGE_SIZE, RESNET_IMAGE_SIZE, self.args.batch_size,
-            intra_threads=self.args.num_intra_threads,
-            resize_method='crop')
+        dataset = ImagenetData(self.args.data_location)
+        preprocessor = ImagenetPreprocessor(
+            'resnet101', RESNET_IMAGE_SIZE, RESNET_IMAGE_SIZE,
+            self.args.batch_size, cache_dir=self.args.cache_dir)
         images, labels = preprocessor.minibatch(dataset, subset='validation')
       else:
         print("Inference with dummy data.")
@@ -142,86 +148,26 @@ class eval_classifier_optimized_graph:
     data_sess  = tf.compat.v1.Session(graph=data_graph,  config=data_config)
     infer_sess = tf.compat.v1.Session(graph=infer_graph, config=infer_config)
 
-    num_processed_images = 0
     num_remaining_images = IMAGENET_VALIDATION_IMAGES
 
-    if (not self.args.accuracy_only):  # performance check
-      iteration = 0
-      warm_up_iteration = self.args.warmup_steps
-      total_run = self.args.steps
-      total_time = 0
-      #options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
-      #run_metadata = tf.RunMetadata()
-
-      while num_remaining_images >= self.args.batch_size and iteration < total_run:
-        iteration += 1
-
-        # Reads and preprocess data
-        data_load_start = time.time()
-        image_np = data_sess.run(images)
-        data_load_time = time.time() - data_load_start
-
-        num_processed_images += self.args.batch_size
-        num_remaining_images -= self.args.batch_size
-
-        start_time = time.time()
-        infer_sess.run([output_tensor], feed_dict={input_tensor: image_np})
-        time_consume = time.time() - start_time
-
-        # only add data loading time for real data, not for dummy data
-        if self.args.data_location:
-          time_consume += data_load_time
-
-        #trace = timeline.Timeline(step_stats=run_metadata.step_stats)
-        #with gfile.Open('resnet101_fp32_int8_master', 'w') as trace_file:
-        #    trace_file.write(trace.generate_chrome_trace_format(show_memory=False))
-
-        print('Iteration %d: %.3f sec' % (iteration, time_consume))
-        if iteration > warm_up_iteration:
-          total_time += time_consume
-
-      time_average = total_time / (iteration - warm_up_iteration)
-      print('Average time: %.3f sec' % (time_average))
-
-      print('Batch size = %d' % self.args.batch_size)
-      if (self.args.batch_size == 1):
-        print('Latency: %.3f ms' % (time_average * 1000))
-      # print throughput for both batch size 1 and 128
-      print('Throughput: %.3f images/sec' % (self.args.batch_size / time_average))
+    if (not self.args.accuracy_only):
+      engine = ClassifierEvalEngine(data_sess, images, infer_sess,
+                                    input_tensor, output_tensor,
+                                    self.args.batch_size)
+      num_batches = min(self.args.steps,
+                        num_remaining_images // self.args.batch_size)
+      engine.benchmark(num_batches, self.args.warmup_steps,
+                       # only add data loading time for real data, not for dummy data
+                       include_data_time=bool(self.args.data_location))
 
     else:  # accuracy check
-      total_accuracy1, total_accuracy5 = (0.0, 0.0)
-
-
-      while num_remaining_images >= self.args.batch_size:
-        # Reads and preprocess data
-        np_images, np_labels = data_sess.run([images, labels])
-        np_labels -= 1
-        num_processed_images += self.args.batch_size
-        num_remaining_images -= self.args.batch_size
-
-        start_time = time.time()
-        # Compute inference on the preprocessed data
-        predictions = infer_sess.run(output_tensor,
-                               {input_tensor: np_images})
-        elapsed_time = time.time() - start_time
-        with tf.Graph().as_default() as accu_graph:
-          # Putting all code within this make things faster.
-          accuracy1 = tf.reduce_sum(
-            input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-                                 targets=tf.constant(np_labels), k=1), tf.float32))
-
-          accuracy5 = tf.reduce_sum(
-            input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-                                 targets=tf.constant(np_labels), k=5), tf.float32))
-          with tf.compat.v1.Session() as accu_sess:
-            np_accuracy1, np_accuracy5 = accu_sess.run([accuracy1, accuracy5])
-          total_accuracy1 += np_accuracy1
-          total_accuracy5 += np_accuracy5
-          print("Iteration time: %0.4f ms" % elapsed_time)
-          print("Processed %d images. (Top1 accuracy, Top5 accuracy) = (%0.4f, %0.4f)" \
-              % (num_processed_images, total_accuracy1 / num_processed_images,
-                 total_accuracy5 / num_processed_images))
+      # the data graph runs on a producer thread, and the accuracy is
+      # computed on the fetched predictions
+      engine = ClassifierEvalEngine(data_sess, [images, labels], infer_sess,
+                                    input_tensor, output_tensor,
+                                    self.args.batch_size)
+      engine.accuracy(num_remaining_images // self.args.batch_size,
+                      label_offset=-1)
 
   def validate_args(self):
     """validate the arguments"""
@@ -18,7 +18,6 @@
 
 #
 
-import time
 from argparse import ArgumentParser
 
 import tensorflow as tf
@@ -27,10 +26,10 @@ from tensorflow.python.framework import dtypes
 from tensorflow.core.protobuf import rewriter_config_pb2
 
 import datasets
+from image_classification.eval_engine import ClassifierEvalEngine
 import numpy as np
 import os
 
-from tensorflow.python.platform import tf_logging
 
 INPUTS = 'input_tensor'
 OUTPUTS = 'softmax_tensor'
@@ -202,93 +201,38 @@ class eval_classifier_optimized_graph:
     num_remaining_images = dataset.num_examples_per_epoch(subset=subset) - num_processed_images \
         if self.args.data_location else (self.args.steps * self.args.batch_size)
 
-    if (not self.args.accuracy_only):
-      iteration = 0
-      warm_up_iteration = self.args.warmup_steps
-      total_run = self.args.steps
-      total_time = 0
-
-      while num_remaining_images >= self.args.batch_size and iteration < total_run:
-        iteration += 1
-        tf_filenames = None
-        np_labels = None
-        data_load_start = time.time()
-        if self.args.results_file_path:
-          image_np, np_labels, tf_filenames = data_sess.run([images, labels, filenames])
-        else:
-          image_np = data_sess.run(images)
-
-        data_load_time = time.time() - data_load_start
-
-        num_processed_images += self.args.batch_size
-        num_remaining_images -= self.args.batch_size
-
-        tf_logging.warn('\n---> Start iteration {0}'.format(str(iteration)))
-        start_time = time.time()
-        predictions = infer_sess.run(output_tensor, feed_dict={input_tensor: image_np})
-        time_consume = time.time() - start_time
-        tf_logging.warn('\n---> Stop iteration {0}'.format(str(iteration)))
-
-        # Write out the file name, expected label, and top prediction
-        self.write_results_output(predictions, tf_filenames, np_labels)
-
-        # only add data loading time for real data, not for dummy data
-        if self.args.data_location:
-          time_consume += data_load_time
+    def write_results(predictions, data):
+      # Write out the file name, expected label, and top prediction
+      if self.args.results_file_path:
+        self.write_results_output(predictions, data[2], data[1])
 
-        print('Iteration %d: %.6f sec' % (iteration, time_consume))
-        if iteration > warm_up_iteration:
-          total_time += time_consume
-
-      time_average = total_time / (iteration - warm_up_iteration)
-      print('Average time: %.6f sec' % (time_average))
-
-      print('Batch size = %d' % self.args.batch_size)
-      if (self.args.batch_size == 1):
-        print('Latency: %.3f ms' % (time_average * 1000))
-      # print throughput for both batch size 1 and 128
-      print('Throughput: %.3f images/sec' % (self.args.batch_size / time_average))
+    if (not self.args.accuracy_only):
+      if self.args.results_file_path:
+        data_fetches = [images, labels, filenames]
+      else:
+        data_fetches = images
+      engine = ClassifierEvalEngine(data_sess, data_fetches, infer_sess,
+                                    input_tensor, output_tensor,
+                                    self.args.batch_size)
+      num_batches = min(self.args.steps,
+                        num_remaining_images // self.args.batch_size)
+      engine.benchmark(num_batches, self.args.warmup_steps,
+                       # only add data loading time for real data, not for dummy data
+                       include_data_time=bool(self.args.data_location),
+                       on_batch=write_results)
 
     else: # accuracy check
-      total_accuracy1, total_accuracy5 = (0.0, 0.0)
-
-      while num_remaining_images >= self.args.batch_size:
-        # Reads and preprocess data
-        tf_filenames = None
-        if self.args.results_file_path:
-          np_images, np_labels, tf_filenames = data_sess.run([images, labels, filenames])
-        else:
-          np_images, np_labels = data_sess.run([images, labels])
-        num_processed_images += self.args.batch_size
-        num_remaining_images -= self.args.batch_size
-
-        start_time = time.time()
-        # Compute inference on the preprocessed data
-        predictions = infer_sess.run(output_tensor,
-                               {input_tensor: np_images})
-        elapsed_time = time.time() - start_time
-
-        # Write out the file name, expected label, and top prediction
-        self.write_results_output(predictions, tf_filenames, np_labels)
-
-        with tf.Graph().as_default() as accu_graph:
-          accuracy1 = tf.reduce_sum(
-            input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-                                   targets=tf.constant(np_labels), k=1), tf.float32))
-
-          accuracy5 = tf.reduce_sum(
-            input_tensor=tf.cast(tf.nn.in_top_k(predictions=tf.constant(predictions),
-                                   targets=tf.constant(np_labels), k=5), tf.float32))
-          with tf.compat.v1.Session(config=infer_config) as accu_sess:
-            np_accuracy1, np_accuracy5 = accu_sess.run([accuracy1, accuracy5])
-
-          total_accuracy1 += np_accuracy1
-          total_accuracy5 += np_accuracy5
-
-        print("Iteration time: %0.4f ms" % elapsed_time)
-        print("Processed %d images. (Top1 accuracy, Top5 accuracy) = (%0.4f, %0.4f)" \
-                  % (num_processed_images, total_accuracy1 / num_processed_images,
-                     total_accuracy5 / num_processed_images))
+      if self.args.results_file_path:
+        data_fetches = [images, labels, filenames]
+      else:
+        data_fetches = [images, labels]
+      # the data graph runs on a producer thread, and the accuracy is
+      # computed on the fetched predictions
+      engine = ClassifierEvalEngine(data_sess, data_fetches, infer_sess,
+                                    input_tensor, output_tensor,
+                                    self.args.batch_size)
+      engine.accuracy(num_remaining_images // self.args.batch_size,
+                      on_batch=write_results)
 
   def validate_args(self):
     """validate the arguments"""
@@ -35,13 +35,14 @@ import glob
 import logging
 import os
 import random
+import sys
 import timeit
 import time
 
 import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader, RandomSampler, SequentialSampler
+from torch.utils.data import DataLoader, Dataset, RandomSampler, SequentialSampler
 from torch.utils.data.distributed import DistributedSampler
 from tqdm import tqdm, trange
 
@@ -74,6 +75,15 @@ from transformers.data.processors.squad import (
 )
 from transformers.trainer_utils import is_main_process
 
+# the feature store is shared with the TensorFlow SQuAD script in models/common
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir, os.pardir, os.pardir, os.pardir, os.pardir, "common",
+    )
+)
+import feature_store
+
 
 try:
     from torch.utils.tensorboard import SummaryWriter
@@ -809,11 +819,256 @@ def evaluate(args, model, tokenizer, prefix=""):
     return results
 
 
+class StoredSquadFeatures(object):
+    """Sequence of the evaluation SquadFeatures that are saved in a FeatureStore.
+
+    The features are read from the memory mapped store when they are used, and
+    the tokens are converted back from their ids.
+    """
+
+    def __init__(self, store, tokenizer):
+        self.store = store
+        self.tokenizer = tokenizer
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError("feature index out of range")
+        return _StoredSquadFeature(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield _StoredSquadFeature(self, index)
+
+
+class _StoredSquadFeature(object):
+    """SquadFeatures of a feature of StoredSquadFeatures."""
+
+    def __init__(self, features, index):
+        self._store = features.store
+        self._tokenizer = features.tokenizer
+        self._index = index
+        self._tokens = None
+        self._token_to_orig_map = None
+        self._token_is_max_context = None
+
+    def _column(self, name):
+        return self._store.column(name)[self._index]
+
+    @property
+    def unique_id(self):
+        return int(self._column("unique_id"))
+
+    @property
+    def example_index(self):
+        return int(self._column("example_index"))
+
+    @property
+    def paragraph_len(self):
+        return int(self._column("paragraph_len"))
+
+    @property
+    def cls_index(self):
+        return int(self._column("cls_index"))
+
+    @property
+    def input_ids(self):
+        return self._column("input_ids").tolist()
+
+    @property
+    def attention_mask(self):
+        return self._column("attention_mask").tolist()
+
+    @property
+    def token_type_ids(self):
+        return self._column("token_type_ids").tolist()
+
+    @property
+    def p_mask(self):
+        return self._column("p_mask").tolist()
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = self._tokenizer.convert_ids_to_tokens(
+                self._column("token_ids").tolist()
+            )
+        return self._tokens
+
+    @property
+    def token_to_orig_map(self):
+        if self._token_to_orig_map is None:
+            self._token_to_orig_map = dict(
+                zip(
+                    self._column("doc_positions").tolist(),
+                    self._column("token_to_orig_index").tolist(),
+                )
+            )
+        return self._token_to_orig_map
+
+    @property
+    def token_is_max_context(self):
+        if self._token_is_max_context is None:
+            self._token_is_max_context = dict(
+                zip(
+                    self._column("doc_positions").tolist(),
+                    self._column("token_is_max_context").tolist(),
+                )
+            )
+        return self._token_is_max_context
+
+
+class StoredSquadDataset(Dataset):
+    """Evaluation dataset of StoredSquadFeatures.
+
+    The items are the same as the TensorDataset of
+    squad_convert_examples_to_features: input_ids, attention_mask,
+    token_type_ids, feature_index, cls_index and p_mask.
+    """
+
+    def __init__(self, features):
+        self.store = features.store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        def column(name, dtype):
+            return torch.from_numpy(np.asarray(self.store.column(name)[index], dtype))
+
+        return (
+            column("input_ids", np.int64),
+            column("attention_mask", np.int64),
+            column("token_type_ids", np.int64),
+            torch.tensor(index, dtype=torch.long),
+            column("cls_index", np.int64),
+            column("p_mask", np.float32),
+        )
+
+
+def get_eval_feature_store(args, tokenizer):
+    """Returns the FeatureStore of the evaluation features.
+
+    The store is keyed by the contents of the predict file and the vocab file,
+    and by the parameters of squad_convert_examples_to_features. Returns None
+    when the examples are not read from a local file.
+    """
+    if not args.data_dir:
+        return None
+    predict_file = os.path.join(args.data_dir, args.predict_file or "")
+    if not os.path.isfile(predict_file):
+        return None
+    files = [predict_file]
+    vocab_file = getattr(tokenizer, "vocab_file", None)
+    if vocab_file and os.path.isfile(vocab_file):
+        files.append(vocab_file)
+    key = feature_store.store_key(
+        files,
+        tokenizer=type(tokenizer).__name__,
+        tokenizer_name=tokenizer.name_or_path,
+        do_lower_case=args.do_lower_case,
+        version_2_with_negative=args.version_2_with_negative,
+        max_seq_length=args.max_seq_length,
+        doc_stride=args.doc_stride,
+        max_query_length=args.max_query_length,
+    )
+    return feature_store.FeatureStore(
+        os.path.join(args.data_dir, "cached_dev_features", key)
+    )
+
+
+def write_eval_feature_store(store, examples, features, tokenizer):
+    """Saves the evaluation SquadExamples and SquadFeatures to a FeatureStore."""
+    seq_shape = [len(features[0].input_ids)] if features else [0]
+    writer = store.writer(
+        dense={
+            "unique_id": (np.int64, []),
+            "example_index": (np.int32, []),
+            "paragraph_len": (np.int32, []),
+            "cls_index": (np.int32, []),
+            "input_ids": (np.int32, seq_shape),
+            "attention_mask": (np.int8, seq_shape),
+            "token_type_ids": (np.int8, seq_shape),
+            "p_mask": (np.int8, seq_shape),
+        },
+        ragged={
+            "token_ids": np.int32,
+            "doc_positions": np.int32,
+            "token_to_orig_index": np.int32,
+            "token_is_max_context": np.bool_,
+        },
+    )
+    try:
+        torch.save(examples, os.path.join(writer.path, "examples.bin"))
+        for feature in features:
+            doc_positions = sorted(feature.token_to_orig_map)
+            writer.add(
+                unique_id=feature.unique_id,
+                example_index=feature.example_index,
+                paragraph_len=feature.paragraph_len,
+                cls_index=feature.cls_index,
+                input_ids=feature.input_ids,
+                attention_mask=feature.attention_mask,
+                token_type_ids=feature.token_type_ids,
+                p_mask=feature.p_mask,
+                token_ids=tokenizer.convert_tokens_to_ids(feature.tokens),
+                doc_positions=doc_positions,
+                token_to_orig_index=[feature.token_to_orig_map[i] for i in doc_positions],
+                token_is_max_context=[
+                    feature.token_is_max_context[i] for i in doc_positions
+                ],
+            )
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
 def load_and_cache_examples(args, tokenizer, evaluate=False, output_examples=False):
     if args.local_rank not in [-1, 0] and not evaluate:
         # Make sure only the first process in distributed training process the dataset, and the others will use the cache
         torch.distributed.barrier()
 
+    # The evaluation features are saved to a memory mapped FeatureStore, which
+    # write_predictions reads lazily
+    store = get_eval_feature_store(args, tokenizer) if evaluate else None
+    if store is not None:
+        examples_file = os.path.join(store.path, "examples.bin")
+        if store.is_complete() and not args.overwrite_cache:
+            logger.info("Loading features from %s", store.path)
+            examples = torch.load(examples_file)
+        else:
+            logger.info("Creating features from dataset file at %s", args.data_dir)
+            processor = (
+                SquadV2Processor()
+                if args.version_2_with_negative
+                else SquadV1Processor()
+            )
+            examples = processor.get_dev_examples(
+                args.data_dir, filename=args.predict_file
+            )
+            features, _ = squad_convert_examples_to_features(
+                examples=examples,
+                tokenizer=tokenizer,
+                max_seq_length=args.max_seq_length,
+                doc_stride=args.doc_stride,
+                max_query_length=args.max_query_length,
+                is_training=False,
+                return_dataset="pt",
+                threads=args.threads,
+            )
+            logger.info("Saving features to %s", store.path)
+            write_eval_feature_store(store, examples, features, tokenizer)
+            del features
+
+        features = StoredSquadFeatures(store, tokenizer)
+        dataset = StoredSquadDataset(features)
+        if output_examples:
+            return dataset, examples, features
+        return dataset
+
     # Load data features from cache or dataset file
     input_dir = args.data_dir if args.data_dir else "."
     cached_features_file = os.path.join(
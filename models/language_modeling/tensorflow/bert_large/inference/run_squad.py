@@ -25,7 +25,9 @@ import json
 import math
 import os
 import random
+import sys
 import modeling
+import numpy as np
 import optimization
 import tokenization
 import six
@@ -43,6 +45,12 @@ from tensorflow.python.platform import tf_logging
 from absl import app
 #from absl import flags
 from absl import logging
+
+# the feature store is shared with the PyTorch SQuAD script in models/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, os.pardir, os.pardir, os.pardir, "common"))
+import feature_store
+
 flags = tf.compat.v1.flags
 
 FLAGS = flags.FLAGS
@@ -204,6 +212,12 @@ flags.DEFINE_integer("num_cores_per_socket", None,
                      "Number of cores per socket.")
 flags.DEFINE_bool("onednn_graph", False, "Enable OneDNN Graph for ITEX users.")
 
+flags.DEFINE_string(
+    "feature_cache_dir", None,
+    "[Optional] Directory where the features of `predict_file` are saved, so "
+    "that later runs with the same vocab_file, do_lower_case, max_seq_length, "
+    "doc_stride and max_query_length skip the feature conversion.")
+
 class UpdateGlobalStepHook(session_run_hook.SessionRunHook):
   def __init__(self):
     pass
@@ -1220,6 +1234,190 @@ class FeatureWriter(object):
     self._writer.close()
 
 
+class StoredInputFeatures(object):
+  """Sequence of the InputFeatures that are saved in a FeatureStore.
+
+  The features are read from the memory mapped store when they are used, and
+  the tokens are converted back from the input ids.
+  """
+
+  def __init__(self, store, inv_vocab):
+    self.store = store
+    self.inv_vocab = inv_vocab
+
+  def __len__(self):
+    return len(self.store)
+
+  def __getitem__(self, index):
+    if not 0 <= index < len(self):
+      raise IndexError("feature index out of range")
+    return _StoredInputFeature(self, index)
+
+  def __iter__(self):
+    for index in range(len(self)):
+      yield _StoredInputFeature(self, index)
+
+
+class _StoredInputFeature(object):
+  """InputFeatures of a feature of StoredInputFeatures."""
+
+  def __init__(self, features, index):
+    self._store = features.store
+    self._inv_vocab = features.inv_vocab
+    self._index = index
+    self._tokens = None
+    self._token_to_orig_map = None
+    self._token_is_max_context = None
+
+  def _column(self, name):
+    return self._store.column(name)[self._index]
+
+  @property
+  def unique_id(self):
+    return int(self._column("unique_ids"))
+
+  @property
+  def example_index(self):
+    return int(self._column("example_index"))
+
+  @property
+  def doc_span_index(self):
+    return int(self._column("doc_span_index"))
+
+  @property
+  def input_ids(self):
+    return self._column("input_ids").tolist()
+
+  @property
+  def input_mask(self):
+    return self._column("input_mask").tolist()
+
+  @property
+  def segment_ids(self):
+    return self._column("segment_ids").tolist()
+
+  @property
+  def tokens(self):
+    if self._tokens is None:
+      num_tokens = int(self._column("input_mask").sum())
+      self._tokens = [self._inv_vocab[i]
+                      for i in self._column("input_ids")[:num_tokens].tolist()]
+    return self._tokens
+
+  def _doc_positions(self):
+    doc_offset = int(self._column("doc_offset"))
+    return range(doc_offset,
+                 doc_offset + len(self._column("token_to_orig_index")))
+
+  @property
+  def token_to_orig_map(self):
+    if self._token_to_orig_map is None:
+      self._token_to_orig_map = dict(zip(
+          self._doc_positions(), self._column("token_to_orig_index").tolist()))
+    return self._token_to_orig_map
+
+  @property
+  def token_is_max_context(self):
+    if self._token_is_max_context is None:
+      self._token_is_max_context = dict(zip(
+          self._doc_positions(),
+          self._column("token_is_max_context").tolist()))
+    return self._token_is_max_context
+
+
+def load_or_convert_eval_features(eval_examples, tokenizer):
+  """Returns the StoredInputFeatures of the predict_file examples.
+
+  The features are converted and saved under feature_cache_dir the first time
+  they are used with the vocab and the sequence lengths.
+  """
+  key = feature_store.store_key(
+      [FLAGS.vocab_file, FLAGS.predict_file],
+      do_lower_case=FLAGS.do_lower_case,
+      max_seq_length=FLAGS.max_seq_length,
+      doc_stride=FLAGS.doc_stride,
+      max_query_length=FLAGS.max_query_length)
+  store = feature_store.FeatureStore(
+      os.path.join(FLAGS.feature_cache_dir, key))
+  if store.is_complete():
+    tf.compat.v1.logging.info("Loading features from %s" % store.path)
+    return StoredInputFeatures(store, tokenizer.inv_vocab)
+
+  tf.compat.v1.logging.info("Saving features to %s" % store.path)
+  seq_shape = [FLAGS.max_seq_length]
+  writer = store.writer(
+      dense={"unique_ids": (np.int64, []),
+             "example_index": (np.int32, []),
+             "doc_span_index": (np.int32, []),
+             "input_ids": (np.int32, seq_shape),
+             "input_mask": (np.int32, seq_shape),
+             "segment_ids": (np.int32, seq_shape),
+             "doc_offset": (np.int32, [])},
+      ragged={"token_to_orig_index": np.int32,
+              "token_is_max_context": np.bool_},
+      metadata={"num_examples": len(eval_examples)})
+
+  def write_feature(feature):
+    # the doc tokens follow [CLS] query [SEP], so the token maps have the
+    # consecutive positions from doc_offset
+    doc_positions = sorted(feature.token_to_orig_map)
+    writer.add(
+        unique_ids=feature.unique_id,
+        example_index=feature.example_index,
+        doc_span_index=feature.doc_span_index,
+        input_ids=feature.input_ids,
+        input_mask=feature.input_mask,
+        segment_ids=feature.segment_ids,
+        doc_offset=doc_positions[0] if doc_positions else 0,
+        token_to_orig_index=[feature.token_to_orig_map[i]
+                             for i in doc_positions],
+        token_is_max_context=[feature.token_is_max_context[i]
+                              for i in doc_positions])
+
+  try:
+    convert_examples_to_features(
+        examples=eval_examples,
+        tokenizer=tokenizer,
+        max_seq_length=FLAGS.max_seq_length,
+        doc_stride=FLAGS.doc_stride,
+        max_query_length=FLAGS.max_query_length,
+        is_training=False,
+        output_fn=write_feature)
+  except BaseException:
+    writer.abort()
+    raise
+  writer.close()
+  return StoredInputFeatures(store, tokenizer.inv_vocab)
+
+
+def stored_input_fn_builder(features, seq_length, drop_remainder):
+  """Creates an `input_fn` closure of StoredInputFeatures."""
+
+  def generate_batches(batch_size):
+    store = features.store
+    columns = ["unique_ids", "input_ids", "input_mask", "segment_ids"]
+    for start in range(0, len(store), batch_size):
+      end = min(start + batch_size, len(store))
+      if drop_remainder and end - start < batch_size:
+        break
+      yield dict((name, store.column(name)[start:end].astype(np.int32))
+                 for name in columns)
+
+  def input_fn(params):
+    """The actual input function."""
+    batch_size = params["batch_size"]
+    seq_shape = tf.TensorShape([None, seq_length])
+    return tf.data.Dataset.from_generator(
+        lambda: generate_batches(batch_size),
+        output_types={"unique_ids": tf.int32, "input_ids": tf.int32,
+                      "input_mask": tf.int32, "segment_ids": tf.int32},
+        output_shapes={"unique_ids": tf.TensorShape([None]),
+                       "input_ids": seq_shape, "input_mask": seq_shape,
+                       "segment_ids": seq_shape})
+
+  return input_fn
+
+
 def validate_flags_or_throw(bert_config):
   """Validate the input FLAGS or throw an exception."""
   tokenization.validate_case_matches_checkpoint(FLAGS.do_lower_case,
@@ -1503,24 +1701,37 @@ def main(_):
     eval_examples = read_squad_examples(
         input_file=FLAGS.predict_file, is_training=False)
 
-    eval_writer = FeatureWriter(
-        filename=os.path.join(FLAGS.output_dir, "eval.tf_record"),
-        is_training=False)
-    eval_features = []
-
-    def append_feature(feature):
-      eval_features.append(feature)
-      eval_writer.process_feature(feature)
-
-    convert_examples_to_features(
-        examples=eval_examples,
-        tokenizer=tokenizer,
-        max_seq_length=FLAGS.max_seq_length,
-        doc_stride=FLAGS.doc_stride,
-        max_query_length=FLAGS.max_query_length,
-        is_training=False,
-        output_fn=append_feature)
-    eval_writer.close()
+    if FLAGS.feature_cache_dir:
+      eval_features = load_or_convert_eval_features(eval_examples, tokenizer)
+      predict_input_fn = stored_input_fn_builder(
+          eval_features,
+          seq_length=FLAGS.max_seq_length,
+          drop_remainder=False)
+    else:
+      eval_writer = FeatureWriter(
+          filename=os.path.join(FLAGS.output_dir, "eval.tf_record"),
+          is_training=False)
+      eval_features = []
+
+      def append_feature(feature):
+        eval_features.append(feature)
+        eval_writer.process_feature(feature)
+
+      convert_examples_to_features(
+          examples=eval_examples,
+          tokenizer=tokenizer,
+          max_seq_length=FLAGS.max_seq_length,
+          doc_stride=FLAGS.doc_stride,
+          max_query_length=FLAGS.max_query_length,
+          is_training=False,
+          output_fn=append_feature)
+      eval_writer.close()
+
+      predict_input_fn = input_fn_builder(
+          input_file=eval_writer.filename,
+          seq_length=FLAGS.max_seq_length,
+          is_training=False,
+          drop_remainder=False)
 
     tf.compat.v1.logging.info("***** Running predictions *****")
     tf.compat.v1.logging.info("  Num orig examples = %d", len(eval_examples))
@@ -1529,12 +1740,6 @@ def main(_):
 
     all_results = []
 
-    predict_input_fn = input_fn_builder(
-        input_file=eval_writer.filename,
-        seq_length=FLAGS.max_seq_length,
-        is_training=False,
-        drop_remainder=False)
-
     # If running eval on the TPU, you will need to specify the number of
     # steps.
     tf.compat.v1.disable_eager_execution()
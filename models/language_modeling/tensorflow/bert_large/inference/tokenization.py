@@ -19,6 +19,9 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import functools
+import multiprocessing
+import os
 import re
 import unicodedata
 import six
@@ -159,22 +162,81 @@ def whitespace_tokenize(text):
 
 
 class FullTokenizer(object):
-  """Runs end-to-end tokenziation."""
+  """Runs end-to-end tokenziation.
 
-  def __init__(self, vocab_file, do_lower_case=True):
+  The output is the same as running the BasicTokenizer and then the
+  WordpieceTokenizer on every token, but the text is cleaned with a single
+  `str.translate`, the word pieces are matched with a `VocabTrie`, and the
+  word pieces of the `cache_size` most recently used words are cached.
+  """
+
+  def __init__(self, vocab_file, do_lower_case=True, cache_size=65536):
     self.vocab = load_vocab(vocab_file)
     self.inv_vocab = {v: k for k, v in self.vocab.items()}
     self.basic_tokenizer = BasicTokenizer(do_lower_case=do_lower_case)
-    self.wordpiece_tokenizer = WordpieceTokenizer(vocab=self.vocab)
+    self.wordpiece_tokenizer = TrieWordpieceTokenizer(vocab=self.vocab)
+    self.cache_size = cache_size
+    self._init_word_cache()
+
+  def _init_word_cache(self):
+    self._tokenize_word = functools.lru_cache(maxsize=self.cache_size)(
+        self._tokenize_word_uncached)
+
+  def __getstate__(self):
+    # the cache isn't picklable, and is rebuilt by the worker processes
+    state = self.__dict__.copy()
+    del state["_tokenize_word"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._init_word_cache()
+
+  def _tokenize_word_uncached(self, word):
+    """Returns the word pieces of a whitespace separated word, as a tuple."""
+    if self.basic_tokenizer.do_lower_case:
+      word = self.basic_tokenizer._run_strip_accents(word.lower())
+    split_tokens = []
+    for token in whitespace_tokenize(
+        " ".join(self.basic_tokenizer._run_split_on_punc(word))):
+      split_tokens.extend(self.wordpiece_tokenizer.tokenize(token))
+    return tuple(split_tokens)
 
   def tokenize(self, text):
+    # this is BasicTokenizer._clean_text and _tokenize_chinese_chars
+    text = convert_to_unicode(text).translate(_CLEAN_TEXT_MAP)
     split_tokens = []
-    for token in self.basic_tokenizer.tokenize(text):
-      for sub_token in self.wordpiece_tokenizer.tokenize(token):
-        split_tokens.append(sub_token)
+    for word in text.split():
+      split_tokens.extend(self._tokenize_word(word))
 
     return split_tokens
 
+  def tokenize_batch(self, texts, num_workers=None, chunksize=64):
+    """Tokenizes a list of texts in a pool of worker processes.
+
+    Args:
+      texts: list of texts.
+      num_workers: number of worker processes, or None for one per CPU. With
+        one worker, the texts are tokenized in this process.
+      chunksize: number of texts that are sent to a worker at a time.
+
+    Returns:
+      A list with the tokens of each text.
+    """
+    if num_workers is None:
+      num_workers = os.cpu_count()
+    num_workers = min(num_workers, (len(texts) + chunksize - 1) // chunksize)
+    if num_workers <= 1:
+      return [self.tokenize(text) for text in texts]
+
+    pool = multiprocessing.get_context("spawn").Pool(
+        num_workers, initializer=_init_tokenize_worker, initargs=(self,))
+    try:
+      return pool.map(_tokenize_in_worker, texts, chunksize)
+    finally:
+      pool.close()
+      pool.join()
+
   def convert_tokens_to_ids(self, tokens):
     return convert_by_vocab(self.vocab, tokens)
 
@@ -182,6 +244,18 @@ class FullTokenizer(object):
     return convert_by_vocab(self.inv_vocab, ids)
 
 
+_worker_tokenizer = None
+
+
+def _init_tokenize_worker(tokenizer):
+  global _worker_tokenizer
+  _worker_tokenizer = tokenizer
+
+
+def _tokenize_in_worker(text):
+  return _worker_tokenizer.tokenize(text)
+
+
 class BasicTokenizer(object):
   """Runs basic tokenization (punctuation splitting, lower casing, etc.)."""
 
@@ -359,6 +433,87 @@ class WordpieceTokenizer(object):
     return output_tokens
 
 
+class VocabTrie(object):
+  """Prefix tree of the vocab tokens, for longest-match-first lookups."""
+
+  def __init__(self, tokens=()):
+    self._root = {}
+    for token in tokens:
+      self.add(token)
+
+  def add(self, token):
+    node = self._root
+    for char in token:
+      node = node.setdefault(char, {})
+    node[_TRIE_END] = True
+
+  def longest_prefix(self, text, start=0):
+    """Returns the end of the longest token that starts at text[start].
+
+    Returns -1 if no token of the trie starts at text[start].
+    """
+    node = self._root
+    end = -1
+    for i in range(start, len(text)):
+      node = node.get(text[i])
+      if node is None:
+        break
+      if _TRIE_END in node:
+        end = i + 1
+    return end
+
+
+_TRIE_END = None
+
+
+class TrieWordpieceTokenizer(WordpieceTokenizer):
+  """WordpieceTokenizer that matches the word pieces with a VocabTrie.
+
+  The output is the same as WordpieceTokenizer, but each word piece is found
+  in a single walk of the trie, instead of looking up every substring that
+  starts at the piece.
+  """
+
+  def __init__(self, vocab, unk_token="[UNK]", max_input_chars_per_word=200):
+    super(TrieWordpieceTokenizer, self).__init__(
+        vocab, unk_token=unk_token,
+        max_input_chars_per_word=max_input_chars_per_word)
+    self._word_trie = VocabTrie(vocab)
+    # the "##" continuation tokens, without the "##"
+    self._suffix_trie = VocabTrie(
+        token[2:] for token in vocab if token.startswith("##"))
+
+  def tokenize(self, text):
+    text = convert_to_unicode(text)
+
+    output_tokens = []
+    for token in whitespace_tokenize(text):
+      if len(token) > self.max_input_chars_per_word:
+        output_tokens.append(self.unk_token)
+        continue
+
+      trie = self._word_trie
+      start = 0
+      sub_tokens = []
+      while start < len(token):
+        end = trie.longest_prefix(token, start)
+        if end < 0:
+          sub_tokens = None
+          break
+        if start > 0:
+          sub_tokens.append("##" + token[start:end])
+        else:
+          sub_tokens.append(token[start:end])
+        trie = self._suffix_trie
+        start = end
+
+      if sub_tokens is None:
+        output_tokens.append(self.unk_token)
+      else:
+        output_tokens.extend(sub_tokens)
+    return output_tokens
+
+
 def _is_whitespace(char):
   """Checks whether `chars` is a whitespace character."""
   # \t, \n, and \r are technically contorl characters but we treat them
@@ -397,3 +552,31 @@ def _is_punctuation(char):
   if cat.startswith("P"):
     return True
   return False
+
+
+class _CleanTextMap(dict):
+  """`str.translate` table of BasicTokenizer._clean_text and
+  BasicTokenizer._tokenize_chinese_chars.
+
+  The mapping of a character is computed the first time it is seen.
+  """
+
+  def __init__(self):
+    super(_CleanTextMap, self).__init__()
+    self._basic_tokenizer = BasicTokenizer()
+
+  def __missing__(self, cp):
+    char = six.unichr(cp)
+    if cp == 0 or cp == 0xfffd or _is_control(char):
+      value = None
+    elif _is_whitespace(char):
+      value = u" "
+    elif self._basic_tokenizer._is_chinese_char(cp):
+      value = u" " + char + u" "
+    else:
+      value = cp
+    self[cp] = value
+    return value
+
+
+_CLEAN_TEXT_MAP = _CleanTextMap()
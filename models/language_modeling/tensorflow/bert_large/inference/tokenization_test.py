@@ -17,6 +17,7 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import random
 import tempfile
 import tokenization
 import six
@@ -90,6 +91,100 @@ class TokenizationTest(tf.test.TestCase):
     self.assertAllEqual(
         tokenizer.tokenize("unwantedX running"), ["[UNK]", "runn", "##ing"])
 
+  def test_trie_wordpiece_tokenizer(self):
+    vocab_tokens = [
+        "[UNK]", "[CLS]", "[SEP]", "want", "##want", "##ed", "wa", "un", "runn",
+        "##ing", "##", "#"
+    ]
+
+    vocab = {}
+    for (i, token) in enumerate(vocab_tokens):
+      vocab[token] = i
+    tokenizer = tokenization.TrieWordpieceTokenizer(vocab=vocab)
+    reference = tokenization.WordpieceTokenizer(vocab=vocab)
+
+    self.assertAllEqual(tokenizer.tokenize(""), [])
+
+    self.assertAllEqual(
+        tokenizer.tokenize("unwanted running"),
+        ["un", "##want", "##ed", "runn", "##ing"])
+
+    self.assertAllEqual(
+        tokenizer.tokenize("unwantedX running"), ["[UNK]", "runn", "##ing"])
+
+    for text in ["wa", "wantwant", "unwa", "##", "#want", "runnin",
+                 "x" * 201]:
+      self.assertAllEqual(tokenizer.tokenize(text), reference.tokenize(text))
+
+  def _random_texts(self, num_texts):
+    rng = random.Random(12345)
+    chars = (u"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+             u"      \t\n\r.,;:!?'\"()[]{}-_$^`#@%&*+=/\\|~<>"
+             u"\u00E9\u00C9\u00FC\u00F1\u00E7\u0130\u00DF\u0301"
+             u"\u00A0\u2028\u3000\u200B\u0005\u0000\ufffd"
+             u"\u535A\u63A8\uF900\u037E\u1FEF\u2019\u00BF\U0001F4A9")
+    texts = []
+    for _ in range(num_texts):
+      text = u"".join(rng.choice(chars) for _ in range(rng.randint(0, 80)))
+      texts.append(text)
+    # long words
+    texts.append(u"a" * 199 + u" " + u"b" * 200 + u" " + u"c" * 201)
+    return texts
+
+  def _write_vocab(self, vocab_tokens):
+    with tempfile.NamedTemporaryFile(delete=False) as vocab_writer:
+      vocab_writer.write("".join(
+          [x + "\n" for x in vocab_tokens]).encode("utf-8"))
+      return vocab_writer.name
+
+  def _parity_vocab(self):
+    rng = random.Random(54321)
+    letters = u"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    vocab_tokens = ["[UNK]", "[CLS]", "[SEP]"]
+    vocab_tokens.extend(letters)
+    vocab_tokens.extend("##" + c for c in letters)
+    vocab_tokens.extend(u".,;:!?'\"()-$^`#\u535A\u00E9\u00BF\U0001F4A9")
+    for _ in range(300):
+      token = u"".join(rng.choice(letters[:30])
+                       for _ in range(rng.randint(2, 6)))
+      vocab_tokens.append(token if rng.random() < 0.5 else "##" + token)
+    # the vocab doesn't have the characters after "m", so some words are
+    # [UNK]
+    return [t for t in vocab_tokens if "z" not in t]
+
+  def test_full_tokenizer_matches_reference(self):
+    vocab_file = self._write_vocab(self._parity_vocab())
+    texts = self._random_texts(500)
+
+    for do_lower_case in [True, False]:
+      tokenizer = tokenization.FullTokenizer(vocab_file,
+                                             do_lower_case=do_lower_case,
+                                             cache_size=64)
+      basic_tokenizer = tokenization.BasicTokenizer(
+          do_lower_case=do_lower_case)
+      wordpiece_tokenizer = tokenization.WordpieceTokenizer(
+          vocab=tokenizer.vocab)
+
+      for text in texts:
+        expected = []
+        for token in basic_tokenizer.tokenize(text):
+          expected.extend(wordpiece_tokenizer.tokenize(token))
+        # twice, to also check the cached words
+        self.assertAllEqual(tokenizer.tokenize(text), expected)
+        self.assertAllEqual(tokenizer.tokenize(text), expected)
+    os.unlink(vocab_file)
+
+  def test_full_tokenizer_batch(self):
+    vocab_file = self._write_vocab(self._parity_vocab())
+    tokenizer = tokenization.FullTokenizer(vocab_file)
+    os.unlink(vocab_file)
+    texts = self._random_texts(100)
+
+    expected = [tokenizer.tokenize(text) for text in texts]
+    self.assertEqual(tokenizer.tokenize_batch(texts, num_workers=1), expected)
+    self.assertEqual(
+        tokenizer.tokenize_batch(texts, num_workers=2, chunksize=16), expected)
+
   def test_convert_tokens_to_ids(self):
     vocab_tokens = [
         "[UNK]", "[CLS]", "[SEP]", "want", "##want", "##ed", "wa", "un", "runn",
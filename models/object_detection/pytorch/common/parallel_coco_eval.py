@@ -0,0 +1,219 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+"""COCO evaluation of the detections of an inference run, in parallel.
+
+The detections are added per image during the inference, to a preallocated
+array of [image_id, x, y, w, h, score, category_id] rows, or as COCO result
+dicts, e.g. for segmentations. COCOeval.evaluate() matches the detections of
+each image and category independently, so the image ids are split in shards
+that are evaluated by a pool of processes. The per image results are merged in
+the sorted image id order, so COCOeval.accumulate() gives the same metrics as
+a single COCOeval.evaluate() of all the detections.
+
+The scripts add this directory to sys.path, e.g.
+
+    sys.path.append(os.path.join(os.path.dirname(__file__), "../../../common"))
+    from parallel_coco_eval import ParallelCocoEvaluator
+"""
+
+import copy
+import io
+import multiprocessing
+import os
+from contextlib import redirect_stdout
+
+import numpy as np
+from pycocotools.coco import COCO
+from pycocotools.cocoeval import COCOeval
+
+# the ground truth and the parameters of the evaluation in a worker process
+_worker_state = {}
+
+
+def _available_cpus():
+    """Returns the number of CPUs of the affinity mask, e.g. of numactl."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count()
+
+
+def _init_worker(gt_dataset, iou_type, params):
+    coco_gt = COCO()
+    coco_gt.dataset = gt_dataset
+    with redirect_stdout(io.StringIO()):
+        coco_gt.createIndex()
+    _worker_state["coco_gt"] = coco_gt
+    _worker_state["iou_type"] = iou_type
+    _worker_state["params"] = params
+
+
+def _evaluate_shard(img_ids, detections, results):
+    return evaluate_images(_worker_state["coco_gt"], _worker_state["iou_type"],
+                           _worker_state["params"], img_ids, detections, results)
+
+
+def evaluate_images(coco_gt, iou_type, params, img_ids, detections, results):
+    """Runs COCOeval.evaluate() on the detections of some images.
+
+    Args:
+        coco_gt: COCO ground truth.
+        iou_type: 'bbox', 'segm' or 'keypoints'.
+        params: COCOeval params, of which the image ids are replaced.
+        img_ids: sorted image ids.
+        detections: (n, 7) array of [image_id, x, y, w, h, score, category_id].
+        results: list of COCO result dicts.
+
+    Returns:
+        the per image results of COCOeval, a (categories, areas, images) array.
+    """
+    with redirect_stdout(io.StringIO()):
+        anns = coco_gt.loadNumpyAnnotations(detections) if len(detections) else []
+        anns.extend(copy.deepcopy(results))
+        coco_dt = coco_gt.loadRes(anns) if anns else COCO()
+        coco_eval = COCOeval(coco_gt, coco_dt, iouType=iou_type)
+        coco_eval.params = copy.deepcopy(params)
+        coco_eval.params.imgIds = list(img_ids)
+        coco_eval.evaluate()
+    p = coco_eval.params
+    num_categories = len(p.catIds) if p.useCats else 1
+    return np.asarray(coco_eval.evalImgs, dtype=object).reshape(
+        num_categories, len(p.areaRng), len(p.imgIds))
+
+
+class ParallelCocoEvaluator(object):
+    """Accumulates the detections of an inference run and evaluates them.
+
+    Args:
+        coco_gt: COCO ground truth.
+        iou_type: 'bbox', 'segm' or 'keypoints'.
+        num_workers: number of processes of evaluate(), the CPUs that the
+            process is bound to by default.
+        capacity: initial number of detection rows, which is doubled as needed.
+    """
+
+    def __init__(self, coco_gt, iou_type="bbox", num_workers=None, capacity=1 << 16):
+        self.coco_gt = coco_gt
+        self.iou_type = iou_type
+        self.num_workers = num_workers or _available_cpus()
+        self.img_ids = []
+        self._detections = np.empty((capacity, 7), np.float64)
+        self._num_detections = 0
+        self._results = []
+
+    @property
+    def detections(self):
+        """The (n, 7) array of [image_id, x, y, w, h, score, category_id]."""
+        return self._detections[:self._num_detections]
+
+    def add_detections(self, image_id, boxes, scores, labels):
+        """Adds the detections of an image.
+
+        Args:
+            image_id: COCO image id.
+            boxes: (n, 4) [x, y, w, h] boxes in pixels.
+            scores: (n,) scores.
+            labels: (n,) COCO category ids.
+        """
+        self.img_ids.append(int(image_id))
+        n = len(scores)
+        if self._num_detections + n > len(self._detections):
+            capacity = max(2 * len(self._detections), self._num_detections + n)
+            detections = np.empty((capacity, 7), np.float64)
+            detections[:self._num_detections] = self.detections
+            self._detections = detections
+        rows = self._detections[self._num_detections:self._num_detections + n]
+        rows[:, 0] = image_id
+        rows[:, 1:5] = boxes
+        rows[:, 5] = scores
+        rows[:, 6] = labels
+        self._num_detections += n
+
+    def add_results(self, image_id, results):
+        """Adds the COCO result dicts of an image, e.g. segmentations."""
+        self.img_ids.append(int(image_id))
+        self._results.extend(results)
+
+    def _shards(self, img_ids, num_shards):
+        detections = self.detections
+        results = {}
+        for result in self._results:
+            results.setdefault(result["image_id"], []).append(result)
+        for shard in np.array_split(img_ids, num_shards):
+            shard_detections = detections[np.isin(detections[:, 0], shard)]
+            shard_results = [r for i in shard for r in results.get(i, [])]
+            yield shard, shard_detections, shard_results
+
+    def evaluate_images(self, img_ids=None, params=None):
+        """Evaluates the images in parallel.
+
+        Args:
+            img_ids: image ids to evaluate, the images of the added detections
+                by default.
+            params: COCOeval params, the defaults of the iou type by default.
+
+        Returns:
+            the sorted image ids and the per image results of COCOeval, a
+            (categories, areas, images) array.
+        """
+        if img_ids is None:
+            img_ids = self.img_ids
+        if params is None:
+            params = COCOeval(self.coco_gt, iouType=self.iou_type).params
+        img_ids = np.unique(np.asarray(img_ids, np.int64))
+        params = copy.deepcopy(params)
+        if params.useCats:
+            params.catIds = list(np.unique(params.catIds))
+        params.maxDets = sorted(params.maxDets)
+
+        # more shards than workers, so that the shards of the images with many
+        # detections don't keep the other workers waiting
+        num_shards = max(1, min(len(img_ids), 4 * self.num_workers))
+        # every worker loads the ground truth, so there are no idle workers
+        num_workers = min(self.num_workers, num_shards)
+        shards = self._shards(img_ids, num_shards)
+        if num_workers > 1:
+            pool = multiprocessing.get_context("spawn").Pool(
+                num_workers, initializer=_init_worker,
+                initargs=(self.coco_gt.dataset, self.iou_type, params))
+            try:
+                eval_imgs = pool.starmap(_evaluate_shard, shards)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            eval_imgs = [evaluate_images(self.coco_gt, self.iou_type, params, *shard)
+                         for shard in shards]
+        return img_ids, np.concatenate(eval_imgs, 2)
+
+    def evaluate(self, img_ids=None, params=None):
+        """Returns a COCOeval of the images, ready for accumulate()."""
+        coco_eval = COCOeval(self.coco_gt, iouType=self.iou_type)
+        if params is not None:
+            coco_eval.params = copy.deepcopy(params)
+        img_ids, eval_imgs = self.evaluate_images(img_ids, coco_eval.params)
+        p = coco_eval.params
+        p.imgIds = list(img_ids)
+        if p.useCats:
+            p.catIds = list(np.unique(p.catIds))
+        p.maxDets = sorted(p.maxDets)
+        coco_eval.evalImgs = list(eval_imgs.flatten())
+        coco_eval._paramsEval = copy.deepcopy(p)
+        return coco_eval
@@ -36,16 +36,18 @@
 
 
 import copy
-import io
-from contextlib import redirect_stdout
+import os
+import sys
 
 import numpy as np
 import pycocotools.mask as mask_util
 import torch
 import utils
-from pycocotools.coco import COCO
 from pycocotools.cocoeval import COCOeval
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../common"))
+from parallel_coco_eval import ParallelCocoEvaluator
+
 
 class CocoEvaluator:
     def __init__(self, coco_gt, iou_types):
@@ -58,29 +60,29 @@ class CocoEvaluator:
         for iou_type in iou_types:
             self.coco_eval[iou_type] = COCOeval(coco_gt, iouType=iou_type)
 
-        self.img_ids = []
-        self.eval_imgs = {k: [] for k in iou_types}
+        # the predictions are accumulated during the inference, and are
+        # evaluated in parallel by synchronize_between_processes
+        self.evaluators = {k: ParallelCocoEvaluator(coco_gt, k) for k in iou_types}
 
     def update(self, predictions):
-        img_ids = list(np.unique(list(predictions.keys())))
-        self.img_ids.extend(img_ids)
-
         for iou_type in self.iou_types:
-            results = self.prepare(predictions, iou_type)
-            with redirect_stdout(io.StringIO()):
-                coco_dt = COCO.loadRes(self.coco_gt, results) if results else COCO()
-            coco_eval = self.coco_eval[iou_type]
-
-            coco_eval.cocoDt = coco_dt
-            coco_eval.params.imgIds = list(img_ids)
-            img_ids, eval_imgs = evaluate(coco_eval)
-
-            self.eval_imgs[iou_type].append(eval_imgs)
+            evaluator = self.evaluators[iou_type]
+            for original_id, prediction in predictions.items():
+                if iou_type == "bbox":
+                    evaluator.add_detections(
+                        original_id,
+                        convert_to_xywh(prediction["boxes"]).numpy(),
+                        prediction["scores"].numpy(),
+                        prediction["labels"].numpy(),
+                    )
+                else:
+                    evaluator.add_results(original_id, self.prepare({original_id: prediction}, iou_type))
 
     def synchronize_between_processes(self):
         for iou_type in self.iou_types:
-            self.eval_imgs[iou_type] = np.concatenate(self.eval_imgs[iou_type], 2)
-            create_common_coco_eval(self.coco_eval[iou_type], self.img_ids, self.eval_imgs[iou_type])
+            coco_eval = self.coco_eval[iou_type]
+            img_ids, eval_imgs = self.evaluators[iou_type].evaluate_images(params=coco_eval.params)
+            create_common_coco_eval(coco_eval, list(img_ids), eval_imgs)
 
     def accumulate(self):
         for coco_eval in self.coco_eval.values():
@@ -220,9 +222,3 @@ def create_common_coco_eval(coco_eval, img_ids, eval_imgs):
     coco_eval.evalImgs = eval_imgs
     coco_eval.params.imgIds = img_ids
     coco_eval._paramsEval = copy.deepcopy(coco_eval.params)
-
-
-def evaluate(imgs):
-    with redirect_stdout(io.StringIO()):
-        imgs.evaluate()
-    return imgs.params.imgIds, np.asarray(imgs.evalImgs).reshape(-1, len(imgs.params.areaRng), len(imgs.params.imgIds))
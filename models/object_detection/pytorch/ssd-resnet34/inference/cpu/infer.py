@@ -21,6 +21,7 @@
 ### This file is originally from: [mlcommons repo](https://github.com/mlcommons/inference/tree/r0.5/others/cloud/single_stage_detector/pytorch/infer.py)
 import os
 from argparse import ArgumentParser
+import sys
 from utils import DefaultBoxes, Encoder, COCODetection
 from base_model import Loss
 from utils import SSDTransformer
@@ -31,6 +32,8 @@ from torch.utils.data import DataLoader
 import time
 import numpy as np
 import torch.fx.experimental.optimization as optimization
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../../common'))
+from parallel_coco_eval import ParallelCocoEvaluator
 
 use_ipex = False
 if os.environ.get('USE_IPEX') == "1":
@@ -59,6 +62,8 @@ def parse_args():
                         help='set the iteration of inference, default is None')
     parser.add_argument('-p', '--print-freq', default=10, type=int,
                         metavar='N', help='print frequency (default: 10)')
+    parser.add_argument('--eval-workers', type=int, default=None,
+                        help='number of processes of the COCO evaluation, all the CPUs by default')
     parser.add_argument('--threshold', '-t', type=float, default=0.20,
                         help='stop training early at threshold')
     parser.add_argument('--checkpoint', type=str, default='',
@@ -152,14 +157,23 @@ def dboxes_R34_coco(figsize,strides):
     dboxes = DefaultBoxes(figsize, feat_size, steps, scales, aspect_ratios)
     return dboxes
 
+def to_coco_boxes(loc, wtot, htot):
+    """Returns the [x, y, w, h] boxes in pixels of ltrb boxes relative to the image size"""
+    boxes = np.empty((len(loc), 4), np.float64)
+    boxes[:, 0] = loc[:, 0].astype(np.float64)*wtot
+    boxes[:, 1] = loc[:, 1].astype(np.float64)*htot
+    boxes[:, 2] = (loc[:, 2] - loc[:, 0]).astype(np.float64)*wtot
+    boxes[:, 3] = (loc[:, 3] - loc[:, 1]).astype(np.float64)*htot
+    return boxes
+
 def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
-    from pycocotools.cocoeval import COCOeval
     device = args.device
     threshold = args.threshold
     use_cuda = not args.no_cuda and torch.cuda.is_available()
     model.eval()
 
-    ret = []
+    # the detections are evaluated in parallel after the inference
+    evaluator = ParallelCocoEvaluator(cocoGt, iou_type='bbox', num_workers=args.eval_workers)
 
     inference_time = AverageMeter('InferenceTime', ':6.3f')
     decoding_time = AverageMeter('DecodingTime', ':6.3f')
@@ -274,14 +288,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
                             # Iterate over batch elements
                             for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                 loc, label, prob = [r.cpu().numpy() for r in result]
-                                # Iterate over image detections
-                                for loc_, label_, prob_ in zip(loc, label, prob):
-                                    ret.append([img_id_, loc_[0]*wtot_, \
-                                                loc_[1]*htot_,
-                                                (loc_[2] - loc_[0])*wtot_,
-                                                (loc_[3] - loc_[1])*htot_,
-                                                prob_,
-                                                inv_map[label_]])
+                                evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                         [inv_map[label_] for label_ in label])
 
                             if total_iteration % args.print_freq == 0:
                                 progress.display(total_iteration)
@@ -364,14 +372,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
 
                                     for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                         loc, label, prob = [r.cpu().numpy() for r in result]
-                                        # Iterate over image detections
-                                        for loc_, label_, prob_ in zip(loc, label, prob):
-                                            ret.append([img_id_, loc_[0]*wtot_, \
-                                                        loc_[1]*htot_,
-                                                        (loc_[2] - loc_[0])*wtot_,
-                                                        (loc_[3] - loc_[1])*htot_,
-                                                        prob_,
-                                                        inv_map[label_]])
+                                        evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                                 [inv_map[label_] for label_ in label])
 
                                     if total_iteration % args.print_freq == 0:
                                         progress.display(total_iteration)
@@ -423,14 +425,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
 
                                         for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                             loc, label, prob = [r.cpu().numpy() for r in result]
-                                            # Iterate over image detections
-                                            for loc_, label_, prob_ in zip(loc, label, prob):
-                                                ret.append([img_id_, loc_[0]*wtot_, \
-                                                            loc_[1]*htot_,
-                                                            (loc_[2] - loc_[0])*wtot_,
-                                                            (loc_[3] - loc_[1])*htot_,
-                                                            prob_,
-                                                            inv_map[label_]])
+                                            evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                                     [inv_map[label_] for label_ in label])
 
                                         if total_iteration % args.print_freq == 0:
                                             progress.display(total_iteration)
@@ -481,14 +477,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
 
                                         for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                             loc, label, prob = [r.cpu().numpy() for r in result]
-                                            # Iterate over image detections
-                                            for loc_, label_, prob_ in zip(loc, label, prob):
-                                                ret.append([img_id_, loc_[0]*wtot_, \
-                                                            loc_[1]*htot_,
-                                                            (loc_[2] - loc_[0])*wtot_,
-                                                            (loc_[3] - loc_[1])*htot_,
-                                                            prob_,
-                                                            inv_map[label_]])
+                                            evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                                     [inv_map[label_] for label_ in label])
 
                                         if total_iteration % args.print_freq == 0:
                                             progress.display(total_iteration)
@@ -555,14 +545,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
                             # Iterate over batch elements
                             for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                 loc, label, prob = [r.cpu().numpy() for r in result]
-                                # Iterate over image detections
-                                for loc_, label_, prob_ in zip(loc, label, prob):
-                                    ret.append([img_id_, loc_[0]*wtot_, \
-                                                loc_[1]*htot_,
-                                                (loc_[2] - loc_[0])*wtot_,
-                                                (loc_[3] - loc_[1])*htot_,
-                                                prob_,
-                                                inv_map[label_]])
+                                evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                         [inv_map[label_] for label_ in label])
 
                             if total_iteration % args.print_freq == 0:
                                 progress.display(total_iteration)
@@ -590,10 +574,7 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
         if not args.accuracy_mode:
             return True
 
-        cocoDt = cocoGt.loadRes(np.array(ret))
-
-        E = COCOeval(cocoGt, cocoDt, iouType='bbox')
-        E.evaluate()
+        E = evaluator.evaluate(img_ids=cocoGt.getImgIds())
         E.accumulate()
         E.summarize()
         print("Current AP: {:.5f} AP goal: {:.5f}".format(E.stats[0], threshold))
@@ -23,6 +23,7 @@ import os
 from argparse import ArgumentParser
 from re import M
 
+import sys
 from utils import DefaultBoxes, Encoder, COCODetection
 from base_model import Loss
 from utils import SSDTransformer
@@ -36,6 +37,8 @@ import torch.nn as nn
 from torch.utils import ThroughputBenchmark
 import threading
 import torch.fx.experimental.optimization as optimization
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../../common'))
+from parallel_coco_eval import ParallelCocoEvaluator
 
 use_ipex = False
 if os.environ.get('USE_IPEX') == "1":
@@ -94,6 +97,8 @@ def parse_args():
                         help='set the iteration of inference, default is None')
     parser.add_argument('-p', '--print-freq', default=10, type=int,
                         metavar='N', help='print frequency (default: 10)')
+    parser.add_argument('--eval-workers', type=int, default=None,
+                        help='number of processes of the COCO evaluation, all the CPUs by default')
     parser.add_argument('--threshold', '-t', type=float, default=0.20,
                         help='stop training early at threshold')
     parser.add_argument('--checkpoint', type=str, default='',
@@ -211,8 +216,16 @@ def dboxes_R34_coco(figsize,strides):
     dboxes = DefaultBoxes(figsize, feat_size, steps, scales, aspect_ratios)
     return dboxes
 
+def to_coco_boxes(loc, wtot, htot):
+    """Returns the [x, y, w, h] boxes in pixels of ltrb boxes relative to the image size"""
+    boxes = np.empty((len(loc), 4), np.float64)
+    boxes[:, 0] = loc[:, 0].astype(np.float64)*wtot
+    boxes[:, 1] = loc[:, 1].astype(np.float64)*htot
+    boxes[:, 2] = (loc[:, 2] - loc[:, 0]).astype(np.float64)*wtot
+    boxes[:, 3] = (loc[:, 3] - loc[:, 1]).astype(np.float64)*htot
+    return boxes
+
 def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
-    from pycocotools.cocoeval import COCOeval
     device = args.device
     threshold = args.threshold
     use_cuda = not args.no_cuda and torch.cuda.is_available()
@@ -228,7 +241,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
             exit(-1)
         epoch_number = (args.iteration // len(val_dataloader) + 1) if (args.iteration > len(val_dataloader)) else 1
 
-    ret = []
+    # the detections are evaluated in parallel after the inference
+    evaluator = ParallelCocoEvaluator(cocoGt, iou_type='bbox', num_workers=args.eval_workers)
 
     inference_time = AverageMeter('InferenceTime', ':6.3f')
     decoding_time = AverageMeter('DecodingTime', ':6.3f')
@@ -351,14 +365,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
                                 # Iterate over batch elements
                                 for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                     loc, label, prob = [r.cpu().numpy() for r in result]
-                                    # Iterate over image detections
-                                    for loc_, label_, prob_ in zip(loc, label, prob):
-                                        ret.append([img_id_, loc_[0]*wtot_, \
-                                                    loc_[1]*htot_,
-                                                    (loc_[2] - loc_[0])*wtot_,
-                                                    (loc_[3] - loc_[1])*htot_,
-                                                    prob_,
-                                                    inv_map[label_]])
+                                    evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                             [inv_map[label_] for label_ in label])
                             if total_iteration == args.iteration:
                                 fps = args.batch_size * (args.iteration - args.warmup_iterations + 1) / time_consume
                                 avg_time = time_consume * 1000 / (args.iteration - args.warmup_iterations + 1)
@@ -494,14 +502,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
                                     # Iterate over batch elements
                                     for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                         loc, label, prob = [r.cpu().numpy() for r in result]
-                                        # Iterate over image detections
-                                        for loc_, label_, prob_ in zip(loc, label, prob):
-                                            ret.append([img_id_, loc_[0]*wtot_, \
-                                                        loc_[1]*htot_,
-                                                        (loc_[2] - loc_[0])*wtot_,
-                                                        (loc_[3] - loc_[1])*htot_,
-                                                        prob_,
-                                                        inv_map[label_]])
+                                        evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                                 [inv_map[label_] for label_ in label])
                                 if total_iteration == args.iteration:
                                     fps = args.batch_size * (args.iteration - args.warmup_iterations + 1) / time_consume
                                     avg_time = time_consume * 1000 / (args.iteration - args.warmup_iterations + 1)
@@ -634,14 +636,8 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
                                     # Iterate over batch elements
                                     for img_id_, wtot_, htot_, result in zip(img_id, wtot, htot, results):
                                         loc, label, prob = [r.cpu().numpy() for r in result]
-                                        # Iterate over image detections
-                                        for loc_, label_, prob_ in zip(loc, label, prob):
-                                            ret.append([img_id_, loc_[0]*wtot_, \
-                                                        loc_[1]*htot_,
-                                                        (loc_[2] - loc_[0])*wtot_,
-                                                        (loc_[3] - loc_[1])*htot_,
-                                                        prob_,
-                                                        inv_map[label_]])
+                                        evaluator.add_detections(img_id_, to_coco_boxes(loc, wtot_, htot_), prob,
+                                                                 [inv_map[label_] for label_ in label])
                                 if total_iteration == args.iteration:
                                     fps = args.batch_size * (args.iteration - args.warmup_iterations + 1) / time_consume
                                     avg_time = time_consume * 1000 / (args.iteration - args.warmup_iterations + 1)
@@ -702,10 +698,7 @@ def coco_eval(model, val_dataloader, cocoGt, encoder, inv_map, args):
             print("Throughput: {:.3f} fps".format(throughput))
             return False
     elif args.use_multi_stream_module and not args.dummy and args.accuracy_mode:
-        cocoDt = cocoGt.loadRes(np.array(ret))
-
-        E = COCOeval(cocoGt, cocoDt, iouType='bbox')
-        E.evaluate()
+        E = evaluator.evaluate(img_ids=cocoGt.getImgIds())
         E.accumulate()
         E.summarize()
         print("Current AP: {:.5f} AP goal: {:.5f}".format(E.stats[0], threshold))
@@ -85,6 +85,94 @@ def calc_iou_tensor(box1, box2):
     iou = intersect/(area1 + area2 - intersect)
     return iou
 
+# upper bound of the number of IoU values that batched_nms computes at once
+NMS_CHUNK_ELEMENTS = 1 << 24
+
+def batched_nms(bboxes_in, scores_in, criteria, max_output, max_num=200, score_threshold=0.05):
+    """ Multi-class non-maximum suppression of a batch of images,
+        with the same results as Encoder.decode_single for each image.
+
+        The candidates of every (image, class) pair are padded to the same
+        number, so the IoU of all the candidate pairs of the batch is
+        computed at once, and the greedy suppression is a single pass over
+        the candidates in descending score order for all the pairs together.
+        Boxes with equal scores are visited in descending anchor order.
+
+        input:
+            bboxes_in (N, nboxes, 4) ltrb
+            scores_in (N, nboxes, nlabels), label 0 is the background
+        output:
+            bboxes_out (nout, 4), labels_out (nout), scores_out (nout),
+            lengths (N) number of outputs of each image
+    """
+    num_images = bboxes_in.size(0)
+    num_classes = scores_in.size(2) - 1
+    max_num = min(max_num, scores_in.size(1))
+    chunk = max(1, NMS_CHUNK_ELEMENTS // (num_classes * max_num * max_num))
+
+    output_bboxes_ = []
+    output_labels_ = []
+    output_scores_ = []
+    output_length_ = []
+    for start in range(0, num_images, chunk):
+        bboxes = bboxes_in[start:start + chunk]
+        # (n, classes, nboxes), without the background
+        scores = scores_in[start:start + chunk, :, 1:].transpose(1, 2)
+        n = bboxes.size(0)
+
+        valid = scores > score_threshold
+        # the scores are probabilities, so the masked boxes sort first
+        masked = scores.masked_fill(~valid, -1.0)
+        k = min(max_num, int(valid.sum(dim=2).max()))
+        sorted_scores, sorted_idx = masked.sort(dim=2, stable=True)
+        # the top k candidates of each class, in descending score order
+        first = scores.size(2) - k
+        cand_scores = sorted_scores[:, :, first:].flip(2)
+        cand_idx = sorted_idx[:, :, first:].flip(2)
+        cand_valid = cand_scores > score_threshold
+        image_idx = torch.arange(n, device=bboxes.device).view(n, 1, 1)
+        cand_bboxes = bboxes[image_idx, cand_idx]
+
+        # IoU of each pair of candidates of the same class, (n, classes, k, k),
+        # with the same operations as calc_iou_tensor
+        be1 = cand_bboxes.unsqueeze(3)
+        be2 = cand_bboxes.unsqueeze(2)
+        lt = torch.max(be1[..., :2], be2[..., :2])
+        rb = torch.min(be1[..., 2:], be2[..., 2:])
+        delta = rb - lt
+        delta[delta < 0] = 0
+        intersect = delta[..., 0]*delta[..., 1]
+        delta1 = cand_bboxes[..., 2:] - cand_bboxes[..., :2]
+        area = delta1[..., 0]*delta1[..., 1]
+        iou = intersect/(area.unsqueeze(3) + area.unsqueeze(2) - intersect)
+        # a candidate is suppressed unless its iou < criteria, as in decode_single
+        suppress = ~(iou < criteria)
+        del be1, be2, lt, rb, delta, intersect, iou
+
+        keep = torch.zeros_like(cand_valid)
+        removed = ~cand_valid
+        for i in range(k):
+            keep_i = ~removed[:, :, i]
+            keep[:, :, i] = keep_i
+            removed |= keep_i.unsqueeze(2) & suppress[:, :, i, :]
+
+        labels = torch.arange(1, num_classes + 1, dtype=torch.long,
+                              device=bboxes.device).view(num_classes, 1).expand(-1, k)
+        for j in range(n):
+            # class major, in descending score order, as decode_single
+            # concatenates them
+            bboxes_out = cand_bboxes[j][keep[j]]
+            labels_out = labels[keep[j]]
+            scores_out = cand_scores[j][keep[j]]
+
+            _, max_ids = scores_out.sort(dim=0)
+            max_ids = max_ids[-max_output:]
+            output_bboxes_.append(bboxes_out[max_ids, :])
+            output_labels_.append(labels_out[max_ids])
+            output_scores_.append(scores_out[max_ids])
+            output_length_.append(max_ids.size(0))
+    return (torch.cat(output_bboxes_), torch.cat(output_labels_), torch.cat(output_scores_), torch.from_numpy(np.array(output_length_)))
+
 # This function is from https://github.com/kuangliu/pytorch-ssd.
 class Encoder(object):
     """
@@ -183,6 +271,12 @@ class Encoder(object):
         return bboxes_in, F.softmax(scores_in, dim=-1)
 
     def decode_batch(self, bboxes_in, scores_in,  criteria = 0.45, max_output=200, device=0):
+        """ Decodes a batch of images. Without IPEX, the detections are those of
+            decode_single, but the detections with equal scores can be in another
+            order: batched_nms visits equal scores in descending anchor order,
+            and the final score sort is given the detections in that order.
+            The (score, label) pairs of each image are the same.
+        """
         if use_ipex:
             bboxes_in = bboxes_in.permute(0, 2, 1).contiguous().to(torch.float32)
             scores_in = scores_in.permute(0, 2, 1).contiguous().to(torch.float32)
@@ -194,20 +288,8 @@ class Encoder(object):
             bboxes_in = bboxes_in.permute(0, 2, 1).contiguous().to(torch.float32)
             scores_in = scores_in.permute(0, 2, 1).contiguous().to(torch.float32)
             bboxes, probs = self.scale_back_batch(bboxes_in, scores_in,device)
-            output_bboxes_ = []
-            output_labels_ = []
-            output_scores_ = []
-            output_length_ = []
-            for bbox, prob in zip(bboxes.split(1, 0), probs.split(1, 0)):
-                bbox = bbox.squeeze(0)
-                prob = prob.squeeze(0)
-                bboxes_out, labels_out, scores_out = self.decode_single(bbox, prob, criteria, max_output)
-                output_bboxes_.append(bboxes_out)
-                output_labels_.append(labels_out)
-                output_scores_.append(scores_out)
-                output_length_.append(scores_out.size(0))
-            return (torch.cat(output_bboxes_), torch.cat(output_labels_), torch.cat(output_scores_), torch.from_numpy(np.array(output_length_)))
-    
+            return batched_nms(bboxes, probs, criteria, max_output)
+
     # perform non-maximum suppression for IPEX tensor
     def decode_single_ipex(self, bboxes_in, scores_in, criteria, max_output, max_num=200):
         # Reference to https://github.com/amdegroot/ssd.pytorch
@@ -222,7 +304,8 @@ class Encoder(object):
         max_ids = max_ids[-max_output:]
         return bboxes_out[max_ids, :], labels_out[max_ids], scores_out[max_ids]
 
-    # perform non-maximum suppression
+    # perform non-maximum suppression, one class at a time. decode_batch uses
+    # batched_nms, which gives the same results for a batch of images
     def decode_single(self, bboxes_in, scores_in, criteria, max_output, max_num=200):
         # Reference to https://github.com/amdegroot/ssd.pytorch
 
@@ -7,6 +7,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import os
+import mmap
 import numpy as np
 from torch.utils.data import Dataset
 import torch
@@ -73,9 +74,10 @@ def _transform_features(
         x_cat_batch = x_cat_batch % max_ind_range
 
     if flag_input_torch_tensor:
-        x_int_batch = torch.log(x_int_batch.clone().detach().type(torch.float) + 1)
-        x_cat_batch = x_cat_batch.clone().detach().type(torch.long)
-        y_batch = y_batch.clone().detach().type(torch.float32).view(-1, 1)
+        # the int32 inputs (views of the mapped data file) are copied once by the dtype conversion
+        x_int_batch = torch.log(x_int_batch.detach().type(torch.float) + 1)
+        x_cat_batch = x_cat_batch.detach().type(torch.long)
+        y_batch = y_batch.detach().type(torch.float32).view(-1, 1)
     else:
         x_int_batch = torch.log(torch.tensor(x_int_batch, dtype=torch.float) + 1)
         x_cat_batch = torch.tensor(x_cat_batch, dtype=torch.long)
@@ -195,10 +197,22 @@ def _test():
 
 
 class CriteoBinDataset(Dataset):
-    """Binary version of criteo dataset."""
+    """
+    Binary version of criteo dataset.
+
+    The data file is memory mapped and each batch is a view of the mapping, so
+    batches are read without seeks or intermediate copies, and DataLoader workers
+    each map the file instead of sharing a file handle. The pages of the next
+    prefetch_batches batches are requested from the kernel ahead of time.
+
+    With shuffle set, blocks of shuffle_block consecutive batches are visited in
+    a random order (reproducible from seed and the epoch set with set_epoch),
+    which keeps the reads within a block sequential.
+    """
 
     def __init__(self, data_file, counts_file,
-                 batch_size=1, max_ind_range=-1, bytes_per_feature=4):
+                 batch_size=1, max_ind_range=-1, bytes_per_feature=4,
+                 shuffle=False, shuffle_block=1, seed=0, prefetch_batches=4):
         # dataset
         self.tar_fea = 1   # single target
         self.den_fea = 13  # 13 dense  features
@@ -206,11 +220,14 @@ class CriteoBinDataset(Dataset):
         self.tad_fea = self.tar_fea + self.den_fea
         self.tot_fea = self.tad_fea + self.spa_fea
 
+        self.data_file = data_file
         self.batch_size = batch_size
         self.max_ind_range = max_ind_range
+        self.bytes_per_feature = bytes_per_feature
         self.bytes_per_entry = (bytes_per_feature * self.tot_fea * batch_size)
 
         data_file_size = os.path.getsize(data_file)
+        self.data_file_size = data_file_size
         self.num_entries = math.ceil(data_file_size / self.bytes_per_entry)
 
         bytes_per_sample = bytes_per_feature * self.tot_fea
@@ -225,12 +242,11 @@ class CriteoBinDataset(Dataset):
         else:
             self.bytes_last_batch = self.bytes_per_rank
 
-        if self.bytes_last_batch == 0:
+        if self.bytes_last_batch == 0 and self.num_entries > 0:
             self.num_entries = self.num_entries - 1
             self.bytes_last_batch = self.bytes_per_rank
 
         print('data file:', data_file, 'number of batches:', self.num_entries)
-        self.file = open(data_file, 'rb')
 
         with np.load(counts_file) as data:
             self.counts = data["counts"]
@@ -238,18 +254,78 @@ class CriteoBinDataset(Dataset):
         # hardcoded for now
         self.m_den = 13
 
+        self.shuffle = shuffle
+        self.shuffle_block = max(1, shuffle_block)
+        self.seed = seed
+        self.prefetch_batches = prefetch_batches
+        self.set_epoch(0)
+
+        # mapped lazily, so that each process (e.g. DataLoader worker) has its own mapping
+        self._mmap = None
+        self._data = None
+        self._next_prefetch = 0
+
+    def set_epoch(self, epoch):
+        """Sets the epoch, which selects the order of the batches in shuffled mode."""
+        self.epoch = epoch
+        if not self.shuffle:
+            self._order = None
+            return
+        blocks = np.arange(0, self.num_entries, self.shuffle_block)
+        blocks = np.random.RandomState(self.seed + epoch).permutation(blocks)
+        self._order = np.concatenate(
+            [np.arange(b, min(b + self.shuffle_block, self.num_entries)) for b in blocks]
+        ) if len(blocks) else np.zeros(0, dtype=np.int64)
+        self._next_prefetch = 0
+
     def __len__(self):
         return self.num_entries
 
-    def __getitem__(self, idx):
-        my_rank = ext_dist.dist.get_rank() if ext_dist.my_size > 1 else 0
-        rank_size = self.bytes_last_batch if idx == (self.num_entries - 1) else self.bytes_per_rank 
+    def _batch_range(self, idx):
+        """Returns the byte offset and size of this rank's part of batch idx."""
+        rank_size = self.bytes_last_batch if idx == (self.num_entries - 1) else self.bytes_per_rank
+        offset = idx * self.bytes_per_entry
         if ext_dist.my_size > 1:
-            self.file.seek(idx * self.bytes_per_entry + rank_size * my_rank, 0)
-        else:
-            self.file.seek(idx * self.bytes_per_entry, 0)
-        raw_data = self.file.read(rank_size)
-        array = np.frombuffer(raw_data, dtype=np.int32)
+            offset += rank_size * ext_dist.dist.get_rank()
+        return offset, min(rank_size, max(self.data_file_size - offset, 0))
+
+    def _prefetch(self, position):
+        """Asks the kernel to read ahead the batches that follow position."""
+        if self.prefetch_batches <= 0 or self._mmap is None or not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        if position < self._next_prefetch - self.prefetch_batches - 1:
+            # restarted from an earlier batch, e.g. a new epoch
+            self._next_prefetch = 0
+        first = max(position + 1, self._next_prefetch)
+        last = min(position + 1 + self.prefetch_batches, self.num_entries)
+        for next_position in range(first, last):
+            idx = self._order[next_position] if self._order is not None else next_position
+            offset, size = self._batch_range(idx)
+            start = offset - offset % mmap.PAGESIZE
+            if size > 0:
+                self._mmap.madvise(mmap.MADV_WILLNEED, start, size + offset - start)
+        self._next_prefetch = max(self._next_prefetch, last)
+
+    def __getitem__(self, idx):
+        if self._data is None:
+            if self.data_file_size == 0:
+                # an empty file can't be mapped
+                self._data = np.zeros(0, dtype=np.int32)
+            else:
+                with open(self.data_file, 'rb') as f:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                if not self.shuffle and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+                self._data = np.frombuffer(self._mmap, dtype=np.int32)
+
+        position = idx
+        if self._order is not None:
+            idx = self._order[idx]
+        offset, size = self._batch_range(idx)
+        self._prefetch(position)
+
+        itemsize = self._data.itemsize
+        array = self._data[offset // itemsize:(offset + size) // itemsize]
         tensor = torch.from_numpy(array).view((-1, self.tot_fea))
 
         return _transform_features(x_int_batch=tensor[:, 1:14],
@@ -258,8 +334,21 @@ class CriteoBinDataset(Dataset):
                                    max_ind_range=self.max_ind_range,
                                    flag_input_torch_tensor=True)
 
+    def __getstate__(self):
+        # the mapping is not pickled, workers map the file themselves
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        state["_data"] = None
+        return state
+
     def __del__(self):
-        self.file.close()
+        self._data = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # a batch still references the mapping, which is closed when it is freed
+                pass
 
 
 def numpy_to_binary(input_files, output_file_path, split='train'):
@@ -40,7 +40,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import sys
 # import os
 from os import path
-from multiprocessing import Process, Manager
+from multiprocessing import cpu_count, get_all_start_methods, get_context
 # import io
 # from io import StringIO
 # import collections as coll
@@ -109,6 +109,254 @@ def convertUStringToDistinctIntsUnique(mat, mat_uni, counts):
     return out, mat_uni, counts
 
 
+# raw data layout: target, 13 integer and 26 hexadecimal categorical features
+NUM_INT_FEA = 13
+NUM_CAT_FEA = 26
+NUM_FIELDS = 1 + NUM_INT_FEA + NUM_CAT_FEA
+# bytes of raw text parsed at a time
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# value of each ascii byte as a hexadecimal digit (-1 if it is not a digit)
+_HEX_DIGITS = np.full(256, -1, dtype=np.int64)
+_HEX_DIGITS[ord("0"):ord("9") + 1] = np.arange(10)
+_HEX_DIGITS[ord("a"):ord("f") + 1] = np.arange(10, 16)
+_HEX_DIGITS[ord("A"):ord("F") + 1] = np.arange(10, 16)
+_DEC_DIGITS = np.where(_HEX_DIGITS < 10, _HEX_DIGITS, -1)
+
+
+def countLines(datafile):
+    # Counts the lines of a text file (including a last line without a
+    # newline) reading it in large binary blocks.
+    count = 0
+    last = b"\n"
+    with open(str(datafile), "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+            count += block.count(b"\n")
+            last = block[-1:]
+    return count + (last != b"\n")
+
+
+def _parseDigits(buf, starts, ends, base, digit_values):
+    # Parses the unsigned numbers buf[starts:ends] in the given base, one digit
+    # position at a time for all fields, with empty fields parsed as 0.
+    lengths = ends - starts
+    out = np.zeros(starts.shape, dtype=np.int64)
+    last = len(buf) - 1
+    for k in range(int(lengths.max()) if lengths.size else 0):
+        present = k < lengths
+        digits = digit_values[buf[np.minimum(starts + k, last)]]
+        if np.any(present & (digits < 0)):
+            raise ValueError("invalid number in the raw data")
+        out = np.where(present, out * base + digits, out)
+    return out
+
+
+def _parseIntFields(buf, starts, ends):
+    # Parses signed decimal fields, as int() would.
+    negative = (ends > starts) & (buf[np.minimum(starts, len(buf) - 1)] == ord("-"))
+    out = _parseDigits(buf, starts + negative, ends, 10, _DEC_DIGITS)
+    return np.where(negative, -out, out)
+
+
+def _parseHexFields(buf, starts, ends, max_ind_range=-1):
+    # Parses hexadecimal fields, as int(x, 16) % max_ind_range would (without
+    # the modulo if max_ind_range is not positive), into int32 values. Values
+    # that don't fit in int32 wrap around.
+    wide = (ends - starts) > 15
+    out = _parseDigits(buf, starts, np.where(wide, starts, ends), 16, _HEX_DIGITS)
+    if max_ind_range > 0:
+        out %= max_ind_range
+    # values that don't fit in int64 are parsed with python integers
+    for index in zip(*np.nonzero(wide)):
+        value = int(bytes(buf[starts[index]:ends[index]]), 16)
+        if max_ind_range > 0:
+            value %= max_ind_range
+        out[index] = (value + 2**31) % 2**32 - 2**31
+    return out.astype(np.int32)
+
+
+def parseCriteoLines(block, max_ind_range=-1):
+    # Parses a block of complete lines of the raw data into numpy arrays,
+    # locating the fields and converting their digits with vectorized numpy
+    # operations instead of splitting each line in python.
+    #
+    # Inputs:
+    #   block (bytes): lines of tab separated fields
+    #   max_ind_range (int): if positive, categorical values are taken modulo max_ind_range
+    #
+    # Outputs:
+    #   y (np.array): int32 targets
+    #   X_int (np.array): int32 integer features, n x 13
+    #   X_cat (np.array): int32 categorical features, n x 26
+    if b"\r" in block:
+        block = block.replace(b"\r", b"")
+    if not block.endswith(b"\n"):
+        block += b"\n"
+    buf = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero((buf == ord("\t")) | (buf == ord("\n")))
+    n = block.count(b"\n")
+    if len(ends) != n * NUM_FIELDS or np.any(buf[ends[NUM_FIELDS - 1::NUM_FIELDS]] != ord("\n")):
+        raise ValueError(
+            "expected %d tab separated fields per line" % NUM_FIELDS
+        )
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    starts = starts.reshape(n, NUM_FIELDS)
+    ends = ends.reshape(n, NUM_FIELDS)
+
+    # missing values are interpreted as 0
+    ints = _parseIntFields(buf, starts[:, :1 + NUM_INT_FEA], ends[:, :1 + NUM_INT_FEA])
+    y = ints[:, 0].astype(np.int32)
+    X_int = ints[:, 1:].astype(np.int32)
+    X_cat = _parseHexFields(
+        buf, starts[:, 1 + NUM_INT_FEA:], ends[:, 1 + NUM_INT_FEA:], max_ind_range
+    )
+    return y, X_int, X_cat
+
+
+def iterCriteoBlocks(datfile, chunk_bytes=CHUNK_BYTES):
+    # Yields blocks of about chunk_bytes bytes of complete lines of a raw data file.
+    with open(str(datfile), "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                return
+            if not block.endswith(b"\n"):
+                block += f.readline()
+            yield block
+
+
+def uniqueInOrder(x):
+    # Returns the distinct values of x in order of first occurrence, which is
+    # the order in which the feature dictionaries assign ids.
+    uni, first = np.unique(x, return_index=True)
+    return uni[np.argsort(first, kind="stable")]
+
+
+def sortedDict(unique):
+    # Returns the (sorted values, ids) lookup table of a feature dictionary,
+    # where the id of a value is its index in the unique array.
+    ids = np.argsort(unique, kind="stable")
+    return unique[ids], ids
+
+
+def mapToIds(x, convertDict):
+    # Maps each value of x to its id, using a sortedDict lookup table.
+    sorted_unique, ids = convertDict
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.int64)
+    pos = np.searchsorted(sorted_unique, x)
+    pos[pos == len(sorted_unique)] = 0
+    if len(sorted_unique) == 0 or np.any(sorted_unique[pos] != x):
+        raise KeyError("categorical value missing from the feature dictionary")
+    return ids[pos]
+
+
+def processCriteoDay(
+        datfile,
+        npzfile,
+        split,
+        num_data_in_split,
+        sub_sample_rate=0.0,
+        max_ind_range=-1,
+        chunk_bytes=CHUNK_BYTES,
+):
+    # Parses the raw data of one day (or split) into {kaggle|terabyte}_day_i.npz,
+    # parsing chunk_bytes of text at a time with numpy.
+    #
+    # Outputs:
+    #   i (int): number of samples kept after sub-sampling
+    #   unique (list): distinct categorical values of each feature, in order of first occurrence
+    y = np.zeros(num_data_in_split, dtype="i4")  # 4 byte int
+    X_int = np.zeros((num_data_in_split, NUM_INT_FEA), dtype="i4")  # 4 byte int
+    X_cat = np.zeros((num_data_in_split, NUM_CAT_FEA), dtype="i4")  # 4 byte int
+    if sub_sample_rate != 0.0:
+        rand_u = np.random.uniform(low=0.0, high=1.0, size=num_data_in_split)
+
+    i = 0
+    k = 0
+    for block in iterCriteoBlocks(datfile, chunk_bytes):
+        y_b, X_int_b, X_cat_b = parseCriteoLines(block, max_ind_range)
+        n = len(y_b)
+        # sub-sample data by dropping zero targets, if needed
+        if sub_sample_rate != 0.0:
+            keep = (y_b != 0) | (rand_u[k:k + n] >= sub_sample_rate)
+            y_b, X_int_b, X_cat_b = y_b[keep], X_int_b[keep], X_cat_b[keep]
+        k += n
+        m = len(y_b)
+        y[i:i + m] = y_b
+        X_int[i:i + m] = X_int_b
+        X_cat[i:i + m] = X_cat_b
+        i += m
+        print("Load %d/%d  Split: %d" % (k, num_data_in_split, split), end="\r")
+
+    # store num_data_in_split samples or extras at the end of file
+    filename_s = npzfile + "_{0}.npz".format(split)
+    if path.exists(filename_s):
+        print("\nSkip existing " + filename_s)
+    else:
+        np.savez_compressed(
+            filename_s,
+            X_int=X_int[0:i, :],
+            # X_cat=X_cat[0:i, :],
+            X_cat_t=np.transpose(X_cat[0:i, :]),  # transpose of the data
+            y=y[0:i],
+        )
+        print("\nSaved " + npzfile + "_{0}.npz!".format(split))
+
+    unique = [uniqueInOrder(X_cat[0:i, j]) for j in range(NUM_CAT_FEA)]
+    return i, unique
+
+
+def mergeUniqueInOrder(uniques):
+    # Merges the per day outputs of uniqueInOrder, in day order.
+    return [
+        uniqueInOrder(np.concatenate([day[j] for day in uniques]))
+        for j in range(NUM_CAT_FEA)
+    ]
+
+
+# arguments of runPerDay, inherited by the forked workers instead of being
+# pickled, since they can include the (large) feature dictionaries
+_per_day_args = None
+
+
+def _setPerDayArgs(args_list):
+    global _per_day_args
+    _per_day_args = args_list
+
+
+def _runDay(function, day):
+    return function(*_per_day_args[day])
+
+
+def runPerDay(function, args_list, multiprocessing):
+    # Runs function on each tuple of arguments, in parallel over the available
+    # cores if multiprocessing is set. Each call gets a fresh worker process, so
+    # that days see the same random state as when run one process per day.
+    # The workers are forked, whatever the default start method, so that they
+    # inherit the arguments. Where fork is not available, the arguments are
+    # pickled to each worker by the pool initializer.
+    if not multiprocessing or len(args_list) <= 1:
+        return [function(*args) for args in args_list]
+    processes = min(len(args_list), cpu_count())
+    if "fork" in get_all_start_methods():
+        context = get_context("fork")
+        pool_args = {}
+        _setPerDayArgs(args_list)
+    else:
+        context = get_context()
+        pool_args = {"initializer": _setPerDayArgs, "initargs": (args_list,)}
+    try:
+        with context.Pool(processes=processes, maxtasksperchild=1, **pool_args) as pool:
+            return pool.starmap(
+                _runDay, [(function, day) for day in range(len(args_list))], chunksize=1
+            )
+    finally:
+        _setPerDayArgs(None)
+
+
 def processCriteoAdData(d_path, d_file, npzfile, i, convertDicts, pre_comp_counts):
     # Process Kaggle Display Advertising Challenge or Terabyte Dataset
     # by converting unicode strings in X_cat to integers and
@@ -142,10 +390,10 @@ def processCriteoAdData(d_path, d_file, npzfile, i, convertDicts, pre_comp_count
             )
             '''
             # Approach 2a: using pre-computed dictionaries
+            # (convertDicts[j] is the sortedDict lookup table of feature j)
             X_cat_t = np.zeros(data["X_cat_t"].shape)
             for j in range(26):
-                for k, x in enumerate(data["X_cat_t"][j, :]):
-                    X_cat_t[j, k] = convertDicts[j][x]
+                X_cat_t[j, :] = mapToIds(data["X_cat_t"][j, :], convertDicts[j])
             # continuous features
             X_int = data["X_int"]
             X_int[X_int < 0] = 0
@@ -919,9 +1167,7 @@ def getCriteoAdData(
             # missing and will be interpreted as 0).
             if path.exists(datafile):
                 print("Reading data from path=%s" % (datafile))
-                with open(str(datafile)) as f:
-                    for _ in f:
-                        total_count += 1
+                total_count = countLines(datafile)
                 total_per_file.append(total_count)
                 # reset total per file due to split
                 num_data_per_split, extras = divmod(total_count, days)
@@ -953,132 +1199,14 @@ def getCriteoAdData(
                 if path.exists(str(datafile_i)):
                     print("Reading data from path=%s" % (str(datafile_i)))
                     # file day_<number>
-                    total_per_file_count = 0
-                    with open(str(datafile_i)) as f:
-                        for _ in f:
-                            total_per_file_count += 1
+                    total_per_file_count = countLines(datafile_i)
                     total_per_file.append(total_per_file_count)
                     total_count += total_per_file_count
                 else:
                     sys.exit("ERROR: Criteo Terabyte Dataset path is invalid; please download from https://labs.criteo.com/2013/12/download-terabyte-click-logs")
 
-    # process a file worth of data and reinitialize data
-    # note that a file main contain a single or multiple splits
-    def process_one_file(
-            datfile,
-            npzfile,
-            split,
-            num_data_in_split,
-            dataset_multiprocessing,
-            convertDictsDay=None,
-            resultDay=None
-    ):
-        if dataset_multiprocessing:
-            convertDicts_day = [{} for _ in range(26)]
-
-        with open(str(datfile)) as f:
-            y = np.zeros(num_data_in_split, dtype="i4")  # 4 byte int
-            X_int = np.zeros((num_data_in_split, 13), dtype="i4")  # 4 byte int
-            X_cat = np.zeros((num_data_in_split, 26), dtype="i4")  # 4 byte int
-            if sub_sample_rate == 0.0:
-                rand_u = 1.0
-            else:
-                rand_u = np.random.uniform(low=0.0, high=1.0, size=num_data_in_split)
-
-            i = 0
-            percent = 0
-            for k, line in enumerate(f):
-                # process a line (data point)
-                line = line.split('\t')
-                # set missing values to zero
-                for j in range(len(line)):
-                    if (line[j] == '') or (line[j] == '\n'):
-                        line[j] = '0'
-                # sub-sample data by dropping zero targets, if needed
-                target = np.int32(line[0])
-                if target == 0 and \
-                   (rand_u if sub_sample_rate == 0.0 else rand_u[k]) < sub_sample_rate:
-                    continue
-
-                y[i] = target
-                X_int[i] = np.array(line[1:14], dtype=np.int32)
-                if max_ind_range > 0:
-                    X_cat[i] = np.array(
-                        list(map(lambda x: int(x, 16) % max_ind_range, line[14:])),
-                        dtype=np.int32
-                    )
-                else:
-                    X_cat[i] = np.array(
-                        list(map(lambda x: int(x, 16), line[14:])),
-                        dtype=np.int32
-                    )
-
-                # count uniques
-                if dataset_multiprocessing:
-                    for j in range(26):
-                        convertDicts_day[j][X_cat[i][j]] = 1
-                    # debug prints
-                    if float(i)/num_data_in_split*100 > percent+1:
-                        percent = int(float(i)/num_data_in_split*100)
-                        print(
-                            "Load %d/%d (%d%%) Split: %d  Label True: %d  Stored: %d"
-                            % (
-                                i,
-                                num_data_in_split,
-                                percent,
-                                split,
-                                target,
-                                y[i],
-                            ),
-                            end="\n",
-                        )
-                else:
-                    for j in range(26):
-                        convertDicts[j][X_cat[i][j]] = 1
-                    # debug prints
-                    print(
-                        "Load %d/%d  Split: %d  Label True: %d  Stored: %d"
-                        % (
-                            i,
-                            num_data_in_split,
-                            split,
-                            target,
-                            y[i],
-                        ),
-                        end="\r",
-                    )
-                i += 1
-
-            # store num_data_in_split samples or extras at the end of file
-            # count uniques
-            # X_cat_t  = np.transpose(X_cat)
-            # for j in range(26):
-            #     for x in X_cat_t[j,:]:
-            #         convertDicts[j][x] = 1
-            # store parsed
-            filename_s = npzfile + "_{0}.npz".format(split)
-            if path.exists(filename_s):
-                print("\nSkip existing " + filename_s)
-            else:
-                np.savez_compressed(
-                    filename_s,
-                    X_int=X_int[0:i, :],
-                    # X_cat=X_cat[0:i, :],
-                    X_cat_t=np.transpose(X_cat[0:i, :]),  # transpose of the data
-                    y=y[0:i],
-                )
-                print("\nSaved " + npzfile + "_{0}.npz!".format(split))
-
-        if dataset_multiprocessing:
-            resultDay[split] = i
-            convertDictsDay[split] = convertDicts_day
-            return
-        else:
-            return i
-
     # create all splits (reuse existing files if possible)
     recreate_flag = False
-    convertDicts = [{} for _ in range(26)]
     # WARNING: to get reproducable sub-sampling results you must reset the seed below
     # np.random.seed(123)
     # in this case there is a single split in each day
@@ -1093,40 +1221,23 @@ def getCriteoAdData(
             recreate_flag = True
 
     if recreate_flag:
-        if dataset_multiprocessing:
-            resultDay = Manager().dict()
-            convertDictsDay = Manager().dict()
-            processes = [Process(target=process_one_file,
-                                 name="process_one_file:%i" % i,
-                                 args=(npzfile + "_{0}".format(i),
-                                       npzfile,
-                                       i,
-                                       total_per_file[i],
-                                       dataset_multiprocessing,
-                                       convertDictsDay,
-                                       resultDay,
-                                       )
-                                 ) for i in range(0, days)]
-            for process in processes:
-                process.start()
-            for process in processes:
-                process.join()
-            for day in range(days):
-                total_per_file[day] = resultDay[day]
-                print("Constructing convertDicts Split: {}".format(day))
-                convertDicts_tmp = convertDictsDay[day]
-                for i in range(26):
-                    for j in convertDicts_tmp[i]:
-                        convertDicts[i][j] = 1
-        else:
-            for i in range(days):
-                total_per_file[i] = process_one_file(
-                    npzfile + "_{0}".format(i),
-                    npzfile,
-                    i,
-                    total_per_file[i],
-                    dataset_multiprocessing,
-                )
+        # parse the days (in parallel if dataset_multiprocessing is set) and
+        # collect the distinct values of each feature, in order of first occurrence
+        results = runPerDay(
+            processCriteoDay,
+            [(npzfile + "_{0}".format(i),
+              npzfile,
+              i,
+              total_per_file[i],
+              sub_sample_rate,
+              max_ind_range) for i in range(days)],
+            dataset_multiprocessing,
+        )
+        for day, (num_data, _) in enumerate(results):
+            total_per_file[day] = num_data
+        print("Constructing convertDicts")
+        convertDicts = mergeUniqueInOrder([unique for _, unique in results])
+        del results
 
     # report and save total into a file
     total_count = np.sum(total_per_file)
@@ -1136,17 +1247,16 @@ def getCriteoAdData(
     print("Divided into days/splits:\n", total_per_file)
 
     # dictionary files
+    # (the id of a categorical value is its index in the feature's unique array)
     counts = np.zeros(26, dtype=np.int32)
     if recreate_flag:
         # create dictionaries
         for j in range(26):
-            for i, x in enumerate(convertDicts[j]):
-                convertDicts[j][x] = i
             dict_file_j = d_path + d_file + "_fea_dict_{0}.npz".format(j)
             if not path.exists(dict_file_j):
                 np.savez_compressed(
                     dict_file_j,
-                    unique=np.array(list(convertDicts[j]), dtype=np.int32)
+                    unique=np.array(convertDicts[j], dtype=np.int32)
                 )
             counts[j] = len(convertDicts[j])
         # store (uniques and) counts
@@ -1155,35 +1265,21 @@ def getCriteoAdData(
             np.savez_compressed(count_file, counts=counts)
     else:
         # create dictionaries (from existing files)
+        convertDicts = []
         for j in range(26):
             with np.load(d_path + d_file + "_fea_dict_{0}.npz".format(j)) as data:
-                unique = data["unique"]
-            for i, x in enumerate(unique):
-                convertDicts[j][x] = i
+                convertDicts.append(data["unique"])
         # load (uniques and) counts
         with np.load(d_path + d_file + "_fea_count.npz") as data:
             counts = data["counts"]
 
     # process all splits
-    if dataset_multiprocessing:
-        processes = [Process(target=processCriteoAdData,
-                           name="processCriteoAdData:%i" % i,
-                           args=(d_path,
-                                 d_file,
-                                 npzfile,
-                                 i,
-                                 convertDicts,
-                                 counts,
-                                 )
-                           ) for i in range(0, days)]
-        for process in processes:
-            process.start()
-        for process in processes:
-            process.join()
-
-    else:
-        for i in range(days):
-            processCriteoAdData(d_path, d_file, npzfile, i, convertDicts, counts)
+    convertDicts = [sortedDict(unique) for unique in convertDicts]
+    runPerDay(
+        processCriteoAdData,
+        [(d_path, d_file, npzfile, i, convertDicts, counts) for i in range(days)],
+        dataset_multiprocessing,
+    )
 
     o_file = concatCriteoAdData(
         d_path,
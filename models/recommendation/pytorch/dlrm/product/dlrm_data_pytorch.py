@@ -443,11 +443,13 @@ def make_criteo_data_and_loaders(args, offset_to_length_converter=False):
                                                 counts_file]):
                 ensure_dataset_preprocessed(args, d_path)
 
+            # shuffled batches are permuted by the dataset, which prefetches them in that order
             train_data = data_loader_terabyte.CriteoBinDataset(
                 data_file=train_file,
                 counts_file=counts_file,
                 batch_size=args.mini_batch_size,
-                max_ind_range=args.max_ind_range
+                max_ind_range=args.max_ind_range,
+                shuffle=args.mlperf_bin_shuffle
             )
 
             train_loader = torch.utils.data.DataLoader(
@@ -459,7 +461,6 @@ def make_criteo_data_and_loaders(args, offset_to_length_converter=False):
                 collate_fn=None,
                 pin_memory=False,
                 drop_last=False,
-                sampler=RandomSampler(train_data) if args.mlperf_bin_shuffle else None
             )
 
             test_data = data_loader_terabyte.CriteoBinDataset(
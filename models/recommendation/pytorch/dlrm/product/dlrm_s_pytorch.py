@@ -104,6 +104,10 @@ import extend_distributed as ext_dist
 
 import os
 import psutil
+# BatchPrefetcher is shared with the other DLRM scripts in models/common/pytorch
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, os.pardir, os.pardir, os.pardir, "common", "pytorch"))
+from batch_prefetcher import BatchPrefetcher
 
 exc = getattr(builtins, "IOError", "FileNotFoundError")
 
@@ -137,6 +141,11 @@ def unpack_batch(b):
     # Experiment with unweighted samples
     return b[0], b[1], b[2], b[3], torch.ones(b[3].size()), None
 
+def unpack_test_data(b):
+    # inputs of distributed_forward_2iter_overlap
+    X, lS_o, lS_i, T, _, _ = unpack_batch(b)
+    return {'dense_x': X, 'T_test': T, 'lS_i': lS_i, 'lS_o': lS_o}
+
 def load_data(buffer_num, is_bf16):
     reset = False
     with torch.autograd.profiler.record_function('load_data'):
@@ -147,6 +156,8 @@ def load_data(buffer_num, is_bf16):
             except:
                 print("epoch ended, reset data_iter")
                 reset = True
+                if hasattr(train_ld.dataset, "set_epoch"):
+                    train_ld.dataset.set_epoch(train_ld.dataset.epoch + 1)
                 data_iter._reset(train_ld)
                 Batch = next(data_iter)
             X, lS_o, lS_i, T, W, CBPP = unpack_batch(Batch)
@@ -956,58 +967,36 @@ def inference(
         run_throughput_benchmark(args, dlrm, test_ld)
     with torch.cpu.amp.autocast(enabled=args.bf16):
         if ext_dist.my_size > 1:
-            i = 0
             n_test_iter = 2     # exec 2 iter per validation
             cur_data = [dict() for _ in range(n_test_iter)]
             next_data = [dict() for _ in range(n_test_iter)]
             n = nbatches_test // n_test_iter
             batch_remainder = nbatches_test % n_test_iter
-            
+
+            # the batches are decoded in the background while the current
+            # and the next 2 iter run
+            prefetcher = BatchPrefetcher(
+                test_ld.dataset,
+                depth=args.test_prefetch_depth,
+                indices=range(nbatches_test),
+                transform=unpack_test_data,
+            )
+            test_iter = iter(prefetcher)
+
+            i = 0
             while i < n:
                 # load 2 iter
                 if i == 0:
-                    cur_batch_0 = test_ld.dataset[i]
-                    cur_batch_1 = test_ld.dataset[i + 1]
-
-                    X_test0, lS_o_test0, lS_i_test0, T_test0, _, _ = unpack_batch(
-                        cur_batch_0
-                    )
-                    X_test1, lS_o_test1, lS_i_test1, T_test1, _, _ = unpack_batch(
-                        cur_batch_1
-                    )
-                    cur_data[0]['dense_x'] = X_test0
-                    cur_data[0]['T_test'] = T_test0
-                    cur_data[0]['lS_i'] = lS_i_test0
-                    cur_data[0]['lS_o'] = lS_o_test0
-
-                    cur_data[1]['dense_x'] = X_test1
-                    cur_data[1]['T_test'] = T_test1
-                    cur_data[1]['lS_i'] = lS_i_test1
-                    cur_data[1]['lS_o'] = lS_o_test1
+                    for j in range(n_test_iter):
+                        cur_data[j] = next(test_iter)
                 else:
                     for j in range(n_test_iter):
                         cur_data[j] = next_data[j]
                 # preload 2 iter
                 if i + 1 < n:
-                    next_batch_0 = test_ld.dataset[(i+1)*n_test_iter]
-                    next_batch_1 = test_ld.dataset[(i+1)*n_test_iter + 1]
-
-                    X_test0, lS_o_test0, lS_i_test0, T_test0, _, _ = unpack_batch(
-                        next_batch_0
-                    )
-                    X_test1, lS_o_test1, lS_i_test1, T_test1, _, _ = unpack_batch(
-                        next_batch_1
-                    )
-                    next_data[0] = {'dense_x': X_test0, 'T_test': T_test0, 'lS_i': lS_i_test0, 'lS_o': lS_o_test0}
-
-                    next_data[1] = {'dense_x': X_test1, 'T_test': T_test1, 'lS_i': lS_i_test1, 'lS_o': lS_o_test1}
+                    next_data = [next(test_iter) for _ in range(n_test_iter)]
                 elif batch_remainder == 1:
-                    next_batch_0 = test_ld.dataset[len(test_ld) - 1]
-                    X_test0, lS_o_test0, lS_i_test0, T_test0, _, _ = unpack_batch(
-                        next_batch_0
-                    )
-                    next_data[0] = {'dense_x': X_test0, 'T_test': T_test0, 'lS_i': lS_i_test0, 'lS_o': lS_o_test0}
-                    next_data[1] = None
+                    next_data = [next(test_iter), None]
 
                 res_pack = dlrm.distributed_forward_2iter_overlap(cur_data, next_data)
                 if i == n - 1:
@@ -1022,19 +1011,32 @@ def inference(
                             targets.append(T_test)
                     if i == n - 1:
                         S_test = last_Z_test.detach().cpu().float()  # numpy array
-                        T_test = T_test0.detach().cpu().float()  # numpy array
+                        T_test = next_data[0]['T_test'].detach().cpu().float()  # numpy array
                         scores.append(S_test)
                         targets.append(T_test)
                 i += 1
-            
+            test_iter.close()
+            if args.inference_only:
+                print(
+                    "Finished {} {} it, {:.2f} ms/it data wait".format(
+                        "inference", prefetcher.num_batches,
+                        1000.0 * prefetcher.wait_time / max(prefetcher.num_batches, 1)
+                    ),
+                    flush=True,
+                )
+
         else:
-            for i, testBatch in enumerate(test_ld):
-                should_print = ((i + 1) % args.print_freq == 0 or i + 1 == len(test_ld)) and args.inference_only
+            prefetcher = BatchPrefetcher(
+                test_ld, depth=args.test_prefetch_depth, transform=unpack_batch
+            )
+            for i, testBatch in enumerate(prefetcher):
+                should_print = ((i + 1) % args.print_freq == 0 or i + 1 == len(prefetcher)) and args.inference_only
                 if should_print:
                     gT = 1000.0 * total_time / total_iter
+                    gW = 1000.0 * prefetcher.reset_wait_per_batch()
                     print(
-                        "Finished {} it {}/{}, {:.2f} ms/it,".format(
-                            "inference", i + 1, len(test_ld), gT
+                        "Finished {} it {}/{}, {:.2f} ms/it, {:.2f} ms/it data wait,".format(
+                            "inference", i + 1, len(prefetcher), gT, gW
                         ),
                         flush=True,
                     )
@@ -1044,9 +1046,8 @@ def inference(
                 if args.inference_only and nbatches > 0 and i >= nbatches:
                     break
 
-                X_test, lS_o_test, lS_i_test, T_test, W_test, CBPP_test = unpack_batch(
-                    testBatch
-                )
+                # already unpacked by the prefetcher
+                X_test, lS_o_test, lS_i_test, T_test, W_test, CBPP_test = testBatch
 
                 # forward pass
                 start = time_wrap()
@@ -1216,6 +1217,7 @@ def run():
     parser.add_argument("--print-freq", type=int, default=1)
     parser.add_argument("--test-freq", type=int, default=6400)
     parser.add_argument("--test-mini-batch-size", type=int, default=-1)
+    parser.add_argument("--test-prefetch-depth", type=int, default=2)
     parser.add_argument("--print-time", action="store_true", default=False)
     parser.add_argument("--print-wall-time", action="store_true", default=False)
     parser.add_argument("--enable-profiling", action="store_true", default=False)
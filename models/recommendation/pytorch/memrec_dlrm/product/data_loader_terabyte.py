@@ -261,7 +261,6 @@ class CriteoBinDataset(Dataset):
     def __del__(self):
         self.file.close()
 
-
 def numpy_to_binary(input_files, output_file_path, split='train'):
     """Convert the data to a binary format to be read with CriteoBinDataset."""
 
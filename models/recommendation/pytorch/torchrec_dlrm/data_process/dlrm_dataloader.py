@@ -55,6 +55,15 @@ except ImportError:
 STAGES = ["train", "val", "test"]
 
 
+def _collate_batch(batch):
+    """
+    Returns the batch of the datapipe, which is already collated. Unlike a
+    lambda, this can be pickled to the DataLoader workers with the spawn start
+    method.
+    """
+    return batch
+
+
 def _get_random_dataloader(
     args: argparse.Namespace,
     stage: str,
@@ -97,6 +106,12 @@ def _get_in_memory_dataloader(
         dir_path = args.synthetic_multi_hot_criteo_path
         sparse_part = "sparse_multi_hot.npz"
         datapipe = MultiHotCriteoIterDataPipe
+    # only MultiHotCriteoIterDataPipe splits its batches between DataLoader workers
+    num_workers = (
+        getattr(args, "dataloader_num_workers", 0)
+        if args.in_memory_binary_criteo_path is None
+        else 0
+    )
 
     if stage == "train":
         stage_files: List[List[str]] = [
@@ -119,8 +134,10 @@ def _get_in_memory_dataloader(
             stage,
             *stage_files,  # pyre-ignore[6]
             batch_size=batch_size,
-            rank=0, #  dist.get_rank(),
-            world_size=1, #  dist.get_world_size(),
+            # every rank reads the global batch, which is split between the
+            # ranks by split_dense_input_and_label_for_ranks in dlrm_main
+            rank=0,
+            world_size=1,
             drop_last=args.drop_last_training_batch if stage == "train" else False,
             shuffle_batches=args.shuffle_batches,
             shuffle_training_set=args.shuffle_training_set,
@@ -132,7 +149,8 @@ def _get_in_memory_dataloader(
         ),
         batch_size=None,
         pin_memory=args.pin_memory,
-        collate_fn=lambda x: x,
+        num_workers=num_workers,
+        collate_fn=_collate_batch,
     )
     return dataloader
 
@@ -23,13 +23,12 @@
 # LICENSE file in the root directory of this source tree.
 
 import zipfile
-from typing import Dict, Iterator, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import torch
 from iopath.common.file_io import PathManager, PathManagerFactory
-from pyre_extensions import none_throws
-from torch.utils.data import IterableDataset
+from torch.utils.data import get_worker_info, IterableDataset
 from torchrec.datasets.criteo import (
     CAT_FEATURE_COUNT,
     DEFAULT_CAT_NAMES,
@@ -43,7 +42,15 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
     Datapipe designed to operate over the MLPerf DLRM v2 synthetic multi-hot dataset.
     This dataset can be created by following the steps in
     torchrec_dlrm/scripts/materialize_synthetic_multihot_dataset.py.
-    Each rank reads only the data for the portion of the dataset it is responsible for.
+    Each rank reads only the data for the portion of the dataset it is responsible for,
+    and when the datapipe is used by a DataLoader with several workers, each worker
+    assembles every num_workers-th batch of the rank.
+
+    Batches are assembled in a ring of num_batch_buffers preallocated buffers, so a
+    batch is overwritten num_batch_buffers batches later. The dense features and
+    labels of a batch that lies within a single file are views of the file arrays,
+    but those of a batch that spans files are in the ring, so consumers that keep
+    tensors of a batch for longer (e.g. the labels of an evaluation) must clone them.
 
     Args:
         stage (str): "train", "val", or "test".
@@ -62,6 +69,7 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
             Length of this list should be CAT_FEATURE_COUNT.
         path_manager_key (str): Path manager key used to load from different
             filesystems.
+        num_batch_buffers (int): Number of reused batch buffers.
 
     Example::
 
@@ -92,6 +100,7 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
         mmap_mode: bool = False,
         hashes: Optional[List[int]] = None,
         path_manager_key: str = PATH_MANAGER_KEY,
+        num_batch_buffers: int = 3,
     ) -> None:
         self.stage = stage
         self.dense_paths = dense_paths
@@ -110,12 +119,14 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
         self.hashes: np.ndarray = np.array(hashes).reshape((CAT_FEATURE_COUNT, 1))
         self.path_manager_key = path_manager_key
         self.path_manager: PathManager = PathManagerFactory().get(path_manager_key)
+        self.num_batch_buffers = max(1, num_batch_buffers)
 
         if shuffle_training_set and stage == "train":
             # Currently not implemented for the materialized multi-hot dataset.
             self._shuffle_and_load_data_for_rank()
         else:
-            m = "r" if mmap_mode else None
+            # copy-on-write, so that batches can be views of the arrays
+            m = "c" if mmap_mode else None
             self.dense_arrs: List[np.ndarray] = [
                 np.load(f, mmap_mode=m) for f in self.dense_paths
             ]
@@ -156,6 +167,7 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
         #         ]
 
         self.num_rows_per_file: List[int] = list(map(len, self.dense_arrs))
+        self.file_row_starts: np.ndarray = np.cumsum([0] + self.num_rows_per_file)
         total_rows = sum(self.num_rows_per_file)
         self.num_full_batches: int = (
             total_rows // batch_size // self.world_size * self.world_size
@@ -183,6 +195,9 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
         self.index_per_key: Dict[str, int] = {
             key: i for (i, key) in enumerate(self.keys)
         }
+        # start of each feature in the values, in units of batch_size
+        self.feature_starts: List[int] = np.cumsum([0] + self.multi_hot_sizes).tolist()
+        self._kjt_metadata: Dict[int, Tuple] = {}
 
     def _load_from_npz(self, fname, npy_name):
         # figure out offset of .npy in .npz
@@ -208,33 +223,36 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
             offset=offset,
         )
 
-    def _np_arrays_to_batch(
+    def _get_kjt_metadata(self, batch_size: int) -> Tuple:
+        """Returns the lengths, offsets, length_per_key and offset_per_key of a batch size."""
+        if batch_size not in self._kjt_metadata:
+            lengths = torch.ones((CAT_FEATURE_COUNT * batch_size), dtype=torch.int32)
+            for k, multi_hot_size in enumerate(self.multi_hot_sizes):
+                lengths[k * batch_size : (k + 1) * batch_size] = multi_hot_size
+            offsets = torch.cumsum(torch.concat((torch.tensor([0]), lengths)), dim=0)
+            length_per_key = [
+                batch_size * multi_hot_size for multi_hot_size in self.multi_hot_sizes
+            ]
+            offset_per_key = torch.cumsum(
+                torch.concat((torch.tensor([0]), torch.tensor(length_per_key))), dim=0
+            )
+            self._kjt_metadata[batch_size] = (
+                lengths, offsets, length_per_key, offset_per_key.tolist()
+            )
+        return self._kjt_metadata[batch_size]
+
+    def _make_batch(
         self,
-        dense: np.ndarray,
-        sparse: List[np.ndarray],
-        labels: np.ndarray,
+        dense: torch.Tensor,
+        values: torch.Tensor,
+        labels: torch.Tensor,
     ) -> Batch:
-        if self.shuffle_batches:
-            # Shuffle all 3 in unison
-            shuffler = np.random.permutation(len(dense))
-            sparse = [multi_hot_ft[shuffler, :] for multi_hot_ft in sparse]
-            dense = dense[shuffler]
-            labels = labels[shuffler]
-
         batch_size = len(dense)
-        lengths = torch.ones((CAT_FEATURE_COUNT * batch_size), dtype=torch.int32)
-        for k, multi_hot_size in enumerate(self.multi_hot_sizes):
-            lengths[k * batch_size : (k + 1) * batch_size] = multi_hot_size
-        offsets = torch.cumsum(torch.concat((torch.tensor([0]), lengths)), dim=0)
-        length_per_key = [
-            batch_size * multi_hot_size for multi_hot_size in self.multi_hot_sizes
-        ]
-        offset_per_key = torch.cumsum(
-            torch.concat((torch.tensor([0]), torch.tensor(length_per_key))), dim=0
+        lengths, offsets, length_per_key, offset_per_key = self._get_kjt_metadata(
+            batch_size
         )
-        values = torch.concat([torch.from_numpy(feat.copy()).flatten() for feat in sparse])
         return Batch(
-            dense_features=torch.from_numpy(dense.copy()),
+            dense_features=dense,
             sparse_features=KeyedJaggedTensor(
                 keys=self.keys,
                 values=values,
@@ -242,87 +260,132 @@ class MultiHotCriteoIterDataPipe(IterableDataset):
                 offsets=offsets,
                 stride=batch_size,
                 length_per_key=length_per_key,
-                offset_per_key=offset_per_key.tolist(),
+                offset_per_key=offset_per_key,
                 index_per_key=self.index_per_key,
             ),
-            labels=torch.from_numpy(labels.reshape(-1).copy()),
+            labels=labels.reshape(-1),
         )
 
-    def __iter__(self) -> Iterator[Batch]:
-        # Invariant: buffer never contains more than batch_size rows.
-        buffer: Optional[List[np.ndarray]] = None
+    def _np_arrays_to_batch(
+        self,
+        dense: np.ndarray,
+        sparse: List[np.ndarray],
+        labels: np.ndarray,
+    ) -> Batch:
+        if self.shuffle_batches:
+            # Shuffle all 3 in unison
+            shuffler = np.random.permutation(len(dense))
+            sparse = [multi_hot_ft[shuffler, :] for multi_hot_ft in sparse]
+            dense = dense[shuffler]
+            labels = labels[shuffler]
 
-        def append_to_buffer(
-            dense: np.ndarray,
-            sparse: List[np.ndarray],
-            labels: np.ndarray,
-        ) -> None:
-            nonlocal buffer
-            if buffer is None:
-                buffer = [dense, sparse, labels]
-            else:
-                buffer[0] = np.concatenate((buffer[0], dense))
-                buffer[1] = [np.concatenate((b, s)) for b, s in zip(buffer[1], sparse)]
-                buffer[2] = np.concatenate((buffer[2], labels))
+        values = torch.concat([torch.from_numpy(feat.copy()).flatten() for feat in sparse])
+        return self._make_batch(
+            torch.from_numpy(dense.copy()), values, torch.from_numpy(labels.copy())
+        )
 
-        # Maintain a buffer that can contain up to batch_size rows. Fill buffer as
-        # much as possible on each iteration. Only return a new batch when batch_size
-        # rows are filled.
-        file_idx = 0
-        row_idx = 0
-        batch_idx = 0
-        buffer_row_count = 0
-        cur_batch_size = (
-            self.batch_size if self.num_full_batches > 0 else self.last_batch_sizes[0]
+    def _get_batch_rows(self, batch_idx: int) -> Tuple[int, int]:
+        """Returns the first row and the number of rows of a batch."""
+        if batch_idx < self.num_full_batches:
+            return batch_idx * self.batch_size, self.batch_size
+        last_idx = batch_idx - self.num_full_batches
+        start = self.num_full_batches * self.batch_size + int(
+            self.last_batch_sizes[:last_idx].sum()
         )
-        while (
-            batch_idx
-            < self.num_full_batches + (self.last_batch_sizes[0] > 0) * self.world_size
-        ):
-            if buffer_row_count == cur_batch_size or file_idx == len(self.dense_arrs):
-                if batch_idx % self.world_size == self.rank:
-                    yield self._np_arrays_to_batch(*none_throws(buffer))
-                    buffer = None
-                buffer_row_count = 0
-                batch_idx += 1
-                if (
-                    0 <= batch_idx - self.num_full_batches < self.world_size
-                    and (self.last_batch_sizes[0] > 0)
-                ):
-                    cur_batch_size = self.last_batch_sizes[
-                        batch_idx - self.num_full_batches
-                    ]
-            else:
-                rows_to_get = min(
-                    cur_batch_size - buffer_row_count,
-                    self.num_rows_per_file[file_idx] - row_idx,
-                )
-                buffer_row_count += rows_to_get
-                slice_ = slice(row_idx, row_idx + rows_to_get)
+        return start, int(self.last_batch_sizes[last_idx])
 
-                if batch_idx % self.world_size == self.rank:
-                    dense_inputs = self.dense_arrs[file_idx][slice_, :]
-                    sparse_inputs = [
-                        feats[slice_, :] for feats in self.sparse_arrs[file_idx]
-                    ]
-                    target_labels = self.labels_arrs[file_idx][slice_, :]
+    def _get_segments(self, start: int, num_rows: int) -> List[Tuple[int, slice]]:
+        """Returns the (file index, row slice) of each file that the rows span."""
+        segments = []
+        file_idx = int(np.searchsorted(self.file_row_starts, start, side="right")) - 1
+        while num_rows > 0 and file_idx < len(self.dense_arrs):
+            row_idx = start - self.file_row_starts[file_idx]
+            rows_to_get = min(num_rows, self.num_rows_per_file[file_idx] - row_idx)
+            if rows_to_get > 0:
+                segments.append((file_idx, slice(row_idx, row_idx + rows_to_get)))
+                start += rows_to_get
+                num_rows -= rows_to_get
+            file_idx += 1
+        return segments
 
-                    # if self.mmap_mode and self.hashes is not None:
-                    #     sparse_inputs = [
-                    #         feats % hash
-                    #         for (feats, hash) in zip(sparse_inputs, self.hashes)
-                    #     ]
+    def _new_batch_buffer(self) -> Dict[str, np.ndarray]:
+        # the last batches can have one more row than batch_size
+        num_rows = max(self.batch_size, int(self.last_batch_sizes.max()))
+        return {
+            "dense": np.empty(
+                (num_rows,) + self.dense_arrs[0].shape[1:],
+                dtype=self.dense_arrs[0].dtype,
+            ),
+            "labels": np.empty(
+                (num_rows,) + self.labels_arrs[0].shape[1:],
+                dtype=self.labels_arrs[0].dtype,
+            ),
+            "values": np.empty(
+                num_rows * self.feature_starts[-1],
+                dtype=self.sparse_arrs[0][0].dtype,
+            ),
+        }
 
-                    append_to_buffer(
-                        dense_inputs,
-                        sparse_inputs,
-                        target_labels,
-                    )
-                row_idx += rows_to_get
+    def _assemble_batch(
+        self, start: int, num_rows: int, buffer: Dict[str, np.ndarray]
+    ) -> Batch:
+        """Writes the rows of a batch into the buffer, and returns the batch."""
+        segments = self._get_segments(start, num_rows)
+        # the batch might be smaller than the buffer, e.g. the last batch
+        num_rows = sum(slice_.stop - slice_.start for _, slice_ in segments)
+        if len(segments) == 1:
+            file_idx, slice_ = segments[0]
+            dense = self.dense_arrs[file_idx][slice_]
+            labels = self.labels_arrs[file_idx][slice_]
+        else:
+            dense = buffer["dense"][:num_rows]
+            labels = buffer["labels"][:num_rows]
+        values = buffer["values"][: num_rows * self.feature_starts[-1]]
+        row = 0
+        for file_idx, slice_ in segments:
+            rows = slice(row, row + slice_.stop - slice_.start)
+            if len(segments) > 1:
+                dense[rows] = self.dense_arrs[file_idx][slice_]
+                labels[rows] = self.labels_arrs[file_idx][slice_]
+            for k, feats in enumerate(self.sparse_arrs[file_idx]):
+                feature_values = values[
+                    num_rows * self.feature_starts[k] : num_rows * self.feature_starts[k + 1]
+                ].reshape(num_rows, -1)
+                feature_values[rows] = feats[slice_]
+            row = rows.stop
+
+        if self.shuffle_batches:
+            # Shuffle all 3 in unison
+            shuffler = np.random.permutation(num_rows)
+            dense = dense[shuffler]
+            labels = labels[shuffler]
+            for k in range(CAT_FEATURE_COUNT):
+                feature_values = values[
+                    num_rows * self.feature_starts[k] : num_rows * self.feature_starts[k + 1]
+                ].reshape(num_rows, -1)
+                feature_values[:] = feature_values[shuffler]
+
+        return self._make_batch(
+            torch.from_numpy(dense), torch.from_numpy(values), torch.from_numpy(labels)
+        )
+
+    def __iter__(self) -> Iterator[Batch]:
+        # Batches are assigned round-robin to ranks, and the batches of a rank
+        # round-robin to the DataLoader workers, which the DataLoader reads from in
+        # the same order, so the order of the batches doesn't depend on the workers.
+        worker_info = get_worker_info()
+        worker_id, num_workers = (
+            (worker_info.id, worker_info.num_workers) if worker_info else (0, 1)
+        )
+        num_batches = (
+            self.num_full_batches + (self.last_batch_sizes[0] > 0) * self.world_size
+        )
+        batch_ids = range(self.rank, num_batches, self.world_size)[worker_id::num_workers]
 
-                if row_idx >= self.num_rows_per_file[file_idx]:
-                    file_idx += 1
-                    row_idx = 0
+        buffers = [self._new_batch_buffer() for _ in range(self.num_batch_buffers)]
+        for i, batch_idx in enumerate(batch_ids):
+            start, num_rows = self._get_batch_rows(batch_idx)
+            yield self._assemble_batch(start, num_rows, buffers[i % len(buffers)])
 
     def __len__(self) -> int:
         return self.num_full_batches // self.world_size + (self.last_batch_sizes[0] > 0)
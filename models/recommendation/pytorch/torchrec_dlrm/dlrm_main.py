@@ -448,6 +448,13 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         action="store_true",
         help="Use pinned memory when loading data.",
     )
+    parser.add_argument(
+        "--dataloader_num_workers",
+        type=int,
+        default=0,
+        help="Number of DataLoader worker processes that assemble the batches of the"
+        " synthetic multi-hot dataset in parallel.",
+    )
     parser.add_argument(
         "--mmap_mode",
         dest="mmap_mode",
@@ -543,6 +550,13 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         default=None,
         help="Multi-hot distribution options.",
     )
+    parser.add_argument(
+        "--multi_hot_on_the_fly",
+        dest="multi_hot_on_the_fly",
+        action="store_true",
+        help="Generate the synthetic multi-hot ids from a hash instead of storing "
+        "the 1-hot to multi-hot lookup tables, which saves host memory.",
+    )
     parser.add_argument(
         "--lr_warmup_steps",
         type=int,
@@ -733,7 +747,9 @@ def _evaluate(
             t1 = time.time()
             logits = model(batch.dense_features, batch.sparse_features)
             t2 = time.time()
-        return logits, batch.labels, t2 - t1
+        # the labels are kept until the end of the evaluation, and the batches of the
+        # multi-hot dataset are assembled in reused buffers
+        return logits, batch.labels.clone(), t2 - t1
 
     def gather_output(label, pred):
         my_rank = dist.get_rank()
@@ -1442,6 +1458,7 @@ def main(argv: List[str]) -> None:
             args.batch_size,
             collect_freqs_stats=args.collect_multi_hot_freqs_stats,
             dist_type=args.multi_hot_distribution_type,
+            on_the_fly=args.multi_hot_on_the_fly,
         )
         multihot.pause_stats_collection_during_val_and_test(model)
         print_memory("start transfer to multihot dataloader for dummy data ")
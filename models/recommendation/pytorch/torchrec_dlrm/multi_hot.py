@@ -43,7 +43,41 @@ class RestartableMap:
         return len(self.source)
 
 
+_MASK32 = 0xFFFFFFFF
+# the counter of column j of table k is k * _COUNTER_TABLE_STRIDE + j
+_COUNTER_TABLE_STRIDE = 1024
+# odd multiplier (2^32 / golden ratio) that spreads the 1-hot ids over 32 bits
+# before the salt is added, so that the hash input is a bijection of the id
+_ID_MULTIPLIER = 0x9E3779B1
+
+
+def _hash32(x: torch.Tensor) -> torch.Tensor:
+    """
+    Counter-based 32-bit integer hash (lowbias32) of an int64 tensor. Products
+    wrap around in int64, and their low 32 bits are the ones kept.
+    """
+    x = x & _MASK32
+    x = x ^ (x >> 16)
+    x = (x * 0x7FEB352D) & _MASK32
+    x = x ^ (x >> 15)
+    x = (x * 0x846CA68B) & _MASK32
+    return x ^ (x >> 16)
+
+
 class Multihot:
+    """
+    Converts 1-hot batches to multi-hot batches. The first id of every multi-hot
+    row is the 1-hot id, and the other ids are synthetic.
+
+    Tables with the same multi-hot size share one lookup table, where the rows
+    of each table are offset, so a batch is expanded with one gather per
+    distinct multi-hot size instead of one per table (tables with a multi-hot
+    size of 1 need no lookup table). With on_the_fly the lookup tables are not
+    stored, and the synthetic ids are generated from a deterministic hash of
+    (table, 1-hot id, column) instead, which needs no host memory (the ids differ
+    from the ones of the stored lookup tables).
+    """
+
     def __init__(
         self,
         multi_hot_sizes: List[int],
@@ -51,6 +85,7 @@ class Multihot:
         batch_size: int,
         collect_freqs_stats: bool,
         dist_type: str = "uniform",
+        on_the_fly: bool = False,
     ):
         if dist_type not in {"uniform", "pareto"}:
             raise ValueError(
@@ -61,11 +96,17 @@ class Multihot:
         self.multi_hot_sizes = multi_hot_sizes
         self.num_embeddings_per_feature = num_embeddings_per_feature
         self.batch_size = batch_size
+        self.on_the_fly = on_the_fly
 
-        # Generate 1-hot to multi-hot lookup tables, one lookup table per sparse embedding table.
-        self.multi_hot_tables_l = self.__make_multi_hot_indices_tables(
-            dist_type, multi_hot_sizes, num_embeddings_per_feature
-        )
+        # Group the tables by multi-hot size, the position of a table in its group
+        # is also the position of its rows in the lookup table of the group.
+        self.groups = self.__make_groups(multi_hot_sizes, num_embeddings_per_feature)
+
+        # Generate 1-hot to multi-hot lookup tables, one lookup table per multi-hot size.
+        if not on_the_fly:
+            self.__make_multi_hot_indices_tables(
+                dist_type, multi_hot_sizes, num_embeddings_per_feature
+            )
 
         # Pooling offsets are computed once and reused.
         self.offsets = self.__make_offsets(
@@ -77,9 +118,18 @@ class Multihot:
         self.model_to_track = None
         self.freqs_pre_hash = []
         self.freqs_post_hash = []
-        for embs_count in num_embeddings_per_feature:
-            self.freqs_pre_hash.append(np.zeros((embs_count)))
-            self.freqs_post_hash.append(np.zeros((embs_count)))
+        if collect_freqs_stats:
+            # one accumulator per multi-hot size, freqs_*_hash are views of them per table
+            self.freqs_pre_hash = [None] * len(num_embeddings_per_feature)
+            self.freqs_post_hash = [None] * len(num_embeddings_per_feature)
+            for group in self.groups:
+                group["freqs_pre"] = torch.zeros(group["rows"], dtype=torch.float64)
+                group["freqs_post"] = torch.zeros(group["rows"], dtype=torch.float64)
+                for k, start, end in zip(
+                    group["tables"], group["row_starts"], group["row_ends"]
+                ):
+                    self.freqs_pre_hash[k] = group["freqs_pre"][start:end].numpy()
+                    self.freqs_post_hash[k] = group["freqs_post"][start:end].numpy()
 
     def save_freqs_stats(self) -> None:
         if torch.distributed.is_available() and torch.distributed.is_initialized():
@@ -96,20 +146,64 @@ class Multihot:
     ) -> None:
         self.model_to_track = model
 
+    def __make_groups(
+        self,
+        multi_hot_sizes: List[int],
+        num_embeddings_per_feature: List[int],
+    ) -> List[dict]:
+        groups = {}
+        for k, (embs_count, multi_hot_size) in enumerate(
+            zip(num_embeddings_per_feature, multi_hot_sizes)
+        ):
+            group = groups.setdefault(
+                multi_hot_size,
+                {"size": multi_hot_size, "tables": [], "row_starts": [],
+                 "row_ends": [], "rows": 0, "lookup_table": None},
+            )
+            group["tables"].append(k)
+            group["row_starts"].append(group["rows"])
+            group["rows"] += embs_count
+            group["row_ends"].append(group["rows"])
+        self.table_positions = [None] * len(multi_hot_sizes)
+        for g, group in enumerate(groups.values()):
+            group["index"] = torch.tensor(group["tables"])
+            # (tables, 1) offsets of the 1-hot ids of the tables in the group
+            group["row_offsets"] = torch.tensor(group["row_starts"]).unsqueeze(1)
+            if self.on_the_fly:
+                # (tables, 1, columns) hash salt of each column of each table
+                salt = torch.tensor(group["tables"]).reshape(-1, 1, 1) * _COUNTER_TABLE_STRIDE
+                group["salt"] = _hash32(salt + torch.arange(group["size"]))
+                group["embs_counts"] = torch.tensor(
+                    [num_embeddings_per_feature[k] for k in group["tables"]]
+                ).reshape(-1, 1, 1)
+            for position, k in enumerate(group["tables"]):
+                self.table_positions[k] = (g, position)
+        return list(groups.values())
+
     def __make_multi_hot_indices_tables(
         self,
         dist_type: str,
         multi_hot_sizes: List[int],
         num_embeddings_per_feature: List[int],
-    ) -> List[np.array]:
+    ) -> None:
         np.random.seed(
             0
         )  # The seed is necessary for all ranks to produce the same lookup values.
-        multi_hot_tables_l = []
-        for embs_count, multi_hot_size in zip(
-            num_embeddings_per_feature, multi_hot_sizes
+        for group in self.groups:
+            if group["size"] > 1:
+                group["lookup_table"] = torch.empty(
+                    (group["rows"], group["size"]), dtype=torch.int
+                )
+        # the random values are drawn in table order, like with one lookup table per table
+        for k, (embs_count, multi_hot_size) in enumerate(
+            zip(num_embeddings_per_feature, multi_hot_sizes)
         ):
-            multi_hot_table = torch.empty((embs_count, multi_hot_size), dtype=torch.int)
+            if multi_hot_size == 1:
+                continue
+            g, position = self.table_positions[k]
+            group = self.groups[g]
+            start = group["row_starts"][position]
+            multi_hot_table = group["lookup_table"][start : start + embs_count]
             multi_hot_table[:, 0].copy_(torch.arange(embs_count, dtype=torch.int))
             if dist_type == "uniform":
                 synthetic_sparse_ids = np.random.randint(
@@ -126,8 +220,6 @@ class Multihot:
             multi_hot_table[:, 1:].copy_(synthetic_sparse_ids)
             del synthetic_sparse_ids
             gc.collect()
-            multi_hot_tables_l.append(multi_hot_table)
-        return multi_hot_tables_l
 
     def __make_offsets(
         self,
@@ -143,31 +235,77 @@ class Multihot:
         lS_o = torch.cumsum(torch.concat((torch.tensor([0]), lS_o)), axis=0)
         return lS_o
 
+    def __lookup(self, group: dict, ids: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the (tables, batch_size, multi_hot_size) multi-hot ids of the
+        (tables, batch_size) 1-hot ids of the tables in the group.
+        """
+        if group["size"] == 1:
+            return ids.int().unsqueeze(2)
+        if not self.on_the_fly:
+            return torch.nn.functional.embedding(
+                ids + group["row_offsets"], group["lookup_table"]
+            )
+        ids = ids.unsqueeze(2)
+        # the id and the salt are hashed together, as XOR with the salt only
+        # flips some bits of the id, and the related ids of columns whose salts
+        # differ in few bits would get related synthetic ids
+        hashed = _hash32(ids * _ID_MULTIPLIER + group["salt"])
+        if self.dist_type == "uniform":
+            synthetic_ids = hashed % group["embs_counts"]
+        else:
+            # inverse CDF of the pareto (Lomax) distribution with a=0.25
+            uniform = hashed.double() / float(_MASK32 + 1)
+            synthetic_ids = torch.fmod(
+                torch.floor(torch.pow(1.0 - uniform, -4.0) - 1.0),
+                group["embs_counts"],
+            ).long()
+        synthetic_ids[:, :, 0:1] = ids
+        return synthetic_ids.int()
+
+    def make_multi_hot_ids(self, table: int, ids: torch.Tensor) -> torch.Tensor:
+        """Returns the (len(ids), multi_hot_size) multi-hot ids of 1-hot ids of one table."""
+        g, position = self.table_positions[table]
+        group = self.groups[g]
+        ids = ids.reshape(1, -1).long()
+        if group["size"] > 1 and not self.on_the_fly:
+            # a single table of the group
+            group = dict(group, row_offsets=group["row_offsets"][position : position + 1])
+        elif self.on_the_fly:
+            group = dict(
+                group,
+                salt=group["salt"][position : position + 1],
+                embs_counts=group["embs_counts"][position : position + 1],
+            )
+        return self.__lookup(group, ids)[0]
+
     def __make_new_batch(
         self,
         lS_i: torch.Tensor,
         batch_size: int,
     ) -> Tuple[torch.Tensor, torch.Tensor]:
-        lS_i = lS_i.reshape(-1, batch_size)
-        multi_hot_ids_l = []
-        for k, (sparse_data_batch_for_table, multi_hot_table) in enumerate(
-            zip(lS_i, self.multi_hot_tables_l)
-        ):
-            multi_hot_ids = torch.nn.functional.embedding(
-                sparse_data_batch_for_table, multi_hot_table
-            )
-            multi_hot_ids = multi_hot_ids.reshape(-1)
-            multi_hot_ids_l.append(multi_hot_ids)
-            if self.collect_freqs_stats and (
-                self.model_to_track is None or self.model_to_track.training
-            ):
-                idx_pre, cnt_pre = np.unique(
-                    sparse_data_batch_for_table, return_counts=True
+        lS_i = lS_i.reshape(-1, batch_size).long()
+        collect_stats = self.collect_freqs_stats and (
+            self.model_to_track is None or self.model_to_track.training
+        )
+        group_ids = []
+        for group in self.groups:
+            ids = lS_i[group["index"]]
+            multi_hot_ids = self.__lookup(group, ids)
+            group_ids.append(multi_hot_ids)
+            if collect_stats:
+                row_ids = ids + group["row_offsets"]
+                group["freqs_pre"].index_add_(
+                    0, row_ids.reshape(-1), torch.ones(row_ids.numel(), dtype=torch.float64)
+                )
+                row_ids = multi_hot_ids + group["row_offsets"].unsqueeze(2)
+                group["freqs_post"].index_add_(
+                    0, row_ids.reshape(-1), torch.ones(row_ids.numel(), dtype=torch.float64)
                 )
-                idx_post, cnt_post = np.unique(multi_hot_ids, return_counts=True)
-                self.freqs_pre_hash[k][idx_pre] += cnt_pre
-                self.freqs_post_hash[k][idx_post] += cnt_post
-        lS_i = torch.cat(multi_hot_ids_l)
+        # back to table order
+        lS_i = torch.cat(
+            [group_ids[g][position].reshape(-1) for g, position in self.table_positions]
+        )
         if batch_size == self.batch_size:
             return lS_i, self.offsets
         else:
@@ -30,7 +30,7 @@ import sys
 
 import numpy as np
 import torch
-from torch import distributed as dist, nn
+from torch import distributed as dist
 from torchrec.datasets.criteo import DAYS
 
 p = pathlib.Path(__file__).absolute().parents[1].resolve()
@@ -146,12 +146,10 @@ def main() -> None:
         print(f"Materializing {input_file_path}")
         sparse_data = np.load(input_file_path, mmap_mode="r")
         multi_hot_ids_dict = {}
-        for j, (multi_hot_table, hash) in enumerate(
-            zip(multihot.multi_hot_tables_l, args.num_embeddings_per_feature)
-        ):
+        for j, hash in enumerate(args.num_embeddings_per_feature):
             sparse_tensor = torch.from_numpy(sparse_data[:, j] % hash)
-            multi_hot_ids_dict[str(j)] = nn.functional.embedding(
-                sparse_tensor, multi_hot_table
+            multi_hot_ids_dict[str(j)] = multihot.make_multi_hot_ids(
+                j, sparse_tensor
             ).numpy()
         output_file_path = os.path.join(
             args.output_path, f"day_{i}_sparse_multi_hot.npz"
@@ -0,0 +1,133 @@
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Structured metrics sidecar.
+
+Model scripts write one JSON record per line to the file in the METRICS_FILE
+environment variable: an "iteration" record for each measured iteration and a
+"summary" record with the final throughput and accuracy. parse_result.py reads
+the sidecar instead of scraping the raw log when it exists.
+"""
+
+import atexit
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+METRICS_FILE_ENV = "METRICS_FILE"
+ITERATION = "iteration"
+SUMMARY = "summary"
+
+
+def _to_float(value) -> Optional[float]:
+    """Convert python numbers and single element tensors to float."""
+    if value is None:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    return float(value)
+
+
+class MetricsEmitter:
+    """Write metrics records to a JSONL sidecar file."""
+
+    def __init__(self, path: Optional[str] = None, **metadata):
+        """
+        path: sidecar file, defaults to the METRICS_FILE environment variable.
+        The emitter does nothing when there is no path.
+        metadata: values that are added to the first record, e.g. the model name.
+        """
+        self.path = path or os.environ.get(METRICS_FILE_ENV)
+        self._file = None
+        self._step = 0
+        if self.path:
+            self._file = open(self.path, "w", encoding="UTF-8")
+            self._write({"type": "meta", "time": time.time(), **metadata})
+            atexit.register(self.close)
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+
+    def iteration(self, latency: float, batch_size: Optional[int] = None,
+                  step: Optional[int] = None, **values) -> None:
+        """Record the latency (in seconds) of one measured iteration."""
+        if not self.enabled:
+            return
+        step = self._step if step is None else step
+        self._step = step + 1
+        record = {"type": ITERATION, "step": step, "latency": _to_float(latency)}
+        if batch_size:
+            record["batch_size"] = int(batch_size)
+            if record["latency"]:
+                record["throughput"] = int(batch_size) / record["latency"]
+        record.update({key: _to_float(value) for key, value in values.items()})
+        self._write(record)
+
+    def summary(self, throughput=None, throughput_unit: str = "", accuracy=None,
+                accuracy_unit: str = "", **values) -> None:
+        """Record the final throughput and accuracy, and flush the sidecar."""
+        if not self.enabled:
+            return
+        record = {"type": SUMMARY,
+                  "throughput": _to_float(throughput), "throughput_unit": throughput_unit,
+                  "accuracy": _to_float(accuracy), "accuracy_unit": accuracy_unit}
+        record.update({key: _to_float(value) for key, value in values.items()})
+        self._write(record)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_metrics(path: str) -> Dict:
+    """
+    Read a sidecar and return the last summary record (or an empty dict) with
+    the list of iteration latencies under "latencies".
+    """
+    summary = {}
+    latencies: List[float] = []
+    with open(path, "r", encoding="UTF-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line can be partial when the run was killed
+                continue
+            if record.get("type") == ITERATION and record.get("latency") is not None:
+                latencies.append(record["latency"])
+            elif record.get("type") == SUMMARY:
+                summary = record
+    return {**summary, "latencies": latencies}
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Return the percentile of the values, with linear interpolation."""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * percent / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
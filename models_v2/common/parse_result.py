@@ -20,150 +20,219 @@
 
 """
 Models log parser.
+
+Every ACC/PERF/FUNCTIONAL pattern of the model is compiled once, and each log is
+read in a single buffered pass that keeps running aggregates of the matched values,
+so that large logs don't have to be scanned once per metric.
+
+When the model wrote a metrics sidecar (<name>_metrics.jsonl next to <name>_raw.log,
+see metrics.py), the throughput, accuracy and latency percentiles are read from it,
+and the patterns are only used for the values that are missing from the sidecar.
 """
 
 
 import argparse
+import collections
+import glob
 import importlib.util
 import re
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 import os
+from metrics import percentile, read_metrics
 # from common.utils import check_python_version
 
 
+READ_BUFFER_SIZE = 1 << 20
+ERROR_PATTERN = r"\S+Error"
+
+
+class Metric:
+    """Running aggregates of the values matched by one pattern."""
+
+    def __init__(self, pattern_dict: dict, has_value: bool = True):
+        self.pattern = re.compile(pattern_dict["pattern"])
+        self.has_value = has_value
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.min = None
+        self.max = None
+        self.number_of_partials = pattern_dict.get("number_of_partials")
+        self.partials = collections.deque(maxlen=self.number_of_partials)
+        self.first_match = None
+
+    def update(self, line: str) -> None:
+        """Update the aggregates with the line, if it matches the pattern."""
+        match = self.pattern.search(line)
+        if not match:
+            return
+        if self.first_match is None:
+            self.first_match = match.group(0)
+        if not self.has_value:
+            self.count += 1
+            return
+        value = float(match.group(1))
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.number_of_partials:
+            self.partials.append(value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean of the last number_of_partials values, or of every value."""
+        if not self.count:
+            return None
+        if self.number_of_partials:
+            return float(sum(self.partials) / self.number_of_partials)
+        return float(self.total / self.count)
+
+
+def scan_log(log_path: str, metrics: Iterable[Metric]) -> None:
+    """Read the log once and update every metric with each line."""
+    metrics = list(metrics)
+    with open(log_path, "r", encoding="UTF-8", errors="replace",
+              buffering=READ_BUFFER_SIZE) as file:
+        for line in file:
+            for metric in metrics:
+                metric.update(line)
+
+
+def _scan_single(log_path: str, pattern_dict: dict) -> Metric:
+    metric = Metric(pattern_dict)
+    scan_log(log_path, [metric])
+    return metric
+
+
 def get_functional_status(log_path: str, pattern_dict: dict) -> str:
     """Check if log contains functional line."""
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(pattern_dict["pattern"], line)
-            if match:
-                return "pass"
-    return "fail"
+    metric = Metric(pattern_dict, has_value=False)
+    scan_log(log_path, [metric])
+    return "pass" if metric.count else "fail"
 
 
 def get_error(log_path: str) -> str:
     """Get error message from log."""
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(r"\S+Error", line)
-            if match:
-                return match.group(0)
-    return "?"
+    metric = Metric({"pattern": ERROR_PATTERN}, has_value=False)
+    scan_log(log_path, [metric])
+    return metric.first_match or "?"
 
 
 def parse_log_total(log_path: str, pattern_dict: dict) -> Optional[float]:
     """Parse log and return matched value as total."""
-    value = None
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(pattern_dict["pattern"], line)
-            if match:
-                value = float(match.group(1))
-    return value
+    return _scan_single(log_path, pattern_dict).last
 
 
 # Parse results for models that leverage Torch DDP Horovod backend
 def parse_log_total_for_hvd_ddp(log_path: str, pattern_dict: dict) -> Optional[float]:
     """Parse log and return matched value as total."""
-    sum_value = []
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(pattern_dict["pattern"], line)
-            if match:
-                sum_value.append(float(match.group(1)))
-    if sum_value:
-        return float(sum(sum_value[-len(sum_value):]))
-    return None
+    metric = _scan_single(log_path, pattern_dict)
+    return float(metric.total) if metric.count else None
 
 
 def parse_log_min_for_hvd_ddp(log_path: str, pattern_dict: dict) -> Optional[float]:
     """Parse log and return matched value as total."""
-    min_value = []
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(pattern_dict["pattern"], line)
-            if match:
-                min_value.append(float(match.group(1)))
-    if min_value:
-        return float(min(min_value))
-    return None
+    return _scan_single(log_path, pattern_dict).min
 
 
 def parse_log_max_for_hvd_ddp(log_path: str, pattern_dict: dict) -> Optional[float]:
     """Parse log and return matched value as total."""
-    max_value = []
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(pattern_dict["pattern"], line)
-            if match:
-                max_value.append(float(match.group(1)))
-    if max_value:
-        return float(max(max_value))
-    return None
+    return _scan_single(log_path, pattern_dict).max
 
 
 def parse_log_mean(log_path: str, pattern_dict: dict) -> Optional[float]:
     """Parse log and return mean of matched values."""
-    partials = []
-    with open(log_path, "r", encoding="UTF-8") as file:
-        for line in file:
-            match = re.search(pattern_dict["pattern"], line)
-            if match:
-                partials.append(float(match.group(1)))
-    number_of_partials = pattern_dict.get("number_of_partials", len(partials))
-    if partials:
-        return float(sum(partials[-number_of_partials:]) / number_of_partials)
-    return None
+    return _scan_single(log_path, pattern_dict).mean
 
 
-def parse_log(args) -> None:
-    """Parse log and save results."""
+def load_patterns(model_name: str):
+    """Load the pattern module of the model."""
     spec = importlib.util.spec_from_file_location(
-        args.model_name, os.path.abspath(args.model_name+".py"))
+        model_name, os.path.abspath(model_name+".py"))
     patterns = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(patterns)
+    return patterns
+
+
+def get_log_paths(log_dirs: List[str]) -> List[str]:
+    """Expand the log paths and globs, and keep the order of the arguments."""
+    log_paths = []
+    for log_dir in log_dirs:
+        matches = sorted(glob.glob(log_dir)) if glob.has_magic(log_dir) else [log_dir]
+        for log_path in matches:
+            if log_path not in log_paths:
+                log_paths.append(log_path)
+    return log_paths
+
+
+def _get_aggregate(metric: Metric, agg_type: Optional[str], ddp: bool) -> Optional[float]:
+    """Return the aggregate of the metric for the pattern type."""
+    if not metric.count:
+        return None
+    if agg_type == "total":
+        return float(metric.total) if ddp else metric.last
+    if agg_type == "mean":
+        return metric.mean
+    if agg_type == "max":
+        return metric.max
+    return None
+
+
+def get_sidecar_path(log_path: str) -> str:
+    """Return the metrics sidecar path of a raw log."""
+    if log_path.endswith('_raw.log'):
+        return log_path[:-len('_raw.log')] + '_metrics.jsonl'
+    return os.path.splitext(log_path)[0] + '_metrics.jsonl'
+
+
+def parse_single_log(log_path: str, patterns, batch_size, ddp: bool = False) -> Dict[str, str]:
+    """Parse a log in one pass and save the results next to it."""
     acc_pattern = patterns.ACC
     perf_pattern = patterns.PERF
     functional_pattern = patterns.FUNCTIONAL
 
+    acc_metric = Metric(acc_pattern) if acc_pattern.get("unit") else None
+    perf_metric = Metric(perf_pattern) if perf_pattern.get("unit") else None
+    functional_metric = Metric(functional_pattern, has_value=False)
+    error_metric = Metric({"pattern": ERROR_PATTERN}, has_value=False)
+    sidecar_path = get_sidecar_path(log_path)
+    sidecar = read_metrics(sidecar_path) if os.path.isfile(sidecar_path) else {}
+    # the log is still scanned for the values that are missing from the sidecar, for the
+    # functional line and for errors
+    if sidecar.get("throughput") is not None:
+        perf_metric = None
+    if sidecar.get("accuracy") is not None:
+        acc_metric = None
+    scan_log(log_path, [m for m in (acc_metric, perf_metric, functional_metric, error_metric) if m])
+
     # parse accuracy
     accuracy = "N/A"
     accuracy_unit = ""
-    if acc_pattern.get("unit"):
+    if sidecar.get("accuracy") is not None:
+        accuracy = sidecar["accuracy"]
+        accuracy_unit = sidecar.get("accuracy_unit") or acc_pattern.get("unit", "")
+    elif acc_metric:
         accuracy_unit = acc_pattern['unit']
-        if args.hvd or args.ddp:
-            if acc_pattern.get("type") == "total":
-                accuracy = parse_log_total_for_hvd_ddp(
-                    args.log_dir, acc_pattern)
-            elif acc_pattern.get("type") == "mean":
-                accuracy = parse_log_mean(args.log_dir, acc_pattern)
-        else:
-            if acc_pattern.get("type") == "total":
-                accuracy = parse_log_total(args.log_dir, acc_pattern)
-            elif acc_pattern.get("type") == "mean":
-                accuracy = parse_log_mean(args.log_dir, acc_pattern)
+        if acc_pattern.get("type") in ("total", "mean"):
+            accuracy = _get_aggregate(acc_metric, acc_pattern.get("type"), ddp)
 
     # parse performance
     performance = "N/A"
+    performance_min = None
     performance_unit = ""
-    if perf_pattern.get("unit"):
+    if sidecar.get("throughput") is not None:
+        performance = sidecar["throughput"]
+        performance_unit = sidecar.get("throughput_unit") or perf_pattern.get("unit", "")
+        if ddp:
+            performance_min = performance
+    elif perf_metric:
         performance_unit = perf_pattern["unit"]
-        if args.hvd or args.ddp:
-            performance_min = parse_log_min_for_hvd_ddp(
-                args.log_dir, perf_pattern)
-            if perf_pattern["type"] == "total":
-                performance = parse_log_total_for_hvd_ddp(
-                    args.log_dir, perf_pattern)
-            elif perf_pattern["type"] == "mean":
-                performance = parse_log_mean(args.log_dir, perf_pattern)
-            elif perf_pattern["type"] == "max":
-                performance = parse_log_max_for_hvd_ddp(
-                    args.log_dir, perf_pattern)
-        else:
-            if perf_pattern["type"] == "total":
-                performance = parse_log_total(args.log_dir, perf_pattern)
-            elif perf_pattern["type"] == "mean":
-                performance = parse_log_mean(args.log_dir, perf_pattern)
+        if ddp:
+            performance_min = perf_metric.min
+        if perf_pattern["type"] in (("total", "mean", "max") if ddp else ("total", "mean")):
+            performance = _get_aggregate(perf_metric, perf_pattern["type"], ddp)
         # inverse if needed
         if perf_pattern.get("inverse") and performance:
             performance = 1 / performance
@@ -173,47 +242,68 @@ def parse_log(args) -> None:
             performance = performance * multiply
         # use batch size if needed
         if perf_pattern.get("use_batch_size") and performance:
-            performance = performance * int(args.batch_size)
+            performance = performance * int(batch_size)
 
     # get latency
     latency = "N/A"
-    if args.hvd or args.ddp:
-        latency = "N/A"
-    else:
-        if perf_pattern.get("unit") and isinstance(performance, float):
-            performance_unit = perf_pattern["unit"]
+    if not ddp:
+        if performance_unit and isinstance(performance, float):
             if bool(re.search('/s$', performance_unit)) or performance_unit == "fps":
-                latency = int(args.batch_size) / performance
+                latency = int(batch_size) / performance
 
     # get functional status
-    functional_status = get_functional_status(args.log_dir, functional_pattern)
+    functional_status = "pass" if functional_metric.count else "fail"
 
     performance = f"{float(f'{performance:.8g}')}" if isinstance(
         performance, float) else performance
-    if args.hvd or args.ddp:
+    if ddp:
         performance_min = f"{float(f'{performance_min:.8g}')}" if isinstance(
             performance_min, float) else performance_min
     accuracy = f"{accuracy:.3f}" if isinstance(accuracy, float) else accuracy
 
-    # save results to log file
-    result_dir = args.log_dir.replace('_raw.log', '.log')
-    result_file = open(result_dir, 'w')
-    result_file.write(f"Batch Size: {args.batch_size}")
-    if args.hvd or args.ddp:
-        result_file.write(
-            f"\nSum Performance: {performance} {performance_unit}")
-        result_file.write(
-            f"\nMin Performance: {performance_min} {performance_unit}")
-    else:
-        result_file.write(f"\nPerformance: {performance} {performance_unit}")
-    result_file.write(f"\nLatency: {latency} s")
-    result_file.write(f"\nAccuracy: {accuracy_unit} {accuracy}")
-    result_file.write(f"\nFunctional: {functional_status}")
-    if functional_status == "fail":
-        error = get_error(args.log_dir)
-        result_file.write(f"\nError: {error}")
-    result_file.write(f"\n")
-    result_file.close()
+    # save results to log file, without overwriting a raw log that isn't named *_raw.log
+    result_dir = log_path.replace('_raw.log', '.log')
+    if result_dir == log_path:
+        result_dir = os.path.splitext(log_path)[0] + "_result.log"
+    with open(result_dir, 'w') as result_file:
+        result_file.write(f"Batch Size: {batch_size}")
+        if ddp:
+            result_file.write(
+                f"\nSum Performance: {performance} {performance_unit}")
+            result_file.write(
+                f"\nMin Performance: {performance_min} {performance_unit}")
+        else:
+            result_file.write(f"\nPerformance: {performance} {performance_unit}")
+        result_file.write(f"\nLatency: {latency} s")
+        latencies = sidecar.get("latencies")
+        if latencies:
+            p50, p90, p99 = (percentile(latencies, p) for p in (50, 90, 99))
+            result_file.write(f"\nP50/P90/P99: {p50:.6g}/{p90:.6g}/{p99:.6g} s")
+        result_file.write(f"\nAccuracy: {accuracy_unit} {accuracy}")
+        result_file.write(f"\nFunctional: {functional_status}")
+        if functional_status == "fail":
+            error = error_metric.first_match or "?"
+            result_file.write(f"\nError: {error}")
+        result_file.write(f"\n")
+
+    return {"log": log_path, "result": result_dir, "performance": f"{performance} {performance_unit}",
+            "accuracy": f"{accuracy_unit} {accuracy}", "functional": functional_status}
+
+
+def parse_log(args) -> None:
+    """Parse every log and save results."""
+    patterns = load_patterns(args.model_name)
+    log_paths = get_log_paths(args.log_dir if isinstance(args.log_dir, list) else [args.log_dir])
+    if not log_paths:
+        print(f"No log files found for: {' '.join(args.log_dir)}")
+        return
+
+    summaries = [parse_single_log(log_path, patterns, args.batch_size, args.hvd or args.ddp)
+                 for log_path in log_paths]
+    if len(summaries) > 1:
+        for summary in summaries:
+            print(f"{summary['log']}: Performance: {summary['performance']}, "
+                  f"Accuracy: {summary['accuracy']}, Functional: {summary['functional']}")
 
 
 def main():
@@ -229,7 +319,8 @@ def main():
     parser.add_argument('--hvd', action='store_true',
                         help="parse results for models that leverage Horovod backend")
     parser.add_argument('--batch_size', '-b', required=True, help='Batch size')
-    parser.add_argument('--log_dir', '-l', required=True, help='Log directory')
+    parser.add_argument('--log_dir', '-l', required=True, nargs='+',
+                        help='Raw log files or globs, e.g. "logs/*_raw.log"')
     args = parser.parse_args()
     parse_log(args)
 
@@ -89,6 +89,11 @@ import dlrm_data_pytorch as dp
 # For distributed run
 import extend_distributed as ext_dist
 import mlperf_logger
+try:
+    # copied next to this script by setup.sh
+    from common.metrics import MetricsEmitter
+except ImportError:
+    MetricsEmitter = None
 
 # numpy
 import numpy as np
@@ -823,6 +828,9 @@ def dash_separated_floats(value):
     return value
 
 
+metrics_emitter = None
+
+
 def inference(
     args,
     dlrm_model,
@@ -847,6 +855,11 @@ def inference(
 
     if not inference_only:
         profile=False
+
+    # per-iteration metrics sidecar, written when METRICS_FILE is set
+    global metrics_emitter
+    if inference_only and metrics_emitter is None and MetricsEmitter and ext_dist.my_size <= 1:
+        metrics_emitter = MetricsEmitter(model="dlrm")
     time_count = 0
     batch = 0
     total_time = 0
@@ -1004,8 +1017,11 @@ def inference(
                             test_accu += A_test
                             test_samp += mbs_test
                     if i >= 5:
-                        total_time += time.time() - t1
+                        duration = time.time() - t1
+                        total_time += duration
                         time_count += 1
+                        if metrics_emitter:
+                            metrics_emitter.iteration(duration, batch_size=X_test.size(0), step=i)
 
                 if profile and i == 15:
                     if use_xpu:
@@ -1165,6 +1181,8 @@ def inference(
             print('dlrm_inf latency: ', total_time, ' s')
             print('dlrm_inf avg time: ', total_time/time_count, ' s, ant the time count is :', time_count)
             print('dlrm_inf throughput: ', batch * time_count/total_time, ' samples/s')
+            if metrics_emitter:
+                metrics_emitter.summary(batch * time_count / total_time, "inst/s", acc_test * 100, "accuracy")
     return model_metrics_dict, is_best
 
 
@@ -75,6 +75,11 @@ import torchvision.datasets as datasets
 import torchvision.models as models
 from torch.utils.data import Subset
 import math
+try:
+    # copied next to this script by setup.sh
+    from common.metrics import MetricsEmitter
+except ImportError:
+    MetricsEmitter = None
 
 torch._C._jit_set_profiling_mode(False)
 torch._C._jit_set_profiling_executor(False)
@@ -88,6 +93,9 @@ converged = False
 final_top1_acc = 0.0
 final_top5_acc = 0.0
 
+# per-iteration metrics sidecar, created in main() when METRICS_FILE is set
+metrics = None
+
 cwd = os.path.dirname(os.path.abspath(__file__))
 hub = os.path.expanduser("~/.cache/torch/intel")
 if not os.path.exists(hub):
@@ -214,7 +222,10 @@ global_lr = 0.0
 global_num_iter = 0
 
 def main():
+    global metrics
     args = parser.parse_args()
+    if MetricsEmitter and not args.multiprocessing_distributed:
+        metrics = MetricsEmitter(model=args.arch, batch_size=args.batch_size)
     if args.converge:
         print('[info] ------------------ converge arguments ------------------')
         print('running model:  ', args.arch)
@@ -1020,21 +1031,29 @@ def validate(val_loader, model, criterion, epoch, profiling, use_autocast, args)
                 # exclude first iteration for calculating througput
                 if i >= warmup_iter and not (args.num_iterations == 0 and i == len(val_loader) - 1):
                     duration_total += duration_eval
+                    if metrics:
+                        metrics.iteration(duration_eval, batch_size=images.size(0), step=i)
 
                 if (not args.num_iterations == 0) and (args.num_iterations <= warmup_iter):
                     print("At least ", warmup_iter, " iteartions required for performance measure")
                     sys.exit(0)
 
                 if i == (args.num_iterations - 1) and args.num_iterations >= warmup_iter:
+                    throughput = args.batch_size / (duration_total / (args.num_iterations - warmup_iter))
                     print('Evalution performance: batch size:%d, throughput:%.2f image/sec, Acc@1:%.2f, Acc@5:%.2f'
-                        % (args.batch_size, (args.batch_size / (duration_total / (args.num_iterations - warmup_iter))), top1.avg, top5.avg))
+                        % (args.batch_size, throughput, top1.avg, top5.avg))
+                    if metrics:
+                        metrics.summary(throughput, "fps", top1.avg, "acc@1", acc5=top5.avg)
                     sys.exit(0)
                 elif args.num_iterations == 0 and i == len(val_loader) - 1:
                     if args.converge and args.distributed:
                         top1.all_reduce()
                         top5.all_reduce()
+                    throughput = args.batch_size / (duration_total / (len(val_loader) - warmup_iter))
                     print('Evalution performance: batch size:%d, throughput:%.2f image/sec, Acc@1:%.2f, Acc@5:%.2f'
-                        % (args.batch_size, (args.batch_size / (duration_total / (len(val_loader) - warmup_iter))), top1.avg, top5.avg))
+                        % (args.batch_size, throughput, top1.avg, top5.avg))
+                    if metrics:
+                        metrics.summary(throughput, "fps", top1.avg, "acc@1", acc5=top5.avg)
                     if args.converge:
                         global final_top1_acc
                         global final_top5_acc
@@ -1188,14 +1207,22 @@ def validate_quantization(val_loader, model, criterion, profiling, args):
                 perf_start_iter = math.floor(args.num_iterations * 0.7)
             if i >= perf_start_iter:
                 duration_total += duration_eval
+                if metrics:
+                    metrics.iteration(duration_eval, batch_size=images.size(0), step=i)
 
             if i == (args.num_iterations - 1) and args.num_iterations >= 2:
+                throughput = args.batch_size / (duration_total / (args.num_iterations - perf_start_iter))
                 print('Quantization Evalution performance: batch size:%d, throughput:%.2f image/sec, Acc@1:%.2f, Acc@5:%.2f'
-                    % (args.batch_size, (args.batch_size / (duration_total / (args.num_iterations - perf_start_iter))), top1.avg, top5.avg))
+                    % (args.batch_size, throughput, top1.avg, top5.avg))
+                if metrics:
+                    metrics.summary(throughput, "fps", top1.avg, "acc@1", acc5=top5.avg)
                 sys.exit(0)
             elif args.num_iterations == 0 and i == len(val_loader) - 1:
+                throughput = args.batch_size / (duration_total / (len(val_loader) - 2))
                 print('Quantization Evalution performance: batch size:%d, throughput:%.2f image/sec, Acc@1:%.2f, Acc@5:%.2f'
-                    % (args.batch_size, (args.batch_size / (duration_total / (len(val_loader) - 2))), top1.avg, top5.avg))
+                    % (args.batch_size, throughput, top1.avg, top5.avg))
+                if metrics:
+                    metrics.summary(throughput, "fps", top1.avg, "acc@1", acc5=top5.avg)
                 sys.exit(0)
 
         progress.display_summary()
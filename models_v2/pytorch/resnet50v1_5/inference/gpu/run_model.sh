@@ -121,8 +121,8 @@ sum_log_analysis() {
 
 modelname=resnet50
 if [[ ${MULTI_TILE} == "False" ]]; then
-    rm ${OUTPUT_DIR}/resnet50_${PRECISION}_inf_t0_raw.log 
-    IPEX_XPU_ONEDNN_LAYOUT=1 python -u main.py \
+    rm -f ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_raw.log ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_metrics.jsonl
+    METRICS_FILE=${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_metrics.jsonl IPEX_XPU_ONEDNN_LAYOUT=1 python -u main.py \
         -a resnet50 \
         -b ${BATCH_SIZE} \
         --xpu 0 \
@@ -139,9 +139,9 @@ if [[ ${MULTI_TILE} == "False" ]]; then
     acc=$(cat ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0.log | grep Accuracy | awk -F ' ' '{print $3}')
     acc_unit=$(cat ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0.log | grep Accuracy | awk -F ' ' '{print $2}')
 else
-    rm ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_raw.log
-    rm ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t1_raw.log
-    ZE_AFFINITY_MASK=0.0 IPEX_XPU_ONEDNN_LAYOUT=1 python -u main.py \
+    rm -f ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_raw.log ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_metrics.jsonl
+    rm -f ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t1_raw.log ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t1_metrics.jsonl
+    METRICS_FILE=${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_metrics.jsonl ZE_AFFINITY_MASK=0.0 IPEX_XPU_ONEDNN_LAYOUT=1 python -u main.py \
         -a resnet50 \
         -b ${BATCH_SIZE} \
         --xpu 0 \
@@ -151,7 +151,7 @@ else
         --num-iterations ${NUM_ITERATIONS} \
         --benchmark 1 \
         ${DATASET_DIR} 2>&1 | tee ${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t0_raw.log &
-    ZE_AFFINITY_MASK=0.1 IPEX_XPU_ONEDNN_LAYOUT=1 python -u main.py \
+    METRICS_FILE=${OUTPUT_DIR}/${modelname}_${PRECISION}_inf_t1_metrics.jsonl ZE_AFFINITY_MASK=0.1 IPEX_XPU_ONEDNN_LAYOUT=1 python -u main.py \
         -a resnet50 \
         -b ${BATCH_SIZE} \
         --xpu 0 \
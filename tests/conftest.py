@@ -79,3 +79,14 @@ def patch(monkeypatch):
         return m
 
     return wrapper
+
+
+@pytest.fixture(autouse=True)
+def no_sysfs_topology(monkeypatch):
+    """
+    The platform util reads the cpu topology from sysfs of the machine running the
+    tests, so disable that and use the mocked lscpu output instead. Tests for the
+    sysfs topology build their own CPUTopology from a fake sysfs directory.
+    """
+    for module in ("common.platform_util", "benchmarks.common.platform_util"):
+        monkeypatch.setattr("{}.get_cpu_topology".format(module), MagicMock(return_value=None))
@@ -308,13 +308,14 @@ def test_multi_instance_train_prefix():
 @patch("common.platform_util.os")
 @patch("common.platform_util.system_platform")
 @patch("common.platform_util.subprocess")
-@patch("os.system")
+@patch("benchmarks.common.base_model_init.InstanceSupervisor")
 def test_numa_multi_instance_run_command(
-        mock_system, mock_subprocess, mock_platform, mock_os, mock_open, mock_glob,
+        mock_supervisor, mock_subprocess, mock_platform, mock_os, mock_open, mock_glob,
         mock_path_exists, test_num_instances, test_socket_id, test_cpu_list, expected_cpu_bind, precision):
     """ Test the multi instance run using numactl by trying different combinations of
-    cpu lists and the number of cores used per instance. Checks the system call that
-    is run to verify that it matches the cpu groups that are expected. """
+    cpu lists and the number of cores used per instance. Checks the instance commands
+    that are passed to the supervisor to verify that they match the cpu groups that are
+    expected. """
     platform_util = MagicMock(cpu_core_list=test_cpu_list)
     test_output_dir = "/tmp/output"
     args = MagicMock(verbose=True, model_name=test_model_name, batch_size=100,
@@ -348,12 +349,17 @@ def test_numa_multi_instance_run_command(
 
     # call run_command and then check the output
     base_model_init.run_command(test_run_command_with_prefix)
-    system_call_args = mock_system.call_args[0][0]
+    mock_supervisor.return_value.run.assert_called_once()
+    add_instance_calls = mock_supervisor.return_value.add_instance.call_args_list
+    assert len(add_instance_calls) == len(expected_cpu_bind)
 
-    for cpu_bind in expected_cpu_bind:
-        expected_cmd = "{}{} numactl --localalloc --physcpubind={} {} >> {}".\
-            format(expected_ld_preload, expected_omp_num_threads, cpu_bind, test_run_command, test_output_dir)
-        assert expected_cmd in system_call_args
+    for instance_call, cpu_bind in zip(add_instance_calls, expected_cpu_bind):
+        name, instance_cmd, instance_logfile = instance_call[0]
+        expected_cmd = "{}{} numactl --localalloc --physcpubind={} {}".\
+            format(expected_ld_preload, expected_omp_num_threads, cpu_bind, test_run_command)
+        assert instance_cmd == expected_cmd
+        assert instance_logfile.startswith(test_output_dir)
+        assert instance_logfile.endswith("_{}.log".format(name))
 
 
 @pytest.mark.parametrize('test_num_instances,test_socket_id,test_num_cores,test_cpu_list,test_cpuset,'
@@ -397,3 +403,39 @@ def test_num_inter_intra_threads_settings(
     print(base_model_init.args.num_intra_threads)
     assert base_model_init.args.num_inter_threads == expected_inter_threads
     assert base_model_init.args.num_intra_threads == expected_intra_threads
+
+
+@patch("os.path.exists")
+@patch("glob.glob")
+@patch("benchmarks.common.base_model_init.open")
+@patch("benchmarks.common.base_model_init.InstanceSupervisor")
+def test_numa_multi_instance_with_topology(mock_supervisor, mock_open, mock_glob, mock_path_exists):
+    """ Verifies that the placement planner is used to group the cores when the sysfs topology is available.
+    The node has two cache domains with 3 cores, so with 2 cores per instance, the leftover core of each
+    domain is added to that domain's instance instead of being skipped. """
+    from common.platform_util import CPUTopology
+    cpus = {cpu: {"core_id": cpu, "socket_id": 0, "node_id": 0, "siblings": [cpu], "llc_id": 0 if cpu < 3 else 3}
+            for cpu in range(6)}
+    platform_util = MagicMock(cpu_core_list=[["0", "1", "2", "3", "4", "5"]], topology=CPUTopology(cpus))
+    args = MagicMock(verbose=True, model_name=test_model_name, batch_size=100,
+                     numa_cores_per_instance="2", precision="fp32", disable_tcmalloc=True,
+                     output_dir="/tmp/output", mode="inference", socket_id=-1, benchmark_only=True)
+    os.environ["PYTHON_EXE"] = "python"
+    os.environ["MPI_HOSTNAMES"] = "None"
+    os.environ["MPI_NUM_PROCESSES"] = "None"
+    mock_path_exists.return_value = True
+    base_model_init = BaseModelInitializer(args, [], platform_util)
+    base_model_init.run_command("python foo.py")
+
+    instance_cmds = [c[0][1] for c in mock_supervisor.return_value.add_instance.call_args_list]
+    assert instance_cmds == ["OMP_NUM_THREADS=3 numactl --membind=0 --physcpubind=0-2 python foo.py",
+                             "OMP_NUM_THREADS=3 numactl --membind=0 --physcpubind=3-5 python foo.py"]
+
+    # With --numa-instances, that number of instances is planned for latency
+    mock_supervisor.reset_mock()
+    args.numa_instances = 1
+    base_model_init = BaseModelInitializer(args, [], platform_util)
+    base_model_init.run_command("python foo.py")
+
+    instance_cmds = [c[0][1] for c in mock_supervisor.return_value.add_instance.call_args_list]
+    assert instance_cmds == ["OMP_NUM_THREADS=6 numactl --membind=0 --physcpubind=0-5 python foo.py"]
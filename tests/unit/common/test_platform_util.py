@@ -23,7 +23,7 @@ import pytest
 import os
 from mock import MagicMock, mock_open, patch
 
-from benchmarks.common.platform_util import PlatformUtil, CPUInfo
+from benchmarks.common.platform_util import PlatformUtil, CPUInfo, CPUTopology
 from test_utils import platform_config
 
 
@@ -267,3 +267,126 @@ def test_platform_util_with_no_args(platform_mock, subprocess_mock):
     subprocess_mock.return_value = platform_config.LSCPU_OUTPUT
     platform_util = PlatformUtil("")
     assert platform_util.num_logical_cpus == 112
+
+
+def write_fake_sysfs(root, cpus, offline="", boot_id="boot-1", cpuset=None):
+    """
+    Writes a fake sysfs directory. cpus is a dict of cpu id to (socket id, core id, node id, llc id),
+    and cpus with the same socket and core id are SMT siblings.
+    """
+    cpu_dir = root.mkdir("devices").mkdir("system").mkdir("cpu")
+    node_dir = root.join("devices", "system").mkdir("node")
+    cpu_dir.join("online").write(",".join(str(x) for x in sorted(cpus)) + "\n")
+    cpu_dir.join("offline").write(offline + "\n")
+
+    nodes = {}
+    for cpu_id, (socket_id, core_id, node_id, llc_id) in cpus.items():
+        siblings = [x for x, v in cpus.items() if v[0] == socket_id and v[1] == core_id]
+        topology_dir = cpu_dir.mkdir("cpu{}".format(cpu_id)).mkdir("topology")
+        topology_dir.join("physical_package_id").write("{}\n".format(socket_id))
+        topology_dir.join("core_id").write("{}\n".format(core_id))
+        topology_dir.join("thread_siblings_list").write(",".join(str(x) for x in sorted(siblings)))
+        l3_dir = cpu_dir.join("cpu{}".format(cpu_id)).mkdir("cache").mkdir("index3")
+        l3_dir.join("level").write("3\n")
+        l3_dir.join("type").write("Unified\n")
+        l3_dir.join("shared_cpu_list").write(",".join(
+            str(x) for x, v in sorted(cpus.items()) if v[3] == llc_id))
+        nodes.setdefault(node_id, []).append(cpu_id)
+
+    for node_id, node_cpus in nodes.items():
+        node_dir.mkdir("node{}".format(node_id)).join("cpulist").write(
+            ",".join(str(x) for x in sorted(node_cpus)))
+
+    if cpuset is not None:
+        root.mkdir("fs").mkdir("cgroup").mkdir("cpuset").join("cpuset.cpus").write(cpuset)
+
+    boot_id_file = root.join("boot_id")
+    boot_id_file.write(boot_id)
+    return str(boot_id_file)
+
+
+# Two sockets with HT, where socket 0 is split into an uneven node 0 (3 cores) and node 1 (2 cores),
+# and socket 1 is node 2 with 3 cores, one of which (cpus 7 and 15) is offline.
+UNEVEN_TOPOLOGY_CPUS = dict(
+    [(cpu, (0, cpu, 0 if cpu < 3 else 1, 0)) for cpu in range(5)] +
+    [(cpu + 8, (0, cpu, 0 if cpu < 3 else 1, 0)) for cpu in range(5)] +
+    [(cpu, (1, cpu - 5, 2, 1)) for cpu in range(5, 7)] +
+    [(cpu + 8, (1, cpu - 5, 2, 1)) for cpu in range(5, 7)])
+
+
+def test_cpu_topology_from_sysfs(tmpdir):
+    """ Verifies the nodes, cores, siblings and cache domains read from a fake sysfs """
+    write_fake_sysfs(tmpdir, UNEVEN_TOPOLOGY_CPUS, offline="7,15")
+    topology = CPUTopology.from_sysfs(str(tmpdir))
+
+    assert topology.sockets == [0, 1]
+    assert topology.nodes == [0, 1, 2]
+    assert topology.threads_per_core == 2
+    assert topology.cores_per_socket == 5
+    assert topology.num_logical_cpus == 16
+    assert topology.offline_cpus == [7, 15]
+    assert topology.physical_cores(node_id=0) == [0, 1, 2]
+    assert topology.physical_cores(node_id=1) == [3, 4]
+    assert topology.physical_cores(node_id=2) == [5, 6]
+    assert topology.physical_cores(node_id=0, allowed_cpus=[1, 8, 9]) == [1, 8]
+    assert topology.cpus[9]["siblings"] == [1, 9]
+    assert topology.llc_domains() == {0: [0, 1, 2, 3, 4], 5: [5, 6]}
+
+
+def test_cpu_topology_cache(tmpdir):
+    """ Verifies that the topology is cached by boot id, and the cpuset is always read again """
+    sysfs = tmpdir.mkdir("sys")
+    cache_dir = str(tmpdir.mkdir("cache"))
+    boot_id_file = write_fake_sysfs(sysfs, UNEVEN_TOPOLOGY_CPUS, cpuset="0-2")
+    topology = CPUTopology.load(str(sysfs), cache_dir=cache_dir, boot_id_file=boot_id_file)
+    assert topology.nodes == [0, 1, 2]
+    assert topology.cpuset == [0, 1, 2]
+
+    # The cached topology is used, even though the node info is gone, but the cpuset is updated
+    sysfs.join("devices", "system", "node").remove()
+    sysfs.join("fs", "cgroup", "cpuset", "cpuset.cpus").write("3-4")
+    with patch("benchmarks.common.platform_util.CPUTopology.from_sysfs") as from_sysfs_mock:
+        topology = CPUTopology.load(str(sysfs), cache_dir=cache_dir, boot_id_file=boot_id_file)
+    assert not from_sysfs_mock.called
+    assert topology.nodes == [0, 1, 2]
+    assert topology.cpuset == [3, 4]
+
+    # After a reboot, sysfs is read again
+    sysfs.join("boot_id").write("boot-2")
+    topology = CPUTopology.load(str(sysfs), cache_dir=cache_dir, boot_id_file=boot_id_file)
+    assert topology.nodes == []
+
+
+@pytest.mark.parametrize('cpuset_range,expected_core_list,expected_cpuset_cpus,expected_num_sockets',
+                         [["", [["0", "1", "2"], ["3", "4"], ["5", "6"]], None, 2],
+                          ["1-4,13", [["1", "2"], ["3", "4"], ["13"]], {0: [1, 2], 1: [3, 4], 2: [13]}, 2],
+                          ["8-12", [["8", "9", "10"], ["11", "12"], []], {0: [8, 9, 10], 1: [11, 12]}, 1]])
+def test_platform_util_sysfs_topology(patch, platform_mock, tmpdir, cpuset_range, expected_core_list,
+                                      expected_cpuset_cpus, expected_num_sockets):
+    """ Verifies the platform info and core lists for uneven nodes from the sysfs topology """
+    write_fake_sysfs(tmpdir, UNEVEN_TOPOLOGY_CPUS, offline="7,15")
+    patch("get_cpu_topology", MagicMock(return_value=CPUTopology.from_sysfs(str(tmpdir))))
+    patch("PlatformUtil._get_cpuset", MagicMock(return_value=cpuset_range))
+    platform_mock.return_value = platform_config.SYSTEM_TYPE
+    platform_util = PlatformUtil(MagicMock(verbose=True, num_cores=-1))
+
+    assert platform_util.num_numa_nodes == 3
+    assert platform_util.num_cores_per_socket == 5
+    assert platform_util.num_threads_per_core == 2
+    assert platform_util.num_logical_cpus == 16
+    assert platform_util.num_cpu_sockets == expected_num_sockets
+    assert platform_util.cpu_core_list == expected_core_list
+    assert platform_util.cpuset_cpus == expected_cpuset_cpus
+
+
+def test_cpu_info_sysfs_topology(patch, tmpdir):
+    """ Verifies that the cpu info binding information is grouped by node for uneven nodes """
+    write_fake_sysfs(tmpdir, UNEVEN_TOPOLOGY_CPUS, offline="7,15")
+    patch("get_cpu_topology", MagicMock(return_value=CPUTopology.from_sysfs(str(tmpdir))))
+    binding_information = CPUInfo().binding_information
+
+    assert [[core["cpu_id"] for core in node] for node in binding_information] == [[0, 1, 2], [3, 4], [5, 6]]
+    assert [[core["ht_cpu_id"] for core in node] for node in binding_information] == \
+        [[8, 9, 10], [11, 12], [13, 14]]
+    assert binding_information[1][0]["node_id"] == 0
+    assert binding_information[1][0]["socket_id"] == 1
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import platform
+import time
+
+import pytest
+
+from common.utils.instance_supervisor import InstanceSupervisor
+
+
+pytestmark = pytest.mark.skipif(platform.system() == "Windows",
+                                reason="The supervisor tests use POSIX shell commands")
+
+
+def test_instance_output_and_exit_codes(tmpdir):
+    """ Verifies that each instance's output is written to its own log and that exit codes are reported """
+    supervisor = InstanceSupervisor(stream_output=False)
+    log_0 = str(tmpdir.join("instance0.log"))
+    log_1 = str(tmpdir.join("instance1.log"))
+
+    # The header is written before the supervisor runs, and the output should be appended
+    with open(log_0, "w") as log:
+        log.write("header\n")
+
+    supervisor.add_instance("instance0", "echo hello; echo world", log_0)
+    supervisor.add_instance("instance1", "echo failed; exit 3", log_1)
+    results = supervisor.run()
+
+    assert [r.returncode for r in results] == [0, 3]
+    assert results[0].succeeded and not results[1].succeeded
+    assert not any(r.stopped for r in results)
+    with open(log_0) as log:
+        assert log.read() == "header\nhello\nworld\n"
+    with open(log_1) as log:
+        assert log.read() == "failed\n"
+
+
+def test_stop_on_failure(tmpdir):
+    """ Verifies that a hung instance is stopped when another instance fails """
+    supervisor = InstanceSupervisor(stop_on_failure=True, stream_output=False)
+    supervisor.add_instance("hung", "sleep 60", str(tmpdir.join("hung.log")))
+    supervisor.add_instance("failed", "exit 1", str(tmpdir.join("failed.log")))
+
+    start = time.time()
+    results = supervisor.run()
+
+    assert time.time() - start < 30
+    assert results[0].stopped
+    assert results[0].returncode != 0
+    assert results[1].returncode == 1
+    assert not results[1].stopped
+
+
+def test_timeout(tmpdir):
+    """ Verifies that instances that are still running after the timeout are stopped """
+    supervisor = InstanceSupervisor(timeout=1, stream_output=False)
+    supervisor.add_instance("fast", "true", str(tmpdir.join("fast.log")))
+    supervisor.add_instance("slow", "sleep 60", str(tmpdir.join("slow.log")))
+    results = supervisor.run()
+
+    assert results[0].returncode == 0
+    assert not results[0].stopped
+    assert results[1].stopped
+    assert all(os.path.exists(r.log_file) for r in results)
+
+
+def test_streamed_output_is_prefixed(tmpdir, capsys):
+    """ Verifies that the live combined output prefixes each line with the instance name """
+    supervisor = InstanceSupervisor()
+    supervisor.add_instance("instance0", "echo foo", str(tmpdir.join("instance0.log")))
+    supervisor.run()
+
+    assert "[instance0] foo" in capsys.readouterr().out
@@ -22,6 +22,7 @@ import json
 import unittest
 from mock import patch
 
+from common.platform_util import CPUTopology
 from common.utils.multi_instance import InferencePrefix, CPUInfo
 
 
@@ -124,3 +125,38 @@ class TestCase(unittest.TestCase):
                                              cores_per_instance=int(inputs[i][2]))
             with self.assertRaises(Exception):
                 _ = multi_instance.generate_multi_instance_prefix(command, use_ht=False)
+
+    @patch("common.platform_util.get_cpu_topology")
+    def test_generate_inference_prefix_topology(self, get_cpu_topology_mock):
+        """
+        Test generate inference prefix with the sysfs topology, where each socket has
+        two cache domains with 3 cores, so the placement planner keeps instances in one
+        cache domain and spreads the leftover cores.
+        :param get_cpu_topology_mock: topology mock
+        :return: Nothing
+        """
+        cpus = {}
+        for cpu in range(12):
+            for cpu_id in (cpu, cpu + 12):
+                cpus[cpu_id] = {"core_id": cpu, "socket_id": cpu // 6, "node_id": cpu // 6,
+                                "siblings": [cpu, cpu + 12], "llc_id": cpu - cpu % 3}
+        get_cpu_topology_mock.return_value = CPUTopology(cpus)
+
+        multi_instance = InferencePrefix(sockets=2, cores_per_instance=2)
+        recived = multi_instance.generate_multi_instance_prefix(["ls"], use_ht=True)
+        self.assertEqual([["numactl", "--membind=0", "--physcpubind=0-2,12-14", "ls"],
+                          ["numactl", "--membind=0", "--physcpubind=3-5,15-17", "ls"],
+                          ["numactl", "--membind=1", "--physcpubind=6-8,18-20", "ls"],
+                          ["numactl", "--membind=1", "--physcpubind=9-11,21-23", "ls"]],
+                         recived, "Wrong generated prefix")
+
+        # Each core has its node and socket under their own keys
+        split_cores = multi_instance.split_cores()
+        self.assertEqual({"cpu_id": 6, "node_id": 1, "socket_id": 1, "ht_cpu_id": 18}, split_cores["1"][0][0])
+
+        # Like the buckets of the binding information, only instances_per_socket instances are used per node
+        multi_instance = InferencePrefix(sockets=2, instances=2, cores_per_instance=2)
+        recived = multi_instance.generate_multi_instance_prefix(["ls"], use_ht=False)
+        self.assertEqual([["numactl", "--membind=0", "--physcpubind=0-2", "ls"],
+                          ["numactl", "--membind=1", "--physcpubind=6-8", "ls"]],
+                         recived, "Wrong generated prefix")
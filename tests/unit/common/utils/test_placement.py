@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import pytest
+
+from common.platform_util import CPUTopology
+from common.utils.placement import LATENCY, THROUGHPUT, PlacementPlanner, format_cpu_list
+
+
+def get_test_topology():
+    """
+    Two nodes with two cache domains of 5 cores each (cpus 0-19), and HT siblings 20-39.
+    """
+    cpus = {}
+    for cpu in range(20):
+        llc_id = cpu - cpu % 5
+        for cpu_id in (cpu, cpu + 20):
+            cpus[cpu_id] = {"core_id": cpu, "socket_id": cpu // 10, "node_id": cpu // 10,
+                            "siblings": [cpu, cpu + 20], "llc_id": llc_id}
+    return CPUTopology(cpus)
+
+
+@pytest.mark.parametrize('cpus,expected',
+                         [[[0, 1, 2, 3, 8, 10, 11], "0-3,8,10-11"],
+                          [[5], "5"],
+                          [[3, 1, 2, 2], "1-3"],
+                          [[], ""]])
+def test_format_cpu_list(cpus, expected):
+    assert format_cpu_list(cpus) == expected
+
+
+@pytest.mark.parametrize('cores_per_instance,expected_cores',
+                         [[5, [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9], [10, 11, 12, 13, 14], [15, 16, 17, 18, 19]]],
+                          # 5 cores per cache domain, so the leftover core goes to the first instance
+                          [2, [[0, 1, 2], [3, 4], [5, 6, 7], [8, 9], [10, 11, 12], [13, 14],
+                               [15, 16, 17], [18, 19]]],
+                          # Instances larger than a cache domain are only kept within a node
+                          [8, [list(range(10)), list(range(10, 20))]]])
+def test_plan_throughput(cores_per_instance, expected_cores):
+    """ Verifies that instances don't span cache domains and that no cores are dropped """
+    placements = PlacementPlanner(get_test_topology()).plan(THROUGHPUT, cores_per_instance=cores_per_instance)
+    assert [p.cores for p in placements] == expected_cores
+    assert [p.node_id for p in placements] == [cores[0] // 10 for cores in expected_cores]
+
+
+@pytest.mark.parametrize('num_instances,expected_cores',
+                         [[4, [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9], [10, 11, 12, 13, 14], [15, 16, 17, 18, 19]]],
+                          [2, [list(range(10)), list(range(10, 20))]],
+                          [6, [[0, 1, 2], [3, 4], [5, 6, 7], [8, 9], [10, 11, 12, 13, 14],
+                               [15, 16, 17, 18, 19]]]])
+def test_plan_latency(num_instances, expected_cores):
+    """ Verifies that the requested number of instances are placed with as many cores as possible """
+    placements = PlacementPlanner(get_test_topology()).plan(LATENCY, num_instances=num_instances)
+    assert [p.cores for p in placements] == expected_cores
+
+
+def test_plan_with_allowed_cpus_and_nodes():
+    """ Verifies that only the allowed cpus of the selected nodes are used, and that a cache domain
+    with fewer cores than an instance is merged into its neighbour instead of getting an undersized instance """
+    planner = PlacementPlanner(get_test_topology(), allowed_cpus=[10, 11, 12, 13, 14, 35], node_ids=[1])
+    placements = planner.plan(THROUGHPUT, cores_per_instance=3)
+    assert [p.cores for p in placements] == [[10, 11, 12], [13, 14, 35]]
+    assert [p.node_id for p in placements] == [1, 1]
+    assert placements[0].ht_cores == []
+
+
+def test_plan_throughput_skips_small_nodes():
+    """ Verifies that the cores of a node with fewer cores than an instance are left unused """
+    planner = PlacementPlanner(get_test_topology(), allowed_cpus=[0, 1, 2, 5, 10, 11])
+    placements = planner.plan(THROUGHPUT, cores_per_instance=3)
+    assert [p.cores for p in placements] == [[0, 1, 2, 5]]
+    with pytest.raises(ValueError):
+        planner.plan(THROUGHPUT, cores_per_instance=5)
+
+
+def test_placement_prefixes():
+    """ Verifies the numactl and taskset prefixes of an instance """
+    placement = PlacementPlanner(get_test_topology()).plan(THROUGHPUT, cores_per_instance=5)[2]
+    assert placement.numactl_prefix() == "numactl --membind=1 --physcpubind=10-14"
+    assert placement.numactl_prefix(use_ht=True, localalloc=True) == \
+        "numactl --localalloc --physcpubind=10-14,30-34"
+    assert placement.taskset_prefix() == "taskset -c 10-14"
+
+
+@pytest.mark.parametrize('objective,kwargs',
+                         [[THROUGHPUT, {}],
+                          [LATENCY, {}],
+                          [LATENCY, {"num_instances": 41}],
+                          ["foo", {"num_instances": 1}]])
+def test_plan_errors(objective, kwargs):
+    with pytest.raises(ValueError):
+        PlacementPlanner(get_test_topology()).plan(objective, **kwargs)
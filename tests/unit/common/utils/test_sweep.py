@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+
+import pytest
+
+from common.utils.sweep import (FAILED, SUCCESS, SweepPoint, SweepResults, SweepRunner, find_point_logs,
+                                get_pareto_front, load_patterns, parse_point_logs)
+
+
+# Throughput of each (cores per instance, batch size) point for the fake runs
+THROUGHPUT = {(4, 1): 100.0, (4, 2): 180.0, (4, 4): 182.0, (4, 8): 300.0,
+              (8, 1): 150.0, (8, 2): 250.0, (8, 4): 400.0, (8, 8): 420.0}
+
+
+class FakeRun(object):
+    """Writes a log file like start.sh does, and fails the points in fail_points."""
+
+    def __init__(self, fail_points=()):
+        self.fail_points = fail_points
+        self.points = []
+
+    def __call__(self, point, output_dir):
+        self.points.append(point.key)
+        if point.key in self.fail_points:
+            return 1
+        with open(os.path.join(output_dir, "benchmark_test.log"), "w") as log:
+            throughput = THROUGHPUT[(point.cores_per_instance, point.batch_size)]
+            log.write("Batch size = {}\n".format(point.batch_size))
+            log.write("Latency: {:.3f} ms\n".format(1000.0 * point.batch_size / throughput))
+            log.write("Throughput: {:.3f} images/sec\n".format(throughput))
+        return 0
+
+
+def get_runner(tmpdir, run, **kwargs):
+    return SweepRunner(run, str(tmpdir.join("sweep", "results.jsonl")), batch_sizes=[1, 2, 4, 8],
+                       cores_per_instance=[4, 8], precisions=["fp32"], **kwargs)
+
+
+def test_parse_multi_instance_logs(tmpdir):
+    """ Verifies that the throughput of the instances is summed and that the latency is averaged """
+    for instance, (throughput, latency) in enumerate([(100, 10), (50, 20)]):
+        tmpdir.join("resnet50_fp32_inference_bs1_4cores_instance{}.log".format(instance)).write(
+            "Latency: {} ms\nThroughput: {} images/sec\n".format(latency, throughput))
+    tmpdir.join("resnet50_fp32_inference_bs1_4cores_all_instances.log").write("Throughput: 1000 images/sec\n")
+    tmpdir.join("benchmark_resnet50.log").write("Throughput: 1000 images/sec\n")
+
+    log_files = find_point_logs(str(tmpdir))
+    assert len(log_files) == 2
+    perf_pattern, latency_pattern = load_patterns()
+    assert parse_point_logs(log_files, perf_pattern, latency_pattern, batch_size=1) == (150.0, 15.0)
+
+
+def test_parse_with_pattern_module(tmpdir):
+    """ Verifies that a model pattern module without a LATENCY pattern gets the latency from the throughput """
+    pattern_file = tmpdir.join("dlrm.py")
+    pattern_file.write('PERF = {"type": "total", "pattern": r"throughput:  (\\d+.\\d+)  samples/s", '
+                       '"unit": "inst/s"}\n')
+    log_file = tmpdir.join("benchmark_dlrm.log")
+    log_file.write("dlrm_inf throughput:  1.0  samples/s\ndlrm_inf throughput:  4.0  samples/s\n")
+
+    perf_pattern, latency_pattern = load_patterns(str(pattern_file))
+    assert latency_pattern is None
+    assert parse_point_logs([str(log_file)], perf_pattern, latency_pattern, batch_size=2) == (4.0, 500.0)
+
+
+def test_sweep_early_stop_and_pareto(tmpdir):
+    """ Verifies that the batch sizes stop once the throughput plateaus and the Pareto table is written """
+    run = FakeRun()
+    runner = get_runner(tmpdir, run)
+    results = runner.run()
+
+    # 4 cores plateaus at batch size 4, so batch size 8 is skipped
+    assert run.points == ["fp32_4cores_bs1", "fp32_4cores_bs2", "fp32_4cores_bs4",
+                          "fp32_8cores_bs1", "fp32_8cores_bs2", "fp32_8cores_bs4", "fp32_8cores_bs8"]
+    assert all(r["status"] == SUCCESS for r in results)
+
+    front = [r["key"] for r in get_pareto_front(results)]
+    assert front == ["fp32_8cores_bs1", "fp32_8cores_bs2", "fp32_8cores_bs4", "fp32_8cores_bs8"]
+    with open(runner.pareto_file) as f:
+        table = f.read()
+    assert "fp32_4cores" not in table
+    assert len(table.splitlines()) == 2 + len(front)
+
+
+def test_sweep_without_early_stop(tmpdir):
+    run = FakeRun()
+    get_runner(tmpdir, run, plateau_threshold=0).run()
+    assert len(run.points) == 8
+
+
+def test_sweep_resume(tmpdir):
+    """ Verifies that a resumed sweep only reruns the failed points """
+    run = FakeRun(fail_points=["fp32_8cores_bs2"])
+    get_runner(tmpdir, run).run()
+    results = SweepResults(str(tmpdir.join("sweep", "results.jsonl")))
+    assert results.get(SweepPoint("fp32", 8, 2))["status"] == FAILED
+
+    run = FakeRun()
+    get_runner(tmpdir, run).run()
+    assert run.points == ["fp32_8cores_bs2"]
+    results = SweepResults(str(tmpdir.join("sweep", "results.jsonl")))
+    assert results.get(SweepPoint("fp32", 8, 2))["status"] == SUCCESS
+    assert len(results.results) == 7
+
+
+@pytest.mark.parametrize('results,expected',
+                         [[[], []],
+                          [[{"key": "a", "status": SUCCESS, "throughput": 10.0, "latency": 1.0},
+                            {"key": "b", "status": SUCCESS, "throughput": 20.0, "latency": 2.0},
+                            {"key": "c", "status": SUCCESS, "throughput": 15.0, "latency": 3.0},
+                            {"key": "d", "status": FAILED, "throughput": None, "latency": None}],
+                           ["a", "b"]]])
+def test_pareto_front(results, expected):
+    assert [r["key"] for r in get_pareto_front(results)] == expected
@@ -28,7 +28,7 @@ from test_utils import platform_config
 from common.utils.validators import (check_for_link, check_no_spaces, check_positive_number,
                                      check_positive_number_or_equal_to_negative_one, check_valid_filename,
                                      check_valid_folder, check_valid_file_or_dir, check_volume_mount,
-                                     check_shm_size, check_num_cores_per_instance)
+                                     check_shm_size, check_num_cores_per_instance, check_sweep_values)
 
 
 @pytest.fixture()
@@ -211,3 +211,18 @@ def test_valid_num_cores_per_instance(test_str):
 def test_invalid_num_cores_per_instance(test_str):
     with pytest.raises(ArgumentTypeError):
         check_num_cores_per_instance(test_str)
+
+
+@pytest.mark.parametrize("value,expected",
+                         [["1,8,16", [1, 8, 16]],
+                          ["1-64", [1, 2, 4, 8, 16, 32, 64]],
+                          ["16-64:16,8", [8, 16, 32, 48, 64]],
+                          ["4,4", [4]]])
+def test_check_sweep_values(value, expected):
+    assert check_sweep_values(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "foo", "8-4", "4-16:0", "1,,2", "-1"])
+def test_check_sweep_values_bad(value):
+    with pytest.raises(ArgumentTypeError):
+        check_sweep_values(value)
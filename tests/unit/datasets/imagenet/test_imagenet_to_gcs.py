@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("absl")
+tf = pytest.importorskip("tensorflow.compat.v1")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "datasets", "imagenet"))
+
+import imagenet_to_gcs  # noqa: E402
+
+
+def encode_jpeg(height, width, channels):
+    image = np.random.RandomState(0).randint(0, 256, (height, width, channels)).astype(np.uint8)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        return sess.run(tf.image.encode_jpeg(image))
+
+
+@pytest.fixture
+def image_files(tmpdir):
+    """Two RGB JPEGs and a grayscale one of each of two synsets."""
+    filenames = []
+    synsets = []
+    for i, synset in enumerate(["n01440764", "n01443537"]):
+        for j, (height, width, channels) in enumerate([(17, 23, 3), (32, 16, 3), (20, 20, 1)]):
+            filename = os.path.join(str(tmpdir), "{}_{}.JPEG".format(synset, j))
+            with open(filename, "wb") as f:
+                f.write(encode_jpeg(height + i, width, channels))
+            filenames.append(filename)
+            synsets.append(synset)
+    return filenames, synsets
+
+
+def read_records(output_file):
+    records = []
+    for record in tf.python_io.tf_record_iterator(output_file):
+        example = tf.train.Example.FromString(record)
+        feature = example.features.feature
+        records.append((feature["image/filename"].bytes_list.value[0].decode(),
+                        feature["image/class/label"].int64_list.value[0],
+                        feature["image/height"].int64_list.value[0],
+                        feature["image/width"].int64_list.value[0]))
+    return records
+
+
+@pytest.mark.parametrize("height,width,channels", [[17, 23, 3], [40, 8, 1]])
+def test_jpeg_header(height, width, channels):
+    image_data = encode_jpeg(height, width, channels)
+    assert imagenet_to_gcs._jpeg_header(image_data) == (height, width, channels)
+    assert imagenet_to_gcs._has_jpeg_end(image_data)
+    assert imagenet_to_gcs._jpeg_header(b"\x89PNG\r\n\x1a\n") is None
+
+
+def test_process_image_uses_header(image_files):
+    coder = imagenet_to_gcs.ImageCoder()
+    filename = image_files[0][1]
+    with open(filename, "rb") as f:
+        image_data = f.read()
+    assert imagenet_to_gcs._process_image(filename, coder) == (image_data, 32, 16)
+
+
+def test_process_image_truncated_jpeg(tmpdir):
+    image_data = encode_jpeg(64, 64, 3)
+    filename = os.path.join(str(tmpdir), "n01440764_9.JPEG")
+    with open(filename, "wb") as f:
+        f.write(image_data[:len(image_data) // 2])
+    # the header is intact, but the image can't be decoded
+    assert imagenet_to_gcs._jpeg_header(image_data[:len(image_data) // 2]) == (64, 64, 3)
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        imagenet_to_gcs._process_image(filename, imagenet_to_gcs.ImageCoder())
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_process_dataset(tmpdir, image_files, num_workers):
+    filenames, synsets = image_files
+    labels = {"n01440764": 1, "n01443537": 2}
+    output_directory = os.path.join(str(tmpdir), "validation")
+
+    files = imagenet_to_gcs._process_dataset(filenames, synsets, labels, output_directory,
+                                             "validation", 3, num_workers)
+    assert [os.path.basename(f) for f in files] == \
+        ["validation-0000{}-of-00003".format(i) for i in range(3)]
+    records = sum((read_records(f) for f in files), [])
+    expected_sizes = [(17, 23), (32, 16), (20, 20), (18, 23), (33, 16), (21, 20)]
+    assert records == [(os.path.basename(filename), labels[synset], height, width)
+                       for filename, synset, (height, width) in zip(filenames, synsets, expected_sizes)]
+    assert sorted(os.listdir(output_directory)) == [os.path.basename(f) for f in files]
+
+    # a truncated shard is written again, and the complete ones are kept
+    with open(files[1], "rb") as f:
+        shard = f.read()
+    with open(files[1], "wb") as f:
+        f.write(shard[:len(shard) // 2])
+    assert not imagenet_to_gcs._is_valid_shard(files[1], 2)
+    mtimes = [os.path.getmtime(f) for f in files]
+    assert imagenet_to_gcs._process_dataset(filenames, synsets, labels, output_directory,
+                                            "validation", 3, num_workers) == files
+    assert [os.path.getmtime(f) for f in files][::2] == mtimes[::2]
+    assert read_records(files[1]) == records[2:4]
+    assert all(imagenet_to_gcs._is_valid_shard(f, 2) for f in files)
@@ -0,0 +1,124 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..", "..", "..",
+                             "models", "aidd", "pytorch", "alphafold2", "inference"))
+
+from runners import feature_cache  # noqa: E402
+from runners.saver import save_feature_dict  # noqa: E402
+
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_read_fasta(tmpdir):
+    path = os.path.join(str(tmpdir), "t.fasta")
+    write(path, "\n>T1049 protein\nMKVL\nAGRE\n\n")
+    assert feature_cache.read_fasta(path) == ("MKVLAGRE", "T1049 protein")
+
+
+@pytest.mark.parametrize("content,error", [
+    ["", "No input sequence"],
+    ["MKVL\n", "No input sequence"],
+    [">a\nMK\n>b\nVL\n", "More than one input sequence"],
+])
+def test_read_fasta_errors(tmpdir, content, error):
+    path = os.path.join(str(tmpdir), "t.fasta")
+    write(path, content)
+    with pytest.raises(ValueError, match=error):
+        feature_cache.read_fasta(path)
+
+
+def test_path_fingerprint_of_a_prefix(tmpdir):
+    prefix = os.path.join(str(tmpdir), "pdb70")
+    for suffix in ["_a3m.ffdata", "_hhm.ffdata"]:
+        write(prefix + suffix, "data")
+    write(os.path.join(str(tmpdir), "other"), "data")
+    assert feature_cache.path_fingerprint(None) == []
+    fingerprint = feature_cache.path_fingerprint(prefix)
+    assert [f[:2] for f in fingerprint] == [["pdb70_a3m.ffdata", 4], ["pdb70_hhm.ffdata", 4]]
+
+    write(prefix + "_hhm.ffdata", "more data")
+    assert feature_cache.path_fingerprint(prefix) != fingerprint
+
+
+def test_path_fingerprint_of_a_directory(tmpdir):
+    mmcif_dir = os.path.join(str(tmpdir), "mmcif")
+    os.makedirs(os.path.join(mmcif_dir, "ab"))
+    write(os.path.join(mmcif_dir, "1abc.cif"), "data")
+    write(os.path.join(mmcif_dir, "ab", "2abd.cif"), "data!")
+    fingerprint = feature_cache.path_fingerprint(mmcif_dir)
+    assert [f[:3] for f in fingerprint] == [["mmcif", 2, 9]]
+
+    # a file of a subdirectory is updated in place, and the directories keep their mtimes
+    stat = os.stat(os.path.join(mmcif_dir, "ab"))
+    path = os.path.join(mmcif_dir, "ab", "2abd.cif")
+    write(path, "data?")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    os.utime(os.path.join(mmcif_dir, "ab"), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert feature_cache.path_fingerprint(mmcif_dir) != fingerprint
+
+
+def test_database_fingerprint(tmpdir):
+    path = os.path.join(str(tmpdir), "uniref90.fasta")
+    write(path, ">a\nMK\n")
+    fingerprint = feature_cache.database_fingerprint({"uniref90": path}, max_template_hits=20)
+    assert fingerprint == feature_cache.database_fingerprint({"uniref90": path}, max_template_hits=20)
+    assert fingerprint != feature_cache.database_fingerprint({"uniref90": path}, max_template_hits=10)
+    assert feature_cache.feature_key("MKVL", fingerprint) != feature_cache.feature_key("MKVA", fingerprint)
+
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_load_previous_features(tmpdir, archive):
+    intermediates_dir = os.path.join(str(tmpdir), "T1049", "intermediates")
+    assert feature_cache.load_previous_features(intermediates_dir, "MKVL") is None
+
+    os.makedirs(intermediates_dir)
+    features = {"sequence": np.array([b"MKVL"], dtype=np.object_),
+                "aatype": np.arange(8, dtype=np.int32).reshape(4, 2)}
+    if archive:
+        save_feature_dict(os.path.join(intermediates_dir, "features"), features)
+    else:
+        # the .npz file of the runs before the feature cache
+        np.savez(os.path.join(intermediates_dir, "features.npz"), **features)
+
+    feature_dict = feature_cache.load_previous_features(intermediates_dir, "MKVL")
+    np.testing.assert_array_equal(feature_dict["aatype"], features["aatype"])
+    # the features of another sequence of the same FASTA name aren't used
+    assert feature_cache.load_previous_features(intermediates_dir, "MKVA") is None
+
+
+def test_feature_cache(tmpdir):
+    cache = feature_cache.FeatureCache(str(tmpdir))
+    key = feature_cache.feature_key("MKVL", "fingerprint")
+    path = cache.features_path(key)
+    assert path.startswith(os.path.join(str(tmpdir), key[:2], key))
+    assert cache.load(path) is None
+    cache.save(path, {"aatype": np.arange(4)})
+    np.testing.assert_array_equal(cache.load(path)["aatype"], np.arange(4))
+    assert cache.processed_features_path(key, "model_1", 1, 0) != \
+        cache.processed_features_path(key, "model_1", 1, 1)
@@ -0,0 +1,99 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..", "..", "..",
+                             "models", "aidd", "pytorch", "alphafold2", "inference"))
+
+from runners import msa_scheduler  # noqa: E402
+from runners.msa_scheduler import CpuBudget  # noqa: E402
+
+
+def test_cpu_budget_limits_concurrent_reservations():
+    budget = CpuBudget(8)
+    lock = threading.Lock()
+    state = {"used": 0, "max_used": 0}
+
+    def search(n_cpu):
+        with budget.reserve(n_cpu):
+            with lock:
+                state["used"] += min(n_cpu, budget.n_cpu)
+                state["max_used"] = max(state["max_used"], state["used"])
+            time.sleep(0.01)
+            with lock:
+                state["used"] -= min(n_cpu, budget.n_cpu)
+
+    threads = [threading.Thread(target=search, args=(n,)) for n in [4, 4, 3, 6, 16, 2]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert 0 < state["max_used"] <= 8
+    assert budget.free == 8
+
+
+def test_cpu_budget_releases_on_errors():
+    budget = CpuBudget(4)
+    try:
+        with budget.reserve(3):
+            assert budget.free == 1
+            raise ValueError()
+    except ValueError:
+        pass
+    assert budget.free == 4
+
+
+class Runner(object):
+    def __init__(self, n_cpu=None):
+        if n_cpu is not None:
+            self.n_cpu = n_cpu
+        self.queries = []
+
+    def query(self, path):
+        self.queries.append(path)
+        return path
+
+
+class DataPipeline(object):
+    def __init__(self):
+        self.jackhmmer_uniref90_runner = Runner(8)
+        self.jackhmmer_mgnify_runner = Runner(8)
+        self.hhblits_bfd_uniclust_runner = Runner(4)
+        self.hhsearch_pdb70_runner = Runner()
+
+
+def test_limit_tool_cpus():
+    data_pipeline = DataPipeline()
+    budgets = {"jackhmmer": CpuBudget(6), "hhblits": CpuBudget(16), "hhsearch": CpuBudget(1)}
+    msa_scheduler.limit_tool_cpus(data_pipeline, budgets)
+
+    uniref90 = data_pipeline.jackhmmer_uniref90_runner
+    assert uniref90.budget is budgets["jackhmmer"]
+    # the cores of a search are limited to the budget of its tool
+    assert uniref90.n_cpu == uniref90.runner.n_cpu == 6
+    assert data_pipeline.hhblits_bfd_uniclust_runner.n_cpu == 4
+    assert data_pipeline.hhsearch_pdb70_runner.n_cpu == msa_scheduler.HHSEARCH_N_CPU
+    assert uniref90.query("q.fasta") == "q.fasta"
+    assert uniref90.runner.queries == ["q.fasta"]
+    assert budgets["jackhmmer"].free == 6
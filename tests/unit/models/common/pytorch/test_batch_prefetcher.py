@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "models", "common", "pytorch"))
+
+from batch_prefetcher import BatchPrefetcher  # noqa: E402
+
+
+def get_batches(num_batches=7):
+    return [(list(range(i, i + 3)), [i % 2]) for i in range(num_batches)]
+
+
+def unpack(batch):
+    return {"dense_x": batch[0], "T_test": batch[1]}
+
+
+@pytest.mark.parametrize("depth", [1, 2, 8])
+def test_prefetched_batches_match_loader(depth):
+    loader = get_batches()
+    prefetcher = BatchPrefetcher(loader, depth=depth)
+    assert len(prefetcher) == len(loader)
+    assert list(prefetcher) == list(loader)
+    assert prefetcher.num_batches == len(loader)
+    # the prefetcher can be iterated again, like a loader
+    assert list(prefetcher) == list(loader)
+
+
+def test_prefetched_batches_match_indexed_dataset():
+    dataset = get_batches()
+    indices = [4, 0, 2]
+    prefetcher = BatchPrefetcher(dataset, depth=2, indices=indices, transform=unpack)
+    assert len(prefetcher) == len(indices)
+    assert list(prefetcher) == [unpack(dataset[i]) for i in indices]
+
+
+def test_prefetcher_stops_early():
+    prefetcher = BatchPrefetcher(get_batches(100), depth=2)
+    batches = iter(prefetcher)
+    assert next(batches) == get_batches(1)[0]
+    batches.close()
+    assert prefetcher.num_batches == 1
+    assert prefetcher.reset_wait_time() >= 0
+    assert prefetcher.wait_time == 0
+
+
+def test_prefetcher_raises_loader_errors():
+    def transform(batch):
+        if batch[1] == [1]:
+            raise ValueError("bad batch")
+        return batch
+
+    prefetcher = BatchPrefetcher(get_batches(), transform=transform)
+    batches = iter(prefetcher)
+    assert next(batches) == get_batches(1)[0]
+    with pytest.raises(ValueError, match="bad batch"):
+        next(batches)
+
+
+def test_prefetcher_wait_per_batch():
+    prefetcher = BatchPrefetcher(get_batches(), depth=2)
+    batches = iter(prefetcher)
+    for _ in range(3):
+        next(batches)
+    assert prefetcher.wait_batches == 3
+    wait_time = prefetcher.wait_time
+    assert prefetcher.reset_wait_per_batch() == pytest.approx(wait_time / 3)
+    assert prefetcher.wait_time == 0
+    assert prefetcher.wait_batches == 0
+    next(batches)
+    assert prefetcher.wait_batches == 1
+    batches.close()
+
+
+def test_prefetcher_raises_base_exceptions():
+    def transform(batch):
+        if batch[1] == [1]:
+            raise SystemExit("loader exited")
+        return batch
+
+    prefetcher = BatchPrefetcher(get_batches(), transform=transform)
+    batches = iter(prefetcher)
+    next(batches)
+    with pytest.raises(SystemExit, match="loader exited"):
+        next(batches)
@@ -0,0 +1,128 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..",
+                             "models", "common", "tensorflow"))
+
+from image_classification import cache  # noqa: E402
+from image_classification.cache import PreprocessedImageCache  # noqa: E402
+
+
+def get_images(start, num_images, height=4, width=3):
+    """Images filled with their index, and labels of the index."""
+    ids = np.arange(start, start + num_images)
+    images = np.broadcast_to(ids.reshape(-1, 1, 1, 1) % 256, (num_images, height, width, 3))
+    return images.astype(np.uint8), ids
+
+
+def write_cache(path, num_images, add_size=3, truncated=False, shard_size=4, start=0):
+    image_cache = PreprocessedImageCache(path, shard_size=shard_size)
+    writer = image_cache.writer(4, 3)
+    for i in range(start, start + num_images, add_size):
+        writer.add(*get_images(i, min(add_size, start + num_images - i)))
+    writer.close(truncated=truncated)
+    return image_cache
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 4, 5, 10])
+def test_batches_span_shards(tmpdir, batch_size):
+    image_cache = write_cache(os.path.join(str(tmpdir), "c"), 10)
+    assert image_cache.index["num_shards"] == 3
+    batches = list(image_cache.batches(batch_size))
+    # the remainder that doesn't fill a batch is dropped
+    assert len(batches) == 10 // batch_size
+    for i, (images, labels) in enumerate(batches):
+        expected_images, expected_labels = get_images(i * batch_size, batch_size)
+        np.testing.assert_array_equal(images, expected_images)
+        np.testing.assert_array_equal(labels, expected_labels)
+
+
+def test_batches_of_some_images(tmpdir):
+    image_cache = write_cache(os.path.join(str(tmpdir), "c"), 10)
+    batches = list(image_cache.batches(3, num_images=7))
+    assert [list(labels) for _, labels in batches] == [[0, 1, 2], [3, 4, 5]]
+    # no more than the cached images
+    assert len(list(image_cache.batches(5, num_images=20))) == 2
+
+
+def test_add_checks_the_image_size(tmpdir):
+    writer = PreprocessedImageCache(os.path.join(str(tmpdir), "c")).writer(4, 3)
+    with pytest.raises(ValueError):
+        writer.add(np.zeros([2, 3, 4, 3], np.uint8), [0, 1])
+    writer.abort()
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_is_complete(tmpdir):
+    path = os.path.join(str(tmpdir), "c")
+    assert not PreprocessedImageCache(path).is_complete(4, 3)
+    write_cache(path, 6, truncated=True)
+    image_cache = PreprocessedImageCache(path)
+    # a truncated cache has enough images for shorter runs only
+    assert not image_cache.is_complete(4, 3)
+    assert image_cache.is_complete(4, 3, num_images=6)
+    assert not image_cache.is_complete(4, 3, num_images=7)
+    assert not image_cache.is_complete(5, 3, num_images=6)
+
+    write_cache(path, 8)
+    image_cache = PreprocessedImageCache(path)
+    assert image_cache.is_complete(4, 3)
+    assert image_cache.is_complete(4, 3, num_images=8)
+    assert not image_cache.is_complete(4, 4)
+
+
+def test_replace_cache(tmpdir):
+    path = os.path.join(str(tmpdir), "c")
+    image_cache = write_cache(path, 6, truncated=True)
+    images, _ = next(image_cache.batches(2))
+    image_cache = write_cache(path, 9, start=100)
+
+    assert PreprocessedImageCache(path).num_images == 9
+    assert [list(labels) for _, labels in image_cache.batches(3)] == \
+        [[100, 101, 102], [103, 104, 105], [106, 107, 108]]
+    # the batches of the replaced cache are still readable
+    np.testing.assert_array_equal(images, get_images(0, 2)[0])
+    assert os.listdir(str(tmpdir)) == ["c"]
+
+
+def test_cache_renamed_by_another_run_is_kept(tmpdir, monkeypatch):
+    path = os.path.join(str(tmpdir), "c")
+    image_cache = PreprocessedImageCache(path, shard_size=4)
+    writer = image_cache.writer(4, 3)
+    writer.add(*get_images(0, 5))
+    rename = os.rename
+
+    def racing_rename(src, dst):
+        if dst == path and "tmp" in os.path.basename(src):
+            # another run renames its cache right before this one
+            monkeypatch.setattr(cache.os, "rename", rename)
+            write_cache(path, 4, start=50)
+        rename(src, dst)
+
+    monkeypatch.setattr(cache.os, "rename", racing_rename)
+    writer.close()
+
+    assert [list(labels) for _, labels in image_cache.batches(4)] == [[50, 51, 52, 53]]
+    assert os.listdir(str(tmpdir)) == ["c"]
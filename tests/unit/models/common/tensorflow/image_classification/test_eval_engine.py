@@ -0,0 +1,119 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..",
+                             "models", "common", "tensorflow"))
+
+from image_classification.eval_engine import ClassifierEvalEngine, in_top_k  # noqa: E402
+
+PREDICTIONS = np.array([[0.1, 0.5, 0.2, 0.2],
+                        [0.3, 0.3, 0.3, 0.1],
+                        [0.4, 0.4, 0.1, 0.1],
+                        [0.1, np.nan, 0.6, 0.2],
+                        [0.1, 0.2, np.inf, 0.3],
+                        [0.0, 0.0, 0.0, 0.0]], np.float32)
+TARGETS = np.array([2, 1, 2, 2, 2, 3])
+
+
+@pytest.mark.parametrize("k,expected", [
+    # ties that straddle the top k boundary are all in the top k, and rows with
+    # non-finite predictions are never in the top k, as with tf.nn.in_top_k
+    [1, [False, True, False, False, False, True]],
+    [2, [True, True, False, False, False, True]],
+    [3, [True, True, True, False, False, True]],
+])
+def test_in_top_k(k, expected):
+    np.testing.assert_array_equal(in_top_k(PREDICTIONS, TARGETS, k), expected)
+
+
+@pytest.mark.parametrize("k", [1, 2, 5])
+def test_in_top_k_matches_tensorflow(k):
+    # not "tensorflow", which is also models/common/tensorflow when models/common is on the path
+    tf = pytest.importorskip("tensorflow.compat.v1")
+    rng = np.random.RandomState(0)
+    # rounded logits, so that many predictions are tied
+    predictions = np.round(rng.normal(size=(64, 10)), 1).astype(np.float32)
+    predictions[3, 4] = np.nan
+    predictions[7, 1] = -np.inf
+    targets = rng.randint(0, 10, 64)
+    targets[:8] = np.argmax(predictions[:8], axis=1)
+    with tf.Graph().as_default(), tf.Session() as sess:
+        expected = sess.run(tf.nn.in_top_k(targets=targets, predictions=predictions, k=k))
+    np.testing.assert_array_equal(in_top_k(predictions, targets, k), expected)
+
+
+class FakeSession(object):
+    """Returns the next of the batches, or raises an exception instead of a batch."""
+
+    def __init__(self, batches):
+        self._batches = iter(batches)
+
+    def run(self, fetches, feed_dict=None):
+        batch = next(self._batches)
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+
+def get_engine(batches, prefetch=2):
+    return ClassifierEvalEngine(FakeSession(batches), ["images", "labels"], None, None, None,
+                                batch_size=2, prefetch=prefetch)
+
+
+def test_batches():
+    batches = [[np.full([2, 3], i), [i, i]] for i in range(5)]
+    fetched = [data for data, _ in get_engine(batches).batches(5)]
+    assert [data[1] for data in fetched] == [batch[1] for batch in batches]
+
+
+def test_batches_raises_data_errors():
+    batches = get_engine([[1, 2], ValueError("bad record")]).batches(2)
+    next(batches)
+    with pytest.raises(ValueError, match="bad record"):
+        next(batches)
+
+
+def test_producer_error_after_the_consumer_stopped():
+    produced = threading.Event()
+
+    class Session(object):
+        def __init__(self):
+            self.num_runs = 0
+
+        def run(self, fetches, feed_dict=None):
+            self.num_runs += 1
+            if self.num_runs > 2:
+                # the queue is full, and the consumer has stopped
+                produced.set()
+                raise ValueError("bad record")
+            return [self.num_runs]
+
+    engine = ClassifierEvalEngine(Session(), ["images"], None, None, None, batch_size=1, prefetch=1)
+    batches = engine.batches(10)
+    next(batches)
+    produced.wait(5)
+    # the producer doesn't wait on the full queue forever, so this returns
+    batches.close()
@@ -0,0 +1,138 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "models", "common"))
+
+import feature_store  # noqa: E402
+
+
+@pytest.fixture
+def store(tmpdir):
+    return feature_store.FeatureStore(os.path.join(str(tmpdir), "f"))
+
+
+def write(store, num_features, offset=0):
+    writer = store.writer(dense={"ids": (np.int32, [4]),
+                                 "unique_id": (np.int64, [])},
+                          ragged={"map": np.int32, "flags": np.bool_},
+                          metadata={"num_examples": 3})
+    for i in range(num_features):
+        writer.add(ids=[i + offset, i + 1, i + 2, 0], unique_id=1000 + i,
+                   map=list(range(i)), flags=[j % 2 == 0 for j in range(i)])
+    return writer
+
+
+def test_round_trip(store):
+    assert not store.is_complete()
+    write(store, 5).close()
+
+    store = feature_store.FeatureStore(store.path)
+    assert store.is_complete()
+    assert len(store) == 5
+    assert store.metadata == {"num_examples": 3}
+    np.testing.assert_array_equal(store.column("ids")[3], [3, 4, 5, 0])
+    np.testing.assert_array_equal(store.column("unique_id"), [1000, 1001, 1002, 1003, 1004])
+    assert len(store.column("map")) == 5
+    np.testing.assert_array_equal(store.column("map")[0], [])
+    np.testing.assert_array_equal(store.column("map")[4], [0, 1, 2, 3])
+    np.testing.assert_array_equal(store.column("flags")[3], [True, False, True])
+
+
+def test_empty_store(store):
+    write(store, 0).close()
+
+    store = feature_store.FeatureStore(store.path)
+    assert store.is_complete()
+    assert len(store) == 0
+    assert store.column("ids").shape == (0, 4)
+    assert len(store.column("map")) == 0
+
+
+def test_unfinished_write_keeps_the_store(store):
+    write(store, 2).close()
+    ids = store.column("ids")
+    writer = write(store, 3, offset=10)
+    # the features are written next to the store, which stays readable
+    reader = feature_store.FeatureStore(store.path)
+    assert len(reader) == 2
+    np.testing.assert_array_equal(reader.column("ids")[1], [1, 2, 3, 0])
+    writer.close()
+
+    assert len(store) == 3
+    np.testing.assert_array_equal(store.column("ids")[1], [11, 2, 3, 0])
+    # the memory maps of the replaced store still have its features
+    np.testing.assert_array_equal(ids[1], [1, 2, 3, 0])
+    assert os.listdir(os.path.dirname(store.path)) == ["f"]
+
+
+def test_abort_keeps_the_store(store):
+    write(store, 2).close()
+    writer = write(store, 3)
+    with open(os.path.join(writer.path, "examples.bin"), "wb") as f:
+        f.write(b"examples")
+    writer.abort()
+
+    assert len(feature_store.FeatureStore(store.path)) == 2
+    assert os.listdir(os.path.dirname(store.path)) == ["f"]
+
+
+def test_store_replaced_by_another_instance_is_kept(store, monkeypatch):
+    write(store, 1).close()
+    writer = write(store, 3)
+    rename = os.rename
+
+    def racing_rename(src, dst):
+        if src == writer.path:
+            # another instance renames its store right before this one
+            monkeypatch.setattr(feature_store.os, "rename", rename)
+            write(feature_store.FeatureStore(store.path), 2).close()
+        rename(src, dst)
+
+    monkeypatch.setattr(feature_store.os, "rename", racing_rename)
+    writer.close()
+
+    assert len(store) == 2
+    assert os.listdir(os.path.dirname(store.path)) == ["f"]
+
+
+def test_add_checks_the_columns(store):
+    writer = write(store, 0)
+    with pytest.raises(ValueError):
+        writer.add(ids=[1, 2, 3], unique_id=1, map=[], flags=[])
+    with pytest.raises(ValueError):
+        writer.add(ids=[1, 2, 3, 4], unique_id=1, map=[])
+    writer.abort()
+
+
+def test_store_key(tmpdir):
+    path = os.path.join(str(tmpdir), "vocab.txt")
+    with open(path, "w") as f:
+        f.write("[UNK]\n")
+    key = feature_store.store_key([path], max_seq_length=384, doc_stride=128)
+    assert key == feature_store.store_key([path], doc_stride=128, max_seq_length=384)
+    assert key != feature_store.store_key([path], max_seq_length=384, doc_stride=64)
+    with open(path, "a") as f:
+        f.write("[CLS]\n")
+    assert key != feature_store.store_key([path], max_seq_length=384, doc_stride=128)
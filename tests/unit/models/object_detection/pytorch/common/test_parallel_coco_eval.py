@@ -0,0 +1,125 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pycocotools")
+from pycocotools.coco import COCO  # noqa: E402
+from pycocotools.cocoeval import COCOeval  # noqa: E402
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..",
+                             "models", "object_detection", "pytorch", "common"))
+
+import parallel_coco_eval  # noqa: E402
+from parallel_coco_eval import ParallelCocoEvaluator  # noqa: E402
+
+
+def random_boxes(rng, n):
+    xy = rng.uniform(0, 150, (n, 2))
+    wh = rng.uniform(5, 100, (n, 2))
+    return np.concatenate([xy, wh], axis=1)
+
+
+@pytest.fixture(scope="module")
+def coco_gt():
+    """Ground truth of 7 images with 3 categories."""
+    rng = np.random.RandomState(0)
+    images = [{"id": i, "width": 256, "height": 256} for i in range(1, 8)]
+    annotations = []
+    for image in images:
+        for box in random_boxes(rng, rng.randint(1, 6)):
+            annotations.append({"id": len(annotations) + 1, "image_id": image["id"],
+                                "category_id": int(rng.randint(1, 4)), "bbox": box.tolist(),
+                                "area": float(box[2] * box[3]), "iscrowd": 0})
+    coco = COCO()
+    coco.dataset = {"images": images, "annotations": annotations,
+                    "categories": [{"id": i, "name": str(i)} for i in range(1, 4)]}
+    with redirect_stdout(io.StringIO()):
+        coco.createIndex()
+    return coco
+
+
+def get_detections(coco_gt):
+    """Detections near the ground truth boxes and false positives of each image."""
+    rng = np.random.RandomState(1)
+    detections = {}
+    for image_id in coco_gt.getImgIds():
+        anns = coco_gt.loadAnns(coco_gt.getAnnIds(imgIds=[image_id]))
+        boxes = np.array([a["bbox"] for a in anns]) + rng.normal(0, 4, (len(anns), 4))
+        labels = np.array([a["category_id"] for a in anns])
+        boxes = np.concatenate([boxes, random_boxes(rng, 3)])
+        labels = np.concatenate([labels, rng.randint(1, 4, 3)])
+        detections[image_id] = (boxes, rng.uniform(0.05, 1, len(labels)), labels)
+    return detections
+
+
+def summarize(coco_eval):
+    with redirect_stdout(io.StringIO()):
+        coco_eval.accumulate()
+        coco_eval.summarize()
+    return coco_eval.stats
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_evaluate_matches_cocoeval(coco_gt, num_workers):
+    detections = get_detections(coco_gt)
+    evaluator = ParallelCocoEvaluator(coco_gt, num_workers=num_workers)
+    results = []
+    for image_id, (boxes, scores, labels) in detections.items():
+        if image_id % 3:
+            evaluator.add_detections(image_id, boxes, scores, labels)
+        else:
+            # the COCO result dicts of the other images
+            image_results = [{"image_id": image_id, "bbox": box.tolist(), "score": float(score),
+                              "category_id": int(label)} for box, score, label in zip(boxes, scores, labels)]
+            evaluator.add_results(image_id, image_results)
+        results.extend({"image_id": image_id, "bbox": box.tolist(), "score": float(score),
+                        "category_id": int(label)} for box, score, label in zip(boxes, scores, labels))
+
+    with redirect_stdout(io.StringIO()):
+        expected = COCOeval(coco_gt, coco_gt.loadRes(results), iouType="bbox")
+        expected.evaluate()
+    expected_stats = summarize(expected)
+    assert expected_stats[0] > 0
+
+    np.testing.assert_allclose(summarize(evaluator.evaluate()), expected_stats)
+
+
+def test_workers_default_to_the_cpu_affinity(coco_gt, monkeypatch):
+    monkeypatch.setattr(parallel_coco_eval.os, "sched_getaffinity", lambda pid: {2, 3}, raising=False)
+    assert ParallelCocoEvaluator(coco_gt).num_workers == 2
+
+
+def test_workers_are_capped_at_the_shards(coco_gt, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("a pool of a single shard")
+
+    monkeypatch.setattr(parallel_coco_eval.multiprocessing, "get_context", fail)
+    evaluator = ParallelCocoEvaluator(coco_gt, num_workers=8)
+    boxes, scores, labels = get_detections(coco_gt)[1]
+    evaluator.add_detections(1, boxes, scores, labels)
+    img_ids, eval_imgs = evaluator.evaluate_images()
+    assert list(img_ids) == [1]
+    assert eval_imgs.shape == (3, 4, 1)
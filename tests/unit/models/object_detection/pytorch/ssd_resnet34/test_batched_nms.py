@@ -0,0 +1,103 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import importlib.util
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("PIL")
+pytest.importorskip("defusedxml")
+
+UTILS_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..", "models",
+                          "object_detection", "pytorch", "ssd-resnet34", "inference", "cpu", "utils.py")
+
+
+@pytest.fixture(scope="module")
+def ssd_utils():
+    # the decoder module is named utils, like many others, so it's loaded from its path
+    spec = importlib.util.spec_from_file_location("ssd_resnet34_utils", UTILS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_detections(num_images, num_boxes=300, num_labels=81, tied=False, seed=0):
+    """Random ltrb boxes and the class probabilities of a batch of images.
+
+    With tied, the logits are rounded heavy tailed values, so that many boxes
+    of an image have the same scores.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    xy = torch.rand(num_images, num_boxes, 2, generator=generator) * 0.8
+    wh = torch.rand(num_images, num_boxes, 2, generator=generator) * 0.3 + 0.01
+    bboxes = torch.cat([xy, xy + wh], dim=2)
+    if tied:
+        pareto = torch.rand(num_images, num_boxes, num_labels, generator=generator).pow(-1.0 / 1.5)
+        logits = torch.round(torch.clamp(pareto, max=8.0))
+    else:
+        logits = torch.randn(num_images, num_boxes, num_labels, generator=generator) * 3
+    return bboxes, torch.softmax(logits, dim=-1)
+
+
+def batched_results(ssd_utils, bboxes, scores, max_output):
+    bboxes_out, labels_out, scores_out, lengths = ssd_utils.batched_nms(bboxes, scores, 0.45, max_output)
+    assert lengths.sum() == bboxes_out.size(0) == labels_out.size(0) == scores_out.size(0)
+    return zip(bboxes_out.split(lengths.tolist()), labels_out.split(lengths.tolist()),
+               scores_out.split(lengths.tolist()))
+
+
+def single_results(ssd_utils, bboxes, scores, max_output):
+    # decode_single doesn't use the default boxes
+    encoder = ssd_utils.Encoder.__new__(ssd_utils.Encoder)
+    return [encoder.decode_single(bboxes[i], scores[i], 0.45, max_output) for i in range(bboxes.size(0))]
+
+
+@pytest.mark.parametrize("num_images", [1, 3, 7])
+@pytest.mark.parametrize("max_output", [200, 20])
+def test_batched_nms_matches_decode_single(ssd_utils, monkeypatch, num_images, max_output):
+    # a chunk of 2 images, so that batches of 3 and 7 images span several chunks
+    monkeypatch.setattr(ssd_utils, "NMS_CHUNK_ELEMENTS", 2 * 80 * 200 * 200)
+    bboxes, scores = get_detections(num_images)
+    expected = single_results(ssd_utils, bboxes, scores, max_output)
+    results = list(batched_results(ssd_utils, bboxes, scores, max_output))
+    assert len(results) == num_images
+    for (bboxes_out, labels_out, scores_out), (expected_bboxes, expected_labels, expected_scores) in \
+            zip(results, expected):
+        assert torch.equal(bboxes_out, expected_bboxes)
+        assert torch.equal(labels_out, expected_labels)
+        assert torch.equal(scores_out, expected_scores)
+
+
+@pytest.mark.parametrize("num_images", [1, 3, 7])
+def test_batched_nms_tied_scores(ssd_utils, monkeypatch, num_images):
+    """The detections of tied scores are the same, but can be in another order."""
+    monkeypatch.setattr(ssd_utils, "NMS_CHUNK_ELEMENTS", 2 * 80 * 200 * 200)
+    bboxes, scores = get_detections(num_images, tied=True, seed=1)
+    expected = single_results(ssd_utils, bboxes, scores, 200)
+    results = list(batched_results(ssd_utils, bboxes, scores, 200))
+    assert len(results) == num_images
+    for (_, labels_out, scores_out), (_, expected_labels, expected_scores) in zip(results, expected):
+        assert labels_out.size(0) > 0
+        assert sorted(zip(scores_out.tolist(), labels_out.tolist())) == \
+            sorted(zip(expected_scores.tolist(), expected_labels.tolist()))
+        # in ascending score order, as decode_single
+        assert torch.equal(scores_out, expected_scores)
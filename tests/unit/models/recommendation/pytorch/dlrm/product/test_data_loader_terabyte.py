@@ -0,0 +1,133 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("tqdm")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..", "..",
+                             "models", "recommendation", "pytorch", "dlrm", "product"))
+
+from data_loader_terabyte import CriteoBinDataset  # noqa: E402
+
+TOT_FEA = 40
+
+
+def write_dataset(tmpdir, num_samples):
+    # sample i has the label i % 2, the dense features i and the sparse features 100 * i + j
+    samples = np.zeros((num_samples, TOT_FEA), dtype=np.int32)
+    samples[:, 0] = np.arange(num_samples) % 2
+    samples[:, 1:14] = np.arange(num_samples).reshape(-1, 1)
+    samples[:, 14:] = 100 * np.arange(num_samples).reshape(-1, 1) + np.arange(26)
+    data_file = os.path.join(str(tmpdir), "train_data.bin")
+    samples.tofile(data_file)
+    counts_file = os.path.join(str(tmpdir), "day_fea_count.npz")
+    np.savez(counts_file, counts=np.full(26, 100 * num_samples))
+    return data_file, counts_file
+
+
+def sample_ids(batch):
+    x_int, lS_o, lS_i, y = batch
+    return (lS_i[0] // 100).tolist()
+
+
+def test_batches(tmpdir):
+    data_file, counts_file = write_dataset(tmpdir, 10)
+    dataset = CriteoBinDataset(data_file, counts_file, batch_size=4)
+    # the last batch is partial
+    assert len(dataset) == 3
+    for idx, expected_ids in enumerate([[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]):
+        x_int, lS_o, lS_i, y = dataset[idx]
+        ids = torch.tensor(expected_ids)
+        np.testing.assert_allclose(x_int, torch.log(ids.float() + 1).reshape(-1, 1).repeat(1, 13))
+        np.testing.assert_array_equal(lS_o, torch.arange(len(ids)).repeat(26, 1))
+        np.testing.assert_array_equal(lS_i, (100 * ids.reshape(1, -1) + torch.arange(26).reshape(-1, 1)))
+        np.testing.assert_array_equal(y, (ids % 2).float().reshape(-1, 1))
+
+
+def test_max_ind_range(tmpdir):
+    data_file, counts_file = write_dataset(tmpdir, 4)
+    dataset = CriteoBinDataset(data_file, counts_file, batch_size=4, max_ind_range=7)
+    x_int, lS_o, lS_i, y = dataset[0]
+    np.testing.assert_array_equal(lS_i, (100 * torch.arange(4).reshape(1, -1) + torch.arange(26).reshape(-1, 1)) % 7)
+
+
+@pytest.mark.parametrize("shuffle_block", [1, 3])
+def test_set_epoch_shuffles_batches(tmpdir, shuffle_block):
+    data_file, counts_file = write_dataset(tmpdir, 21)
+    dataset = CriteoBinDataset(data_file, counts_file, batch_size=2, shuffle=True,
+                               shuffle_block=shuffle_block, seed=1)
+    assert len(dataset) == 11
+
+    def epoch_ids(epoch):
+        dataset.set_epoch(epoch)
+        return [sample_ids(dataset[idx]) for idx in range(len(dataset))]
+
+    first = epoch_ids(0)
+    # every sample once, with the partial last batch
+    assert sorted(i for ids in first for i in ids) == list(range(21))
+    assert [20] in first
+    # blocks of consecutive batches
+    starts = [ids[0] // 2 for ids in first]
+    position = 0
+    while position < len(starts):
+        start = starts[position]
+        assert start % shuffle_block == 0
+        block = list(range(start, min(start + shuffle_block, len(dataset))))
+        assert starts[position:position + len(block)] == block
+        position += len(block)
+    assert first != sorted(first)
+    # reproducible from the seed and the epoch
+    second = epoch_ids(1)
+    assert second != first
+    assert epoch_ids(0) == first
+    assert epoch_ids(1) == second
+
+
+def test_data_loader_workers(tmpdir):
+    data_file, counts_file = write_dataset(tmpdir, 10)
+    dataset = CriteoBinDataset(data_file, counts_file, batch_size=4)
+    dataset[0]
+    # the mapping is not pickled
+    copy = pickle.loads(pickle.dumps(dataset))
+    assert [sample_ids(copy[idx]) for idx in range(len(copy))] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    loader = torch.utils.data.DataLoader(dataset, batch_size=None, num_workers=2)
+    assert [sample_ids(batch) for batch in loader] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_empty_file(tmpdir, shuffle):
+    data_file, counts_file = write_dataset(tmpdir, 0)
+    dataset = CriteoBinDataset(data_file, counts_file, batch_size=4, shuffle=shuffle)
+    assert len(dataset) == 0
+    assert list(torch.utils.data.DataLoader(dataset, batch_size=None)) == []
+
+
+def test_empty_file_batch(tmpdir):
+    data_file, counts_file = write_dataset(tmpdir, 0)
+    dataset = CriteoBinDataset(data_file, counts_file, batch_size=4)
+    # an empty file can't be memory mapped, and its batches are empty
+    x_int, lS_o, lS_i, y = dataset[0]
+    assert lS_i.shape == (26, 0)
@@ -0,0 +1,55 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..", "..",
+                             "models", "recommendation", "pytorch", "dlrm", "product"))
+
+import data_utils  # noqa: E402
+
+ARGS_LIST = [(2, 3, 7), (3, 2, 5), (4, 3, 11)]
+
+
+@pytest.fixture
+def spawn_by_default(monkeypatch):
+    # the default start method on macOS and Windows, and of Python 3.14 on Linux
+    monkeypatch.setattr(data_utils, "get_context",
+                        lambda method=None: multiprocessing.get_context(method or "spawn"))
+
+
+@pytest.mark.parametrize("multiprocessing_enabled", [False, True])
+def test_run_per_day(multiprocessing_enabled):
+    assert data_utils.runPerDay(pow, ARGS_LIST, multiprocessing_enabled) == [1, 4, 9]
+    assert data_utils._per_day_args is None
+
+
+def test_run_per_day_forks_with_spawn_by_default(spawn_by_default):
+    assert data_utils.runPerDay(pow, ARGS_LIST, True) == [1, 4, 9]
+    assert data_utils._per_day_args is None
+
+
+def test_run_per_day_without_fork(spawn_by_default, monkeypatch):
+    monkeypatch.setattr(data_utils, "get_all_start_methods", lambda: ["spawn"])
+    assert data_utils.runPerDay(pow, ARGS_LIST, True) == [1, 4, 9]
+    assert data_utils._per_day_args is None
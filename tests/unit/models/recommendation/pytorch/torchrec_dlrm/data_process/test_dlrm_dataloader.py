@@ -0,0 +1,39 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import os
+import pickle
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("torchrec")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..", "..",
+                             "models", "recommendation", "pytorch", "torchrec_dlrm", "data_process"))
+
+import dlrm_dataloader  # noqa: E402
+
+
+def test_collate_batch_can_be_pickled():
+    # the DataLoader workers get the collate function pickled with spawn
+    collate_batch = pickle.loads(pickle.dumps(dlrm_dataloader._collate_batch))
+    batch = object()
+    assert collate_batch(batch) is batch
@@ -0,0 +1,175 @@
+#
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import gc
+import os
+import sys
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchrec")
+from torchrec.datasets.utils import Batch  # noqa: E402
+from torchrec.sparse.jagged_tensor import KeyedJaggedTensor  # noqa: E402
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..",
+                             "models", "recommendation", "pytorch", "torchrec_dlrm"))
+
+from multi_hot import Multihot  # noqa: E402
+
+MULTI_HOT_SIZES = [3, 1, 3, 5, 1, 5]
+NUM_EMBEDDINGS = [10, 7, 13, 20, 5, 20]
+BATCH_SIZE = 8
+
+
+class PerSampleMultihot(object):
+    """The previous expansion, with a lookup table per table and a gather per table."""
+
+    def __init__(self, multi_hot_sizes, num_embeddings_per_feature, dist_type):
+        np.random.seed(0)
+        self.tables = []
+        for embs_count, multi_hot_size in zip(num_embeddings_per_feature, multi_hot_sizes):
+            multi_hot_table = torch.empty((embs_count, multi_hot_size), dtype=torch.int)
+            multi_hot_table[:, 0].copy_(torch.arange(embs_count, dtype=torch.int))
+            if dist_type == "uniform":
+                synthetic_sparse_ids = np.random.randint(
+                    0, embs_count, size=(embs_count, multi_hot_size - 1), dtype=np.int32)
+            else:
+                synthetic_sparse_ids = np.random.pareto(
+                    a=0.25, size=(embs_count, multi_hot_size - 1)).astype(np.int32) % embs_count
+            multi_hot_table[:, 1:].copy_(torch.from_numpy(synthetic_sparse_ids).int())
+            del synthetic_sparse_ids
+            gc.collect()
+            self.tables.append(multi_hot_table)
+        self.freqs_pre_hash = [np.zeros(embs_count) for embs_count in num_embeddings_per_feature]
+        self.freqs_post_hash = [np.zeros(embs_count) for embs_count in num_embeddings_per_feature]
+
+    def expand(self, lS_i, batch_size):
+        multi_hot_ids_l = []
+        for k, (ids, multi_hot_table) in enumerate(zip(lS_i.reshape(-1, batch_size), self.tables)):
+            multi_hot_ids = torch.nn.functional.embedding(ids, multi_hot_table).reshape(-1)
+            multi_hot_ids_l.append(multi_hot_ids)
+            idx_pre, cnt_pre = np.unique(ids, return_counts=True)
+            idx_post, cnt_post = np.unique(multi_hot_ids, return_counts=True)
+            self.freqs_pre_hash[k][idx_pre] += cnt_pre
+            self.freqs_post_hash[k][idx_post] += cnt_post
+        return torch.cat(multi_hot_ids_l)
+
+
+def get_batch(batch_size, seed):
+    generator = torch.Generator().manual_seed(seed)
+    ids = torch.cat([torch.randint(0, n, (batch_size,), generator=generator) for n in NUM_EMBEDDINGS])
+    sparse_features = KeyedJaggedTensor.from_offsets_sync(
+        keys=[str(k) for k in range(len(NUM_EMBEDDINGS))], values=ids,
+        offsets=torch.arange(0, len(ids) + 1))
+    return Batch(dense_features=torch.zeros(batch_size, 13), sparse_features=sparse_features,
+                 labels=torch.zeros(batch_size))
+
+
+def expected_offsets(batch_size):
+    lengths = np.repeat(MULTI_HOT_SIZES, batch_size)
+    return np.concatenate([[0], np.cumsum(lengths)])
+
+
+@pytest.mark.parametrize("dist_type", ["uniform", "pareto"])
+def test_batch_expansion_matches_per_sample_expansion(dist_type):
+    multihot = Multihot(MULTI_HOT_SIZES, NUM_EMBEDDINGS, BATCH_SIZE, collect_freqs_stats=True,
+                        dist_type=dist_type)
+    reference = PerSampleMultihot(MULTI_HOT_SIZES, NUM_EMBEDDINGS, dist_type)
+    # the last batch of a dataset can be smaller
+    for seed, batch_size in enumerate([BATCH_SIZE, BATCH_SIZE, 5]):
+        batch = get_batch(batch_size, seed)
+        expected_ids = reference.expand(batch.sparse_features.values(), batch_size)
+        new_batch = multihot.convert_to_multi_hot(batch)
+        np.testing.assert_array_equal(new_batch.sparse_features.values(), expected_ids)
+        np.testing.assert_array_equal(new_batch.sparse_features.offsets(), expected_offsets(batch_size))
+        assert new_batch.sparse_features.keys() == batch.sparse_features.keys()
+
+    for k in range(len(NUM_EMBEDDINGS)):
+        np.testing.assert_array_equal(multihot.freqs_pre_hash[k], reference.freqs_pre_hash[k])
+        np.testing.assert_array_equal(multihot.freqs_post_hash[k], reference.freqs_post_hash[k])
+
+
+def test_stats_paused_during_evaluation():
+    class Model(object):
+        training = False
+
+    multihot = Multihot(MULTI_HOT_SIZES, NUM_EMBEDDINGS, BATCH_SIZE, collect_freqs_stats=True)
+    multihot.pause_stats_collection_during_val_and_test(Model())
+    multihot.convert_to_multi_hot(get_batch(BATCH_SIZE, 0))
+    assert all(not freqs.any() for freqs in multihot.freqs_pre_hash + multihot.freqs_post_hash)
+
+
+@pytest.mark.parametrize("dist_type", ["uniform", "pareto"])
+def test_make_multi_hot_ids_matches_batch(dist_type):
+    for on_the_fly in [False, True]:
+        multihot = Multihot(MULTI_HOT_SIZES, NUM_EMBEDDINGS, BATCH_SIZE, collect_freqs_stats=False,
+                            dist_type=dist_type, on_the_fly=on_the_fly)
+        batch = get_batch(BATCH_SIZE, 1)
+        ids = batch.sparse_features.values().reshape(-1, BATCH_SIZE)
+        values = multihot.convert_to_multi_hot(batch).sparse_features.values()
+        expected = torch.cat([multihot.make_multi_hot_ids(k, ids[k]).reshape(-1)
+                              for k in range(len(NUM_EMBEDDINGS))])
+        np.testing.assert_array_equal(values, expected)
+
+
+@pytest.mark.parametrize("dist_type", ["uniform", "pareto"])
+def test_on_the_fly_ids(dist_type):
+    num_embeddings = [1000, 1000, 1000]
+    multihot = Multihot([20, 20, 20], num_embeddings, BATCH_SIZE, collect_freqs_stats=False,
+                        dist_type=dist_type, on_the_fly=True)
+    ids = torch.arange(1000)
+    tables = [multihot.make_multi_hot_ids(k, ids) for k in range(len(num_embeddings))]
+    for multi_hot_ids in tables:
+        assert multi_hot_ids.shape == (1000, 20)
+        np.testing.assert_array_equal(multi_hot_ids[:, 0], ids)
+        assert multi_hot_ids.min() >= 0 and multi_hot_ids.max() < 1000
+    # deterministic, e.g. for all the ranks
+    np.testing.assert_array_equal(multihot.make_multi_hot_ids(1, ids), tables[1])
+    if dist_type == "uniform":
+        # the synthetic ids of the columns of every table are independent of the
+        # 1-hot id, also for related ids
+        synthetic = torch.stack(tables)[:, :, 1:]
+        assert abs(float(synthetic.double().mean()) - 499.5) < 10
+        for column in range(19):
+            for other in range(column + 1, 19):
+                same = (synthetic[:, :, column] == synthetic[:, :, other]).double().mean()
+                assert same < 0.01
+        same_as_next_id = (synthetic[:, 1:] == synthetic[:, :-1]).double().mean()
+        assert same_as_next_id < 0.01
+        same_across_tables = (synthetic[0] == synthetic[1]).double().mean()
+        assert same_across_tables < 0.01
+
+
+def test_on_the_fly_columns_are_not_related():
+    multihot = Multihot([4], [1000], BATCH_SIZE, collect_freqs_stats=False, on_the_fly=True)
+    g, position = multihot.table_positions[0]
+    salt = multihot.groups[g]["salt"][position, 0]
+    ids = torch.arange(1000)
+    multi_hot_ids = multihot.make_multi_hot_ids(0, ids)
+    for column in range(1, 4):
+        for other in range(1, 4):
+            if other == column:
+                continue
+            # the ids that a hash of the id XOR the salt maps to the same value
+            related_ids = ids ^ salt[column] ^ salt[other]
+            related = multihot.make_multi_hot_ids(0, related_ids)
+            same = (multi_hot_ids[:, column] == related[:, other]).double().mean()
+            assert same < 0.01
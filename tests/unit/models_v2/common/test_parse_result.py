@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2023 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "models_v2", "common"))
+
+import metrics  # noqa: E402
+import parse_result  # noqa: E402
+
+
+PATTERNS = SimpleNamespace(
+    ACC={"pattern": r"Accuracy: ([\d.]+)", "unit": "%", "type": "total"},
+    PERF={"pattern": r"Throughput: ([\d.]+)", "unit": "fps", "type": "mean"},
+    FUNCTIONAL={"pattern": r"Test done"},
+)
+
+
+def write_log(tmpdir, lines, name="model_raw.log"):
+    log_path = os.path.join(str(tmpdir), name)
+    with open(log_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return log_path
+
+
+def read_result(summary):
+    with open(summary["result"]) as f:
+        return f.read()
+
+
+def test_metrics_emitter_disabled_without_path(monkeypatch):
+    monkeypatch.delenv(metrics.METRICS_FILE_ENV, raising=False)
+    emitter = metrics.MetricsEmitter()
+    assert not emitter.enabled
+    # nothing is written and nothing fails
+    emitter.iteration(0.5, batch_size=2)
+    emitter.summary(throughput=4.0)
+    emitter.close()
+
+
+def test_metrics_emitter_round_trip(tmpdir, monkeypatch):
+    path = os.path.join(str(tmpdir), "model_metrics.jsonl")
+    monkeypatch.setenv(metrics.METRICS_FILE_ENV, path)
+    emitter = metrics.MetricsEmitter(model="resnet50")
+    assert emitter.path == path
+    emitter.iteration(0.5, batch_size=2)
+    emitter.iteration(0.25, batch_size=2, loss=1.5)
+    emitter.summary(throughput=6.0, throughput_unit="fps", accuracy=75.5, accuracy_unit="%")
+    emitter.close()
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert [r["type"] for r in records] == ["meta", metrics.ITERATION, metrics.ITERATION, metrics.SUMMARY]
+    assert records[0]["model"] == "resnet50"
+    assert [r["step"] for r in records[1:3]] == [0, 1]
+    assert records[1]["throughput"] == 4.0
+    assert records[2]["loss"] == 1.5
+
+    result = metrics.read_metrics(path)
+    assert result["throughput"] == 6.0
+    assert result["throughput_unit"] == "fps"
+    assert result["accuracy"] == 75.5
+    assert result["latencies"] == [0.5, 0.25]
+
+
+def test_read_metrics_skips_partial_line(tmpdir):
+    path = os.path.join(str(tmpdir), "model_metrics.jsonl")
+    with open(path, "w") as f:
+        f.write(json.dumps({"type": metrics.ITERATION, "step": 0, "latency": 0.1}) + "\n")
+        f.write('{"type": "iteration", "step": 1, "lat')
+    result = metrics.read_metrics(path)
+    assert result == {"latencies": [0.1]}
+
+
+@pytest.mark.parametrize("values,percent,expected",
+                         [[[], 50, None],
+                          [[3.0], 99, 3.0],
+                          [[4.0, 1.0, 3.0, 2.0], 50, 2.5],
+                          [[1.0, 2.0, 3.0, 4.0, 5.0], 90, 4.6]])
+def test_percentile(values, percent, expected):
+    assert metrics.percentile(values, percent) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("log_path,expected",
+                         [["logs/model_raw.log", "logs/model_metrics.jsonl"],
+                          ["logs/model.log", "logs/model_metrics.jsonl"]])
+def test_get_sidecar_path(log_path, expected):
+    assert parse_result.get_sidecar_path(log_path) == expected
+
+
+def test_parse_single_log_without_sidecar(tmpdir):
+    log_path = write_log(tmpdir, ["Throughput: 10.0", "Throughput: 30.0", "Accuracy: 76.1234", "Test done"])
+    summary = parse_result.parse_single_log(log_path, PATTERNS, 4)
+    assert summary["result"] == os.path.join(str(tmpdir), "model.log")
+    assert summary["performance"] == "20.0 fps"
+    assert summary["accuracy"] == "% 76.123"
+    assert summary["functional"] == "pass"
+    assert "Latency: 0.2 s" in read_result(summary)
+
+
+def test_parse_single_log_merges_sidecar(tmpdir):
+    # the throughput and latencies come from the sidecar, and the accuracy that is
+    # missing from it from the log
+    log_path = write_log(tmpdir, ["Throughput: 10.0", "Accuracy: 76.1234", "Test done"])
+    emitter = metrics.MetricsEmitter(parse_result.get_sidecar_path(log_path))
+    for latency in (0.1, 0.2, 0.3):
+        emitter.iteration(latency, batch_size=4)
+    emitter.summary(throughput=40.0, throughput_unit="img/s")
+    emitter.close()
+
+    summary = parse_result.parse_single_log(log_path, PATTERNS, 4)
+    assert summary["performance"] == "40.0 img/s"
+    assert summary["accuracy"] == "% 76.123"
+    assert summary["functional"] == "pass"
+    result = read_result(summary)
+    assert "Latency: 0.1 s" in result
+    assert "P50/P90/P99: 0.2/0.28/0.298 s" in result
+
+
+def test_parse_single_log_sidecar_accuracy(tmpdir):
+    log_path = write_log(tmpdir, ["Throughput: 10.0", "Accuracy: 76.1234", "Test done"])
+    emitter = metrics.MetricsEmitter(parse_result.get_sidecar_path(log_path))
+    emitter.summary(accuracy=0.5, accuracy_unit="top1")
+    emitter.close()
+
+    summary = parse_result.parse_single_log(log_path, PATTERNS, 4)
+    assert summary["performance"] == "10.0 fps"
+    assert summary["accuracy"] == "top1 0.500"
+
+
+def test_parse_single_log_sidecar_checks_functional(tmpdir):
+    # a throughput in the sidecar doesn't mean the run passed, the log is still
+    # checked for the functional line and the error is reported
+    log_path = write_log(tmpdir, ["Throughput: 10.0", "RuntimeError: out of memory"])
+    emitter = metrics.MetricsEmitter(parse_result.get_sidecar_path(log_path))
+    emitter.summary(throughput=40.0, throughput_unit="fps")
+    emitter.close()
+
+    summary = parse_result.parse_single_log(log_path, PATTERNS, 4)
+    assert summary["performance"] == "40.0 fps"
+    assert summary["functional"] == "fail"
+    assert "Error: RuntimeError" in read_result(summary)
+
+
+SAMPLE_LOG = [
+    "Loading model",
+    "Throughput: 12.5 fps",
+    "Accuracy: 70.0",
+    "Throughput: 7.5 fps",
+    "warning: ValueError ignored",
+    "Throughput: 20.0 fps",
+    "Accuracy: 75.25",
+    "KeyError: 'missing'",
+    "Test done",
+]
+
+
+@pytest.mark.parametrize("parse,pattern_dict,expected",
+                         [[parse_result.parse_log_total, {"pattern": r"Throughput: ([\d.]+)"}, 20.0],
+                          [parse_result.parse_log_total, {"pattern": r"Accuracy: ([\d.]+)"}, 75.25],
+                          [parse_result.parse_log_total_for_hvd_ddp, {"pattern": r"Throughput: ([\d.]+)"}, 40.0],
+                          [parse_result.parse_log_min_for_hvd_ddp, {"pattern": r"Throughput: ([\d.]+)"}, 7.5],
+                          [parse_result.parse_log_max_for_hvd_ddp, {"pattern": r"Throughput: ([\d.]+)"}, 20.0],
+                          [parse_result.parse_log_mean, {"pattern": r"Throughput: ([\d.]+)"}, 40.0 / 3],
+                          [parse_result.parse_log_mean, {"pattern": r"Throughput: ([\d.]+)", "number_of_partials": 2},
+                           13.75],
+                          [parse_result.parse_log_mean, {"pattern": r"Accuracy: ([\d.]+)"}, 72.625],
+                          [parse_result.parse_log_total, {"pattern": r"Latency: ([\d.]+)"}, None],
+                          [parse_result.parse_log_total_for_hvd_ddp, {"pattern": r"Latency: ([\d.]+)"}, None],
+                          [parse_result.parse_log_mean, {"pattern": r"Latency: ([\d.]+)"}, None]])
+def test_parse_log_values(tmpdir, parse, pattern_dict, expected):
+    # the values of the single pass parser are the ones of the former per metric parsers
+    log_path = write_log(tmpdir, SAMPLE_LOG)
+    assert parse(log_path, pattern_dict) == pytest.approx(expected)
+
+
+def test_functional_status_and_error(tmpdir):
+    log_path = write_log(tmpdir, SAMPLE_LOG)
+    assert parse_result.get_functional_status(log_path, {"pattern": r"Test done"}) == "pass"
+    assert parse_result.get_functional_status(log_path, {"pattern": r"Benchmark done"}) == "fail"
+    # the first error of the log
+    assert parse_result.get_error(log_path) == "ValueError"
+    assert parse_result.get_error(write_log(tmpdir, ["Test done"], "ok_raw.log")) == "?"
+
+
+def test_scan_log_updates_every_metric(tmpdir):
+    log_path = write_log(tmpdir, SAMPLE_LOG)
+    perf = parse_result.Metric({"pattern": r"Throughput: ([\d.]+)"})
+    acc = parse_result.Metric({"pattern": r"Accuracy: ([\d.]+)"})
+    functional = parse_result.Metric({"pattern": r"Test done"}, has_value=False)
+    error = parse_result.Metric({"pattern": parse_result.ERROR_PATTERN}, has_value=False)
+    parse_result.scan_log(log_path, [perf, acc, functional, error])
+
+    assert (perf.count, perf.total, perf.last, perf.min, perf.max) == (3, 40.0, 20.0, 7.5, 20.0)
+    assert (acc.count, acc.last, acc.mean) == (2, 75.25, 72.625)
+    assert functional.count == 1
+    assert error.count == 2
+    assert error.first_match == "ValueError"
+
+
+def test_parse_single_log_ddp(tmpdir):
+    patterns = SimpleNamespace(ACC=PATTERNS.ACC, FUNCTIONAL=PATTERNS.FUNCTIONAL,
+                               PERF={"pattern": r"Throughput: ([\d.]+)", "unit": "fps", "type": "total"})
+    summary = parse_result.parse_single_log(write_log(tmpdir, SAMPLE_LOG), patterns, 4, ddp=True)
+    assert summary["performance"] == "40.0 fps"
+    assert summary["accuracy"] == "% 145.250"
+    result = read_result(summary)
+    assert "Min Performance: 7.5 fps" in result
+    assert "Latency: N/A s" in result
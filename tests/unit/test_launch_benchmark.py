@@ -215,7 +215,14 @@ def test_launch_benchmark_parse_unknown_args(launch_benchmark):
                                                 "--mode", test_mode,
                                                 "--precision", test_precision,
                                                 "--volume", "~:test"],
-                                                  "Volume mounts can only be used when running in a docker container"]
+                                                  "Volume mounts can only be used when running in a docker container"],
+                                              ['catch_error', SystemExit, ["--sweep-batch-sizes", "1,2"],
+                                                  "can only be used with --sweep"],
+                                              ['catch_error', SystemExit, ["--sweep"],
+                                                  "A sweep requires at least one of"],
+                                              ['catch_error', SystemExit,
+                                               ["--sweep", "--sweep-precisions", "fp32,fp64"],
+                                                  "Invalid sweep precisions: fp64"]
                                               ], indirect=True)
 def test_launch_benchmark_parse_bad_args(launch_benchmark):
     """
@@ -295,6 +302,33 @@ def test_launch_benchmark_tensorflow_serving_framework(launch_benchmark, mock_po
     assert os.environ["TEST_ENV_VAR_2"] == test_env_vars["TEST_ENV_VAR_2"]
 
 
+@pytest.mark.parametrize('launch_benchmark', [["--sweep", "--sweep-batch-sizes", "1-4",
+                                               "--sweep-cores-per-instance", "4,8",
+                                               "--sweep-precisions", "fp32,int8"]], indirect=True)
+def test_launch_benchmark_sweep(launch_benchmark, platform_mock):
+    """ Verifies that each sweep point runs the model with the point's args """
+    platform_mock.return_value = platform_config.OS_TYPE
+    with mock_patch("launch_benchmark.SweepRunner") as mock_runner, \
+            mock_patch.object(launch_benchmark, "run_model", return_value=0) as mock_run_model:
+        launch_benchmark.main()
+        assert mock_runner.return_value.run.called
+        args, kwargs = mock_runner.call_args
+        assert kwargs["batch_sizes"] == [1, 2, 4]
+        assert kwargs["cores_per_instance"] == [4, 8]
+        assert kwargs["precisions"] == ["fp32", "int8"]
+
+        # Run a point and check the args that the model is run with
+        run_point = args[0]
+        point_args = {}
+        mock_run_model.side_effect = lambda *_: point_args.update(vars(launch_benchmark.args)) or 0
+        assert run_point(MagicMock(precision="int8", batch_size=2, cores_per_instance=8), "/tmp/point") == 0
+        assert point_args["precision"] == "int8"
+        assert point_args["batch_size"] == 2
+        assert point_args["numa_cores_per_instance"] == "8"
+        assert point_args["output_dir"] == "/tmp/point"
+        assert point_args["disable_tcmalloc"] == "False"
+
+
 def test_help(mock_platform_util, capsys):
     """ Tests `launch_benchmark.py --help` output and ensures there is no error """
     with mock_patch.object(sys, 'argv', ["launch_benchmark.py", "--help"]):